@@ -1,28 +1,194 @@
 from __future__ import annotations
 
+import json
 import re
 from collections import defaultdict
+from datetime import date
 from typing import Any
 
-from fastapi import APIRouter, Depends, Request, Response
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 from app.config import settings
-from app.core.cache import get_cache
+from app.core.cache import CacheBackend, get_cache
 from app.core.exceptions import NotFoundError, ValidationError
 from app.core.logging import get_logger
+from app.core.offline_lookup import get_offline_lookup
 from app.database import get_db
 from app.middleware.rate_limit import limiter
-from app.schemas.api_responses import BatchCNPJRequest, BatchCNPJResponse, CNPJResponse
+from app.schemas.api_responses import (
+    BatchCNPJRequest,
+    BatchCNPJResponse,
+    CNPJDetalhadoResponse,
+    CNPJResponse,
+    HistoricoSituacaoResponse,
+)
 from app.schemas.empresa import EmpresaSchema
-from app.schemas.estabelecimento import EstabelecimentoSchema
+from app.schemas.estabelecimento import (
+    EstabelecimentoDetalhadoSchema,
+    EstabelecimentoDetalheSchema,
+    EstabelecimentoSchema,
+)
+from app.schemas.historico import SituacaoPeriodoSchema
 from app.schemas.socio import SocioSchema
 
 logger = get_logger(__name__)
 
 router = APIRouter(prefix="/cnpj", tags=["cnpj"])
 
+EMPRESA_SELECT_SQL = """
+    SELECT
+        e.cnpj_basico,
+        e.razao_social,
+        e.natureza_juridica,
+        n.descricao AS natureza_juridica_descricao,
+        e.capital_social,
+        e.porte_empresa,
+        s.opcao_pelo_simples,
+        s.data_opcao_pelo_simples,
+        s.data_exclusao_do_simples,
+        s.opcao_pelo_mei,
+        s.data_opcao_pelo_mei,
+        s.data_exclusao_do_mei
+    FROM empresas e
+    LEFT JOIN naturezas n ON n.codigo = e.natureza_juridica
+    LEFT JOIN simples s ON s.cnpj_basico = e.cnpj_basico
+"""
+
+ESTABELECIMENTO_SELECT_SQL = """
+    SELECT
+        est.cnpj_completo,
+        est.cnpj_basico,
+        est.nome_fantasia,
+        est.situacao,
+        est.uf,
+        est.municipio,
+        m.descricao AS municipio_descricao,
+        est.cnae_principal,
+        c.descricao AS cnae_principal_descricao,
+        est.cnae_secundario,
+        est.pais,
+        p.descricao AS pais_descricao,
+        est.motivo,
+        mot.descricao AS motivo_descricao
+    FROM estabelecimentos est
+    LEFT JOIN municipios m ON m.codigo = est.municipio
+    LEFT JOIN cnaes c ON c.codigo = est.cnae_principal
+    LEFT JOIN paises p ON p.codigo = est.pais
+    LEFT JOIN motivos mot ON mot.codigo = est.motivo
+"""
+
+# Partner names and documents live in the pessoas dictionary ('' = missing).
+SOCIO_SELECT_SQL = """
+    SELECT
+        s.id,
+        s.cnpj_basico,
+        NULLIF(pe.nome, '') AS nome_socio,
+        NULLIF(pe.cpf_cnpj, '') AS cpf_cnpj_socio,
+        s.qualificacao,
+        q.descricao AS qualificacao_descricao,
+        s.pais,
+        p.descricao AS pais_descricao,
+        s.data_entrada
+    FROM socios s
+    JOIN pessoas pe ON pe.id = s.pessoa_id
+    LEFT JOIN qualificacoes q ON q.codigo = s.qualificacao
+    LEFT JOIN paises p ON p.codigo = s.pais
+"""
+
+EMPRESA_BY_BASICO_SQL = EMPRESA_SELECT_SQL + """
+    WHERE e.cnpj_basico = :cnpj_basico
+"""
+
+ESTABELECIMENTOS_BY_BASICO_SQL = ESTABELECIMENTO_SELECT_SQL + """
+    WHERE est.cnpj_basico = :cnpj_basico
+    ORDER BY est.cnpj_completo
+"""
+
+# cnpj_basico is the leading column of idx_estabelecimentos_lookup; filtering on
+# it too lets the 14-digit lookup use the same covering index.
+ESTABELECIMENTOS_BY_COMPLETO_SQL = ESTABELECIMENTO_SELECT_SQL + """
+    WHERE est.cnpj_basico = :cnpj_basico
+      AND est.cnpj_completo = :cnpj_completo
+    ORDER BY est.cnpj_completo
+"""
+
+SOCIOS_BY_BASICO_SQL = SOCIO_SELECT_SQL + """
+    WHERE s.cnpj_basico = :cnpj_basico
+    ORDER BY s.id
+"""
+
+# Cold half of the establishment rows (vertical split), read only when the
+# client asks for it: one primary-key probe per establishment.
+DETALHES_BY_COMPLETOS_SQL = """
+    SELECT
+        cnpj_completo,
+        matriz_filial,
+        cep,
+        tipo_logradouro,
+        logradouro,
+        numero,
+        complemento,
+        bairro,
+        cidade_exterior,
+        ddd1,
+        telefone1,
+        ddd2,
+        telefone2,
+        email,
+        situacao_especial,
+        data_situacao_especial
+    FROM estabelecimentos_detalhes
+    WHERE cnpj_completo = ANY(CAST(:cnpjs AS CHAR(14)[]))
+"""
+
+# Reads the primary key (cnpj_completo, vigencia) of the few intervals of one
+# establishment; a date picks its interval from these rows.
+HISTORICO_SQL = """
+    SELECT
+        h.situacao,
+        h.motivo,
+        mot.descricao AS motivo_descricao,
+        lower(h.vigencia) AS desde,
+        upper(h.vigencia) AS ate
+    FROM situacoes_historico h
+    LEFT JOIN motivos mot ON mot.codigo = h.motivo
+    WHERE h.cnpj_completo = :cnpj_completo
+    ORDER BY lower(h.vigencia)
+"""
+
+DOCUMENTO_BY_BASICO_SQL = """
+    SELECT documento::text
+    FROM cnpj_documento
+    WHERE cnpj_basico = :cnpj_basico
+"""
+
+# 14-digit lookups keep only the requested establishment, still in one
+# primary-key read.
+DOCUMENTO_BY_COMPLETO_SQL = """
+    SELECT jsonb_set(
+        d.documento,
+        '{estabelecimentos}',
+        COALESCE(
+            (
+                SELECT jsonb_agg(est)
+                FROM jsonb_array_elements(d.documento->'estabelecimentos') est
+                WHERE est->>'cnpj_completo' = :cnpj_completo
+            ),
+            '[]'::jsonb
+        )
+    )::text
+    FROM cnpj_documento d
+    WHERE d.cnpj_basico = :cnpj_basico
+"""
+
+DOCUMENTOS_BY_BASICOS_SQL = """
+    SELECT cnpj_basico, documento::text AS documento
+    FROM cnpj_documento
+    WHERE cnpj_basico = ANY(CAST(:cnpj_basicos AS CHAR(8)[]))
+"""
+
 
 def _only_digits(value: str) -> str:
     return re.sub(r"\D", "", value)
@@ -43,13 +209,100 @@ def _cnpj_response_from_rows(
     )
 
 
+def _cnpj_response_from_db(db: Session, cnpj_digits: str) -> CNPJResponse:
+    cnpj_basico = cnpj_digits[:8]
+    empresa_sql = text(EMPRESA_BY_BASICO_SQL)
+    socios_sql = text(SOCIOS_BY_BASICO_SQL)
+    if len(cnpj_digits) == 14:
+        estabelecimentos_sql = text(ESTABELECIMENTOS_BY_COMPLETO_SQL)
+    else:
+        estabelecimentos_sql = text(ESTABELECIMENTOS_BY_BASICO_SQL)
+
+    empresa_row = db.execute(empresa_sql, {"cnpj_basico": cnpj_basico}).mappings().first()
+
+    if len(cnpj_digits) == 14:
+        estabelecimento_rows = db.execute(
+            estabelecimentos_sql,
+            {"cnpj_basico": cnpj_basico, "cnpj_completo": cnpj_digits},
+        ).mappings().all()
+    else:
+        estabelecimento_rows = db.execute(
+            estabelecimentos_sql,
+            {"cnpj_basico": cnpj_basico},
+        ).mappings().all()
+
+    socio_rows = db.execute(socios_sql, {"cnpj_basico": cnpj_basico}).mappings().all()
+
+    return _cnpj_response_from_rows(
+        dict(empresa_row) if empresa_row else None,
+        [dict(r) for r in estabelecimento_rows],
+        [dict(r) for r in socio_rows],
+    )
+
+
+def _with_detalhes(db: Session, result: CNPJResponse) -> CNPJDetalhadoResponse:
+    cnpjs = [estabelecimento.cnpj_completo for estabelecimento in result.estabelecimentos]
+    detalhes: dict[str, EstabelecimentoDetalheSchema] = {}
+    if cnpjs:
+        for row in db.execute(text(DETALHES_BY_COMPLETOS_SQL), {"cnpjs": cnpjs}).mappings():
+            detalhes[row["cnpj_completo"]] = EstabelecimentoDetalheSchema(**dict(row))
+
+    return CNPJDetalhadoResponse(
+        empresa=result.empresa,
+        estabelecimentos=[
+            EstabelecimentoDetalhadoSchema(
+                **estabelecimento.model_dump(),
+                detalhes=detalhes.get(estabelecimento.cnpj_completo),
+            )
+            for estabelecimento in result.estabelecimentos
+        ],
+        socios=result.socios,
+    )
+
+
+def _only_estabelecimento(documento: str | bytes, cnpj_completo: str) -> str:
+    # Same shape as DOCUMENTO_BY_COMPLETO_SQL: only the requested establishment.
+    parsed = json.loads(documento)
+    parsed["estabelecimentos"] = [
+        est for est in parsed["estabelecimentos"] if est["cnpj_completo"] == cnpj_completo
+    ]
+    return json.dumps(parsed, ensure_ascii=False)
+
+
+def _offline_documento(cnpj_digits: str) -> bytes:
+    documento = get_offline_lookup().get(cnpj_digits[:8])
+    if documento is None:
+        raise NotFoundError("CNPJ nao encontrado")
+    if len(cnpj_digits) == 8:
+        return documento
+    return _only_estabelecimento(documento, cnpj_digits).encode("utf-8")
+
+
+def _cached_documento(db: Session, cache: CacheBackend, cnpj_basico: str) -> str | None:
+    """Whole company document, read through the same cnpj:{basico} entry as the batch endpoint."""
+    key = cache.key(cnpj_basico)
+    documento = cache.get(key)
+    if documento is not None:
+        return documento
+
+    documento = db.execute(text(DOCUMENTO_BY_BASICO_SQL), {"cnpj_basico": cnpj_basico}).scalar()
+    if documento is None:
+        result = _cnpj_response_from_db(db, cnpj_basico)
+        if result.empresa is None and not result.estabelecimentos and not result.socios:
+            return None
+        documento = cache.serialize(result.model_dump(mode="json"))
+    cache.set(key, documento, settings.CACHE_TTL_SECONDS)
+    return documento
+
+
 @router.get(
     "/{cnpj}",
-    response_model=CNPJResponse,
+    response_model=CNPJResponse | CNPJDetalhadoResponse,
     summary="Consultar CNPJ",
     description=(
         "Retorna dados completos de empresa, estabelecimentos e socios. "
-        "Aceita CNPJ com 8 digitos (raiz) ou 14 digitos (completo)."
+        "Aceita CNPJ com 8 digitos (raiz) ou 14 digitos (completo). "
+        "Com `detalhes=true`, cada estabelecimento traz tambem endereco, contatos e situacao especial."
     ),
 )
 @limiter.limit("60/minute")
@@ -57,124 +310,96 @@ def get_cnpj(
     request: Request,
     cnpj: str,
     response: Response,
+    detalhes: bool = Query(False, description="Inclui endereco, contatos e situacao especial"),
     db: Session = Depends(get_db),
-) -> CNPJResponse:
+) -> CNPJResponse | CNPJDetalhadoResponse | Response:
     response.headers["Cache-Control"] = "private, max-age=3600"
 
     cnpj_digits = _only_digits(cnpj)
     if len(cnpj_digits) not in (8, 14):
         raise ValidationError("CNPJ deve ter 8 ou 14 digitos")
 
-    cnpj_basico = cnpj_digits[:8]
+    if settings.LOOKUP_BACKEND == "offline":
+        if detalhes:
+            raise ValidationError("Detalhes indisponiveis no modo offline")
+        return Response(
+            content=_offline_documento(cnpj_digits),
+            media_type="application/json",
+            headers={"Cache-Control": response.headers["Cache-Control"]},
+        )
 
-    empresa_sql = text(
-        """
-        SELECT
-            e.cnpj_basico,
-            e.razao_social,
-            e.natureza_juridica,
-            n.descricao AS natureza_juridica_descricao,
-            e.capital_social,
-            e.porte_empresa,
-            s.opcao_pelo_simples,
-            s.data_opcao_pelo_simples,
-            s.data_exclusao_do_simples,
-            s.opcao_pelo_mei,
-            s.data_opcao_pelo_mei,
-            s.data_exclusao_do_mei
-        FROM empresas e
-        LEFT JOIN naturezas n ON n.codigo = e.natureza_juridica
-        LEFT JOIN simples s ON s.cnpj_basico = e.cnpj_basico
-        WHERE e.cnpj_basico = :cnpj_basico
-        """
-    )
+    cnpj_basico = cnpj_digits[:8]
+    cache = get_cache()
 
-    estabelecimentos_base_sql = """
-        SELECT
-            est.id,
-            est.cnpj_completo,
-            est.cnpj_basico,
-            est.nome_fantasia,
-            est.situacao,
-            est.uf,
-            est.municipio,
-            m.descricao AS municipio_descricao,
-            est.cnae_principal,
-            c.descricao AS cnae_principal_descricao,
-            est.cnae_secundario,
-            est.pais,
-            p.descricao AS pais_descricao,
-            est.motivo,
-            mot.descricao AS motivo_descricao
-        FROM estabelecimentos est
-        LEFT JOIN municipios m ON m.codigo = est.municipio
-        LEFT JOIN cnaes c ON c.codigo = est.cnae_principal
-        LEFT JOIN paises p ON p.codigo = est.pais
-        LEFT JOIN motivos mot ON mot.codigo = est.motivo
-    """
+    if cache.enabled:
+        # The entry holds every establishment; a 14-digit lookup filters it
+        # here instead of caching one entry per establishment.
+        documento = _cached_documento(db, cache, cnpj_basico)
+        if documento is None:
+            raise NotFoundError("CNPJ nao encontrado")
+        if len(cnpj_digits) == 14:
+            documento = _only_estabelecimento(documento, cnpj_digits)
+    # Precomputed document: one primary-key read, served as stored JSON.
+    elif len(cnpj_digits) == 14:
+        documento = db.execute(
+            text(DOCUMENTO_BY_COMPLETO_SQL),
+            {"cnpj_basico": cnpj_basico, "cnpj_completo": cnpj_digits},
+        ).scalar()
+    else:
+        documento = db.execute(text(DOCUMENTO_BY_BASICO_SQL), {"cnpj_basico": cnpj_basico}).scalar()
 
-    if len(cnpj_digits) == 14:
-        estabelecimentos_sql = text(
-            estabelecimentos_base_sql
-            + """
-            WHERE est.cnpj_completo = :cnpj_completo
-            ORDER BY est.cnpj_completo
-            """
+    if documento is not None and not detalhes:
+        return Response(
+            content=documento,
+            media_type="application/json",
+            headers={"Cache-Control": response.headers["Cache-Control"]},
         )
+
+    if documento is not None:
+        result = CNPJResponse.model_validate_json(documento)
     else:
-        estabelecimentos_sql = text(
-            estabelecimentos_base_sql
-            + """
-            WHERE est.cnpj_basico = :cnpj_basico
-            ORDER BY est.cnpj_completo
-            """
-        )
+        result = _cnpj_response_from_db(db, cnpj_digits)
 
-    socios_sql = text(
-        """
-        SELECT
-            s.id,
-            s.cnpj_basico,
-            s.nome_socio,
-            s.cpf_cnpj_socio,
-            s.qualificacao,
-            q.descricao AS qualificacao_descricao,
-            s.pais,
-            p.descricao AS pais_descricao,
-            s.data_entrada
-        FROM socios s
-        LEFT JOIN qualificacoes q ON q.codigo = s.qualificacao
-        LEFT JOIN paises p ON p.codigo = s.pais
-        WHERE s.cnpj_basico = :cnpj_basico
-        ORDER BY s.id
-        """
-    )
+    if result.empresa is None and not result.estabelecimentos and not result.socios:
+        raise NotFoundError("CNPJ nao encontrado")
 
-    empresa_row = db.execute(empresa_sql, {"cnpj_basico": cnpj_basico}).mappings().first()
+    if not detalhes:
+        return result
+    return _with_detalhes(db, result)
 
-    if len(cnpj_digits) == 14:
-        estabelecimento_rows = db.execute(
-            estabelecimentos_sql,
-            {"cnpj_completo": cnpj_digits},
-        ).mappings().all()
-    else:
-        estabelecimento_rows = db.execute(
-            estabelecimentos_sql,
-            {"cnpj_basico": cnpj_basico},
-        ).mappings().all()
 
-    socio_rows = db.execute(socios_sql, {"cnpj_basico": cnpj_basico}).mappings().all()
+@router.get(
+    "/{cnpj}/historico",
+    response_model=HistoricoSituacaoResponse,
+    summary="Historico de situacao cadastral",
+    description=(
+        "Periodos de situacao cadastral de um estabelecimento (CNPJ de 14 digitos), do mais antigo "
+        "ao atual. Com `data`, so o periodo vigente naquela data."
+    ),
+)
+@limiter.limit("60/minute")
+def get_historico(
+    request: Request,
+    cnpj: str,
+    response: Response,
+    data: date | None = Query(None, description="Data de referencia (AAAA-MM-DD)"),
+    db: Session = Depends(get_db),
+) -> HistoricoSituacaoResponse:
+    response.headers["Cache-Control"] = "private, max-age=3600"
 
-    result = _cnpj_response_from_rows(
-        dict(empresa_row) if empresa_row else None,
-        [dict(r) for r in estabelecimento_rows],
-        [dict(r) for r in socio_rows],
-    )
+    cnpj_digits = _only_digits(cnpj)
+    if len(cnpj_digits) != 14:
+        raise ValidationError("CNPJ deve ter 14 digitos")
 
-    if result.empresa is None and not result.estabelecimentos and not result.socios:
+    rows = db.execute(text(HISTORICO_SQL), {"cnpj_completo": cnpj_digits}).mappings().all()
+    if not rows:
         raise NotFoundError("CNPJ nao encontrado")
 
-    return result
+    periodos = [SituacaoPeriodoSchema(**dict(row)) for row in rows]
+    if data is not None:
+        # Half-open intervals: [desde, ate).
+        periodos = [p for p in periodos if p.desde <= data and (p.ate is None or data < p.ate)]
+    return HistoricoSituacaoResponse(cnpj_completo=cnpj_digits, data=data, periodos=periodos)
 
 
 @router.post(
@@ -229,18 +454,31 @@ def get_cnpj_batch(
         except Exception:
             logger.exception("batch.cache_deserialize_failed", cnpj_basico=basico)
 
+    cache_hits = len(found_by_basico)
     missed_basicos = [basico for basico in unique_basicos if basico not in found_by_basico]
 
+    cache_to_set: dict[str, str] = {}
+    if missed_basicos:
+        documento_rows = db.execute(
+            text(DOCUMENTOS_BY_BASICOS_SQL),
+            {"cnpj_basicos": missed_basicos},
+        ).all()
+        for basico, documento in documento_rows:
+            found_by_basico[basico] = CNPJResponse.model_validate_json(documento)
+            cache_to_set[cache.key(basico)] = documento
+        missed_basicos = [basico for basico in missed_basicos if basico not in found_by_basico]
+
     logger.info(
         "batch.lookup_start",
         total=total,
         valid=len(normalized_by_input),
-        cache_hits=len(found_by_basico),
+        cache_hits=cache_hits,
+        documento_hits=len(found_by_basico) - cache_hits,
         db_misses=len(missed_basicos),
     )
 
     if missed_basicos:
-        db.execute(text("CREATE TEMP TABLE IF NOT EXISTS _lookup_cnpj (cnpj_basico TEXT NOT NULL)"))
+        db.execute(text("CREATE TEMP TABLE IF NOT EXISTS _lookup_cnpj (cnpj_basico CHAR(8) NOT NULL)"))
         db.execute(text("TRUNCATE _lookup_cnpj"))
         db.execute(
             text("INSERT INTO _lookup_cnpj (cnpj_basico) VALUES (:cnpj_basico)"),
@@ -248,68 +486,21 @@ def get_cnpj_batch(
         )
 
         empresa_sql = text(
-            """
-            SELECT
-                e.cnpj_basico,
-                e.razao_social,
-                e.natureza_juridica,
-                n.descricao AS natureza_juridica_descricao,
-                e.capital_social,
-                e.porte_empresa,
-                s.opcao_pelo_simples,
-                s.data_opcao_pelo_simples,
-                s.data_exclusao_do_simples,
-                s.opcao_pelo_mei,
-                s.data_opcao_pelo_mei,
-                s.data_exclusao_do_mei
-            FROM empresas e
-            LEFT JOIN naturezas n ON n.codigo = e.natureza_juridica
-            LEFT JOIN simples s ON s.cnpj_basico = e.cnpj_basico
+            EMPRESA_SELECT_SQL
+            + """
             JOIN _lookup_cnpj l ON l.cnpj_basico = e.cnpj_basico
             """
         )
         estabelecimentos_sql = text(
-            """
-            SELECT
-                est.id,
-                est.cnpj_completo,
-                est.cnpj_basico,
-                est.nome_fantasia,
-                est.situacao,
-                est.uf,
-                est.municipio,
-                m.descricao AS municipio_descricao,
-                est.cnae_principal,
-                c.descricao AS cnae_principal_descricao,
-                est.cnae_secundario,
-                est.pais,
-                p.descricao AS pais_descricao,
-                est.motivo,
-                mot.descricao AS motivo_descricao
-            FROM estabelecimentos est
-            LEFT JOIN municipios m ON m.codigo = est.municipio
-            LEFT JOIN cnaes c ON c.codigo = est.cnae_principal
-            LEFT JOIN paises p ON p.codigo = est.pais
-            LEFT JOIN motivos mot ON mot.codigo = est.motivo
+            ESTABELECIMENTO_SELECT_SQL
+            + """
             JOIN _lookup_cnpj l ON l.cnpj_basico = est.cnpj_basico
             ORDER BY est.cnpj_completo
             """
         )
         socios_sql = text(
-            """
-            SELECT
-                s.id,
-                s.cnpj_basico,
-                s.nome_socio,
-                s.cpf_cnpj_socio,
-                s.qualificacao,
-                q.descricao AS qualificacao_descricao,
-                s.pais,
-                p.descricao AS pais_descricao,
-                s.data_entrada
-            FROM socios s
-            LEFT JOIN qualificacoes q ON q.codigo = s.qualificacao
-            LEFT JOIN paises p ON p.codigo = s.pais
+            SOCIO_SELECT_SQL
+            + """
             JOIN _lookup_cnpj l ON l.cnpj_basico = s.cnpj_basico
             ORDER BY s.id
             """
@@ -331,7 +522,6 @@ def get_cnpj_batch(
         for row in socio_rows:
             socios_by_basico[row["cnpj_basico"]].append(row)
 
-        cache_to_set: dict[str, str] = {}
         for basico in missed_basicos:
             response_item = _cnpj_response_from_rows(
                 empresa_by_basico.get(basico),
@@ -343,7 +533,7 @@ def get_cnpj_batch(
             found_by_basico[basico] = response_item
             cache_to_set[cache.key(basico)] = cache.serialize(response_item.model_dump(mode="json"))
 
-        cache.set_many(cache_to_set, settings.CACHE_TTL_SECONDS)
+    cache.set_many(cache_to_set, settings.CACHE_TTL_SECONDS)
 
     resultados: dict[str, CNPJResponse] = {}
     for original in payload.cnpjs:
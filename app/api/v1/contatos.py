@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import re
+from collections import defaultdict
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy import TextClause, text
+from sqlalchemy.orm import Session
+
+from app.api.v1.cnpj import ESTABELECIMENTO_SELECT_SQL
+from app.core.exceptions import ValidationError
+from app.database import get_db
+from app.middleware.rate_limit import limiter
+from app.schemas.api_responses import (
+    ContatosBatchRequest,
+    ContatosBatchResponse,
+    EstabelecimentosResponse,
+)
+from app.schemas.estabelecimento import EstabelecimentoSchema
+
+router = APIRouter(prefix="/contatos", tags=["contatos"])
+
+
+def _por_contato_sql(campo: str) -> str:
+    # One range scan of idx_contatos_{campo}, then the page's establishments by
+    # primary key.
+    return f"""
+        SELECT x.*
+        FROM (
+            SELECT cnpj_completo
+            FROM contatos
+            WHERE {campo} = :valor
+              AND cnpj_completo > :apos
+            ORDER BY cnpj_completo
+            LIMIT :limite
+        ) ct
+        JOIN LATERAL (
+            {ESTABELECIMENTO_SELECT_SQL}
+            WHERE est.cnpj_basico = left(ct.cnpj_completo, 8)
+              AND est.cnpj_completo = ct.cnpj_completo
+        ) x ON TRUE
+        ORDER BY x.cnpj_completo
+    """
+
+
+def _lote_sql(campo: str, tipo: str) -> str:
+    # Every contact of the batch in one statement, at most :limite CNPJs each.
+    return f"""
+        SELECT v.valor, c.cnpj_completo
+        FROM unnest(CAST(:valores AS {tipo}[])) AS v(valor)
+        CROSS JOIN LATERAL (
+            SELECT cnpj_completo
+            FROM contatos
+            WHERE {campo} = v.valor
+            ORDER BY cnpj_completo
+            LIMIT :limite
+        ) c
+    """
+
+
+POR_TELEFONE_SQL = text(_por_contato_sql("telefone"))
+POR_EMAIL_SQL = text(_por_contato_sql("email"))
+TELEFONES_LOTE_SQL = text(_lote_sql("telefone", "BIGINT"))
+EMAILS_LOTE_SQL = text(_lote_sql("email", "TEXT"))
+
+
+# The normalizar_* functions of migration 0020 also build contatos in the ETL,
+# so any spelling of a stored contact resolves to the stored value.
+NORMALIZAR_SQL = text(
+    """
+    SELECT v.valor, normalizar_telefone(v.valor) AS telefone, normalizar_email(v.valor) AS email
+    FROM unnest(CAST(:valores AS TEXT[])) AS v(valor)
+    """
+)
+
+
+def _normalizar(db: Session, valores: list[str]) -> dict[str, tuple[int | None, str | None]]:
+    rows = db.execute(NORMALIZAR_SQL, {"valores": valores})
+    return {valor: (telefone, email) for valor, telefone, email in rows}
+
+
+def _only_digits(value: str) -> str:
+    return re.sub(r"\D", "", value)
+
+
+def _cursor(apos: str | None) -> str:
+    if apos is None:
+        return ""
+    cursor = _only_digits(apos)
+    if len(cursor) != 14:
+        raise ValidationError("Cursor invalido")
+    return cursor
+
+
+def _listar(db: Session, sql: TextClause, valor: object, apos: str | None, limite: int) -> EstabelecimentosResponse:
+    rows = db.execute(sql, {"valor": valor, "apos": _cursor(apos), "limite": limite}).mappings().all()
+    resultados = [EstabelecimentoSchema(**dict(row)) for row in rows]
+    proximo = resultados[-1].cnpj_completo if len(resultados) == limite else None
+    return EstabelecimentosResponse(resultados=resultados, proximo=proximo)
+
+
+@router.get(
+    "/telefone/{telefone}",
+    response_model=EstabelecimentosResponse,
+    summary="Estabelecimentos por telefone",
+    description=(
+        "Estabelecimentos que informaram o telefone (DDD + numero, com ou sem formatacao), "
+        "ordenados por CNPJ. Pagine repassando `proximo` em `apos`."
+    ),
+)
+@limiter.limit("30/minute")
+def listar_por_telefone(
+    request: Request,
+    response: Response,
+    telefone: str,
+    apos: str | None = Query(None, description="Cursor: valor de `proximo` da pagina anterior"),
+    limite: int = Query(100, ge=1, le=1000, description="Itens por pagina"),
+    db: Session = Depends(get_db),
+) -> EstabelecimentosResponse:
+    response.headers["Cache-Control"] = "private, max-age=3600"
+
+    numero, _ = _normalizar(db, [telefone])[telefone]
+    if numero is None:
+        raise ValidationError("Telefone deve ter DDD + 8 ou 9 digitos")
+    return _listar(db, POR_TELEFONE_SQL, numero, apos, limite)
+
+
+@router.get(
+    "/email/{email}",
+    response_model=EstabelecimentosResponse,
+    summary="Estabelecimentos por e-mail",
+    description=(
+        "Estabelecimentos que informaram o e-mail (sem diferenciar maiusculas), ordenados por CNPJ. "
+        "Pagine repassando `proximo` em `apos`."
+    ),
+)
+@limiter.limit("30/minute")
+def listar_por_email(
+    request: Request,
+    response: Response,
+    email: str,
+    apos: str | None = Query(None, description="Cursor: valor de `proximo` da pagina anterior"),
+    limite: int = Query(100, ge=1, le=1000, description="Itens por pagina"),
+    db: Session = Depends(get_db),
+) -> EstabelecimentosResponse:
+    response.headers["Cache-Control"] = "private, max-age=3600"
+
+    _, endereco = _normalizar(db, [email])[email]
+    if endereco is None:
+        raise ValidationError("E-mail invalido")
+    return _listar(db, POR_EMAIL_SQL, endereco, apos, limite)
+
+
+@router.post(
+    "/batch",
+    response_model=ContatosBatchResponse,
+    summary="Consultar contatos em lote",
+    description=(
+        "Resolve ate 1000 telefones e e-mails (itens com `@` sao e-mails) para os CNPJs que os "
+        "informaram, no maximo `max_por_contato` por item."
+    ),
+)
+@limiter.limit("10/minute")
+def get_contatos_batch(
+    request: Request,
+    payload: ContatosBatchRequest,
+    response: Response,
+    max_por_contato: int = Query(100, ge=1, le=1000, description="CNPJs retornados por contato"),
+    db: Session = Depends(get_db),
+) -> ContatosBatchResponse:
+    response.headers["Cache-Control"] = "private, max-age=3600"
+
+    # Different spellings of one contact ("(11) 3333-4444", "1133334444") share a lookup.
+    telefones: dict[int, list[str]] = defaultdict(list)
+    emails: dict[str, list[str]] = defaultdict(list)
+    validos: list[str] = []
+    nao_encontrados: list[str] = []
+    normalizados = _normalizar(db, list(dict.fromkeys(payload.contatos)))
+    for original, (numero, email) in normalizados.items():
+        if "@" in original and email is not None:
+            emails[email].append(original)
+            validos.append(original)
+        elif "@" not in original and numero is not None:
+            telefones[numero].append(original)
+            validos.append(original)
+        else:
+            nao_encontrados.append(original)
+
+    # One extra row per contact tells whether its list was cut.
+    params = {"limite": max_por_contato + 1}
+    cnpjs: dict[str, list[str]] = defaultdict(list)
+    if telefones:
+        for valor, cnpj in db.execute(TELEFONES_LOTE_SQL, {**params, "valores": list(telefones)}):
+            for original in telefones[valor]:
+                cnpjs[original].append(cnpj)
+    if emails:
+        for valor, cnpj in db.execute(EMAILS_LOTE_SQL, {**params, "valores": list(emails)}):
+            for original in emails[valor]:
+                cnpjs[original].append(cnpj)
+
+    resultados: dict[str, list[str]] = {}
+    truncados: list[str] = []
+    for original in validos:
+        encontrados = cnpjs.get(original)
+        if not encontrados:
+            nao_encontrados.append(original)
+            continue
+        if len(encontrados) > max_por_contato:
+            truncados.append(original)
+            del encontrados[max_por_contato:]
+        resultados[original] = encontrados
+
+    return ContatosBatchResponse(
+        resultados=resultados,
+        truncados=truncados,
+        nao_encontrados=nao_encontrados,
+        total=len(payload.contatos),
+        encontrados=len(resultados),
+    )
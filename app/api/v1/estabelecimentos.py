@@ -0,0 +1,329 @@
+from __future__ import annotations
+
+import re
+from datetime import date, datetime
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from psycopg2.errors import QueryCanceled
+from sqlalchemy import TextClause, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.api.v1.cnpj import ESTABELECIMENTO_SELECT_SQL
+from app.config import settings
+from app.core.exceptions import ValidationError
+from app.database import get_db
+from app.middleware.rate_limit import limiter
+from app.schemas.api_responses import (
+    EstabelecimentosAberturaResponse,
+    EstabelecimentosEnderecoResponse,
+    EstabelecimentosResponse,
+)
+from app.schemas.estabelecimento import (
+    EstabelecimentoAberturaSchema,
+    EstabelecimentoEnderecoSchema,
+    EstabelecimentoSchema,
+)
+
+router = APIRouter(prefix="/estabelecimentos", tags=["estabelecimentos"])
+
+# Filters of GET /abertas, applied to the rows of the inicio walk.
+CNAE_CONDICOES = {
+    "principal": "est.cnae_principal = :cnae",
+    "secundario": "est.cnae_secundario @> ARRAY[CAST(:cnae AS INTEGER)]",
+    "qualquer": "(est.cnae_principal = :cnae OR est.cnae_secundario @> ARRAY[CAST(:cnae AS INTEGER)])",
+}
+
+# Candidates of GET /cnae, each walked in cursor order and stopped after
+# :limite matches, so a page never re-reads the rows before the cursor:
+# principal on the (cnae_principal, cnpj_completo) btree, secundario on the
+# (cnae, cnpj_completo) btree of estabelecimentos_cnaes_secundarios, checking
+# each entry against the establishment's filters. qualquer merges both walks.
+CNAE_CANDIDATOS = {
+    "principal": """
+        SELECT est.cnpj_completo
+        FROM estabelecimentos est
+        WHERE est.cnae_principal = :cnae
+          AND est.cnpj_completo > :apos
+          AND {condicoes}
+        ORDER BY est.cnpj_completo
+        LIMIT :limite
+    """,
+    "secundario": """
+        SELECT cs.cnpj_completo
+        FROM estabelecimentos_cnaes_secundarios cs
+        WHERE cs.cnae = :cnae
+          AND cs.cnpj_completo > :apos
+          AND EXISTS (
+              SELECT 1
+              FROM estabelecimentos est
+              WHERE est.cnpj_completo = cs.cnpj_completo
+                AND {condicoes}
+          )
+        ORDER BY cs.cnpj_completo
+        LIMIT :limite
+    """,
+}
+
+POR_CNAE_SQL = """
+    SELECT x.*
+    FROM ({candidatos}) d
+    JOIN LATERAL (
+        {estabelecimento_sql}
+        WHERE est.cnpj_completo = d.cnpj_completo
+          AND est.situacao = :situacao
+    ) x ON TRUE
+    ORDER BY d.cnpj_completo
+    LIMIT :limite
+"""
+
+CEP_DIGITS = 8
+
+# Walks idx_estabelecimentos_detalhes_cep in (cep, cnpj_completo) order and stops after
+# :limite establishments in the requested situacao.
+POR_CEP_SQL = text(
+    f"""
+    SELECT
+        x.*,
+        en.cep,
+        en.tipo_logradouro,
+        en.logradouro,
+        en.numero,
+        en.complemento,
+        en.bairro
+    FROM estabelecimentos_detalhes en
+    JOIN LATERAL (
+        {ESTABELECIMENTO_SELECT_SQL}
+        WHERE est.cnpj_completo = en.cnpj_completo
+          AND est.situacao = :situacao
+    ) x ON TRUE
+    WHERE en.cep BETWEEN :cep_de AND :cep_ate
+      AND (en.cep, en.cnpj_completo) > (:apos_cep, :apos_cnpj)
+    ORDER BY en.cep, en.cnpj_completo
+    LIMIT :limite
+    """
+)
+
+# Opening-date feed: walks idx_estabelecimentos_inicio_cnpj in (inicio,
+# cnpj_completo) order from the cursor and stops after :limite matches, so
+# deep pages cost the same as the first.
+ABERTAS_SQL = """
+    SELECT x.*, d.inicio, d.data_situacao
+    FROM (
+        SELECT est.cnpj_completo, est.situacao, est.inicio, est.data_situacao
+        FROM estabelecimentos est
+        WHERE {condicoes}
+        ORDER BY est.inicio, est.cnpj_completo
+        LIMIT :limite
+    ) d
+    JOIN LATERAL (
+        {estabelecimento_sql}
+        WHERE est.cnpj_completo = d.cnpj_completo
+          AND est.situacao = d.situacao
+    ) x ON TRUE
+    ORDER BY d.inicio, d.cnpj_completo
+"""
+
+
+def _only_digits(value: str) -> str:
+    return re.sub(r"\D", "", value)
+
+
+def _por_cnae_sql(tipo: str, condicoes: list[str]) -> TextClause:
+    modos = ["principal", "secundario"] if tipo == "qualquer" else [tipo]
+    candidatos = " UNION ".join(
+        f"({CNAE_CANDIDATOS[modo].format(condicoes=' AND '.join(condicoes))})" for modo in modos
+    )
+    return text(POR_CNAE_SQL.format(candidatos=candidatos, estabelecimento_sql=ESTABELECIMENTO_SELECT_SQL))
+
+
+@router.get(
+    "/cnae/{cnae}",
+    response_model=EstabelecimentosResponse,
+    summary="Estabelecimentos por CNAE",
+    description=(
+        "Estabelecimentos com o CNAE informado como atividade principal, secundaria ou qualquer uma, "
+        "ordenados por CNPJ. Pagine repassando `proximo` em `apos`."
+    ),
+)
+@limiter.limit("30/minute")
+def listar_por_cnae(
+    request: Request,
+    response: Response,
+    cnae: str,
+    tipo: Literal["qualquer", "principal", "secundario"] = Query("qualquer"),
+    uf: str | None = Query(None, min_length=2, max_length=2),
+    municipio: int | None = Query(None, ge=0, description="Codigo do municipio (tabela da Receita)"),
+    situacao: int = Query(2, ge=0, description="Situacao cadastral (padrao: 02, ativa)"),
+    apos: str | None = Query(None, description="Cursor: valor de `proximo` da pagina anterior"),
+    limite: int = Query(100, ge=1, le=1000, description="Itens por pagina"),
+    db: Session = Depends(get_db),
+) -> EstabelecimentosResponse:
+    response.headers["Cache-Control"] = "public, max-age=3600"
+
+    cnae_digits = _only_digits(cnae)
+    if len(cnae_digits) != 7:
+        raise ValidationError("CNAE deve ter 7 digitos")
+    cursor = _only_digits(apos) if apos else None
+    if cursor is not None and len(cursor) != 14:
+        raise ValidationError("Cursor invalido")
+
+    filtros = {
+        "cnae": int(cnae_digits),
+        "situacao": situacao,
+        "uf": uf.upper() if uf else None,
+        "municipio": municipio,
+        "apos": cursor or "",
+    }
+    condicoes = ["est.situacao = :situacao"]
+    if filtros["uf"] is not None:
+        condicoes.append("est.uf = :uf")
+    if municipio is not None:
+        condicoes.append("est.municipio = :municipio")
+
+    sql = _por_cnae_sql(tipo, condicoes)
+    # A filter that matches few of a common CNAE's secondary entries makes the
+    # walk long; those modes run under CNAE_SECUNDARIO_TIMEOUT_MS.
+    if tipo != "principal":
+        db.execute(text(f"SET LOCAL statement_timeout = {int(settings.CNAE_SECUNDARIO_TIMEOUT_MS)}"))
+    try:
+        rows = db.execute(sql, {**filtros, "limite": limite}).mappings().all()
+    except OperationalError as exc:
+        if not isinstance(exc.orig, QueryCanceled):
+            raise
+        raise ValidationError(
+            "Consulta longa demais para tipo=secundario/qualquer com esses filtros; use tipo=principal"
+        ) from None
+    resultados = [EstabelecimentoSchema(**dict(row)) for row in rows]
+    proximo = resultados[-1].cnpj_completo if len(resultados) == limite else None
+
+    return EstabelecimentosResponse(resultados=resultados, proximo=proximo)
+
+
+@router.get(
+    "/cep/{cep}",
+    response_model=EstabelecimentosEnderecoResponse,
+    summary="Estabelecimentos por CEP",
+    description=(
+        "Estabelecimentos com o CEP informado (8 digitos) ou iniciado por ele (prefixo, ex.: `01310`), "
+        "com endereco, ordenados por CEP e CNPJ. Pagine repassando `proximo` em `apos`."
+    ),
+)
+@limiter.limit("30/minute")
+def listar_por_cep(
+    request: Request,
+    response: Response,
+    cep: str,
+    situacao: int = Query(2, ge=0, description="Situacao cadastral (padrao: 02, ativa)"),
+    apos: str | None = Query(None, description="Cursor: valor de `proximo` da pagina anterior"),
+    limite: int = Query(100, ge=1, le=1000, description="Itens por pagina"),
+    db: Session = Depends(get_db),
+) -> EstabelecimentosEnderecoResponse:
+    response.headers["Cache-Control"] = "public, max-age=3600"
+
+    prefixo = _only_digits(cep)
+    if not 1 <= len(prefixo) <= CEP_DIGITS:
+        raise ValidationError("CEP deve ter de 1 a 8 digitos")
+
+    # The cursor is the last (cep, cnpj_completo) returned, as 8 + 14 digits.
+    cursor = _only_digits(apos) if apos else "0" * (CEP_DIGITS + 14)
+    if len(cursor) != CEP_DIGITS + 14:
+        raise ValidationError("Cursor invalido")
+
+    params = {
+        "cep_de": int(prefixo.ljust(CEP_DIGITS, "0")),
+        "cep_ate": int(prefixo.ljust(CEP_DIGITS, "9")),
+        "apos_cep": int(cursor[:CEP_DIGITS]),
+        "apos_cnpj": cursor[CEP_DIGITS:],
+        "situacao": situacao,
+        "limite": limite,
+    }
+    rows = db.execute(POR_CEP_SQL, params).mappings().all()
+    resultados = [EstabelecimentoEnderecoSchema(**dict(row)) for row in rows]
+    proximo = None
+    if len(resultados) == limite:
+        proximo = f"{rows[-1]['cep']:0{CEP_DIGITS}d}{rows[-1]['cnpj_completo']}"
+
+    return EstabelecimentosEnderecoResponse(resultados=resultados, proximo=proximo)
+
+
+@router.get(
+    "/abertas",
+    response_model=EstabelecimentosAberturaResponse,
+    summary="Estabelecimentos abertos no periodo",
+    description=(
+        "Estabelecimentos com data de inicio de atividade entre `de` e `ate` (inclusive), "
+        "opcionalmente filtrados por UF e CNAE, ordenados por data de inicio e CNPJ. "
+        "Pagine repassando `proximo` em `apos`."
+    ),
+)
+@limiter.limit("30/minute")
+def listar_abertas(
+    request: Request,
+    response: Response,
+    de: date = Query(..., description="Inicio do periodo (AAAA-MM-DD)"),
+    ate: date = Query(..., description="Fim do periodo (AAAA-MM-DD), inclusive"),
+    uf: str | None = Query(None, min_length=2, max_length=2),
+    cnae: str | None = Query(None, description="CNAE de 7 digitos"),
+    tipo: Literal["qualquer", "principal", "secundario"] = Query("principal"),
+    situacao: int = Query(2, ge=0, description="Situacao cadastral (padrao: 02, ativa)"),
+    apos: str | None = Query(None, description="Cursor: valor de `proximo` da pagina anterior"),
+    limite: int = Query(100, ge=1, le=1000, description="Itens por pagina"),
+    db: Session = Depends(get_db),
+) -> EstabelecimentosAberturaResponse:
+    response.headers["Cache-Control"] = "public, max-age=3600"
+
+    if de > ate:
+        raise ValidationError("`de` deve ser anterior ou igual a `ate`")
+
+    params: dict[str, object] = {"situacao": situacao, "de": de, "ate": ate, "limite": limite}
+    condicoes = [
+        "est.inicio BETWEEN :de AND :ate",
+        "(est.inicio, est.cnpj_completo) > (:apos_inicio, :apos_cnpj)",
+        "est.situacao = :situacao",
+    ]
+    if uf:
+        params["uf"] = uf.upper()
+        condicoes.append("est.uf = :uf")
+    if cnae:
+        cnae_digits = _only_digits(cnae)
+        if len(cnae_digits) != 7:
+            raise ValidationError("CNAE deve ter 7 digitos")
+        params["cnae"] = int(cnae_digits)
+        condicoes.append(CNAE_CONDICOES[tipo])
+
+    # The cursor is the last (inicio, cnpj_completo) returned, as AAAAMMDD + 14 digits.
+    apos_inicio, apos_cnpj = de, ""
+    if apos:
+        cursor = _only_digits(apos)
+        if len(cursor) != 8 + 14:
+            raise ValidationError("Cursor invalido")
+        try:
+            apos_inicio = datetime.strptime(cursor[:8], "%Y%m%d").date()
+        except ValueError:
+            raise ValidationError("Cursor invalido") from None
+        apos_cnpj = cursor[8:]
+    params.update(apos_inicio=apos_inicio, apos_cnpj=apos_cnpj)
+
+    sql = text(
+        ABERTAS_SQL.format(condicoes=" AND ".join(condicoes), estabelecimento_sql=ESTABELECIMENTO_SELECT_SQL)
+    )
+    # A CNAE filters the walk after the index: a rare one over a long period
+    # reads most of it. Same cap as GET /cnae.
+    if cnae:
+        db.execute(text(f"SET LOCAL statement_timeout = {int(settings.CNAE_SECUNDARIO_TIMEOUT_MS)}"))
+    try:
+        rows = db.execute(sql, params).mappings().all()
+    except OperationalError as exc:
+        if not isinstance(exc.orig, QueryCanceled):
+            raise
+        raise ValidationError("Consulta longa demais para o CNAE informado; reduza o periodo") from None
+    resultados = [EstabelecimentoAberturaSchema(**dict(row)) for row in rows]
+
+    proximo = None
+    if len(resultados) == limite:
+        ultimo = resultados[-1]
+        proximo = ultimo.inicio.strftime("%Y%m%d") + ultimo.cnpj_completo
+
+    return EstabelecimentosAberturaResponse(resultados=resultados, proximo=proximo)
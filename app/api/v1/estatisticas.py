@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.exceptions import ValidationError
+from app.database import get_db
+from app.middleware.rate_limit import limiter
+from app.schemas.api_responses import EstatisticasResponse
+from app.schemas.estatistica import EstatisticaSchema
+
+router = APIRouter(prefix="/estatisticas", tags=["estatisticas"])
+
+# Dimension -> column of the rollup tables (etl.estatisticas).
+DIMENSOES = {
+    "uf": "t.uf",
+    "municipio": "t.municipio",
+    "cnae_secao": "cs.secao",
+    "cnae_divisao": "t.cnae_divisao",
+    "cnae_principal": "t.cnae_principal",
+    "situacao": "t.situacao",
+    "porte_empresa": "t.porte_empresa",
+}
+
+# estatisticas_uf is a few thousand rows; the municipio-level table is only
+# read when the question needs one of its extra dimensions.
+DIMENSOES_MUNICIPIO = {"municipio", "cnae_principal"}
+
+
+@router.get(
+    "/estabelecimentos",
+    response_model=EstatisticasResponse,
+    response_model_exclude_unset=True,
+    summary="Contagem de estabelecimentos",
+    description=(
+        "Quantidade de estabelecimentos agrupada por UF, municipio, CNAE (secao, divisao ou subclasse), "
+        "situacao cadastral e porte da empresa. Servido por tabelas agregadas atualizadas pelo ETL."
+    ),
+)
+@limiter.limit("30/minute")
+def contar_estabelecimentos(
+    request: Request,
+    response: Response,
+    agrupar_por: list[str] = Query(["uf"], description=f"Dimensoes: {', '.join(DIMENSOES)}"),
+    uf: str | None = Query(None, min_length=2, max_length=2),
+    municipio: int | None = Query(None, ge=0, description="Codigo do municipio (tabela da Receita)"),
+    cnae_secao: str | None = Query(None, pattern="^[A-Ua-u]$"),
+    cnae_divisao: int | None = Query(None, ge=1, le=99),
+    cnae_principal: int | None = Query(None, ge=0),
+    situacao: int | None = Query(None, ge=0),
+    porte_empresa: int | None = Query(None, ge=0),
+    limite: int = Query(1000, ge=1, le=10000, description="Maximo de grupos retornados, por total decrescente"),
+    db: Session = Depends(get_db),
+) -> EstatisticasResponse:
+    response.headers["Cache-Control"] = "public, max-age=3600"
+
+    grupos = list(dict.fromkeys(agrupar_por))
+    invalidas = [dimensao for dimensao in grupos if dimensao not in DIMENSOES]
+    if invalidas:
+        raise ValidationError(f"Dimensao invalida: {', '.join(invalidas)}")
+
+    filtros = {
+        "uf": uf.upper() if uf else None,
+        "municipio": municipio,
+        "cnae_secao": cnae_secao.upper() if cnae_secao else None,
+        "cnae_divisao": cnae_divisao,
+        "cnae_principal": cnae_principal,
+        "situacao": situacao,
+        "porte_empresa": porte_empresa,
+    }
+    filtros = {dimensao: valor for dimensao, valor in filtros.items() if valor is not None}
+
+    usadas = set(grupos) | set(filtros)
+    tabela = "estatisticas_municipio" if usadas & DIMENSOES_MUNICIPIO else "estatisticas_uf"
+    join = "LEFT JOIN cnae_secoes cs ON cs.divisao = t.cnae_divisao" if "cnae_secao" in usadas else ""
+    where = " AND ".join(f"{DIMENSOES[dimensao]} = :{dimensao}" for dimensao in filtros) or "TRUE"
+    colunas = ", ".join(f"{DIMENSOES[dimensao]} AS {dimensao}" for dimensao in grupos)
+    group_by = ", ".join(DIMENSOES[dimensao] for dimensao in grupos)
+
+    sql = text(
+        f"""
+        SELECT
+            {colunas + "," if colunas else ""}
+            SUM(t.total)::bigint AS total,
+            (SUM(SUM(t.total)) OVER ())::bigint AS total_geral
+        FROM {tabela} t
+        {join}
+        WHERE {where}
+        {"GROUP BY " + group_by if group_by else ""}
+        ORDER BY total DESC
+        LIMIT :limite
+        """
+    )
+    rows = db.execute(sql, {**filtros, "limite": limite}).mappings().all()
+
+    resultados = [
+        EstatisticaSchema(**{key: value for key, value in row.items() if key != "total_geral"})
+        for row in rows
+    ]
+    total = int(rows[0]["total_geral"]) if rows else 0
+
+    return EstatisticasResponse(agrupado_por=grupos, resultados=resultados, total=total)
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.middleware.rate_limit import limiter
+from app.schemas.api_responses import MudancasResponse
+from app.schemas.mudanca import MudancaSchema
+
+router = APIRouter(prefix="/mudancas", tags=["mudancas"])
+
+# Change ids grow with the import they belong to (imports run one at a time),
+# so after locating the first change past ?desde= every page is a primary key
+# range scan.
+PRIMEIRA_MUDANCA_SQL = text(
+    """
+    SELECT id
+    FROM mudancas
+    WHERE importacao_id > :desde
+    ORDER BY importacao_id, id
+    LIMIT 1
+    """
+)
+
+MUDANCAS_SQL = text(
+    """
+    SELECT id, importacao_id, cnpj_basico, tipo, campos
+    FROM mudancas
+    WHERE id >= :inicio
+      AND importacao_id > :desde
+    ORDER BY id
+    LIMIT :limite
+    """
+)
+
+
+@router.get(
+    "",
+    response_model=MudancasResponse,
+    summary="Mudancas desde uma importacao",
+    description=(
+        "Empresas incluidas, alteradas, com mudanca de situacao ou excluidas nas importacoes "
+        "posteriores a `desde`. Pagine repassando `proximo` em `apos`."
+    ),
+)
+@limiter.limit("30/minute")
+def listar_mudancas(
+    request: Request,
+    response: Response,
+    desde: int = Query(..., ge=0, description="Id da ultima importacao ja sincronizada"),
+    apos: int | None = Query(None, ge=0, description="Cursor: valor de `proximo` da pagina anterior"),
+    limite: int = Query(1000, ge=1, le=10000, description="Itens por pagina"),
+    db: Session = Depends(get_db),
+) -> MudancasResponse:
+    response.headers["Cache-Control"] = "public, max-age=300"
+
+    if apos is None:
+        inicio = db.execute(PRIMEIRA_MUDANCA_SQL, {"desde": desde}).scalar()
+        if inicio is None:
+            return MudancasResponse(desde=desde)
+    else:
+        inicio = apos + 1
+
+    rows = db.execute(MUDANCAS_SQL, {"inicio": inicio, "desde": desde, "limite": limite}).mappings().all()
+    mudancas = [MudancaSchema(**dict(row)) for row in rows]
+    proximo = mudancas[-1].id if len(mudancas) == limite else None
+
+    return MudancasResponse(desde=desde, mudancas=mudancas, proximo=proximo)
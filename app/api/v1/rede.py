@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import re
+import time
+from collections import defaultdict
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from psycopg2.errors import QueryCanceled
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.exceptions import NotFoundError, ValidationError
+from app.core.rede import PESSOA_NODE_MIN
+from app.database import get_db
+from app.middleware.rate_limit import limiter
+from app.schemas.api_responses import CaminhoResponse, RedeResponse
+from app.schemas.rede import ArestaRedeSchema, NoRedeSchema
+
+router = APIRouter(prefix="/rede", tags=["rede"])
+
+# One index-only range scan of the primary key per frontier node, capped at
+# :limite so a hub partner with thousands of companies costs the same as any other.
+VIZINHOS_SQL = text(
+    """
+    SELECT f.origem, a.destino
+    FROM unnest(CAST(:nos AS BIGINT[])) AS f(origem)
+    CROSS JOIN LATERAL (
+        SELECT destino
+        FROM rede_arestas
+        WHERE origem = f.origem
+        ORDER BY destino
+        LIMIT :limite
+    ) a
+    """
+)
+
+EMPRESAS_SQL = text(
+    """
+    SELECT cnpj_basico, razao_social
+    FROM empresas
+    WHERE cnpj_basico = ANY(CAST(:cnpj_basicos AS CHAR(8)[]))
+    """
+)
+
+PESSOAS_SQL = text(
+    """
+    SELECT id, NULLIF(nome, ''), NULLIF(cpf_cnpj, '')
+    FROM pessoas
+    WHERE id = ANY(CAST(:ids AS INTEGER[]))
+    """
+)
+
+
+def _only_digits(value: str) -> str:
+    return re.sub(r"\D", "", value)
+
+
+def _empresa_node(cnpj: str) -> int:
+    cnpj_digits = _only_digits(cnpj)
+    if len(cnpj_digits) not in (8, 14):
+        raise ValidationError("CNPJ deve ter 8 ou 14 digitos")
+    return int(cnpj_digits[:8])
+
+
+def _node_key(node: int) -> str:
+    return str(node) if node >= PESSOA_NODE_MIN else f"{node:08d}"
+
+
+def _limit_statements(db: Session) -> float:
+    """Returns the deadline of the search; single statements are capped at twice the budget."""
+    budget_ms = settings.NETWORK_TIME_BUDGET_MS
+    db.execute(text(f"SET LOCAL statement_timeout = {int(budget_ms) * 2}"))
+    return time.monotonic() + budget_ms / 1000
+
+
+def _expand(db: Session, frontier: list[int], fanout: int) -> tuple[dict[int, list[int]], set[int]] | None:
+    """Neighbours of each frontier node, at most ``fanout`` each, and the nodes that had more.
+
+    None when the statement hit the time limit.
+    """
+    try:
+        rows = db.execute(VIZINHOS_SQL, {"nos": frontier, "limite": fanout + 1}).all()
+    except OperationalError as exc:
+        if not isinstance(exc.orig, QueryCanceled):
+            raise
+        # Ends the aborted transaction, and with it the statement limit; the
+        # node lookups that follow are primary key reads.
+        db.rollback()
+        return None
+    neighbours: dict[int, list[int]] = defaultdict(list)
+    for origem, destino in rows:
+        neighbours[origem].append(destino)
+
+    capped = set()
+    for origem, destinos in neighbours.items():
+        if len(destinos) > fanout:
+            capped.add(origem)
+            del destinos[fanout:]
+    return neighbours, capped
+
+
+def _nos(db: Session, distancias: dict[int, int], capped: set[int]) -> list[NoRedeSchema]:
+    empresas = [_node_key(node) for node in distancias if node < PESSOA_NODE_MIN]
+    pessoas = [node for node in distancias if node >= PESSOA_NODE_MIN]
+
+    nomes: dict[str, str | None] = dict(db.execute(EMPRESAS_SQL, {"cnpj_basicos": empresas}).all()) if empresas else {}
+    socios: dict[int, tuple[str | None, str | None]] = {}
+    if pessoas:
+        ids = [node - PESSOA_NODE_MIN for node in pessoas]
+        for pessoa_id, nome, cpf_cnpj in db.execute(PESSOAS_SQL, {"ids": ids}):
+            socios[pessoa_id + PESSOA_NODE_MIN] = (nome, cpf_cnpj)
+
+    nos = []
+    for node, distancia in distancias.items():
+        if node < PESSOA_NODE_MIN:
+            key = _node_key(node)
+            no = NoRedeSchema(id=key, tipo="empresa", distancia=distancia, nome=nomes.get(key))
+        else:
+            nome, cpf_cnpj = socios.get(node, (None, None))
+            no = NoRedeSchema(
+                id=_node_key(node), tipo="socio", distancia=distancia, nome=nome, cpf_cnpj_socio=cpf_cnpj
+            )
+        no.vizinhos_truncados = node in capped
+        nos.append(no)
+    return nos
+
+
+@router.get(
+    "/{cnpj}",
+    response_model=RedeResponse,
+    summary="Rede de socios",
+    description=(
+        "Empresas e socios a ate `profundidade` saltos de um CNPJ, seguindo socios em comum "
+        "(inclusive empresas que sao socias de outras). Cada no expande no maximo `max_vizinhos` "
+        "vizinhos; limites de nos ou de tempo marcam a resposta como `truncado`."
+    ),
+)
+@limiter.limit("30/minute")
+def rede_socios(
+    request: Request,
+    response: Response,
+    cnpj: str,
+    profundidade: int = Query(2, ge=1, le=4, description="Saltos a partir do CNPJ (empresa -> socio = 1)"),
+    max_vizinhos: int = Query(50, ge=1, le=500, description="Vizinhos expandidos por no"),
+    max_nos: int = Query(500, ge=1, le=5000, description="Maximo de nos na resposta"),
+    db: Session = Depends(get_db),
+) -> RedeResponse:
+    response.headers["Cache-Control"] = "public, max-age=3600"
+
+    inicio = _empresa_node(cnpj)
+    deadline = _limit_statements(db)
+
+    distancias = {inicio: 0}
+    arestas: set[tuple[int, int]] = set()
+    capped: set[int] = set()
+    truncado = False
+    fronteira = [inicio]
+    for nivel in range(1, profundidade + 1):
+        if not fronteira:
+            break
+        if time.monotonic() > deadline:
+            truncado = True
+            break
+
+        expandidos = _expand(db, fronteira, max_vizinhos)
+        if expandidos is None:
+            truncado = True
+            break
+        vizinhos, cortados = expandidos
+        capped |= cortados
+        proxima = []
+        for origem, destinos in vizinhos.items():
+            for destino in destinos:
+                if destino not in distancias:
+                    if len(distancias) >= max_nos:
+                        truncado = True
+                        continue
+                    distancias[destino] = nivel
+                    proxima.append(destino)
+                arestas.add((min(origem, destino), max(origem, destino)))
+        fronteira = proxima
+
+    nos = _nos(db, distancias, capped)
+    if len(nos) == 1 and nos[0].nome is None:
+        raise NotFoundError("CNPJ nao encontrado")
+
+    return RedeResponse(
+        cnpj_basico=_node_key(inicio),
+        profundidade=profundidade,
+        nos=nos,
+        arestas=[ArestaRedeSchema(origem=_node_key(a), destino=_node_key(b)) for a, b in sorted(arestas)],
+        truncado=truncado or bool(capped),
+    )
+
+
+@router.get(
+    "/{cnpj}/caminho/{destino}",
+    response_model=CaminhoResponse,
+    summary="Caminho entre duas empresas",
+    description=(
+        "Menor cadeia de socios ligando dois CNPJs, por busca bidirecional em largura. "
+        "`truncado` indica que algum limite (vizinhos por no ou tempo) foi atingido, entao a "
+        "ausencia de caminho, ou um caminho mais curto, nao e garantida."
+    ),
+)
+@limiter.limit("30/minute")
+def caminho_socios(
+    request: Request,
+    response: Response,
+    cnpj: str,
+    destino: str,
+    profundidade: int = Query(6, ge=1, le=10, description="Tamanho maximo do caminho, em saltos"),
+    max_vizinhos: int = Query(1000, ge=1, le=10000, description="Vizinhos expandidos por no"),
+    db: Session = Depends(get_db),
+) -> CaminhoResponse:
+    response.headers["Cache-Control"] = "public, max-age=3600"
+
+    origem_node = _empresa_node(cnpj)
+    destino_node = _empresa_node(destino)
+    deadline = _limit_statements(db)
+
+    # Parent pointers of each side; each round expands the smaller frontier by
+    # one level, so the path found has at most one hop per round.
+    pais: list[dict[int, int | None]] = [{origem_node: None}, {destino_node: None}]
+    fronteiras = [[origem_node], [destino_node]]
+    encontro = origem_node if origem_node == destino_node else None
+    truncado = False
+    for _ in range(profundidade):
+        if encontro is not None:
+            break
+        if time.monotonic() > deadline:
+            truncado = True
+            break
+        lado = 0 if len(fronteiras[0]) <= len(fronteiras[1]) else 1
+        if not fronteiras[lado]:
+            break
+
+        expandidos = _expand(db, fronteiras[lado], max_vizinhos)
+        if expandidos is None:
+            truncado = True
+            break
+        vizinhos, cortados = expandidos
+        truncado = truncado or bool(cortados)
+        proxima = []
+        for origem, destinos in vizinhos.items():
+            for vizinho in destinos:
+                if vizinho in pais[lado]:
+                    continue
+                pais[lado][vizinho] = origem
+                if vizinho in pais[1 - lado]:
+                    encontro = vizinho
+                    break
+                proxima.append(vizinho)
+            if encontro is not None:
+                break
+        fronteiras[lado] = proxima
+
+    if encontro is None:
+        return CaminhoResponse(
+            origem=_node_key(origem_node),
+            destino=_node_key(destino_node),
+            encontrado=False,
+            truncado=truncado,
+        )
+
+    caminho = []
+    node: int | None = encontro
+    while node is not None:
+        caminho.append(node)
+        node = pais[0][node]
+    caminho.reverse()
+    node = pais[1][encontro]
+    while node is not None:
+        caminho.append(node)
+        node = pais[1][node]
+
+    nos = {no.id: no for no in _nos(db, {node: posicao for posicao, node in enumerate(caminho)}, set())}
+    return CaminhoResponse(
+        origem=_node_key(origem_node),
+        destino=_node_key(destino_node),
+        encontrado=True,
+        caminho=[nos[_node_key(node)] for node in caminho],
+        truncado=truncado,
+    )
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import json
 from functools import lru_cache
+from typing import Literal
 
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -23,6 +24,18 @@ class Settings(BaseSettings):
     API_V1_PREFIX: str = "/api/v1"
     APP_NAME: str = "Sistema CNPJ"
     ETL_HASH_ALGORITHM: str = "sha256"
+    ETL_POST_LOAD_MAINTENANCE: bool = True
+    ETL_VACUUM_PARALLEL_WORKERS: int = 4
+    ETL_PARQUET_PATH: str = ""
+    ETL_MERGE_SLICES: dict[str, int] = {}
+    ETL_PARSE_WORKERS: int = 1
+    ETL_DROP_PAGE_CACHE: bool = False
+    LOOKUP_BACKEND: Literal["postgres", "offline"] = "postgres"
+    OFFLINE_ARTIFACT_PATH: str = "data/offline/cnpj_documento.idx"
+    SNAPSHOT_PATH: str = "data/snapshots"
+    SNAPSHOT_JOBS: int = 4
+    NETWORK_TIME_BUDGET_MS: int = 1500
+    CNAE_SECUNDARIO_TIMEOUT_MS: int = 3000
     ENVIRONMENT: str = "production"
     TRUST_PROXY: bool = False
     CORS_ORIGINS: list[str] = ["http://localhost:3000", "http://localhost:5500"]
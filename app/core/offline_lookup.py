@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import bisect
+import mmap
+import struct
+import sys
+import zlib
+from pathlib import Path
+from threading import Lock
+
+from app.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Read-only lookup artifact written by etl.offline_export:
+#
+#   header   MAGIC, count, keys_offset, index_offset, payload_offset (little-endian)
+#   keys     count x uint32, cnpj_basico as integer, ascending
+#   index    (count + 1) x uint64, offset of each payload block (+ end of data)
+#   payload  blocks of uint32 length + zlib-compressed cnpj_documento JSON
+#
+# The file is mmap'ed, so every uvicorn worker shares the same page cache pages.
+MAGIC = b"CNPJDOC1"
+HEADER = struct.Struct("<8sQQQQ")
+BLOCK_LENGTH = struct.Struct("<I")
+
+
+class OfflineLookup:
+    def __init__(self, path: str | Path) -> None:
+        if sys.byteorder != "little":
+            raise RuntimeError("Artefato offline exige uma plataforma little-endian")
+
+        self.path = Path(path)
+        with open(self.path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.count, keys_offset, index_offset, self._payload_offset = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise RuntimeError(f"Artefato offline invalido: {self.path}")
+
+        view = memoryview(self._mmap)
+        self._keys = view[keys_offset : keys_offset + 4 * self.count].cast("I")
+        self._index = view[index_offset : index_offset + 8 * (self.count + 1)].cast("Q")
+        self._view = view
+
+    def get(self, cnpj_basico: str) -> bytes | None:
+        """Returns the stored document (JSON bytes) of a company, or None."""
+        key = int(cnpj_basico)
+        position = bisect.bisect_left(self._keys, key)
+        if position >= self.count or self._keys[position] != key:
+            return None
+
+        start = self._payload_offset + self._index[position]
+        (length,) = BLOCK_LENGTH.unpack_from(self._mmap, start)
+        block_start = start + BLOCK_LENGTH.size
+        return zlib.decompress(self._view[block_start : block_start + length])
+
+
+_LOOKUP_SINGLETON: OfflineLookup | None = None
+_LOOKUP_LOCK = Lock()
+
+
+def get_offline_lookup() -> OfflineLookup:
+    global _LOOKUP_SINGLETON
+    if _LOOKUP_SINGLETON is None:
+        with _LOOKUP_LOCK:
+            if _LOOKUP_SINGLETON is None:
+                _LOOKUP_SINGLETON = OfflineLookup(settings.OFFLINE_ARTIFACT_PATH)
+                logger.info(
+                    "offline_lookup.carregado",
+                    arquivo=settings.OFFLINE_ARTIFACT_PATH,
+                    empresas=_LOOKUP_SINGLETON.count,
+                )
+    return _LOOKUP_SINGLETON
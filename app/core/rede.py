@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+# Node ids of rede_arestas share one BIGINT space:
+#   companies            cnpj_basico as a number (< 10^8); a partner that is a
+#                        company (14-digit CNPJ) is that company's node
+#   individual partners  pessoas.id + 2^62
+# The seed, the incremental refresh and the rebuild (etl.rede) and the API
+# (app.api.v1.rede) all derive nodes from here.
+PESSOA_NODE_MIN = 1 << 62
+
+
+def no_socio_sql(alias: str) -> str:
+    """Node id of a ``pessoas`` row."""
+    return f"""
+        CASE
+            WHEN {alias}.cpf_cnpj ~ '^[0-9]{{14}}$' THEN left({alias}.cpf_cnpj, 8)::bigint
+            ELSE {alias}.id + {PESSOA_NODE_MIN}
+        END
+    """
@@ -15,13 +15,19 @@ from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 
 from app.api.v1.cnpj import router as cnpj_router
+from app.api.v1.contatos import router as contatos_router
 from app.api.v1.empresas import router as empresas_router
+from app.api.v1.estabelecimentos import router as estabelecimentos_router
+from app.api.v1.estatisticas import router as estatisticas_router
 from app.api.v1.metrics import router as metrics_router
+from app.api.v1.mudancas import router as mudancas_router
+from app.api.v1.rede import router as rede_router
 from app.config import settings
 from app.core.cache import get_cache
 from app.core.exceptions import AppError
 from app.core.logging import get_logger, setup_logging
 from app.core.metrics import get_uptime_seconds, increment_db_errors_total, set_startup_time
+from app.core.offline_lookup import get_offline_lookup
 from app.database import SessionLocal
 from app.middleware.api_key import APIKeyMiddleware
 from app.middleware.rate_limit import limiter, rate_limit_exceeded_handler
@@ -46,6 +52,8 @@ async def lifespan(_: FastAPI):
     setup_logging()
     set_startup_time()
     get_cache()
+    if settings.LOOKUP_BACKEND == "offline":
+        get_offline_lookup()
     if not settings.API_KEYS:
         logger.warning(
             "api.sem_autenticacao",
@@ -66,7 +74,12 @@ app = FastAPI(
     redoc_url="/redoc" if settings.ENVIRONMENT != "production" else None,
     openapi_tags=[
         {"name": "cnpj", "description": "Consulta de CNPJ individual e em lote"},
+        {"name": "contatos", "description": "Estabelecimentos por telefone ou e-mail informado"},
         {"name": "empresas", "description": "Busca de empresas por razao social"},
+        {"name": "estabelecimentos", "description": "Listagens de estabelecimentos por atividade, CEP e data de abertura"},
+        {"name": "estatisticas", "description": "Contagens agregadas de estabelecimentos"},
+        {"name": "mudancas", "description": "Empresas alteradas entre importacoes"},
+        {"name": "rede", "description": "Rede de empresas ligadas por socios em comum"},
     ],
     lifespan=lifespan,
     swagger_ui_init_oauth={},
@@ -121,8 +134,13 @@ app.add_middleware(
 )
 
 app.include_router(cnpj_router, prefix=settings.API_V1_PREFIX)
+app.include_router(contatos_router, prefix=settings.API_V1_PREFIX)
 app.include_router(empresas_router, prefix=settings.API_V1_PREFIX)
+app.include_router(estabelecimentos_router, prefix=settings.API_V1_PREFIX)
+app.include_router(estatisticas_router, prefix=settings.API_V1_PREFIX)
 app.include_router(metrics_router, prefix=settings.API_V1_PREFIX)
+app.include_router(mudancas_router, prefix=settings.API_V1_PREFIX)
+app.include_router(rede_router, prefix=settings.API_V1_PREFIX)
 
 
 @app.exception_handler(AppError)
@@ -195,9 +213,11 @@ def health(request: Request, response: Response) -> HealthResponse:
             db.execute(text("SELECT 1"))
     except Exception:
         increment_db_errors_total()
-        response.status_code = 503
+        # With the offline backend GET /cnpj keeps working without the database.
+        offline = settings.LOOKUP_BACKEND == "offline"
+        response.status_code = 200 if offline else 503
         return HealthResponse(
-            status="unhealthy",
+            status="degraded" if offline else "unhealthy",
             database="unavailable",
             cache=cache_status,
             version=APP_VERSION,
@@ -1,19 +1,29 @@
 from __future__ import annotations
 
 from app.models.cnae import Cnae
+from app.models.cnae_secao import CnaeSecao
+from app.models.contato import Contato
+from app.models.documento import CnpjDocumento, CnpjDocumentoPendente
 from app.models.empresa import Empresa
 from app.models.estabelecimento import Estabelecimento
+from app.models.estabelecimento_cnae_secundario import EstabelecimentoCnaeSecundario
+from app.models.estabelecimento_detalhe import EstabelecimentoDetalhe
 from app.models.importacao import Importacao
 from app.models.motivo import Motivo
+from app.models.mudanca import Mudanca
 from app.models.municipio import Municipio
 from app.models.natureza import Natureza
 from app.models.pais import Pais
+from app.models.pessoa import Pessoa
 from app.models.qualificacao import Qualificacao
+from app.models.rede_aresta import RedeAresta
 from app.models.simples import Simples
+from app.models.situacao_historico import SituacaoHistorico
 from app.models.socio import Socio
 
 __all__ = [
-    "Cnae", "Empresa", "Estabelecimento", "Importacao",
-    "Motivo", "Municipio", "Natureza", "Pais",
-    "Qualificacao", "Simples", "Socio",
+    "Cnae", "CnaeSecao", "CnpjDocumento", "CnpjDocumentoPendente", "Contato", "Empresa", "Estabelecimento",
+    "EstabelecimentoCnaeSecundario", "EstabelecimentoDetalhe", "Importacao", "Motivo", "Mudanca", "Municipio",
+    "Natureza", "Pais", "Pessoa",
+    "Qualificacao", "RedeAresta", "Simples", "SituacaoHistorico", "Socio",
 ]
@@ -1,4 +1,4 @@
-from sqlalchemy import String
+from sqlalchemy import Integer, String
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base
@@ -7,5 +7,5 @@ from app.database import Base
 class Cnae(Base):
     __tablename__ = "cnaes"
 
-    codigo: Mapped[str] = mapped_column(String, primary_key=True)
+    codigo: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
     descricao: Mapped[str] = mapped_column(String, nullable=False)
@@ -0,0 +1,11 @@
+from sqlalchemy import CHAR, SmallInteger
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class CnaeSecao(Base):
+    __tablename__ = "cnae_secoes"
+
+    divisao: Mapped[int] = mapped_column(SmallInteger, primary_key=True, autoincrement=False)
+    secao: Mapped[str] = mapped_column(CHAR(1), nullable=False)
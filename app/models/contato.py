@@ -0,0 +1,14 @@
+from sqlalchemy import CHAR, BigInteger, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class Contato(Base):
+    __tablename__ = "contatos"
+
+    # Exactly one of telefone (DDD + number) / email (lower-cased) is set.
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    cnpj_completo: Mapped[str] = mapped_column(CHAR(14), nullable=False)
+    telefone: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    email: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -0,0 +1,22 @@
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import CHAR, DateTime, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class CnpjDocumento(Base):
+    __tablename__ = "cnpj_documento"
+
+    cnpj_basico: Mapped[str] = mapped_column(CHAR(8), primary_key=True)
+    documento: Mapped[dict[str, Any]] = mapped_column(JSONB, nullable=False)
+    atualizado_em: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class CnpjDocumentoPendente(Base):
+    __tablename__ = "cnpj_documento_pendente"
+
+    cnpj_basico: Mapped[str] = mapped_column(CHAR(8), primary_key=True)
@@ -1,4 +1,6 @@
-﻿from sqlalchemy import String
+﻿from decimal import Decimal
+
+from sqlalchemy import CHAR, Numeric, SmallInteger, String
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base
@@ -7,8 +9,8 @@ from app.database import Base
 class Empresa(Base):
     __tablename__ = "empresas"
 
-    cnpj_basico: Mapped[str] = mapped_column(String(8), primary_key=True)
+    cnpj_basico: Mapped[str] = mapped_column(CHAR(8), primary_key=True)
     razao_social: Mapped[str | None] = mapped_column(String, nullable=True)
-    natureza_juridica: Mapped[str | None] = mapped_column(String, nullable=True)
-    capital_social: Mapped[str | None] = mapped_column(String, nullable=True)
-    porte_empresa: Mapped[str | None] = mapped_column(String, nullable=True)
+    natureza_juridica: Mapped[int | None] = mapped_column(SmallInteger, nullable=True)
+    capital_social: Mapped[Decimal | None] = mapped_column(Numeric(20, 2), nullable=True)
+    porte_empresa: Mapped[int | None] = mapped_column(SmallInteger, nullable=True)
@@ -1,4 +1,7 @@
-from sqlalchemy import ForeignKey, Integer, String
+from datetime import date
+
+from sqlalchemy import CHAR, Date, ForeignKey, Integer, SmallInteger, String
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base
@@ -6,15 +9,17 @@ from app.database import Base
 
 class Estabelecimento(Base):
     __tablename__ = "estabelecimentos"
+    __table_args__ = {"postgresql_partition_by": "LIST (situacao)"}
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    cnpj_completo: Mapped[str] = mapped_column(String(14), unique=True, nullable=False)
+    cnpj_completo: Mapped[str] = mapped_column(CHAR(14), primary_key=True)
     cnpj_basico: Mapped[str] = mapped_column(ForeignKey("empresas.cnpj_basico"), nullable=False, index=True)
     nome_fantasia: Mapped[str | None] = mapped_column(String, nullable=True)
-    situacao: Mapped[str | None] = mapped_column(String, nullable=True)
+    situacao: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
     uf: Mapped[str | None] = mapped_column(String(2), nullable=True)
-    municipio: Mapped[str | None] = mapped_column(String, nullable=True)
-    cnae_principal: Mapped[str | None] = mapped_column(String, nullable=True)
-    cnae_secundario: Mapped[str | None] = mapped_column(String, nullable=True)
-    pais: Mapped[str | None] = mapped_column(String, nullable=True)
-    motivo: Mapped[str | None] = mapped_column(String, nullable=True)
+    municipio: Mapped[int | None] = mapped_column(SmallInteger, nullable=True)
+    cnae_principal: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    cnae_secundario: Mapped[list[int] | None] = mapped_column(ARRAY(Integer), nullable=True)
+    pais: Mapped[int | None] = mapped_column(SmallInteger, nullable=True)
+    motivo: Mapped[int | None] = mapped_column(SmallInteger, nullable=True)
+    inicio: Mapped[date | None] = mapped_column(Date, nullable=True)
+    data_situacao: Mapped[date | None] = mapped_column(Date, nullable=True)
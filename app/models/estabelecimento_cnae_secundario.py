@@ -0,0 +1,12 @@
+from sqlalchemy import CHAR, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class EstabelecimentoCnaeSecundario(Base):
+    __tablename__ = "estabelecimentos_cnaes_secundarios"
+
+    # One row per element of estabelecimentos.cnae_secundario.
+    cnpj_completo: Mapped[str] = mapped_column(CHAR(14), primary_key=True)
+    cnae: Mapped[int] = mapped_column(Integer, primary_key=True)
@@ -0,0 +1,28 @@
+from datetime import date
+
+from sqlalchemy import CHAR, Date, Integer, SmallInteger, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class EstabelecimentoDetalhe(Base):
+    __tablename__ = "estabelecimentos_detalhes"
+
+    cnpj_completo: Mapped[str] = mapped_column(CHAR(14), primary_key=True)
+    cnpj_basico: Mapped[str] = mapped_column(CHAR(8), nullable=False)
+    cep: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    tipo_logradouro: Mapped[str | None] = mapped_column(String, nullable=True)
+    logradouro: Mapped[str | None] = mapped_column(String, nullable=True)
+    numero: Mapped[str | None] = mapped_column(String, nullable=True)
+    complemento: Mapped[str | None] = mapped_column(String, nullable=True)
+    bairro: Mapped[str | None] = mapped_column(String, nullable=True)
+    matriz_filial: Mapped[int | None] = mapped_column(SmallInteger, nullable=True)
+    cidade_exterior: Mapped[str | None] = mapped_column(String, nullable=True)
+    ddd1: Mapped[str | None] = mapped_column(String, nullable=True)
+    telefone1: Mapped[str | None] = mapped_column(String, nullable=True)
+    ddd2: Mapped[str | None] = mapped_column(String, nullable=True)
+    telefone2: Mapped[str | None] = mapped_column(String, nullable=True)
+    email: Mapped[str | None] = mapped_column(String, nullable=True)
+    situacao_especial: Mapped[str | None] = mapped_column(String, nullable=True)
+    data_situacao_especial: Mapped[date | None] = mapped_column(Date, nullable=True)
@@ -1,4 +1,7 @@
+from typing import Any
+
 from sqlalchemy import Integer, String
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base
@@ -13,3 +16,4 @@ class Importacao(Base):
     status: Mapped[str | None] = mapped_column(String, nullable=True)
     registros_processados: Mapped[int | None] = mapped_column(Integer, nullable=True)
     registros_inseridos: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    manutencao: Mapped[dict[str, Any] | None] = mapped_column(JSONB, nullable=True)
@@ -0,0 +1,15 @@
+from sqlalchemy import CHAR, BigInteger, ForeignKey, String, Text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class Mudanca(Base):
+    __tablename__ = "mudancas"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    importacao_id: Mapped[int] = mapped_column(ForeignKey("importacoes.id"), nullable=False)
+    cnpj_basico: Mapped[str] = mapped_column(CHAR(8), nullable=False)
+    tipo: Mapped[str] = mapped_column(String(16), nullable=False)
+    campos: Mapped[list[str]] = mapped_column(ARRAY(Text), nullable=False)
@@ -0,0 +1,14 @@
+from sqlalchemy import Integer, Text, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class Pessoa(Base):
+    __tablename__ = "pessoas"
+    __table_args__ = (UniqueConstraint("cpf_cnpj", "nome", name="uq_pessoas_cpf_cnpj_nome"),)
+
+    # Missing values are stored as '' (see migration 0017_pessoas).
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    cpf_cnpj: Mapped[str] = mapped_column(Text, nullable=False)
+    nome: Mapped[str] = mapped_column(Text, nullable=False)
@@ -0,0 +1,11 @@
+from sqlalchemy import BigInteger
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class RedeAresta(Base):
+    __tablename__ = "rede_arestas"
+
+    origem: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    destino: Mapped[int] = mapped_column(BigInteger, primary_key=True)
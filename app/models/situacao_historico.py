@@ -0,0 +1,15 @@
+from sqlalchemy import CHAR, SmallInteger
+from sqlalchemy.dialects.postgresql import DATERANGE, Range
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class SituacaoHistorico(Base):
+    __tablename__ = "situacoes_historico"
+
+    # Half-open [desde, ate) intervals; the current status has no upper bound.
+    cnpj_completo: Mapped[str] = mapped_column(CHAR(14), primary_key=True)
+    vigencia: Mapped[Range] = mapped_column(DATERANGE, primary_key=True)
+    situacao: Mapped[int] = mapped_column(SmallInteger, nullable=False)
+    motivo: Mapped[int | None] = mapped_column(SmallInteger, nullable=True)
@@ -1,6 +1,6 @@
 from datetime import date
 
-from sqlalchemy import Date, ForeignKey, Integer, String
+from sqlalchemy import Date, ForeignKey, Integer, SmallInteger
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base
@@ -11,8 +11,7 @@ class Socio(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     cnpj_basico: Mapped[str] = mapped_column(ForeignKey("empresas.cnpj_basico"), nullable=False, index=True)
-    nome_socio: Mapped[str | None] = mapped_column(String, nullable=True)
-    cpf_cnpj_socio: Mapped[str | None] = mapped_column(String, nullable=True)
-    qualificacao: Mapped[str | None] = mapped_column(String, nullable=True)
-    pais: Mapped[str | None] = mapped_column(String, nullable=True)
+    pessoa_id: Mapped[int] = mapped_column(ForeignKey("pessoas.id"), nullable=False, index=True)
+    qualificacao: Mapped[int | None] = mapped_column(SmallInteger, nullable=True)
+    pais: Mapped[int | None] = mapped_column(SmallInteger, nullable=True)
     data_entrada: Mapped[date | None] = mapped_column(Date, nullable=True)
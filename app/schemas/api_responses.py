@@ -1,10 +1,22 @@
 from __future__ import annotations
 
+from datetime import date
+from typing import Generic, TypeVar
+
 from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 from app.config import settings
 from app.schemas.empresa import EmpresaSchema, EmpresaSearchResultSchema
-from app.schemas.estabelecimento import EstabelecimentoSchema
+from app.schemas.estabelecimento import (
+    EstabelecimentoAberturaSchema,
+    EstabelecimentoDetalhadoSchema,
+    EstabelecimentoEnderecoSchema,
+    EstabelecimentoSchema,
+)
+from app.schemas.estatistica import EstatisticaSchema
+from app.schemas.historico import SituacaoPeriodoSchema
+from app.schemas.mudanca import MudancaSchema
+from app.schemas.rede import ArestaRedeSchema, NoRedeSchema
 from app.schemas.socio import SocioSchema
 
 
@@ -26,12 +38,29 @@ class HealthResponse(BaseModel):
     uptime_seconds: float
 
 
-class CNPJResponse(BaseModel):
+EstabelecimentoT = TypeVar("EstabelecimentoT", bound=EstabelecimentoSchema)
+
+
+class CNPJBaseResponse(BaseModel, Generic[EstabelecimentoT]):
     empresa: EmpresaSchema | None = None
-    estabelecimentos: list[EstabelecimentoSchema] = Field(default_factory=list)
+    estabelecimentos: list[EstabelecimentoT] = Field(default_factory=list)
     socios: list[SocioSchema] = Field(default_factory=list)
 
 
+class CNPJResponse(CNPJBaseResponse[EstabelecimentoSchema]):
+    pass
+
+
+class CNPJDetalhadoResponse(CNPJBaseResponse[EstabelecimentoDetalhadoSchema]):
+    pass
+
+
+class HistoricoSituacaoResponse(BaseModel):
+    cnpj_completo: str
+    data: date | None = None
+    periodos: list[SituacaoPeriodoSchema] = Field(default_factory=list)
+
+
 class EmpresasSearchResponse(BaseModel):
     resultados: list[EmpresaSearchResultSchema] = Field(default_factory=list)
     total: int
@@ -61,3 +90,70 @@ class BatchCNPJResponse(BaseModel):
     nao_encontrados: list[str]
     total: int
     encontrados: int
+
+
+class ContatosBatchRequest(BaseModel):
+    contatos: list[str] = Field(
+        description="Telefones (DDD + numero) e e-mails. Maximo 1000 por request.",
+        examples=[["(11) 3333-4444", "contato@exemplo.com.br"]],
+    )
+
+    model_config = ConfigDict(extra="forbid")
+
+    @field_validator("contatos")
+    @classmethod
+    def validate_size(cls, value: list[str]) -> list[str]:
+        if len(value) > settings.BATCH_MAX_SIZE:
+            raise ValueError(f"Maximo de {settings.BATCH_MAX_SIZE} contatos por request")
+        return value
+
+
+class ContatosBatchResponse(BaseModel):
+    resultados: dict[str, list[str]]
+    truncados: list[str] = Field(default_factory=list)
+    nao_encontrados: list[str]
+    total: int
+    encontrados: int
+
+
+class EstabelecimentosResponse(BaseModel):
+    resultados: list[EstabelecimentoSchema] = Field(default_factory=list)
+    proximo: str | None = None
+
+
+class EstabelecimentosEnderecoResponse(BaseModel):
+    resultados: list[EstabelecimentoEnderecoSchema] = Field(default_factory=list)
+    proximo: str | None = None
+
+
+class EstabelecimentosAberturaResponse(BaseModel):
+    resultados: list[EstabelecimentoAberturaSchema] = Field(default_factory=list)
+    proximo: str | None = None
+
+
+class EstatisticasResponse(BaseModel):
+    agrupado_por: list[str]
+    resultados: list[EstatisticaSchema] = Field(default_factory=list)
+    total: int
+
+
+class MudancasResponse(BaseModel):
+    desde: int
+    mudancas: list[MudancaSchema] = Field(default_factory=list)
+    proximo: int | None = None
+
+
+class RedeResponse(BaseModel):
+    cnpj_basico: str
+    profundidade: int
+    nos: list[NoRedeSchema] = Field(default_factory=list)
+    arestas: list[ArestaRedeSchema] = Field(default_factory=list)
+    truncado: bool = False
+
+
+class CaminhoResponse(BaseModel):
+    origem: str
+    destino: str
+    encontrado: bool
+    caminho: list[NoRedeSchema] = Field(default_factory=list)
+    truncado: bool = False
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+from pydantic import ValidationInfo
+
+# Code columns are stored as SMALLINT/INTEGER; the API keeps exposing them as
+# zero-padded strings, exactly as published by the Receita Federal.
+CODE_WIDTHS = {
+    "natureza_juridica": 4,
+    "porte_empresa": 2,
+    "situacao": 2,
+    "matriz_filial": 1,
+    "motivo": 2,
+    "pais": 3,
+    "municipio": 4,
+    "cnae_principal": 7,
+    "cnae_secundario": 7,
+    "cnae_divisao": 2,
+    "qualificacao": 2,
+    "cep": 8,
+}
+
+
+def format_code(value: object, field_name: str) -> object:
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value).zfill(CODE_WIDTHS[field_name])
+    return value
+
+
+def format_code_list(value: object, field_name: str) -> object:
+    # INTEGER[] columns (cnae_secundario) keep their published comma-separated form.
+    if isinstance(value, list):
+        return ",".join(str(format_code(item, field_name)) for item in value) or None
+    return value
+
+
+def format_code_field(value: object, info: ValidationInfo) -> object:
+    """``field_validator(..., mode="before")`` for code fields; the field name picks the width."""
+    if info.field_name is None:
+        return value
+    return format_code(value, info.field_name)
+
+
+def format_code_list_field(value: object, info: ValidationInfo) -> object:
+    if info.field_name is None:
+        return value
+    return format_code_list(value, info.field_name)
+
+
+def format_decimal(value: object) -> object:
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def code_sql(column_sql: str, field_name: str) -> str:
+    """SQL counterpart of format_code, for payloads serialized by PostgreSQL."""
+    return f"lpad(({column_sql})::text, {CODE_WIDTHS[field_name]}, '0')"
+
+
+def code_list_sql(column_sql: str, field_name: str) -> str:
+    """SQL counterpart of format_code_list; NULL for a NULL or empty array."""
+    return (
+        f"(SELECT string_agg(lpad(c::text, {CODE_WIDTHS[field_name]}, '0'), ',' ORDER BY n) "
+        f"FROM unnest({column_sql}) WITH ORDINALITY AS u(c, n))"
+    )
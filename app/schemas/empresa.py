@@ -2,7 +2,9 @@ from __future__ import annotations
 
 from datetime import date
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, field_validator
+
+from app.schemas.codes import format_code_field, format_decimal
 
 
 class EmpresaSchema(BaseModel):
@@ -21,6 +23,9 @@ class EmpresaSchema(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+    format_codes = field_validator("natureza_juridica", "porte_empresa", mode="before")(format_code_field)
+    format_capital_social = field_validator("capital_social", mode="before")(format_decimal)
+
 
 class EmpresaSearchResultSchema(BaseModel):
     cnpj_basico: str
@@ -31,3 +36,6 @@ class EmpresaSearchResultSchema(BaseModel):
     relevancia: float | None = None
 
     model_config = ConfigDict(from_attributes=True)
+
+    format_codes = field_validator("natureza_juridica", "porte_empresa", mode="before")(format_code_field)
+    format_capital_social = field_validator("capital_social", mode="before")(format_decimal)
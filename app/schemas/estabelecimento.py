@@ -1,10 +1,13 @@
 from __future__ import annotations
 
-from pydantic import BaseModel, ConfigDict
+from datetime import date
+
+from pydantic import BaseModel, ConfigDict, field_validator
+
+from app.schemas.codes import format_code_field, format_code_list_field
 
 
 class EstabelecimentoSchema(BaseModel):
-    id: int
     cnpj_completo: str
     cnpj_basico: str
     nome_fantasia: str | None = None
@@ -21,3 +24,51 @@ class EstabelecimentoSchema(BaseModel):
     motivo_descricao: str | None = None
 
     model_config = ConfigDict(from_attributes=True)
+
+    format_codes = field_validator(
+        "situacao", "municipio", "cnae_principal", "pais", "motivo", mode="before"
+    )(format_code_field)
+    format_code_lists = field_validator("cnae_secundario", mode="before")(format_code_list_field)
+
+
+class EstabelecimentoEnderecoSchema(EstabelecimentoSchema):
+    cep: str | None = None
+    tipo_logradouro: str | None = None
+    logradouro: str | None = None
+    numero: str | None = None
+    complemento: str | None = None
+    bairro: str | None = None
+
+    format_cep = field_validator("cep", mode="before")(format_code_field)
+
+
+class EstabelecimentoAberturaSchema(EstabelecimentoSchema):
+    # The feed filters on inicio, so establishments without one never appear.
+    inicio: date
+    data_situacao: date | None = None
+
+
+class EstabelecimentoDetalheSchema(BaseModel):
+    matriz_filial: str | None = None
+    cep: str | None = None
+    tipo_logradouro: str | None = None
+    logradouro: str | None = None
+    numero: str | None = None
+    complemento: str | None = None
+    bairro: str | None = None
+    cidade_exterior: str | None = None
+    ddd1: str | None = None
+    telefone1: str | None = None
+    ddd2: str | None = None
+    telefone2: str | None = None
+    email: str | None = None
+    situacao_especial: str | None = None
+    data_situacao_especial: date | None = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+    format_codes = field_validator("matriz_filial", "cep", mode="before")(format_code_field)
+
+
+class EstabelecimentoDetalhadoSchema(EstabelecimentoSchema):
+    detalhes: EstabelecimentoDetalheSchema | None = None
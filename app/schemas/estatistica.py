@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from pydantic import BaseModel, field_validator
+
+from app.schemas.codes import format_code_field
+
+
+class EstatisticaSchema(BaseModel):
+    uf: str | None = None
+    municipio: str | None = None
+    cnae_secao: str | None = None
+    cnae_divisao: str | None = None
+    cnae_principal: str | None = None
+    situacao: str | None = None
+    porte_empresa: str | None = None
+    total: int
+
+    format_codes = field_validator(
+        "municipio", "cnae_divisao", "cnae_principal", "situacao", "porte_empresa", mode="before"
+    )(format_code_field)
@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from datetime import date
+
+from pydantic import BaseModel, ConfigDict, field_validator
+
+from app.schemas.codes import format_code_field
+
+
+class SituacaoPeriodoSchema(BaseModel):
+    situacao: str | None = None
+    motivo: str | None = None
+    motivo_descricao: str | None = None
+    desde: date
+    ate: date | None = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+    format_codes = field_validator("situacao", "motivo", mode="before")(format_code_field)
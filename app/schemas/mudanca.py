@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class MudancaSchema(BaseModel):
+    id: int
+    importacao_id: int
+    cnpj_basico: str
+    tipo: str
+    campos: list[str] = Field(default_factory=list)
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from typing import Literal
+
+from pydantic import BaseModel
+
+
+class NoRedeSchema(BaseModel):
+    id: str
+    tipo: Literal["empresa", "socio"]
+    distancia: int
+    nome: str | None = None
+    cpf_cnpj_socio: str | None = None
+    vizinhos_truncados: bool = False
+
+
+class ArestaRedeSchema(BaseModel):
+    origem: str
+    destino: str
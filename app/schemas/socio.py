@@ -4,6 +4,8 @@ from datetime import date
 
 from pydantic import BaseModel, ConfigDict, field_validator
 
+from app.schemas.codes import format_code_field
+
 
 class SocioSchema(BaseModel):
     id: int
@@ -17,3 +19,5 @@ class SocioSchema(BaseModel):
     data_entrada: date | None = None
 
     model_config = ConfigDict(from_attributes=True)
+
+    format_codes = field_validator("qualificacao", "pais", mode="before")(format_code_field)
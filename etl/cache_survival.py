@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import argparse
+import ctypes
+import ctypes.util
+import json
+import mmap
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import Engine, text
+
+from app.database import engine as default_engine
+from etl.maintenance import PREWARM_LEAVES_SQL, PREWARM_RELATIONS
+
+# The working set of GET /cnpj, as prewarmed. A partitioned index has no
+# storage of its own and is measured per partition.
+RELATIONS = PREWARM_RELATIONS
+
+BLOCK_SIZE = 8192
+MB = 1024 * 1024
+
+RELATIONS_SQL = """
+    SELECT c.oid::regclass::text AS relacao, pg_relation_filepath(c.oid) AS caminho, pg_relation_size(c.oid) AS bytes
+    FROM pg_class c
+    WHERE c.oid = ANY(CAST(:relacoes AS regclass[]))
+"""
+
+SHARED_BUFFERS_SQL = """
+    SELECT c.oid::regclass::text AS relacao, count(*) AS paginas
+    FROM pg_buffercache b
+    JOIN pg_class c ON b.relfilenode = pg_relation_filenode(c.oid)
+    WHERE b.reldatabase = (SELECT oid FROM pg_database WHERE datname = current_database())
+      AND c.oid = ANY(CAST(:relacoes AS regclass[]))
+    GROUP BY c.oid
+"""
+
+_libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+
+
+def _resident_bytes(path: Path) -> int:
+    """Bytes of a file in the OS page cache, via mincore(2) on a private mapping."""
+    size = path.stat().st_size
+    if size == 0:
+        return 0
+    pages = (size + mmap.PAGESIZE - 1) // mmap.PAGESIZE
+    vector = (ctypes.c_ubyte * pages)()
+    with open(path, "rb") as handle, mmap.mmap(handle.fileno(), size, access=mmap.ACCESS_COPY) as mapped:
+        buffer = ctypes.c_char.from_buffer(mapped)
+        try:
+            if _libc.mincore(ctypes.c_void_p(ctypes.addressof(buffer)), ctypes.c_size_t(size), vector) != 0:
+                raise OSError(ctypes.get_errno(), "mincore falhou", str(path))
+        finally:
+            # The mapping cannot close while ctypes exports it.
+            del buffer
+    return sum(byte & 1 for byte in vector) * mmap.PAGESIZE
+
+
+def _page_cache_bytes(data_directory: Path, relative_path: str) -> int:
+    # Relations are stored in 1 GB segments: <path>, <path>.1, <path>.2, ...
+    segment = data_directory / relative_path
+    total = 0
+    index = 0
+    while segment.exists():
+        total += _resident_bytes(segment)
+        index += 1
+        segment = data_directory / f"{relative_path}.{index}"
+    return total
+
+
+def measure_cache(engine: Engine) -> dict[str, Any]:
+    """Cached pages of the lookup working set, in shared_buffers and in the OS page cache.
+
+    shared_buffers needs the pg_buffercache extension; the page cache is read
+    from the relation files, so it needs to run on the database host with read
+    access to the data directory. Either one is None when unavailable.
+    """
+    with engine.connect() as connection:
+        leaves = [
+            leaf
+            for relation in RELATIONS
+            for leaf in connection.execute(text(PREWARM_LEAVES_SQL), {"name": relation}).scalars()
+        ]
+        relations = connection.execute(text(RELATIONS_SQL), {"relacoes": leaves}).mappings().all()
+        has_buffercache = connection.execute(
+            text("SELECT 1 FROM pg_extension WHERE extname = 'pg_buffercache'")
+        ).scalar()
+        shared: dict[str, int] | None = None
+        if has_buffercache:
+            rows = connection.execute(text(SHARED_BUFFERS_SQL), {"relacoes": leaves}).all()
+            shared = {relacao: paginas for relacao, paginas in rows}
+        data_directory = connection.execute(
+            text("SELECT setting FROM pg_settings WHERE name = 'data_directory'")
+        ).scalar()
+
+    directory = Path(data_directory) if data_directory else None
+    result: dict[str, Any] = {}
+    for relation in relations:
+        page_cache = None
+        if directory is not None:
+            try:
+                page_cache = round(_page_cache_bytes(directory, relation["caminho"]) / MB, 1)
+            except OSError:
+                page_cache = None
+        result[relation["relacao"]] = {
+            "tamanho_mb": round(relation["bytes"] / MB, 1),
+            "shared_buffers_mb": (
+                round(shared.get(relation["relacao"], 0) * BLOCK_SIZE / MB, 1) if shared is not None else None
+            ),
+            "page_cache_mb": page_cache,
+        }
+    return result
+
+
+def _survival(before: float | None, after: float | None) -> float | None:
+    if before is None or after is None or before == 0:
+        return None
+    return round(min(after / before, 1.0), 3)
+
+
+def compare(before: dict[str, Any], after: dict[str, Any]) -> dict[str, Any]:
+    """Fraction of each relation's cached pages still cached after the import."""
+    comparison = {}
+    for relation, antes in before.items():
+        depois = after.get(relation, {})
+        comparison[relation] = {
+            "shared_buffers": _survival(antes["shared_buffers_mb"], depois.get("shared_buffers_mb")),
+            "page_cache": _survival(antes["page_cache_mb"], depois.get("page_cache_mb")),
+        }
+    return comparison
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Quanto do working set em cache do PostgreSQL sobrevive a uma importacao"
+    )
+    parser.add_argument("--output", type=Path, default=None, help="grava a medicao em JSON (antes da importacao)")
+    parser.add_argument("--baseline", type=Path, default=None, help="medicao anterior; imprime a fracao que sobreviveu")
+    args = parser.parse_args()
+
+    measurement = measure_cache(default_engine)
+    if args.output:
+        args.output.write_text(json.dumps(measurement, indent=2), encoding="utf-8")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        print(json.dumps({"depois": measurement, "sobrevivencia": compare(baseline, measurement)}, indent=2))
+    else:
+        print(json.dumps(measurement, indent=2))
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+from sqlalchemy import Engine, text
+
+from app.api.v1.cnpj import EMPRESA_SELECT_SQL, ESTABELECIMENTO_SELECT_SQL, SOCIO_SELECT_SQL
+from app.core.logging import get_logger
+from app.database import engine as default_engine
+from app.schemas.codes import code_list_sql, code_sql
+from etl.estatisticas import apply_estatisticas_delta
+from etl.mudancas import record_mudancas
+from etl.rede import refresh_rede
+
+logger = get_logger(__name__)
+
+DOCUMENTO_TABLE = "cnpj_documento"
+QUEUE_TABLE = "cnpj_documento_pendente"
+
+REFRESH_BATCH_SIZE = 20000
+
+
+def _json_overrides(alias: str, code_fields: list[str], extra: dict[str, str] | None = None) -> str:
+    # to_jsonb(row) keeps the API column names but renders SMALLINT codes as
+    # numbers; re-emit them zero-padded, as the Pydantic schemas do.
+    pairs = [f"'{field}', {code_sql(f'{alias}.{field}', field)}" for field in code_fields]
+    pairs += [f"'{field}', {expression}" for field, expression in (extra or {}).items()]
+    return f"jsonb_build_object({', '.join(pairs)})"
+
+
+EMPRESA_JSON = _json_overrides(
+    "x",
+    ["natureza_juridica", "porte_empresa"],
+    {"capital_social": "x.capital_social::text"},
+)
+ESTABELECIMENTO_JSON = _json_overrides(
+    "x",
+    ["situacao", "municipio", "cnae_principal", "pais", "motivo"],
+    {"cnae_secundario": code_list_sql("x.cnae_secundario", "cnae_secundario")},
+)
+SOCIO_JSON = _json_overrides("x", ["qualificacao", "pais"])
+
+# Companies claimed from the queue in the current batch, with their previous
+# document so derived tables (e.g. etl.estatisticas) can apply old -> new deltas.
+LOTE_TABLE = "_documento_lote"
+
+CREATE_LOTE_SQL = f"""
+    CREATE TEMP TABLE IF NOT EXISTS {LOTE_TABLE} (
+        cnpj_basico CHAR(8) PRIMARY KEY,
+        importacao_id INTEGER,
+        anterior JSONB
+    ) ON COMMIT DELETE ROWS
+"""
+
+CLAIM_SQL = f"""
+    WITH lote AS (
+        DELETE FROM {QUEUE_TABLE}
+        WHERE cnpj_basico IN (
+            SELECT cnpj_basico
+            FROM {QUEUE_TABLE}
+            ORDER BY cnpj_basico
+            LIMIT :limit
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING cnpj_basico, importacao_id
+    )
+    INSERT INTO {LOTE_TABLE} (cnpj_basico, importacao_id, anterior)
+    SELECT l.cnpj_basico, l.importacao_id, d.documento
+    FROM lote l
+    LEFT JOIN {DOCUMENTO_TABLE} d ON d.cnpj_basico = l.cnpj_basico
+"""
+
+# Same SELECT lists as GET /cnpj/{cnpj}, so a stored document is byte-for-byte
+# the payload the join path would return (modulo JSONB key order).
+REFRESH_SQL = f"""
+    WITH documentos AS (
+        SELECT
+            l.cnpj_basico,
+            jsonb_build_object(
+                'empresa', (
+                    SELECT to_jsonb(x) || {EMPRESA_JSON}
+                    FROM ({EMPRESA_SELECT_SQL} WHERE e.cnpj_basico = l.cnpj_basico) x
+                ),
+                'estabelecimentos', COALESCE((
+                    SELECT jsonb_agg(to_jsonb(x) || {ESTABELECIMENTO_JSON} ORDER BY x.cnpj_completo)
+                    FROM ({ESTABELECIMENTO_SELECT_SQL} WHERE est.cnpj_basico = l.cnpj_basico) x
+                ), '[]'::jsonb),
+                'socios', COALESCE((
+                    SELECT jsonb_agg(to_jsonb(x) || {SOCIO_JSON} ORDER BY x.id)
+                    FROM ({SOCIO_SELECT_SQL} WHERE s.cnpj_basico = l.cnpj_basico) x
+                ), '[]'::jsonb)
+            ) AS documento
+        FROM {LOTE_TABLE} l
+    ),
+    removidos AS (
+        DELETE FROM {DOCUMENTO_TABLE} d
+        USING documentos doc
+        WHERE d.cnpj_basico = doc.cnpj_basico
+          AND doc.documento->'empresa' = 'null'::jsonb
+          AND doc.documento->'estabelecimentos' = '[]'::jsonb
+          AND doc.documento->'socios' = '[]'::jsonb
+    )
+    INSERT INTO {DOCUMENTO_TABLE} (cnpj_basico, documento, atualizado_em)
+    SELECT cnpj_basico, documento, now()
+    FROM documentos
+    WHERE documento->'empresa' <> 'null'::jsonb
+       OR documento->'estabelecimentos' <> '[]'::jsonb
+       OR documento->'socios' <> '[]'::jsonb
+    ON CONFLICT (cnpj_basico)
+    DO UPDATE SET documento = EXCLUDED.documento, atualizado_em = EXCLUDED.atualizado_em
+"""
+
+ENQUEUE_ALL_SQL = f"""
+    INSERT INTO {QUEUE_TABLE} (cnpj_basico)
+    SELECT cnpj_basico FROM empresas
+    UNION
+    SELECT cnpj_basico FROM estabelecimentos
+    UNION
+    SELECT cnpj_basico FROM socios
+    ON CONFLICT DO NOTHING
+"""
+
+
+# The upserts queue companies without an import id; imports run one at a
+# time, so whatever is unstamped when an import finishes loading (or fails)
+# was queued by it.
+STAMP_SQL = f"""
+    UPDATE {QUEUE_TABLE}
+    SET importacao_id = :importacao_id
+    WHERE importacao_id IS NULL
+"""
+
+
+def stamp_queue(engine: Engine, importacao_id: int) -> int:
+    """Attributes the companies queued since the last stamp to ``importacao_id``."""
+    with engine.begin() as connection:
+        return connection.execute(text(STAMP_SQL), {"importacao_id": importacao_id}).rowcount or 0
+
+
+def enqueue_all(engine: Engine = default_engine) -> None:
+    """Marks every company for rebuild, e.g. after reference descriptions change."""
+    with engine.begin() as connection:
+        connection.execute(text(ENQUEUE_ALL_SQL))
+
+
+def refresh_documentos(
+    engine: Engine = default_engine,
+    batch_size: int = REFRESH_BATCH_SIZE,
+    importacao_id: int | None = None,
+) -> int:
+    """Rebuilds the documents of every queued company, one committed batch at a time.
+
+    The rollup and partner network tables are updated in the same transaction
+    as the documents they are derived from. The companies whose document
+    changed are logged in ``mudancas`` under ``importacao_id`` or, without it,
+    under the import that queued them (e.g. one that failed before its refresh).
+    """
+    started = time.perf_counter()
+    refreshed = 0
+    mudancas = 0
+    while True:
+        with engine.begin() as connection:
+            connection.execute(text(CREATE_LOTE_SQL))
+            batch = connection.execute(text(CLAIM_SQL), {"limit": batch_size}).rowcount or 0
+            if batch == 0:
+                break
+            connection.execute(text(REFRESH_SQL))
+            apply_estatisticas_delta(connection, LOTE_TABLE)
+            refresh_rede(connection, LOTE_TABLE)
+            mudancas += record_mudancas(connection, LOTE_TABLE, importacao_id)
+        refreshed += batch
+
+    logger.info(
+        "etl.documentos_atualizados",
+        documentos=refreshed,
+        mudancas=mudancas,
+        segundos=round(time.perf_counter() - started, 3),
+    )
+    return refreshed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Atualiza a tabela cnpj_documento")
+    parser.add_argument("--rebuild", action="store_true", help="reconstroi os documentos de todas as empresas")
+    args = parser.parse_args()
+    if args.rebuild:
+        enqueue_all()
+    print(refresh_documentos())
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+from sqlalchemy import Connection, Engine, text
+
+from app.core.logging import get_logger
+from app.database import engine as default_engine
+
+logger = get_logger(__name__)
+
+# Rollups of establishment counts, derived from cnpj_documento so that
+# rollup = sum over documents holds after every refresh batch.
+MUNICIPIO_TABLE = "estatisticas_municipio"
+UF_TABLE = "estatisticas_uf"
+
+DELTA_TABLE = "_estatisticas_delta"
+
+CREATE_DELTA_SQL = f"""
+    CREATE TEMP TABLE IF NOT EXISTS {DELTA_TABLE} (
+        uf VARCHAR(2),
+        municipio SMALLINT,
+        cnae_principal INTEGER,
+        situacao SMALLINT,
+        porte_empresa SMALLINT,
+        total BIGINT NOT NULL
+    ) ON COMMIT DELETE ROWS
+"""
+
+# One row per establishment of each document, keyed by the rollup dimensions.
+# Documents store codes zero-padded (see app.schemas.codes); cast them back.
+_ESTABELECIMENTOS_SQL = """
+    SELECT
+        est->>'uf' AS uf,
+        (est->>'municipio')::smallint AS municipio,
+        (est->>'cnae_principal')::integer AS cnae_principal,
+        (est->>'situacao')::smallint AS situacao,
+        (docs.documento->'empresa'->>'porte_empresa')::smallint AS porte_empresa,
+        docs.sinal
+    FROM ({documentos}) docs
+    CROSS JOIN LATERAL jsonb_array_elements(docs.documento->'estabelecimentos') est
+"""
+
+
+def _delta_sql(lote_table: str) -> str:
+    # -1 for every establishment of the previous documents, +1 for the current ones.
+    documentos = f"""
+        SELECT l.anterior AS documento, -1 AS sinal
+        FROM {lote_table} l
+        WHERE l.anterior IS NOT NULL
+        UNION ALL
+        SELECT d.documento, 1 AS sinal
+        FROM {lote_table} l
+        JOIN cnpj_documento d ON d.cnpj_basico = l.cnpj_basico
+    """
+    return f"""
+        INSERT INTO {DELTA_TABLE} (uf, municipio, cnae_principal, situacao, porte_empresa, total)
+        SELECT uf, municipio, cnae_principal, situacao, porte_empresa, SUM(sinal)
+        FROM ({_ESTABELECIMENTOS_SQL.format(documentos=documentos)}) e
+        GROUP BY uf, municipio, cnae_principal, situacao, porte_empresa
+        HAVING SUM(sinal) <> 0
+    """
+
+
+APPLY_MUNICIPIO_SQL = f"""
+    INSERT INTO {MUNICIPIO_TABLE} AS t (uf, municipio, cnae_principal, situacao, porte_empresa, total)
+    SELECT uf, municipio, cnae_principal, situacao, porte_empresa, total
+    FROM {DELTA_TABLE}
+    ON CONFLICT (uf, municipio, cnae_principal, situacao, porte_empresa)
+    DO UPDATE SET total = t.total + EXCLUDED.total
+"""
+
+APPLY_UF_SQL = f"""
+    INSERT INTO {UF_TABLE} AS t (uf, cnae_divisao, situacao, porte_empresa, total)
+    SELECT uf, (cnae_principal / 100000)::smallint, situacao, porte_empresa, SUM(total)
+    FROM {DELTA_TABLE}
+    GROUP BY 1, 2, 3, 4
+    HAVING SUM(total) <> 0
+    ON CONFLICT (uf, cnae_divisao, situacao, porte_empresa)
+    DO UPDATE SET total = t.total + EXCLUDED.total
+"""
+
+# Served by the partial idx_*_zerados indexes.
+PURGE_SQL = [f"DELETE FROM {table} WHERE total = 0" for table in (MUNICIPIO_TABLE, UF_TABLE)]
+
+REBUILD_SQL = [
+    f"TRUNCATE {MUNICIPIO_TABLE}, {UF_TABLE}",
+    f"""
+    INSERT INTO {MUNICIPIO_TABLE} (uf, municipio, cnae_principal, situacao, porte_empresa, total)
+    SELECT uf, municipio, cnae_principal, situacao, porte_empresa, SUM(sinal)
+    FROM ({_ESTABELECIMENTOS_SQL.format(documentos="SELECT documento, 1 AS sinal FROM cnpj_documento")}) e
+    GROUP BY uf, municipio, cnae_principal, situacao, porte_empresa
+    """,
+    f"""
+    INSERT INTO {UF_TABLE} (uf, cnae_divisao, situacao, porte_empresa, total)
+    SELECT uf, cnae_divisao, situacao, porte_empresa, SUM(total)
+    FROM {MUNICIPIO_TABLE}
+    GROUP BY uf, cnae_divisao, situacao, porte_empresa
+    """,
+]
+
+
+def apply_estatisticas_delta(connection: Connection, lote_table: str) -> None:
+    """Moves the rollups from the previous to the current documents of a refresh batch.
+
+    Runs inside the refresh transaction; ``lote_table`` holds the batch keys and
+    the documents as they were before the refresh (``anterior``).
+    """
+    connection.execute(text(CREATE_DELTA_SQL))
+    connection.execute(text(_delta_sql(lote_table)))
+    connection.execute(text(APPLY_MUNICIPIO_SQL))
+    connection.execute(text(APPLY_UF_SQL))
+    for sql in PURGE_SQL:
+        connection.execute(text(sql))
+
+
+def rebuild_estatisticas(engine: Engine = default_engine) -> None:
+    """Recomputes both rollups from cnpj_documento; full scan, for repairs only."""
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        for sql in REBUILD_SQL:
+            connection.execute(text(sql))
+
+    logger.info("etl.estatisticas_reconstruidas", segundos=round(time.perf_counter() - started, 3))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tabelas de estatisticas agregadas")
+    parser.add_argument("--rebuild", action="store_true", help="recalcula as tabelas a partir de cnpj_documento")
+    args = parser.parse_args()
+    if args.rebuild:
+        rebuild_estatisticas()
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from sqlalchemy import Connection, text
+
+# Status history of estabelecimentos (slowly changing dimension): one row per
+# (cnpj_completo, vigencia), where vigencia is a half-open daterange and the
+# open interval is the current status. Intervals start at the Receita's
+# data_situacao when it is known, otherwise at the load date.
+HISTORICO_TABLE = "situacoes_historico"
+
+
+def _append_sql(staging_table: str) -> list[str]:
+    # Set-based against the chunk's staging rows, and only where (situacao,
+    # motivo) differs from the open interval: a resent unchanged row writes
+    # nothing. Closing first lets the new interval start where the old ends;
+    # GREATEST keeps intervals non-empty when the informed date goes backwards.
+    return [
+        f"""
+        UPDATE {HISTORICO_TABLE} h
+        SET vigencia = daterange(
+            lower(h.vigencia),
+            GREATEST(COALESCE(s.data_situacao, CURRENT_DATE), lower(h.vigencia) + 1)
+        )
+        FROM {staging_table} s
+        WHERE h.cnpj_completo = s.cnpj_completo
+          AND upper_inf(h.vigencia)
+          AND (h.situacao, h.motivo) IS DISTINCT FROM (s.situacao, s.motivo)
+        """,
+        f"""
+        INSERT INTO {HISTORICO_TABLE} (cnpj_completo, vigencia, situacao, motivo)
+        SELECT
+            s.cnpj_completo,
+            daterange(GREATEST(COALESCE(s.data_situacao, CURRENT_DATE), anterior.fim), NULL),
+            s.situacao,
+            s.motivo
+        FROM {staging_table} s
+        CROSS JOIN LATERAL (
+            SELECT max(upper(h.vigencia)) AS fim
+            FROM {HISTORICO_TABLE} h
+            WHERE h.cnpj_completo = s.cnpj_completo
+        ) anterior
+        WHERE NOT EXISTS (
+            SELECT 1
+            FROM {HISTORICO_TABLE} h
+            WHERE h.cnpj_completo = s.cnpj_completo
+              AND upper_inf(h.vigencia)
+        )
+        """,
+    ]
+
+
+def append_situacoes(connection: Connection, staging_table: str) -> None:
+    """Closes and opens status intervals for the establishments in a staging table.
+
+    Runs in the caller's transaction, so the history commits with the upsert of the same rows.
+    """
+    for sql in _append_sql(staging_table):
+        connection.execute(text(sql))
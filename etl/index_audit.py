@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import Engine, text
+
+from app.database import engine as default_engine
+
+# Partitioned (parent) indexes have no storage or statistics of their own;
+# every query below looks at the leaf indexes (relkind 'i').
+INDEXES_SQL = """
+    SELECT
+        s.relname AS tabela,
+        s.indexrelname AS indice,
+        am.amname AS metodo,
+        x.indisunique AS unico,
+        x.indisprimary AS primaria,
+        (con.oid IS NOT NULL) AS restricao,
+        s.idx_scan AS scans,
+        s.idx_tup_read AS tuplas_lidas,
+        pg_relation_size(s.indexrelid) AS bytes,
+        ic.relpages AS paginas,
+        ic.reltuples AS tuplas,
+        COALESCE(
+            (SELECT option_value::int
+             FROM pg_options_to_table(ic.reloptions)
+             WHERE option_name = 'fillfactor'),
+            90
+        ) AS fillfactor,
+        -- Average width of the indexed values: column stats for plain
+        -- columns, the index's own stats for expressions.
+        (
+            SELECT COALESCE(SUM(st.avg_width), 0)
+            FROM pg_attribute a
+            LEFT JOIN pg_stats st
+              ON st.schemaname = current_schema()
+             AND (
+                    (st.tablename = s.relname AND st.attname = a.attname)
+                 OR (st.tablename = s.indexrelname AND st.attname = a.attname)
+             )
+            WHERE a.attrelid = s.indexrelid
+        ) AS largura_media,
+        t.n_tup_ins + t.n_tup_upd - t.n_tup_hot_upd AS escritas_estimadas,
+        pg_get_indexdef(s.indexrelid) AS definicao
+    FROM pg_stat_user_indexes s
+    JOIN pg_index x ON x.indexrelid = s.indexrelid
+    JOIN pg_class ic ON ic.oid = s.indexrelid
+    JOIN pg_am am ON am.oid = ic.relam
+    JOIN pg_stat_user_tables t ON t.relid = s.relid
+    LEFT JOIN pg_constraint con ON con.conindid = s.indexrelid
+    WHERE s.schemaname = current_schema()
+      AND ic.relkind = 'i'
+    ORDER BY s.relname, s.indexrelname
+"""
+
+# An index is redundant when another index on the same table has the same
+# access method and starts with the same key columns and operator classes,
+# with no predicate or expressions on either side. Unique indexes are only
+# redundant with an identical unique index (they enforce something).
+REDUNDANT_SQL = """
+    SELECT
+        t.relname AS tabela,
+        ai.relname AS indice,
+        bi.relname AS coberto_por,
+        pg_relation_size(a.indexrelid) AS bytes
+    FROM pg_index a
+    JOIN pg_index b ON b.indrelid = a.indrelid AND b.indexrelid <> a.indexrelid
+    JOIN pg_class ai ON ai.oid = a.indexrelid
+    JOIN pg_class bi ON bi.oid = b.indexrelid
+    JOIN pg_class t ON t.oid = a.indrelid
+    JOIN pg_namespace ns ON ns.oid = t.relnamespace
+    WHERE ns.nspname = current_schema()
+      AND ai.relkind = 'i'
+      AND ai.relam = bi.relam
+      AND a.indexprs IS NULL AND b.indexprs IS NULL
+      AND a.indpred IS NULL AND b.indpred IS NULL
+      AND a.indnatts = a.indnkeyatts
+      AND a.indnkeyatts <= b.indnkeyatts
+      AND (a.indkey::int2[])[0:a.indnkeyatts - 1] = (b.indkey::int2[])[0:a.indnkeyatts - 1]
+      AND (a.indclass::oid[])[0:a.indnkeyatts - 1] = (b.indclass::oid[])[0:a.indnkeyatts - 1]
+      AND NOT a.indisprimary
+      AND (
+            NOT a.indisunique
+         OR (b.indisunique AND a.indnkeyatts = b.indnkeyatts)
+      )
+      -- identical pair: report the newer one (or the one shadowing the PK)
+      AND NOT (
+            a.indnkeyatts = b.indnkeyatts
+        AND a.indisunique = b.indisunique
+        AND a.indnatts = b.indnatts
+        AND NOT b.indisprimary
+        AND a.indexrelid < b.indexrelid
+      )
+    ORDER BY t.relname, ai.relname
+"""
+
+# Expression/partial indexes (e.g. full-text) are compared by definition.
+DUPLICATE_DEFINITION_SQL = """
+    SELECT
+        t.relname AS tabela,
+        ai.relname AS indice,
+        bi.relname AS coberto_por,
+        pg_relation_size(a.indexrelid) AS bytes
+    FROM pg_index a
+    JOIN pg_index b ON b.indrelid = a.indrelid AND b.indexrelid > a.indexrelid
+    JOIN pg_class ai ON ai.oid = a.indexrelid
+    JOIN pg_class bi ON bi.oid = b.indexrelid
+    JOIN pg_class t ON t.oid = a.indrelid
+    JOIN pg_namespace ns ON ns.oid = t.relnamespace
+    WHERE ns.nspname = current_schema()
+      AND ai.relkind = 'i'
+      AND (a.indexprs IS NOT NULL OR a.indpred IS NOT NULL)
+      AND regexp_replace(pg_get_indexdef(a.indexrelid), 'INDEX \\S+ ON', 'INDEX ON')
+        = regexp_replace(pg_get_indexdef(b.indexrelid), 'INDEX \\S+ ON', 'INDEX ON')
+"""
+
+STATS_RESET_SQL = """
+    SELECT stats_reset
+    FROM pg_stat_database
+    WHERE datname = current_database()
+"""
+
+BLOCK_SIZE = 8192
+PAGE_HEADER_BYTES = 24
+BTREE_SPECIAL_BYTES = 16
+INDEX_TUPLE_HEADER_BYTES = 8
+ITEM_POINTER_BYTES = 4
+
+
+def _maxalign(size: float) -> int:
+    return int(math.ceil(size / 8) * 8)
+
+
+def estimate_btree_bloat(index: dict[str, Any]) -> dict[str, Any] | None:
+    """Estimated pages a freshly built btree would need vs. its current size.
+
+    Uses reltuples and pg_stats widths, so it is only as fresh as the last ANALYZE.
+    """
+    if index["metodo"] != "btree" or not index["paginas"] or index["tuplas"] <= 0:
+        return None
+
+    tuple_bytes = _maxalign(INDEX_TUPLE_HEADER_BYTES + index["largura_media"]) + ITEM_POINTER_BYTES
+    usable = (BLOCK_SIZE - PAGE_HEADER_BYTES - BTREE_SPECIAL_BYTES) * index["fillfactor"] / 100
+    tuples_per_page = max(int(usable // tuple_bytes), 1)
+    # +1 for the metapage; internal pages add roughly 1/tuples_per_page more.
+    leaf_pages = math.ceil(index["tuplas"] / tuples_per_page)
+    expected_pages = leaf_pages + math.ceil(leaf_pages / tuples_per_page) + 1
+
+    bloat_pages = max(index["paginas"] - expected_pages, 0)
+    return {
+        "paginas_esperadas": expected_pages,
+        "bloat_bytes": bloat_pages * BLOCK_SIZE,
+        "bloat_ratio": round(bloat_pages / index["paginas"], 3),
+    }
+
+
+def audit_indexes(
+    engine: Engine,
+    min_bloat_ratio: float = 0.3,
+    min_bloat_bytes: int = 10 * 1024 * 1024,
+) -> dict[str, Any]:
+    """Redundant, unused and bloated indexes, with the ETL writes each one costs."""
+    with engine.connect() as connection:
+        indexes = [dict(row) for row in connection.execute(text(INDEXES_SQL)).mappings().all()]
+        redundant = [dict(row) for row in connection.execute(text(REDUNDANT_SQL)).mappings().all()]
+        redundant += [dict(row) for row in connection.execute(text(DUPLICATE_DEFINITION_SQL)).mappings().all()]
+        stats_reset = connection.execute(text(STATS_RESET_SQL)).scalar()
+
+    by_name = {index["indice"]: index for index in indexes}
+    for item in redundant:
+        # Every insert and non-HOT update writes an entry into each index of the table.
+        item["escritas_estimadas"] = by_name.get(item["indice"], {}).get("escritas_estimadas")
+
+    # Indexes backing a constraint (PK/unique/exclusion) are needed even when never scanned.
+    unused = [
+        {
+            "tabela": index["tabela"],
+            "indice": index["indice"],
+            "bytes": index["bytes"],
+            "escritas_estimadas": index["escritas_estimadas"],
+        }
+        for index in indexes
+        if index["scans"] == 0 and not index["restricao"] and not index["unico"]
+    ]
+
+    bloated = []
+    for index in indexes:
+        bloat = estimate_btree_bloat(index)
+        if bloat and bloat["bloat_ratio"] >= min_bloat_ratio and bloat["bloat_bytes"] >= min_bloat_bytes:
+            bloated.append({"tabela": index["tabela"], "indice": index["indice"], "bytes": index["bytes"], **bloat})
+
+    # An index can be both redundant and unused; count its size once.
+    droppable = {item["indice"]: item["bytes"] for item in redundant + unused}
+
+    return {
+        "estatisticas_desde": stats_reset.isoformat() if stats_reset else None,
+        "indices": len(indexes),
+        "bytes_total": sum(index["bytes"] for index in indexes),
+        "redundantes": redundant,
+        "nao_usados": unused,
+        "inchados": sorted(bloated, key=lambda item: item["bloat_bytes"], reverse=True),
+        "bytes_recuperaveis": sum(droppable.values())
+        + sum(item["bloat_bytes"] for item in bloated if item["indice"] not in droppable),
+    }
+
+
+def _print_report(report: dict[str, Any]) -> None:
+    def mb(value: int) -> str:
+        return f"{value / 1024 / 1024:,.1f} MB"
+
+    print(f"Indices: {report['indices']} ({mb(report['bytes_total'])}); estatisticas desde {report['estatisticas_desde']}")
+    print("\nRedundantes:")
+    for item in report["redundantes"]:
+        print(f"  {item['tabela']}.{item['indice']} ({mb(item['bytes'])}) coberto por {item['coberto_por']}, "
+              f"~{item['escritas_estimadas']} escritas")
+    print("\nNao usados (idx_scan = 0):")
+    for item in report["nao_usados"]:
+        print(f"  {item['tabela']}.{item['indice']} ({mb(item['bytes'])}), ~{item['escritas_estimadas']} escritas")
+    print("\nInchados (estimativa):")
+    for item in report["inchados"]:
+        print(f"  {item['tabela']}.{item['indice']} ({mb(item['bytes'])}): "
+              f"{item['bloat_ratio']:.0%} / {mb(item['bloat_bytes'])} recuperaveis com REINDEX")
+    print(f"\nTotal recuperavel: {mb(report['bytes_recuperaveis'])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Auditoria de indices: redundantes, nao usados e inchados")
+    parser.add_argument("--min-bloat-ratio", type=float, default=0.3, help="fracao minima de bloat reportada")
+    parser.add_argument("--min-bloat-mb", type=int, default=10, help="bloat minimo reportado, em MB")
+    parser.add_argument("--output", type=Path, default=None, help="grava o relatorio em JSON")
+    args = parser.parse_args()
+
+    report = audit_indexes(default_engine, args.min_bloat_ratio, args.min_bloat_mb * 1024 * 1024)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, default=str), encoding="utf-8")
+    _print_report(report)
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import Engine, text
+
+from app.config import settings
+from app.database import engine as default_engine
+
+SAMPLE_SQL = """
+    SELECT cnpj_basico
+    FROM cnpj_documento TABLESAMPLE SYSTEM (1)
+    LIMIT :limit
+"""
+
+STARTUP_TIMEOUT_SECONDS = 60
+
+
+def _process_memory_kb(pid: int) -> dict[str, int]:
+    # Rss counts the mmap'ed artifact pages in every worker; Pss splits shared
+    # pages between the processes mapping them, so its sum is the real footprint.
+    memory = {"rss_kb": 0, "pss_kb": 0}
+    try:
+        for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+            name, _, value = line.partition(":")
+            if name in ("Rss", "Pss"):
+                memory[f"{name.lower()}_kb"] = int(value.split()[0])
+    except OSError:
+        pass
+    return memory
+
+
+def _server_memory_kb(pid: int) -> dict[str, int]:
+    pids = [pid]
+    children = Path(f"/proc/{pid}/task/{pid}/children")
+    if children.exists():
+        pids += [int(child) for child in children.read_text().split()]
+    totals = {"rss_kb": 0, "pss_kb": 0}
+    for process in pids:
+        for key, value in _process_memory_kb(process).items():
+            totals[key] += value
+    return totals
+
+
+def _get(url: str, api_key: str | None, sequence: int) -> float:
+    # The server trusts X-Forwarded-For during the run; one address per request
+    # keeps the per-IP rate limit out of the measurement.
+    headers = {"X-Forwarded-For": f"10.{sequence >> 16 & 255}.{sequence >> 8 & 255}.{sequence & 255}"}
+    if api_key:
+        headers["X-API-Key"] = api_key
+    request = urllib.request.Request(url, headers=headers)
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+    except urllib.error.HTTPError as exc:
+        if exc.code != 404:
+            raise
+    return (time.perf_counter() - started) * 1000
+
+
+def _wait_until_ready(base_url: str) -> None:
+    deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}{settings.API_V1_PREFIX}/health"):
+                return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.5)
+    raise RuntimeError("API nao respondeu ao health check")
+
+
+def benchmark_backend(
+    backend: str,
+    basicos: list[str],
+    workers: int,
+    concurrency: int,
+    port: int,
+    api_key: str | None,
+) -> dict[str, Any]:
+    """Starts uvicorn with ``workers`` processes on one backend and replays the sample."""
+    env = {**os.environ, "LOOKUP_BACKEND": backend, "API_KEYS": api_key or "", "TRUST_PROXY": "true"}
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+        ],
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_ready(base_url)
+        urls = [f"{base_url}{settings.API_V1_PREFIX}/cnpj/{cnpj_basico}" for cnpj_basico in basicos]
+
+        # Warm-up pass: loads the artifact pages / shared_buffers for both backends.
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(lambda item: _get(item[1], api_key, item[0]), enumerate(urls)))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            timings_ms = sorted(
+                pool.map(lambda item: _get(item[1], api_key, len(urls) + item[0]), enumerate(urls))
+            )
+        elapsed = time.perf_counter() - started
+
+        memory = _server_memory_kb(server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    return {
+        "backend": backend,
+        "workers": workers,
+        "requisicoes": len(timings_ms),
+        "req_por_segundo": round(len(timings_ms) / elapsed, 1) if elapsed else None,
+        "media_ms": round(statistics.fmean(timings_ms), 3),
+        "p50_ms": round(timings_ms[len(timings_ms) // 2], 3),
+        "p95_ms": round(timings_ms[int(len(timings_ms) * 0.95) - 1], 3),
+        "p99_ms": round(timings_ms[int(len(timings_ms) * 0.99) - 1], 3),
+        **memory,
+    }
+
+
+def sample_basicos(engine: Engine, samples: int) -> list[str]:
+    with engine.connect() as connection:
+        return list(connection.execute(text(SAMPLE_SQL), {"limit": samples}).scalars().all())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compara latencia e memoria do GET /cnpj entre os backends postgres e offline"
+    )
+    parser.add_argument("--samples", type=int, default=2000, help="CNPJs sorteados de cnpj_documento")
+    parser.add_argument("--workers", type=int, default=4, help="workers do uvicorn")
+    parser.add_argument("--concurrency", type=int, default=16, help="requisicoes simultaneas")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--api-key", default=None, help="X-API-Key usada nas requisicoes")
+    parser.add_argument("--backends", nargs="+", default=["postgres", "offline"])
+    args = parser.parse_args()
+
+    basicos = sample_basicos(default_engine, args.samples)
+    results = [
+        benchmark_backend(backend, basicos, args.workers, args.concurrency, args.port, args.api_key)
+        for backend in args.backends
+    ]
+    print(json.dumps(results, indent=2))
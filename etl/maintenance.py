@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import time
+
+from sqlalchemy import Connection, Engine, text
+
+from app.config import settings
+from app.core.logging import get_logger
+from app.database import engine as default_engine
+from etl.utils.postgres_copy import quote_ident
+
+logger = get_logger(__name__)
+
+# Rows arrive in file order, so the rows of one company are scattered across
+# heap pages. CLUSTER rewrites each table in lookup-index order. Not
+# estabelecimentos: its new rows go in inicio order for the BRIN indexes
+# (see the estabelecimentos processor), which a cnpj_basico order would undo.
+CLUSTER_INDEXES = {
+    "empresas": "idx_empresas_lookup",
+    "simples": "idx_simples_lookup",
+    "socios": "idx_socios_lookup",
+}
+
+
+def cluster_tables(engine: Engine = default_engine) -> dict[str, float]:
+    """CLUSTER + ANALYZE each lookup table; holds an ACCESS EXCLUSIVE lock per table."""
+    durations: dict[str, float] = {}
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for table, index in CLUSTER_INDEXES.items():
+            started = time.perf_counter()
+            connection.execute(text(f"CLUSTER {quote_ident(table)} USING {quote_ident(index)}"))
+            connection.execute(text(f"ANALYZE {quote_ident(table)}"))
+            durations[table] = round(time.perf_counter() - started, 3)
+            logger.info("etl.cluster", tabela=table, indice=index, segundos=durations[table])
+
+    return durations
+
+
+# The working set of every GET /cnpj, loaded into shared_buffers after the
+# import so the first requests do not go to disk: the document heap and the
+# lookup indexes. A partitioned index is prewarmed through its partitions'
+# indexes, whatever their names (ALTER COLUMN TYPE rebuilds them under
+# generated names); a table also through its TOAST table and index, where
+# documents too large to stay inline live.
+PREWARM_RELATIONS = [
+    "cnpj_documento",
+    "cnpj_documento_pkey",
+    "idx_empresas_lookup",
+    "idx_simples_lookup",
+    "idx_estabelecimentos_lookup",
+    "idx_socios_lookup",
+]
+
+PREWARM_LEAVES_SQL = """
+    SELECT relid::regclass::text AS relation
+    FROM pg_partition_tree(to_regclass(:name))
+    WHERE isleaf
+    UNION
+    SELECT oid::regclass::text
+    FROM pg_class
+    WHERE oid = to_regclass(:name)
+      AND relkind <> 'I'
+    UNION
+    SELECT t.oid::regclass::text
+    FROM pg_class c
+    JOIN pg_class t ON t.oid = c.reltoastrelid
+    WHERE c.oid = to_regclass(:name)
+    UNION
+    SELECT i.indexrelid::regclass::text
+    FROM pg_class c
+    JOIN pg_index i ON i.indrelid = c.reltoastrelid
+    WHERE c.oid = to_regclass(:name)
+    ORDER BY relation
+"""
+
+
+def _timed(durations: dict[str, float], step: str, connection: Connection, sql: str) -> None:
+    started = time.perf_counter()
+    connection.execute(text(sql))
+    durations[step] = round(time.perf_counter() - started, 3)
+    logger.info("etl.manutencao", etapa=step, segundos=durations[step])
+
+
+def run_post_load_maintenance(engine: Engine, changed_tables: list[str]) -> dict[str, float]:
+    """VACUUM (ANALYZE) the tables an import changed and prewarm the GET /cnpj working set.
+
+    Returns the duration of each step in seconds, keyed by step name.
+    """
+    durations: dict[str, float] = {}
+    workers = max(settings.ETL_VACUUM_PARALLEL_WORKERS, 0)
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        # VACUUM sets the visibility map bits index-only scans depend on;
+        # PARALLEL vacuums the indexes of each table with several workers.
+        for table in changed_tables:
+            _timed(
+                durations,
+                f"vacuum_{table}",
+                connection,
+                f"VACUUM (ANALYZE, PARALLEL {workers}) {quote_ident(table)}",
+            )
+
+        for relation in PREWARM_RELATIONS:
+            leaves = connection.execute(text(PREWARM_LEAVES_SQL), {"name": relation}).scalars().all()
+            for leaf in leaves:
+                _timed(durations, f"prewarm_{leaf}", connection, f"SELECT pg_prewarm('{leaf}')")
+
+    return durations
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from sqlalchemy import Connection, text
+
+MUDANCAS_TABLE = "mudancas"
+
+# Fields that differ between the previous and the current document, as
+# "empresa.<campo>", "estabelecimentos.<campo>" (establishments matched by
+# cnpj_completo) or "socios".
+_CAMPOS_SQL = """
+    ARRAY(
+        SELECT 'empresa.' || k
+        FROM jsonb_object_keys(
+            COALESCE(NULLIF(l.anterior->'empresa', 'null'::jsonb), '{}'::jsonb)
+            || COALESCE(NULLIF(d.documento->'empresa', 'null'::jsonb), '{}'::jsonb)
+        ) k
+        WHERE l.anterior->'empresa'->k IS DISTINCT FROM d.documento->'empresa'->k
+        UNION
+        SELECT 'estabelecimentos.' || k
+        FROM jsonb_array_elements(l.anterior->'estabelecimentos') o(v)
+        FULL JOIN jsonb_array_elements(d.documento->'estabelecimentos') n(v)
+            ON o.v->>'cnpj_completo' = n.v->>'cnpj_completo'
+        CROSS JOIN LATERAL jsonb_object_keys(COALESCE(o.v, '{}'::jsonb) || COALESCE(n.v, '{}'::jsonb)) k
+        WHERE o.v->k IS DISTINCT FROM n.v->k
+        UNION
+        SELECT 'socios'
+        WHERE l.anterior->'socios' IS DISTINCT FROM d.documento->'socios'
+        ORDER BY 1
+    )
+"""
+
+
+def _record_sql(lote_table: str) -> str:
+    return f"""
+        INSERT INTO {MUDANCAS_TABLE} (importacao_id, cnpj_basico, tipo, campos)
+        SELECT
+            c.importacao_id,
+            c.cnpj_basico,
+            CASE
+                WHEN c.anterior IS NULL THEN 'inclusao'
+                WHEN c.atual IS NULL THEN 'exclusao'
+                WHEN 'estabelecimentos.situacao' = ANY(c.campos) THEN 'situacao'
+                ELSE 'alteracao'
+            END,
+            CASE WHEN c.anterior IS NULL OR c.atual IS NULL THEN '{{}}'::text[] ELSE c.campos END
+        FROM (
+            SELECT
+                COALESCE(CAST(:importacao_id AS INTEGER), l.importacao_id) AS importacao_id,
+                l.cnpj_basico,
+                l.anterior,
+                d.documento AS atual,
+                {_CAMPOS_SQL} AS campos
+            FROM {lote_table} l
+            LEFT JOIN cnpj_documento d ON d.cnpj_basico = l.cnpj_basico
+            WHERE l.anterior IS DISTINCT FROM d.documento
+        ) c
+        WHERE c.importacao_id IS NOT NULL
+    """
+
+
+def record_mudancas(connection: Connection, lote_table: str, importacao_id: int | None) -> int:
+    """Logs the companies whose document changed in a refresh batch; returns the count.
+
+    Runs inside the refresh transaction, after the documents were rebuilt. The
+    refresh of an import logs every change under that import, so ids grow with
+    the order changes are published in; without one, each company is logged
+    under the import that queued it and hand-queued companies are not logged.
+    """
+    result = connection.execute(text(_record_sql(lote_table)), {"importacao_id": importacao_id})
+    return result.rowcount or 0
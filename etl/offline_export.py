@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import struct
+import tempfile
+import time
+import zlib
+from pathlib import Path
+
+from sqlalchemy import Engine, text
+
+from app.config import settings
+from app.core.logging import get_logger
+from app.core.offline_lookup import BLOCK_LENGTH, HEADER, MAGIC
+from app.database import engine as default_engine
+
+logger = get_logger(__name__)
+
+EXPORT_SQL = """
+    SELECT cnpj_basico, documento::text
+    FROM cnpj_documento
+    ORDER BY cnpj_basico
+"""
+
+FETCH_SIZE = 10000
+COMPRESSION_LEVEL = 6
+
+_KEY = struct.Struct("<I")
+_OFFSET = struct.Struct("<Q")
+
+
+def _align(position: int, boundary: int = 8) -> int:
+    return (position + boundary - 1) // boundary * boundary
+
+
+def export_offline_artifact(path: str | Path, engine: Engine = default_engine) -> int:
+    """Writes the mmap lookup artifact (see app.core.offline_lookup) from cnpj_documento.
+
+    Streams the documents in key order into three temporary sections and
+    concatenates them, so memory use does not grow with the number of companies.
+    Returns the number of companies written.
+    """
+    started = time.perf_counter()
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    count = 0
+    with tempfile.TemporaryDirectory(dir=target.parent) as work_dir:
+        keys_path = Path(work_dir) / "keys"
+        index_path = Path(work_dir) / "index"
+        payload_path = Path(work_dir) / "payload"
+
+        with (
+            open(keys_path, "wb") as keys,
+            open(index_path, "wb") as index,
+            open(payload_path, "wb") as payload,
+            engine.connect() as connection,
+        ):
+            result = connection.execution_options(stream_results=True, yield_per=FETCH_SIZE).execute(
+                text(EXPORT_SQL)
+            )
+            offset = 0
+            for cnpj_basico, documento in result:
+                block = zlib.compress(documento.encode("utf-8"), COMPRESSION_LEVEL)
+                keys.write(_KEY.pack(int(cnpj_basico)))
+                index.write(_OFFSET.pack(offset))
+                payload.write(BLOCK_LENGTH.pack(len(block)))
+                payload.write(block)
+                offset += BLOCK_LENGTH.size + len(block)
+                count += 1
+            index.write(_OFFSET.pack(offset))
+
+        keys_offset = HEADER.size
+        index_offset = _align(keys_offset + 4 * count)
+        payload_offset = index_offset + 8 * (count + 1)
+
+        # Written next to the target and renamed, so running API workers keep
+        # their mapping of the previous file until they restart.
+        partial_path = Path(work_dir) / "artifact"
+        with open(partial_path, "wb") as artifact:
+            artifact.write(HEADER.pack(MAGIC, count, keys_offset, index_offset, payload_offset))
+            for section_offset, section_path in (
+                (keys_offset, keys_path),
+                (index_offset, index_path),
+                (payload_offset, payload_path),
+            ):
+                artifact.write(b"\0" * (section_offset - artifact.tell()))
+                with open(section_path, "rb") as section:
+                    shutil.copyfileobj(section, artifact, length=16 * 1024 * 1024)
+            artifact.flush()
+            os.fsync(artifact.fileno())
+        os.replace(partial_path, target)
+
+    logger.info(
+        "etl.artefato_offline",
+        arquivo=str(target),
+        empresas=count,
+        bytes=target.stat().st_size,
+        segundos=round(time.perf_counter() - started, 3),
+    )
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta o artefato de consulta offline (mmap)")
+    parser.add_argument("--output", default=settings.OFFLINE_ARTIFACT_PATH, help="arquivo de destino")
+    args = parser.parse_args()
+    print(export_offline_artifact(args.output))
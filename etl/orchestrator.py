@@ -1,15 +1,20 @@
 from __future__ import annotations
 
 import argparse
+import json
 import shutil
 import zipfile
+from contextlib import ExitStack
 from pathlib import Path
+from typing import Any
 
 from sqlalchemy import text
 
 from app.config import settings
 from app.core.logging import get_logger
 from app.database import SessionLocal, engine
+from etl.documentos import refresh_documentos, stamp_queue
+from etl.maintenance import cluster_tables, run_post_load_maintenance
 from etl.processors.cnaes_processor import process_cnaes_csv
 from etl.processors.empresas_processor import process_empresas_csv
 from etl.processors.estabelecimentos_processor import process_estabelecimentos_csv
@@ -18,9 +23,13 @@ from etl.processors.municipios_processor import process_municipios_csv
 from etl.processors.naturezas_processor import process_naturezas_csv
 from etl.processors.paises_processor import process_paises_csv
 from etl.processors.qualificacoes_processor import process_qualificacoes_csv
+from etl.processors.simples_processor import DATE_COLUMNS as SIMPLES_DATE_COLUMNS
 from etl.processors.simples_processor import process_simples_csv
 from etl.processors.socios_processor import process_socios_csv
+from etl.snapshot import publish_snapshot
 from etl.utils.file_hash import calculate_file_hash
+from etl.utils.page_cache import drop_file_pages, open_streaming
+from etl.utils.parquet_sink import ParquetSink
 
 logger = get_logger(__name__)
 
@@ -110,6 +119,78 @@ def _update_importacao(
         db.commit()
 
 
+def _record_manutencao(importacao_id: int, manutencao: dict[str, float]) -> None:
+    query = text(
+        """
+        UPDATE importacoes
+        SET manutencao = CAST(:manutencao AS JSONB)
+        WHERE id = :id
+        """
+    )
+    with SessionLocal() as db:
+        db.execute(query, {"id": importacao_id, "manutencao": json.dumps(manutencao)})
+        db.commit()
+
+
+def _post_load_maintenance(importacao_id: int, extracted: dict[str, list[Path]], documentos: int) -> None:
+    # File types are named after the tables they load.
+    changed_tables = [file_type for file_type, paths in extracted.items() if paths]
+    if extracted["estabelecimentos"]:
+        changed_tables += [
+            "estabelecimentos_detalhes",
+            "estabelecimentos_cnaes_secundarios",
+            "contatos",
+            "situacoes_historico",
+        ]
+    if extracted["socios"]:
+        changed_tables.append("pessoas")
+    if documentos > 0:
+        changed_tables += [
+            "cnpj_documento",
+            "cnpj_documento_pendente",
+            "estatisticas_municipio",
+            "estatisticas_uf",
+            "mudancas",
+            "rede_arestas",
+        ]
+
+    try:
+        manutencao = run_post_load_maintenance(engine, changed_tables)
+        _record_manutencao(importacao_id, manutencao)
+    except Exception:
+        # The data is already committed; a failed VACUUM/prewarm must not
+        # mark the import as FAILED.
+        logger.exception("etl.manutencao_falhou", importacao_id=importacao_id)
+
+
+def _open_parquet_sinks(
+    stack: ExitStack,
+    extracted: dict[str, list[Path]],
+    release: str,
+    source: str,
+) -> dict[str, ParquetSink]:
+    if not settings.ETL_PARQUET_PATH:
+        return {}
+
+    options: dict[str, dict[str, Any]] = {
+        "empresas": {"decimal_columns": ["capital_social"]},
+        "estabelecimentos": {
+            "partition_column": "uf",
+            "date_columns": ["inicio", "data_situacao"],
+            "list_columns": ["cnae_secundario"],
+        },
+        "socios": {"date_columns": ["data_entrada"]},
+        "simples": {"date_columns": SIMPLES_DATE_COLUMNS},
+    }
+    return {
+        table: stack.enter_context(
+            ParquetSink(settings.ETL_PARQUET_PATH, table, release, source, **table_options)
+        )
+        for table, table_options in options.items()
+        if extracted[table]
+    }
+
+
 def _classify_name(file_name: str) -> str | None:
     upper = Path(file_name).name.upper()
 
@@ -179,7 +260,7 @@ def _extract_classified_files(zip_path: Path) -> dict[str, list[Path]]:
                             inner_name = Path(inner.filename).name
                             target_path = destination_dir / outer_stem / inner_name
                             target_path.parent.mkdir(parents=True, exist_ok=True)
-                            with nested.open(inner, "r") as src, open(target_path, "wb") as dst:
+                            with nested.open(inner, "r") as src, open_streaming(target_path, "wb") as dst:
                                 shutil.copyfileobj(src, dst)
                             extracted[file_type].append(target_path)
                 finally:
@@ -191,8 +272,12 @@ def _extract_classified_files(zip_path: Path) -> dict[str, list[Path]]:
                 continue
 
             extracted_path = Path(archive.extract(member, path=destination_dir))
+            drop_file_pages(extracted_path)
             extracted[file_type].append(extracted_path)
 
+    # The nested ZIPs are gone (their pages with them); the outer one is not
+    # read again.
+    drop_file_pages(zip_path)
     return extracted
 
 
@@ -203,7 +288,7 @@ def _move_to_processed(zip_path: Path) -> None:
     shutil.move(str(zip_path), str(destination))
 
 
-def process_zip_file(zip_path: Path, force: bool = False) -> int:
+def process_zip_file(zip_path: Path, force: bool = False, release: str | None = None) -> int:
     file_hash = calculate_file_hash(zip_path, algorithm=settings.ETL_HASH_ALGORITHM)
 
     if not force and _already_processed(file_hash):
@@ -226,32 +311,42 @@ def process_zip_file(zip_path: Path, force: bool = False) -> int:
 
         total_processed = 0
 
-        for file_path in extracted["empresas"]:
-            total_processed += process_empresas_csv(file_path)
-        for file_path in extracted["estabelecimentos"]:
-            total_processed += process_estabelecimentos_csv(file_path)
-        for file_path in extracted["socios"]:
-            total_processed += process_socios_csv(file_path)
-
-        for file_path in extracted["cnaes"]:
-            total_processed += process_cnaes_csv(file_path)
-        for file_path in extracted["motivos"]:
-            total_processed += process_motivos_csv(file_path)
-        for file_path in extracted["municipios"]:
-            total_processed += process_municipios_csv(file_path)
-        for file_path in extracted["naturezas"]:
-            total_processed += process_naturezas_csv(file_path)
-        for file_path in extracted["paises"]:
-            total_processed += process_paises_csv(file_path)
-        for file_path in extracted["qualificacoes"]:
-            total_processed += process_qualificacoes_csv(file_path)
-        for file_path in extracted["simples"]:
-            total_processed += process_simples_csv(file_path)
+        with ExitStack() as stack:
+            sinks = _open_parquet_sinks(stack, extracted, release or zip_path.stem, zip_path.stem)
+
+            for file_path in extracted["empresas"]:
+                total_processed += process_empresas_csv(file_path, sink=sinks.get("empresas"))
+            for file_path in extracted["estabelecimentos"]:
+                total_processed += process_estabelecimentos_csv(
+                    file_path, sink=sinks.get("estabelecimentos")
+                )
+            for file_path in extracted["socios"]:
+                total_processed += process_socios_csv(file_path, sink=sinks.get("socios"))
+
+            for file_path in extracted["cnaes"]:
+                total_processed += process_cnaes_csv(file_path)
+            for file_path in extracted["motivos"]:
+                total_processed += process_motivos_csv(file_path)
+            for file_path in extracted["municipios"]:
+                total_processed += process_municipios_csv(file_path)
+            for file_path in extracted["naturezas"]:
+                total_processed += process_naturezas_csv(file_path)
+            for file_path in extracted["paises"]:
+                total_processed += process_paises_csv(file_path)
+            for file_path in extracted["qualificacoes"]:
+                total_processed += process_qualificacoes_csv(file_path)
+            for file_path in extracted["simples"]:
+                total_processed += process_simples_csv(file_path, sink=sinks.get("simples"))
 
         if total_processed <= 0:
             _update_importacao(importacao_id, "FAILED", 0, 0)
             raise RuntimeError("Nenhum registro processado")
 
+        stamp_queue(engine, importacao_id)
+        documentos = refresh_documentos(engine, importacao_id=importacao_id)
+        if settings.ETL_POST_LOAD_MAINTENANCE:
+            _post_load_maintenance(importacao_id, extracted, documentos)
+
         missing_aux = sorted(aux for aux in REQUIRED_AUXILIARY_TYPES if not extracted[aux])
         if missing_aux:
             logger.warning(
@@ -268,6 +363,9 @@ def process_zip_file(zip_path: Path, force: bool = False) -> int:
         return total_processed
     except Exception:
         try:
+            # Whatever this import queued stays queued for the next refresh,
+            # which logs it; a manual refresh logs it under this import.
+            stamp_queue(engine, importacao_id)
             _update_importacao(importacao_id, "FAILED", 0, 0)
         except Exception:
             logger.exception(
@@ -277,7 +375,12 @@ def process_zip_file(zip_path: Path, force: bool = False) -> int:
         raise
 
 
-def run(force: bool = False) -> int:
+def run(
+    force: bool = False,
+    cluster: bool = False,
+    release: str | None = None,
+    snapshot: bool = False,
+) -> int:
     _ensure_directories()
 
     total = 0
@@ -285,18 +388,37 @@ def run(force: bool = False) -> int:
 
     for zip_path in sorted(raw_dir.glob("*.zip")):
         try:
-            total += process_zip_file(zip_path, force=force)
+            total += process_zip_file(zip_path, force=force, release=release)
         except Exception:
             logger.exception(
                 "Erro ao processar arquivo, continuando com os demais",
                 arquivo=str(zip_path),
             )
 
+    if cluster and total > 0:
+        cluster_tables(engine)
+    if snapshot and total > 0:
+        publish_snapshot(engine)
+
     return total
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="ETL orchestrator")
     parser.add_argument("--force", action="store_true", help="ignora bloqueio por hash")
+    parser.add_argument(
+        "--cluster",
+        action="store_true",
+        help="ao final, reordena empresas, simples e socios por cnpj_basico (CLUSTER, bloqueia as tabelas)",
+    )
+    parser.add_argument(
+        "--release",
+        help="nome da release na copia Parquet (ETL_PARQUET_PATH); padrao: nome do ZIP",
+    )
+    parser.add_argument(
+        "--snapshot",
+        action="store_true",
+        help="ao final, publica um snapshot do banco (python -m etl.snapshot publish)",
+    )
     args = parser.parse_args()
-    print(run(force=args.force))
+    print(run(force=args.force, cluster=args.cluster, release=args.release, snapshot=args.snapshot))
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from functools import partial
 from pathlib import Path
 
 import pandas as pd
@@ -7,6 +8,16 @@ from sqlalchemy import Engine, text
 
 from app.config import settings
 from app.database import engine as default_engine
+from etl.documentos import QUEUE_TABLE as DOCUMENTO_QUEUE_TABLE
+from etl.utils.normalize import (
+    category_dtypes,
+    normalize_code_columns,
+    normalize_decimal_columns,
+    strip_categories,
+)
+from etl.utils.page_cache import open_streaming
+from etl.utils.parallel_merge import SlicedMerge, ensure_slice_tables, merge_slices, slice_table
+from etl.utils.parquet_sink import ParquetSink
 from etl.utils.postgres_copy import copy_dataframe_to_staging, quote_ident, upsert_from_staging
 
 CSV_COLUMNS = [
@@ -27,20 +38,39 @@ INSERT_COLUMNS = [
     "porte_empresa",
 ]
 
+CODE_COLUMNS = ["natureza_juridica", "porte_empresa"]
+
+# Fewer than ~6000 distinct values: read and normalized as categoricals, one
+# string per distinct value instead of one per row.
+CATEGORY_COLUMNS = ["natureza_juridica", "porte_empresa"]
+
+DECIMAL_COLUMNS = ["capital_social"]
+
 STAGING_TABLE = "stg_empresas"
 TARGET_TABLE = "empresas"
 
 
 def _normalize_strings(chunk: pd.DataFrame) -> pd.DataFrame:
+    text_columns = []
     for col in chunk.columns:
-        chunk[col] = chunk[col].astype("string").str.strip()
-    chunk = chunk.replace({"": None, pd.NA: None})
+        if isinstance(chunk[col].dtype, pd.CategoricalDtype):
+            chunk[col] = strip_categories(chunk[col])
+        else:
+            chunk[col] = chunk[col].astype("string").str.strip()
+            text_columns.append(col)
+    chunk[text_columns] = chunk[text_columns].replace({"": None, pd.NA: None})
     return chunk
 
 
+def _normalize_codes(chunk: pd.DataFrame) -> pd.DataFrame:
+    chunk = normalize_code_columns(chunk, CODE_COLUMNS)
+    return normalize_decimal_columns(chunk, DECIMAL_COLUMNS)
+
+
 def _prepare_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
     chunk = chunk.copy()
     chunk = _normalize_strings(chunk)
+    chunk = _normalize_codes(chunk)
     prepared = chunk[INSERT_COLUMNS].copy()
     prepared = prepared[prepared["cnpj_basico"].notna()]
     return prepared
@@ -49,62 +79,76 @@ def _prepare_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
 def _ensure_staging_table(engine: Engine) -> None:
     sql = f"""
         CREATE TABLE IF NOT EXISTS {quote_ident(STAGING_TABLE)} (
-            cnpj_basico VARCHAR(8),
+            cnpj_basico CHAR(8),
             razao_social TEXT,
-            natureza_juridica TEXT,
-            capital_social TEXT,
-            porte_empresa TEXT
+            natureza_juridica SMALLINT,
+            capital_social NUMERIC(20, 2),
+            porte_empresa SMALLINT
         )
     """
     with engine.begin() as connection:
         connection.execute(text(sql))
 
 
+def _merge(engine: Engine, index: int, prepared: pd.DataFrame) -> None:
+    staging_table = slice_table(STAGING_TABLE, index)
+    copy_dataframe_to_staging(engine, prepared, staging_table)
+    upsert_from_staging(
+        engine,
+        staging_table=staging_table,
+        target_table=TARGET_TABLE,
+        insert_columns=INSERT_COLUMNS,
+        conflict_columns=["cnpj_basico"],
+        changed_keys_table=DOCUMENTO_QUEUE_TABLE,
+    )
+
+
 def process_empresas_csv(
     file_path: str | Path,
     engine: Engine = default_engine,
     chunk_size: int = settings.BATCH_SIZE,
+    sink: ParquetSink | None = None,
 ) -> int:
+    slices = merge_slices("empresas")
     _ensure_staging_table(engine)
+    ensure_slice_tables(engine, [STAGING_TABLE], slices)
 
     processed = 0
-    try:
-        chunks = pd.read_csv(
-            file_path,
-            sep=";",
-            dtype=str,
-            encoding="latin1",
-            chunksize=chunk_size,
-            usecols=CSV_COLUMNS,
-            keep_default_na=False,
-        )
-    except ValueError:
-        # Receita files may come without header; map fields by fixed SPEC order.
-        chunks = pd.read_csv(
-            file_path,
-            sep=";",
-            dtype=str,
-            encoding="latin1",
-            chunksize=chunk_size,
-            header=None,
-            names=CSV_COLUMNS,
-            usecols=list(range(len(CSV_COLUMNS))),
-            keep_default_na=False,
-        )
-
-    for chunk in chunks:
-        prepared = _prepare_chunk(chunk)
-        if prepared.empty:
-            continue
-
-        copy_dataframe_to_staging(engine, prepared, STAGING_TABLE)
-        upsert_from_staging(
-            engine,
-            staging_table=STAGING_TABLE,
-            target_table=TARGET_TABLE,
-            insert_columns=INSERT_COLUMNS,
-            conflict_columns=["cnpj_basico"],
-        )
-        processed += len(prepared)
+    with open_streaming(file_path) as handle:
+        try:
+            chunks = pd.read_csv(
+                handle,
+                sep=";",
+                dtype=category_dtypes(CSV_COLUMNS, CATEGORY_COLUMNS),
+                encoding="latin1",
+                chunksize=chunk_size,
+                usecols=CSV_COLUMNS,
+                keep_default_na=False,
+            )
+        except ValueError:
+            # Receita files may come without header; map fields by fixed SPEC order.
+            handle.seek(0)
+            chunks = pd.read_csv(
+                handle,
+                sep=";",
+                dtype=category_dtypes(CSV_COLUMNS, CATEGORY_COLUMNS),
+                encoding="latin1",
+                chunksize=chunk_size,
+                header=None,
+                names=CSV_COLUMNS,
+                usecols=list(range(len(CSV_COLUMNS))),
+                keep_default_na=False,
+            )
+
+        with SlicedMerge(slices) as merger:
+            for chunk in chunks:
+                prepared = _prepare_chunk(chunk)
+                if prepared.empty:
+                    continue
+
+                if sink is not None:
+                    sink.write(prepared)
+                merger.run(partial(_merge, engine), prepared)
+                processed += len(prepared)
 
     return processed
@@ -1,15 +1,32 @@
 from __future__ import annotations
 
+from collections.abc import Iterator
+from functools import partial
 from pathlib import Path
 
 import pandas as pd
-from sqlalchemy import Engine, text
+from sqlalchemy import Connection, Engine, text
 
 from app.config import settings
+from app.core.logging import get_logger
 from app.database import engine as default_engine
-from etl.utils.normalize import normalize_date_columns
+from etl.documentos import QUEUE_TABLE as DOCUMENTO_QUEUE_TABLE
+from etl.historico import append_situacoes
+from etl.utils.normalize import (
+    category_dtypes,
+    normalize_code_columns,
+    normalize_code_list_columns,
+    normalize_date_columns,
+    strip_categories,
+)
+from etl.utils.page_cache import drop_cache_enabled, open_streaming
+from etl.utils.parallel_csv import read_csv_parallel
+from etl.utils.parallel_merge import SlicedMerge, ensure_slice_tables, merge_slices, slice_table
+from etl.utils.parquet_sink import ParquetSink
 from etl.utils.postgres_copy import copy_dataframe_to_staging, quote_ident, upsert_from_staging
 
+logger = get_logger(__name__)
+
 CSV_COLUMNS = [
     "cnpj_basico",
     "cnpj_ordem",
@@ -43,6 +60,14 @@ CSV_COLUMNS = [
 
 DATE_COLUMNS = ["data_situacao", "inicio", "data_situacao_especial"]
 
+CODE_COLUMNS = ["situacao", "motivo", "pais", "cnae_principal", "municipio", "cep", "matriz_filial"]
+
+# Fewer than ~6000 distinct values: read and normalized as categoricals, one
+# string per distinct value instead of one per row.
+CATEGORY_COLUMNS = ["matriz_filial", "situacao", "motivo", "pais", "cnae_principal", "uf", "municipio"]
+
+CODE_LIST_COLUMNS = ["cnae_secundario"]
+
 INSERT_COLUMNS = [
     "cnpj_completo",
     "cnpj_basico",
@@ -54,16 +79,116 @@ INSERT_COLUMNS = [
     "cnae_secundario",
     "pais",
     "motivo",
+    "inicio",
+    "data_situacao",
+]
+
+# Everything the lookups do not read goes to the cold 1:1 detail table, so the
+# estabelecimentos rows (and their buffer cache footprint) stay narrow.
+DETALHE_COLUMNS = [
+    "cnpj_completo",
+    "cnpj_basico",
+    "cep",
+    "tipo_logradouro",
+    "logradouro",
+    "numero",
+    "complemento",
+    "bairro",
+    "matriz_filial",
+    "cidade_exterior",
+    "ddd1",
+    "telefone1",
+    "ddd2",
+    "telefone2",
+    "email",
+    "situacao_especial",
+    "data_situacao_especial",
 ]
 
 STAGING_TABLE = "stg_estabelecimentos"
 TARGET_TABLE = "estabelecimentos"
+DETALHE_STAGING_TABLE = "stg_estabelecimentos_detalhes"
+DETALHE_TARGET_TABLE = "estabelecimentos_detalhes"
+CONTATOS_TABLE = "contatos"
+CNAES_SECUNDARIOS_TABLE = "estabelecimentos_cnaes_secundarios"
+
+
+def _contatos_chunk_sql(staging_table: str) -> str:
+    # Contacts of the chunk, read back from the detail staging table through
+    # the normalizar_* functions of migration 0020, which the API also uses.
+    return f"""
+        SELECT DISTINCT cnpj_completo, telefone, email
+        FROM (
+            SELECT d.cnpj_completo, t.telefone, NULL::text AS email
+            FROM {staging_table} d
+            CROSS JOIN LATERAL (
+                VALUES
+                    (normalizar_telefone(COALESCE(d.ddd1, '') || COALESCE(d.telefone1, ''))),
+                    (normalizar_telefone(COALESCE(d.ddd2, '') || COALESCE(d.telefone2, '')))
+            ) t(telefone)
+            WHERE t.telefone IS NOT NULL
+            UNION ALL
+            SELECT d.cnpj_completo, NULL, normalizar_email(d.email)
+            FROM {staging_table} d
+            WHERE normalizar_email(d.email) IS NOT NULL
+        ) c
+    """
+
+
+def _sync_contatos_sql(staging_table: str) -> list[str]:
+    # Contacts are a set per establishment: only the ones that disappeared are
+    # deleted and only new ones inserted, so a resent unchanged row writes nothing.
+    return [
+        f"""
+        WITH novos AS ({_contatos_chunk_sql(staging_table)})
+        DELETE FROM {CONTATOS_TABLE} c
+        USING {staging_table} d
+        WHERE c.cnpj_completo = d.cnpj_completo
+          AND NOT EXISTS (
+              SELECT 1
+              FROM novos n
+              WHERE n.cnpj_completo = c.cnpj_completo
+                AND n.telefone IS NOT DISTINCT FROM c.telefone
+                AND n.email IS NOT DISTINCT FROM c.email
+          )
+        """,
+        f"""
+        INSERT INTO {CONTATOS_TABLE} (cnpj_completo, telefone, email)
+        {_contatos_chunk_sql(staging_table)}
+        ON CONFLICT (cnpj_completo, telefone, email) DO NOTHING
+        """,
+    ]
+
+
+def _sync_cnaes_secundarios_sql(staging_table: str) -> list[str]:
+    # The side table behind the ordered secondary-CNAE listing (migration
+    # 0014), kept equal to the chunk's arrays without rewriting unchanged rows.
+    return [
+        f"""
+        DELETE FROM {CNAES_SECUNDARIOS_TABLE} c
+        USING {staging_table} s
+        WHERE c.cnpj_completo = s.cnpj_completo
+          AND c.cnae <> ALL (COALESCE(s.cnae_secundario, '{{}}'))
+        """,
+        f"""
+        INSERT INTO {CNAES_SECUNDARIOS_TABLE} (cnpj_completo, cnae)
+        SELECT DISTINCT s.cnpj_completo, u.cnae
+        FROM {staging_table} s
+        CROSS JOIN LATERAL unnest(s.cnae_secundario) AS u(cnae)
+        ON CONFLICT DO NOTHING
+        """,
+    ]
 
 
 def _normalize_strings(chunk: pd.DataFrame) -> pd.DataFrame:
+    text_columns = []
     for col in chunk.columns:
-        chunk[col] = chunk[col].astype("string").str.strip()
-    chunk = chunk.replace({"": None, pd.NA: None})
+        if isinstance(chunk[col].dtype, pd.CategoricalDtype):
+            chunk[col] = strip_categories(chunk[col])
+        else:
+            chunk[col] = chunk[col].astype("string").str.strip()
+            text_columns.append(col)
+    chunk[text_columns] = chunk[text_columns].replace({"": None, pd.NA: None})
     return chunk
 
 
@@ -71,85 +196,184 @@ def _normalize_dates(chunk: pd.DataFrame) -> pd.DataFrame:
     return normalize_date_columns(chunk, DATE_COLUMNS)
 
 
-def _prepare_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+def _normalize_codes(chunk: pd.DataFrame) -> pd.DataFrame:
+    chunk = normalize_code_columns(chunk, CODE_COLUMNS)
+    return normalize_code_list_columns(chunk, CODE_LIST_COLUMNS)
+
+
+def _prepare_chunk(chunk: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
     chunk = chunk.copy()
     chunk = _normalize_strings(chunk)
     chunk = _normalize_dates(chunk)
+    chunk = _normalize_codes(chunk)
 
     chunk["cnpj_completo"] = (
         chunk["cnpj_basico"].fillna("") + chunk["cnpj_ordem"].fillna("") + chunk["cnpj_dv"].fillna("")
     )
     chunk.loc[chunk["cnpj_completo"].str.len() != 14, "cnpj_completo"] = None
 
+    # A missing or invalid situacao stays NULL: the row lands in the DEFAULT
+    # (inactive) partition and is counted by process_estabelecimentos_csv.
+    chunk = chunk[chunk["cnpj_basico"].notna() & chunk["cnpj_completo"].notna()]
+    chunk = chunk.drop_duplicates(subset=["cnpj_completo"])
+
     prepared = chunk[INSERT_COLUMNS].copy()
-    prepared = prepared[prepared["cnpj_basico"].notna() & prepared["cnpj_completo"].notna()]
-    prepared = prepared.drop_duplicates(subset=["cnpj_completo"])
-    return prepared
+    detalhes = chunk[DETALHE_COLUMNS].copy()
+    return prepared, detalhes
 
 
 def _ensure_staging_table(engine: Engine) -> None:
     sql = f"""
         CREATE TABLE IF NOT EXISTS {quote_ident(STAGING_TABLE)} (
-            cnpj_completo VARCHAR(14),
-            cnpj_basico VARCHAR(8),
+            cnpj_completo CHAR(14),
+            cnpj_basico CHAR(8),
             nome_fantasia TEXT,
-            situacao TEXT,
+            situacao SMALLINT,
             uf VARCHAR(2),
-            municipio TEXT,
-            cnae_principal TEXT,
-            cnae_secundario TEXT,
-            pais TEXT,
-            motivo TEXT
+            municipio SMALLINT,
+            cnae_principal INTEGER,
+            cnae_secundario INTEGER[],
+            pais SMALLINT,
+            motivo SMALLINT,
+            inicio DATE,
+            data_situacao DATE
+        )
+    """
+    detalhe_sql = f"""
+        CREATE TABLE IF NOT EXISTS {quote_ident(DETALHE_STAGING_TABLE)} (
+            cnpj_completo CHAR(14),
+            cnpj_basico CHAR(8),
+            cep INTEGER,
+            tipo_logradouro TEXT,
+            logradouro TEXT,
+            numero TEXT,
+            complemento TEXT,
+            bairro TEXT,
+            matriz_filial SMALLINT,
+            cidade_exterior TEXT,
+            ddd1 TEXT,
+            telefone1 TEXT,
+            ddd2 TEXT,
+            telefone2 TEXT,
+            email TEXT,
+            situacao_especial TEXT,
+            data_situacao_especial DATE
         )
     """
     with engine.begin() as connection:
         connection.execute(text(sql))
+        connection.execute(text(detalhe_sql))
+
+
+def _sync_contatos(connection: Connection, staging_table: str) -> None:
+    for sql in _sync_contatos_sql(staging_table):
+        connection.execute(text(sql))
+
+
+def _sync_cnaes_secundarios(connection: Connection, staging_table: str) -> None:
+    for sql in _sync_cnaes_secundarios_sql(staging_table):
+        connection.execute(text(sql))
+
+
+def _sync_derivadas(connection: Connection, staging_table: str) -> None:
+    # Both compare the staging rows with the current state, so they run
+    # before the upsert empties the staging table, in its transaction.
+    append_situacoes(connection, staging_table)
+    _sync_cnaes_secundarios(connection, staging_table)
+
+
+def _merge(engine: Engine, index: int, prepared: pd.DataFrame, detalhes: pd.DataFrame) -> None:
+    staging_table = slice_table(STAGING_TABLE, index)
+    detalhe_staging_table = slice_table(DETALHE_STAGING_TABLE, index)
+
+    copy_dataframe_to_staging(engine, prepared, staging_table)
+    upsert_from_staging(
+        engine,
+        staging_table=staging_table,
+        target_table=TARGET_TABLE,
+        insert_columns=INSERT_COLUMNS,
+        conflict_columns=["cnpj_completo", "situacao"],
+        partition_columns=["situacao"],
+        changed_keys_table=DOCUMENTO_QUEUE_TABLE,
+        # Keeps each chunk's block ranges narrow for the BRIN index on inicio.
+        insert_order=["inicio", "cnpj_completo"],
+        before=partial(_sync_derivadas, staging_table=staging_table),
+    )
+    # Not part of cnpj_documento, so detail-only changes do not queue a refresh.
+    copy_dataframe_to_staging(engine, detalhes, detalhe_staging_table)
+    upsert_from_staging(
+        engine,
+        staging_table=detalhe_staging_table,
+        target_table=DETALHE_TARGET_TABLE,
+        insert_columns=DETALHE_COLUMNS,
+        conflict_columns=["cnpj_completo"],
+        before=partial(_sync_contatos, staging_table=detalhe_staging_table),
+    )
+
+
+def _read_chunks(file_path: str | Path, chunk_size: int) -> Iterator[pd.DataFrame]:
+    if settings.ETL_PARSE_WORKERS > 1:
+        yield from read_csv_parallel(
+            file_path,
+            CSV_COLUMNS,
+            settings.ETL_PARSE_WORKERS,
+            chunk_size,
+            dtype=category_dtypes(CSV_COLUMNS, CATEGORY_COLUMNS),
+            drop_cache=drop_cache_enabled(),
+        )
+        return
+
+    with open_streaming(file_path) as handle:
+        try:
+            chunks = pd.read_csv(
+                handle,
+                sep=";",
+                dtype=category_dtypes(CSV_COLUMNS, CATEGORY_COLUMNS),
+                encoding="latin1",
+                chunksize=chunk_size,
+                usecols=CSV_COLUMNS,
+                keep_default_na=False,
+            )
+        except ValueError:
+            handle.seek(0)
+            chunks = pd.read_csv(
+                handle,
+                sep=";",
+                dtype=category_dtypes(CSV_COLUMNS, CATEGORY_COLUMNS),
+                encoding="latin1",
+                chunksize=chunk_size,
+                header=None,
+                names=CSV_COLUMNS,
+                usecols=list(range(len(CSV_COLUMNS))),
+                keep_default_na=False,
+            )
+        yield from chunks
 
 
 def process_estabelecimentos_csv(
     file_path: str | Path,
     engine: Engine = default_engine,
     chunk_size: int = settings.BATCH_SIZE,
+    sink: ParquetSink | None = None,
 ) -> int:
+    slices = merge_slices("estabelecimentos")
     _ensure_staging_table(engine)
-
-    try:
-        chunks = pd.read_csv(
-            file_path,
-            sep=";",
-            dtype=str,
-            encoding="latin1",
-            chunksize=chunk_size,
-            usecols=CSV_COLUMNS,
-            keep_default_na=False,
-        )
-    except ValueError:
-        chunks = pd.read_csv(
-            file_path,
-            sep=";",
-            dtype=str,
-            encoding="latin1",
-            chunksize=chunk_size,
-            header=None,
-            names=CSV_COLUMNS,
-            usecols=list(range(len(CSV_COLUMNS))),
-            keep_default_na=False,
-        )
+    ensure_slice_tables(engine, [STAGING_TABLE, DETALHE_STAGING_TABLE], slices)
 
     processed = 0
-    for chunk in chunks:
-        prepared = _prepare_chunk(chunk)
-        if prepared.empty:
-            continue
-
-        copy_dataframe_to_staging(engine, prepared, STAGING_TABLE)
-        upsert_from_staging(
-            engine,
-            staging_table=STAGING_TABLE,
-            target_table=TARGET_TABLE,
-            insert_columns=INSERT_COLUMNS,
-            conflict_columns=["cnpj_completo"],
-        )
-        processed += len(prepared)
+    sem_situacao = 0
+    with SlicedMerge(slices) as merger:
+        for chunk in _read_chunks(file_path, chunk_size):
+            prepared, detalhes = _prepare_chunk(chunk)
+            if prepared.empty:
+                continue
+
+            if sink is not None:
+                sink.write(prepared)
+            merger.run(partial(_merge, engine), prepared, detalhes)
+            processed += len(prepared)
+            sem_situacao += int(prepared["situacao"].isna().sum())
 
+    if sem_situacao:
+        logger.warning("estabelecimentos.sem_situacao", arquivo=Path(file_path).name, linhas=sem_situacao)
     return processed
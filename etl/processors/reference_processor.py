@@ -10,10 +10,22 @@ from sqlalchemy import Engine, text
 
 from app.config import settings
 from app.database import engine as default_engine
+from etl.documentos import QUEUE_TABLE as DOCUMENTO_QUEUE_TABLE
+from etl.utils.normalize import normalize_code_columns
 from etl.utils.postgres_copy import copy_dataframe_to_staging, quote_ident, upsert_from_staging
 
 CSV_COLUMNS = ["codigo", "descricao"]
 
+# Columns whose descricao is denormalized into cnpj_documento, per reference table.
+DOCUMENTO_REFERENCES = {
+    "cnaes": [("estabelecimentos", "cnae_principal")],
+    "motivos": [("estabelecimentos", "motivo")],
+    "municipios": [("estabelecimentos", "municipio")],
+    "naturezas": [("empresas", "natureza_juridica")],
+    "paises": [("estabelecimentos", "pais"), ("socios", "pais")],
+    "qualificacoes": [("socios", "qualificacao")],
+}
+
 
 def _normalize_strings(chunk: pd.DataFrame) -> pd.DataFrame:
     for col in chunk.columns:
@@ -25,6 +37,7 @@ def _normalize_strings(chunk: pd.DataFrame) -> pd.DataFrame:
 def _prepare_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
     chunk = chunk.copy()
     chunk = _normalize_strings(chunk)
+    chunk = normalize_code_columns(chunk, ["codigo"])
     prepared = chunk[CSV_COLUMNS].copy()
     prepared = prepared[prepared["codigo"].notna() & prepared["descricao"].notna()]
     prepared = prepared.drop_duplicates(subset=["codigo"])
@@ -34,7 +47,7 @@ def _prepare_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
 def _ensure_staging_table(engine: Engine, staging_table: str) -> None:
     sql = f"""
         CREATE TABLE IF NOT EXISTS {quote_ident(staging_table)} (
-            codigo TEXT,
+            codigo INTEGER,
             descricao TEXT
         )
     """
@@ -42,6 +55,34 @@ def _ensure_staging_table(engine: Engine, staging_table: str) -> None:
         connection.execute(text(sql))
 
 
+def _enqueue_documentos(engine: Engine, staging_table: str, target_table: str) -> None:
+    """Queues the companies whose documents show a descricao the staged chunk changes."""
+    references = DOCUMENTO_REFERENCES.get(target_table)
+    if not references:
+        return
+
+    changed_sql = f"""
+        SELECT s.codigo
+        FROM {quote_ident(staging_table)} s
+        LEFT JOIN {quote_ident(target_table)} r ON r.codigo = s.codigo
+        WHERE r.descricao IS DISTINCT FROM s.descricao
+    """
+    companies_sql = " UNION ".join(
+        f"SELECT cnpj_basico FROM {quote_ident(table)} WHERE {quote_ident(column)} = ANY(:codigos)"
+        for table, column in references
+    )
+    enqueue_sql = f"""
+        INSERT INTO {DOCUMENTO_QUEUE_TABLE} (cnpj_basico)
+        {companies_sql}
+        ON CONFLICT DO NOTHING
+    """
+
+    with engine.begin() as connection:
+        codigos = connection.execute(text(changed_sql)).scalars().all()
+        if codigos:
+            connection.execute(text(enqueue_sql), {"codigos": list(codigos)})
+
+
 def process_reference_csv(
     file_path: str | Path,
     target_table: str,
@@ -70,6 +111,7 @@ def process_reference_csv(
             continue
 
         copy_dataframe_to_staging(engine, prepared, staging_table)
+        _enqueue_documentos(engine, staging_table, target_table)
         upsert_from_staging(
             engine,
             staging_table=staging_table,
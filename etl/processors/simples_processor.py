@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from functools import partial
 from pathlib import Path
 
 import pandas as pd
@@ -7,7 +8,11 @@ from sqlalchemy import Engine, text
 
 from app.config import settings
 from app.database import engine as default_engine
+from etl.documentos import QUEUE_TABLE as DOCUMENTO_QUEUE_TABLE
 from etl.utils.normalize import normalize_date_columns
+from etl.utils.page_cache import open_streaming
+from etl.utils.parallel_merge import SlicedMerge, ensure_slice_tables, merge_slices, slice_table
+from etl.utils.parquet_sink import ParquetSink
 from etl.utils.postgres_copy import copy_dataframe_to_staging, quote_ident, upsert_from_staging
 
 CSV_COLUMNS = [
@@ -59,7 +64,7 @@ def _prepare_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
 def _ensure_staging_table(engine: Engine) -> None:
     sql = f"""
         CREATE TABLE IF NOT EXISTS {quote_ident(STAGING_TABLE)} (
-            cnpj_basico VARCHAR(8),
+            cnpj_basico CHAR(8),
             opcao_pelo_simples CHAR(1),
             data_opcao_pelo_simples DATE,
             data_exclusao_do_simples DATE,
@@ -72,39 +77,52 @@ def _ensure_staging_table(engine: Engine) -> None:
         connection.execute(text(sql))
 
 
+def _merge(engine: Engine, index: int, prepared: pd.DataFrame) -> None:
+    staging_table = slice_table(STAGING_TABLE, index)
+    copy_dataframe_to_staging(engine, prepared, staging_table)
+    upsert_from_staging(
+        engine,
+        staging_table=staging_table,
+        target_table=TARGET_TABLE,
+        insert_columns=CSV_COLUMNS,
+        conflict_columns=["cnpj_basico"],
+        changed_keys_table=DOCUMENTO_QUEUE_TABLE,
+    )
+
+
 def process_simples_csv(
     file_path: str | Path,
     engine: Engine = default_engine,
     chunk_size: int = settings.BATCH_SIZE,
+    sink: ParquetSink | None = None,
 ) -> int:
+    slices = merge_slices("simples")
     _ensure_staging_table(engine)
-
-    chunks = pd.read_csv(
-        file_path,
-        sep=";",
-        dtype=str,
-        encoding="latin1",
-        chunksize=chunk_size,
-        header=None,
-        names=CSV_COLUMNS,
-        usecols=list(range(len(CSV_COLUMNS))),
-        keep_default_na=False,
-    )
-
-    processed = 0
-    for chunk in chunks:
-        prepared = _prepare_chunk(chunk)
-        if prepared.empty:
-            continue
-
-        copy_dataframe_to_staging(engine, prepared, STAGING_TABLE)
-        upsert_from_staging(
-            engine,
-            staging_table=STAGING_TABLE,
-            target_table=TARGET_TABLE,
-            insert_columns=CSV_COLUMNS,
-            conflict_columns=["cnpj_basico"],
+    ensure_slice_tables(engine, [STAGING_TABLE], slices)
+
+    with open_streaming(file_path) as handle:
+        chunks = pd.read_csv(
+            handle,
+            sep=";",
+            dtype=str,
+            encoding="latin1",
+            chunksize=chunk_size,
+            header=None,
+            names=CSV_COLUMNS,
+            usecols=list(range(len(CSV_COLUMNS))),
+            keep_default_na=False,
         )
-        processed += len(prepared)
+
+        processed = 0
+        with SlicedMerge(slices) as merger:
+            for chunk in chunks:
+                prepared = _prepare_chunk(chunk)
+                if prepared.empty:
+                    continue
+
+                if sink is not None:
+                    sink.write(prepared)
+                merger.run(partial(_merge, engine), prepared)
+                processed += len(prepared)
 
     return processed
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from collections.abc import Iterator
+from functools import partial
 from pathlib import Path
 
 import pandas as pd
@@ -7,7 +9,17 @@ from sqlalchemy import Engine, text
 
 from app.config import settings
 from app.database import engine as default_engine
-from etl.utils.normalize import normalize_date_columns
+from etl.documentos import QUEUE_TABLE as DOCUMENTO_QUEUE_TABLE
+from etl.utils.normalize import (
+    category_dtypes,
+    normalize_code_columns,
+    normalize_date_columns,
+    strip_categories,
+)
+from etl.utils.page_cache import drop_cache_enabled, open_streaming
+from etl.utils.parallel_csv import read_csv_parallel
+from etl.utils.parallel_merge import SlicedMerge, ensure_slice_tables, merge_slices, slice_table
+from etl.utils.parquet_sink import ParquetSink
 from etl.utils.postgres_copy import copy_dataframe_to_staging, quote_ident, upsert_from_staging
 
 CSV_COLUMNS = [
@@ -26,16 +38,59 @@ CSV_COLUMNS = [
 
 DATE_COLUMNS = ["data_entrada"]
 
-INSERT_COLUMNS = ["cnpj_basico", "nome_socio", "cpf_cnpj_socio", "qualificacao", "pais", "data_entrada"]
+CODE_COLUMNS = ["qualificacao", "pais"]
+
+# Fewer than ~6000 distinct values: read and normalized as categoricals, one
+# string per distinct value instead of one per row.
+CATEGORY_COLUMNS = ["qualificacao", "pais"]
+
+# The staging table keeps nome_socio/cpf_cnpj_socio; socios stores pessoa_id.
+INSERT_COLUMNS = ["cnpj_basico", "pessoa_id", "qualificacao", "pais", "data_entrada"]
 
 STAGING_TABLE = "stg_socios"
 TARGET_TABLE = "socios"
+PESSOAS_TABLE = "pessoas"
+
+
+def _pessoas_sql(staging_table: str) -> list[str]:
+    # Identities are assigned in bulk per chunk. Only the missing ones are
+    # inserted: ON CONFLICT alone would still draw an id from the sequence for
+    # every partner resent by the monthly release. Concurrent merge slices can
+    # insert the same new identity; inserting in key order makes them wait on
+    # each other instead of deadlocking.
+    return [
+        f"""
+        INSERT INTO {PESSOAS_TABLE} (cpf_cnpj, nome)
+        SELECT DISTINCT COALESCE(s.cpf_cnpj_socio, ''), COALESCE(s.nome_socio, '')
+        FROM {staging_table} s
+        WHERE NOT EXISTS (
+            SELECT 1
+            FROM {PESSOAS_TABLE} p
+            WHERE p.cpf_cnpj = COALESCE(s.cpf_cnpj_socio, '')
+              AND p.nome = COALESCE(s.nome_socio, '')
+        )
+        ORDER BY 1, 2
+        ON CONFLICT (cpf_cnpj, nome) DO NOTHING
+        """,
+        f"""
+        UPDATE {staging_table} s
+        SET pessoa_id = p.id
+        FROM {PESSOAS_TABLE} p
+        WHERE p.cpf_cnpj = COALESCE(s.cpf_cnpj_socio, '')
+          AND p.nome = COALESCE(s.nome_socio, '')
+        """,
+    ]
 
 
 def _normalize_strings(chunk: pd.DataFrame) -> pd.DataFrame:
+    text_columns = []
     for col in chunk.columns:
-        chunk[col] = chunk[col].astype("string").str.strip()
-    chunk = chunk.replace({"": None, pd.NA: None})
+        if isinstance(chunk[col].dtype, pd.CategoricalDtype):
+            chunk[col] = strip_categories(chunk[col])
+        else:
+            chunk[col] = chunk[col].astype("string").str.strip()
+            text_columns.append(col)
+    chunk[text_columns] = chunk[text_columns].replace({"": None, pd.NA: None})
     return chunk
 
 
@@ -43,10 +98,15 @@ def _normalize_dates(chunk: pd.DataFrame) -> pd.DataFrame:
     return normalize_date_columns(chunk, DATE_COLUMNS)
 
 
+def _normalize_codes(chunk: pd.DataFrame) -> pd.DataFrame:
+    return normalize_code_columns(chunk, CODE_COLUMNS)
+
+
 def _prepare_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
     chunk = chunk.copy()
     chunk = _normalize_strings(chunk)
     chunk = _normalize_dates(chunk)
+    chunk = _normalize_codes(chunk)
 
     prepared = pd.DataFrame(
         {
@@ -65,67 +125,98 @@ def _prepare_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
 def _ensure_staging_table(engine: Engine) -> None:
     sql = f"""
         CREATE TABLE IF NOT EXISTS {quote_ident(STAGING_TABLE)} (
-            cnpj_basico VARCHAR(8),
+            cnpj_basico CHAR(8),
             nome_socio TEXT,
             cpf_cnpj_socio TEXT,
-            qualificacao TEXT,
-            pais TEXT,
-            data_entrada DATE
+            qualificacao SMALLINT,
+            pais SMALLINT,
+            data_entrada DATE,
+            pessoa_id INTEGER
         )
     """
     with engine.begin() as connection:
         connection.execute(text(sql))
 
 
+def _assign_pessoas(engine: Engine, staging_table: str) -> None:
+    with engine.begin() as connection:
+        for sql in _pessoas_sql(staging_table):
+            connection.execute(text(sql))
+
+
+def _merge(engine: Engine, index: int, prepared: pd.DataFrame) -> None:
+    staging_table = slice_table(STAGING_TABLE, index)
+    copy_dataframe_to_staging(engine, prepared, staging_table)
+    _assign_pessoas(engine, staging_table)
+    upsert_from_staging(
+        engine,
+        staging_table=staging_table,
+        target_table=TARGET_TABLE,
+        insert_columns=INSERT_COLUMNS,
+        conflict_columns=["cnpj_basico", "pessoa_id"],
+        changed_keys_table=DOCUMENTO_QUEUE_TABLE,
+    )
+
+
+def _read_chunks(file_path: str | Path, chunk_size: int) -> Iterator[pd.DataFrame]:
+    if settings.ETL_PARSE_WORKERS > 1:
+        yield from read_csv_parallel(
+            file_path,
+            CSV_COLUMNS,
+            settings.ETL_PARSE_WORKERS,
+            chunk_size,
+            dtype=category_dtypes(CSV_COLUMNS, CATEGORY_COLUMNS),
+            drop_cache=drop_cache_enabled(),
+        )
+        return
+
+    with open_streaming(file_path) as handle:
+        try:
+            chunks = pd.read_csv(
+                handle,
+                sep=";",
+                dtype=category_dtypes(CSV_COLUMNS, CATEGORY_COLUMNS),
+                encoding="latin1",
+                chunksize=chunk_size,
+                usecols=CSV_COLUMNS,
+                keep_default_na=False,
+            )
+        except ValueError:
+            handle.seek(0)
+            chunks = pd.read_csv(
+                handle,
+                sep=";",
+                dtype=category_dtypes(CSV_COLUMNS, CATEGORY_COLUMNS),
+                encoding="latin1",
+                chunksize=chunk_size,
+                header=None,
+                names=CSV_COLUMNS,
+                usecols=list(range(len(CSV_COLUMNS))),
+                keep_default_na=False,
+            )
+        yield from chunks
+
+
 def process_socios_csv(
     file_path: str | Path,
     engine: Engine = default_engine,
     chunk_size: int = settings.BATCH_SIZE,
+    sink: ParquetSink | None = None,
 ) -> int:
+    slices = merge_slices("socios")
     _ensure_staging_table(engine)
-
-    try:
-        chunks = pd.read_csv(
-            file_path,
-            sep=";",
-            dtype=str,
-            encoding="latin1",
-            chunksize=chunk_size,
-            usecols=CSV_COLUMNS,
-            keep_default_na=False,
-        )
-    except ValueError:
-        chunks = pd.read_csv(
-            file_path,
-            sep=";",
-            dtype=str,
-            encoding="latin1",
-            chunksize=chunk_size,
-            header=None,
-            names=CSV_COLUMNS,
-            usecols=list(range(len(CSV_COLUMNS))),
-            keep_default_na=False,
-        )
+    ensure_slice_tables(engine, [STAGING_TABLE], slices)
 
     processed = 0
-    for chunk in chunks:
-        prepared = _prepare_chunk(chunk)
-        if prepared.empty:
-            continue
-
-        copy_dataframe_to_staging(engine, prepared, STAGING_TABLE)
-        upsert_from_staging(
-            engine,
-            staging_table=STAGING_TABLE,
-            target_table=TARGET_TABLE,
-            insert_columns=INSERT_COLUMNS,
-            conflict_columns=["cnpj_basico", "nome_socio", "cpf_cnpj_socio"],
-            conflict_expressions=[
-                '"cnpj_basico"',
-                "COALESCE(nome_socio, '')",
-                "COALESCE(cpf_cnpj_socio, '')",
-            ],
-        )
-        processed += len(prepared)
+    with SlicedMerge(slices) as merger:
+        for chunk in _read_chunks(file_path, chunk_size):
+            prepared = _prepare_chunk(chunk)
+            if prepared.empty:
+                continue
+
+            if sink is not None:
+                sink.write(prepared)
+            merger.run(partial(_merge, engine), prepared)
+            processed += len(prepared)
 
     return processed
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+from sqlalchemy import Connection, Engine, text
+
+from app.core.logging import get_logger
+from app.core.rede import no_socio_sql
+from app.database import engine as default_engine
+
+logger = get_logger(__name__)
+
+# Partner network as an adjacency list: one row per direction of every
+# company <-> partner edge, so expanding a BFS frontier is an index-only scan
+# of the primary key (origem, destino). Node ids: see app.core.rede.
+ARESTAS_TABLE = "rede_arestas"
+
+_TEM_SOCIO = "(p.nome <> '' OR p.cpf_cnpj <> '')"
+
+
+def _insert_arestas_sql(empresas_sql: str) -> str:
+    return f"""
+        WITH e AS ({empresas_sql})
+        INSERT INTO {ARESTAS_TABLE} (origem, destino)
+        SELECT empresa, socio FROM e WHERE empresa <> socio
+        UNION
+        SELECT socio, empresa FROM e WHERE empresa <> socio
+        ON CONFLICT DO NOTHING
+    """
+
+
+def _refresh_delete_sql(lote_table: str) -> list[str]:
+    # Both directions of every edge touching a batch company: the reverse ones
+    # first, while the forward ones still point at them.
+    return [
+        f"""
+        DELETE FROM {ARESTAS_TABLE} a
+        USING {ARESTAS_TABLE} f
+        JOIN {lote_table} l ON f.origem = l.cnpj_basico::bigint
+        WHERE a.origem = f.destino
+          AND a.destino = f.origem
+        """,
+        f"""
+        DELETE FROM {ARESTAS_TABLE} a
+        USING {lote_table} l
+        WHERE a.origem = l.cnpj_basico::bigint
+        """,
+    ]
+
+
+def _refresh_empresas_sql(lote_table: str) -> str:
+    # The batch companies' own partners, and the companies with a partner that
+    # maps to a batch company. The range on pessoas.cpf_cnpj only selects the
+    # candidates through uq_pessoas_cpf_cnpj_nome; the node id decides, as in
+    # the rebuild, whether or not that CNPJ has an establishment row.
+    return f"""
+        SELECT s.cnpj_basico::bigint AS empresa, {no_socio_sql("p")} AS socio
+        FROM {lote_table} l
+        JOIN socios s ON s.cnpj_basico = l.cnpj_basico
+        JOIN pessoas p ON p.id = s.pessoa_id
+        WHERE {_TEM_SOCIO}
+        UNION
+        SELECT s.cnpj_basico::bigint, l.cnpj_basico::bigint
+        FROM {lote_table} l
+        JOIN pessoas p
+          ON p.cpf_cnpj BETWEEN l.cnpj_basico || '000000' AND l.cnpj_basico || '999999'
+        JOIN socios s ON s.pessoa_id = p.id
+        WHERE {no_socio_sql("p")} = l.cnpj_basico::bigint
+    """
+
+
+REBUILD_SQL = [
+    f"TRUNCATE {ARESTAS_TABLE}",
+    _insert_arestas_sql(
+        f"""
+        SELECT s.cnpj_basico::bigint AS empresa, {no_socio_sql("p")} AS socio
+        FROM socios s
+        JOIN pessoas p ON p.id = s.pessoa_id
+        WHERE {_TEM_SOCIO}
+        """
+    ),
+]
+
+
+def refresh_rede(connection: Connection, lote_table: str) -> None:
+    """Recomputes the edges of the companies in a refresh batch.
+
+    Runs inside the refresh transaction of etl.documentos; the queue holds every
+    company whose socios rows changed.
+    """
+    for sql in _refresh_delete_sql(lote_table):
+        connection.execute(text(sql))
+    connection.execute(text(_insert_arestas_sql(_refresh_empresas_sql(lote_table))))
+
+
+def rebuild_rede(engine: Engine = default_engine) -> None:
+    """Recomputes the whole edge table from socios; full scan, for repairs only."""
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        for sql in REBUILD_SQL:
+            connection.execute(text(sql))
+
+    logger.info("etl.rede_reconstruida", segundos=round(time.perf_counter() - started, 3))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tabela de arestas da rede de socios")
+    parser.add_argument("--rebuild", action="store_true", help="recalcula as arestas a partir de socios")
+    args = parser.parse_args()
+    if args.rebuild:
+        rebuild_rede()
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import Engine, text
+
+from app.api.v1.cnpj import (
+    EMPRESA_BY_BASICO_SQL,
+    ESTABELECIMENTOS_BY_BASICO_SQL,
+    ESTABELECIMENTOS_BY_COMPLETO_SQL,
+    SOCIOS_BY_BASICO_SQL,
+)
+from app.database import engine as default_engine
+
+TABLES = [
+    "empresas",
+    "estabelecimentos",
+    "estabelecimentos_ativos",
+    "estabelecimentos_inativos",
+    "socios",
+    "simples",
+]
+
+TABLE_SIZES_SQL = """
+    SELECT
+        c.relname AS tabela,
+        c.reltuples::bigint AS linhas_estimadas,
+        pg_table_size(c.oid) AS tabela_bytes,
+        pg_indexes_size(c.oid) AS indices_bytes,
+        pg_total_relation_size(c.oid) AS total_bytes
+    FROM pg_class c
+    JOIN pg_namespace ns ON ns.oid = c.relnamespace
+    WHERE ns.nspname = current_schema()
+      AND c.relname = ANY(:tables)
+    ORDER BY c.relname
+"""
+
+INDEX_SIZES_SQL = """
+    SELECT
+        i.relname AS tabela,
+        i.indexrelname AS indice,
+        pg_relation_size(i.indexrelid) AS bytes
+    FROM pg_stat_user_indexes i
+    WHERE i.schemaname = current_schema()
+      AND i.relname = ANY(:tables)
+    ORDER BY i.relname, i.indexrelname
+"""
+
+# Relations that must be read through index-only scans on the lookup path;
+# reference tables are tiny and may be read any way the planner likes.
+INDEX_ONLY_RELATIONS = {
+    "empresas",
+    "simples",
+    "estabelecimentos_ativos",
+    "estabelecimentos_inativos",
+    "socios",
+}
+
+SAMPLE_COMPLETO_SQL = """
+    SELECT cnpj_basico, cnpj_completo
+    FROM estabelecimentos TABLESAMPLE SYSTEM (1)
+    LIMIT 1
+"""
+
+FIRST_COMPLETO_SQL = """
+    SELECT cnpj_basico, cnpj_completo
+    FROM estabelecimentos
+    LIMIT 1
+"""
+
+SAMPLE_SQL = """
+    SELECT cnpj_basico
+    FROM empresas TABLESAMPLE SYSTEM (1)
+    LIMIT :limit
+"""
+
+
+def collect_sizes(engine: Engine) -> dict[str, Any]:
+    with engine.connect() as connection:
+        tables = connection.execute(text(TABLE_SIZES_SQL), {"tables": TABLES}).mappings().all()
+        indexes = connection.execute(text(INDEX_SIZES_SQL), {"tables": TABLES}).mappings().all()
+
+    return {
+        "tabelas": {row["tabela"]: dict(row) for row in tables},
+        "indices": {f'{row["tabela"]}.{row["indice"]}': row["bytes"] for row in indexes},
+    }
+
+
+def measure_lookup_latency(engine: Engine, samples: int) -> dict[str, float | int]:
+    """Times the three GET /cnpj/{cnpj} queries for a random sample of companies."""
+    with engine.connect() as connection:
+        basicos = connection.execute(text(SAMPLE_SQL), {"limit": samples}).scalars().all()
+
+        timings_ms: list[float] = []
+        for cnpj_basico in basicos:
+            params = {"cnpj_basico": cnpj_basico}
+            started = time.perf_counter()
+            connection.execute(text(EMPRESA_BY_BASICO_SQL), params).all()
+            connection.execute(text(ESTABELECIMENTOS_BY_BASICO_SQL), params).all()
+            connection.execute(text(SOCIOS_BY_BASICO_SQL), params).all()
+            timings_ms.append((time.perf_counter() - started) * 1000)
+
+    if not timings_ms:
+        return {"amostras": 0}
+
+    timings_ms.sort()
+    return {
+        "amostras": len(timings_ms),
+        "media_ms": round(statistics.fmean(timings_ms), 3),
+        "p50_ms": round(timings_ms[len(timings_ms) // 2], 3),
+        "p95_ms": round(timings_ms[int(len(timings_ms) * 0.95) - 1], 3),
+        "max_ms": round(timings_ms[-1], 3),
+    }
+
+
+def _scan_nodes(plan: dict[str, Any]) -> list[dict[str, Any]]:
+    nodes = []
+    if "Relation Name" in plan:
+        nodes.append(
+            {
+                "relacao": plan["Relation Name"],
+                "tipo": plan["Node Type"],
+                "heap_fetches": plan.get("Heap Fetches"),
+            }
+        )
+    for child in plan.get("Plans", []):
+        nodes.extend(_scan_nodes(child))
+    return nodes
+
+
+def check_index_only_scans(engine: Engine) -> dict[str, Any]:
+    """EXPLAIN ANALYZE the GET /cnpj queries and flag heap access on the big tables.
+
+    Index-only scans only skip the heap for all-visible pages, so run this after
+    the post-load VACUUM.
+    """
+    with engine.connect() as connection:
+        # A 1% page sample of a small table can come back empty.
+        sample = (
+            connection.execute(text(SAMPLE_COMPLETO_SQL)).mappings().first()
+            or connection.execute(text(FIRST_COMPLETO_SQL)).mappings().first()
+        )
+        if sample is None:
+            return {"ok": False, "violacoes": [], "consultas": {}, "motivo": "estabelecimentos vazia"}
+
+        params = dict(sample)
+        queries = {
+            "empresa": EMPRESA_BY_BASICO_SQL,
+            "estabelecimentos_basico": ESTABELECIMENTOS_BY_BASICO_SQL,
+            "estabelecimentos_completo": ESTABELECIMENTOS_BY_COMPLETO_SQL,
+            "socios": SOCIOS_BY_BASICO_SQL,
+        }
+
+        consultas: dict[str, list[dict[str, Any]]] = {}
+        for name, sql in queries.items():
+            plan = connection.execute(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}"), params).scalar_one()
+            consultas[name] = _scan_nodes(plan[0]["Plan"])
+
+    violations = [
+        f'{name}: {node["tipo"]} em {node["relacao"]}'
+        for name, nodes in consultas.items()
+        for node in nodes
+        if node["relacao"] in INDEX_ONLY_RELATIONS and node["tipo"] != "Index Only Scan"
+    ]
+    return {"ok": not violations, "violacoes": violations, "consultas": consultas}
+
+
+def build_report(engine: Engine = default_engine, samples: int = 200) -> dict[str, Any]:
+    report = collect_sizes(engine)
+    report["latencia_lookup"] = measure_lookup_latency(engine, samples)
+    return report
+
+
+def compare_reports(before: dict[str, Any], after: dict[str, Any]) -> dict[str, Any]:
+    tabelas: dict[str, Any] = {}
+    for tabela in sorted(set(before["tabelas"]) | set(after["tabelas"])):
+        old = before["tabelas"].get(tabela, {})
+        new = after["tabelas"].get(tabela, {})
+        tabelas[tabela] = {
+            key: {"antes": old.get(key), "depois": new.get(key)}
+            for key in ("tabela_bytes", "indices_bytes", "total_bytes")
+        }
+
+    indices = {
+        name: {"antes": before["indices"].get(name), "depois": after["indices"].get(name)}
+        for name in sorted(set(before["indices"]) | set(after["indices"]))
+    }
+
+    latencia = {
+        key: {
+            "antes": before["latencia_lookup"].get(key),
+            "depois": after["latencia_lookup"].get(key),
+        }
+        for key in ("media_ms", "p50_ms", "p95_ms", "max_ms")
+    }
+
+    return {"tabelas": tabelas, "indices": indices, "latencia_lookup": latencia}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tamanho de tabelas/indices e latencia de lookup")
+    parser.add_argument("--samples", type=int, default=200, help="CNPJs amostrados para latencia")
+    parser.add_argument("--output", type=Path, help="grava o relatorio em JSON")
+    parser.add_argument("--compare", type=Path, help="relatorio anterior (JSON) para comparar")
+    parser.add_argument(
+        "--check-index-only",
+        action="store_true",
+        help="verifica via EXPLAIN que o GET /cnpj usa apenas index-only scans",
+    )
+    args = parser.parse_args()
+
+    if args.check_index_only:
+        result = check_index_only_scans(default_engine)
+        print(json.dumps(result, indent=2))
+        raise SystemExit(0 if result["ok"] else 1)
+
+    current = build_report(samples=args.samples)
+    if args.output:
+        args.output.write_text(json.dumps(current, indent=2), encoding="utf-8")
+
+    if args.compare:
+        previous = json.loads(args.compare.read_text(encoding="utf-8"))
+        print(json.dumps(compare_reports(previous, current), indent=2))
+    else:
+        print(json.dumps(current, indent=2))
@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import Engine, create_engine, text
+
+from app.config import settings
+from app.core.logging import get_logger
+from app.database import engine as default_engine
+from etl.utils.file_hash import calculate_file_hash
+
+logger = get_logger(__name__)
+
+ROOT = Path(__file__).resolve().parents[1]
+
+MANIFEST_NAME = "manifest.json"
+DUMP_DIR_NAME = "dump"
+LATEST_NAME = "LATEST"
+
+# Staging tables are recreated by the processors and never read by the API.
+EXCLUDED_TABLES = ["stg_*"]
+
+LAST_IMPORT_SQL = """
+    SELECT max(id)
+    FROM importacoes
+    WHERE status IN ('SUCCESS', 'PARTIAL')
+"""
+
+IMPORT_IN_PROGRESS_SQL = "SELECT 1 FROM importacoes WHERE status = 'PROCESSING' LIMIT 1"
+
+USER_TABLES_SQL = "SELECT count(*) FROM pg_tables WHERE schemaname = current_schema()"
+
+
+class SnapshotError(RuntimeError):
+    pass
+
+
+def _libpq_url(engine: Engine) -> str:
+    # pg_dump/pg_restore take a plain libpq URI, without the SQLAlchemy driver.
+    # The password goes through the environment (_libpq_env): command lines
+    # are visible to every local user in ps and /proc.
+    # (URL.set() ignores None, hence _replace.)
+    return engine.url.set(drivername="postgresql")._replace(password=None).render_as_string(hide_password=False)
+
+
+def _libpq_env(engine: Engine) -> dict[str, str]:
+    env = dict(os.environ)
+    if engine.url.password is not None:
+        env["PGPASSWORD"] = str(engine.url.password)
+    return env
+
+
+def _alembic_head() -> str:
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "migrations"))
+    head = ScriptDirectory.from_config(config).get_current_head()
+    if head is None:
+        raise SnapshotError("Nenhuma migration encontrada")
+    return head
+
+
+def _database_revision(engine: Engine) -> str | None:
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+
+def _run(command: list[str], env: dict[str, str]) -> None:
+    logger.info("etl.snapshot_comando", comando=command[0])
+    completed = subprocess.run(command, capture_output=True, text=True, env=env)
+    if completed.returncode != 0:
+        raise SnapshotError(f"{command[0]} falhou: {completed.stderr.strip()}")
+
+
+def _checksums(dump_dir: Path) -> dict[str, dict[str, Any]]:
+    return {
+        str(path.relative_to(dump_dir)): {"sha256": calculate_file_hash(path), "bytes": path.stat().st_size}
+        for path in sorted(dump_dir.rglob("*"))
+        if path.is_file()
+    }
+
+
+def publish_snapshot(
+    engine: Engine = default_engine,
+    output_dir: str | Path | None = None,
+    jobs: int | None = None,
+) -> Path:
+    """pg_dump (directory format, parallel) the loaded schema as a versioned generation.
+
+    The manifest is written last, so a generation without one is incomplete.
+    """
+    started = time.perf_counter()
+    root = Path(output_dir or settings.SNAPSHOT_PATH)
+    jobs = jobs or settings.SNAPSHOT_JOBS
+
+    with engine.connect() as connection:
+        if connection.execute(text(IMPORT_IN_PROGRESS_SQL)).first() is not None:
+            raise SnapshotError("Ha uma importacao em andamento (PROCESSING)")
+        importacao_id = connection.execute(text(LAST_IMPORT_SQL)).scalar()
+    if importacao_id is None:
+        raise SnapshotError("Nenhuma importacao concluida para publicar")
+
+    revision = _database_revision(engine)
+    generation = f"importacao-{importacao_id:06d}"
+    target = root / generation
+    if (target / MANIFEST_NAME).exists():
+        logger.info("etl.snapshot_existente", geracao=generation)
+        return target
+    if target.exists():
+        shutil.rmtree(target)
+    target.mkdir(parents=True)
+
+    dump_dir = target / DUMP_DIR_NAME
+    command = [
+        "pg_dump",
+        "--format=directory",
+        f"--jobs={jobs}",
+        "--no-owner",
+        "--no-privileges",
+        f"--file={dump_dir}",
+    ]
+    command += [f"--exclude-table={pattern}" for pattern in EXCLUDED_TABLES]
+    _run(command + [_libpq_url(engine)], _libpq_env(engine))
+
+    manifest = {
+        "geracao": generation,
+        "importacao_id": importacao_id,
+        "alembic_revision": revision,
+        "criado_em": datetime.now(UTC).isoformat(),
+        "formato": "pg_dump-directory",
+        "arquivos": _checksums(dump_dir),
+    }
+    (target / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    (root / LATEST_NAME).write_text(generation + "\n", encoding="utf-8")
+
+    logger.info(
+        "etl.snapshot_publicado",
+        geracao=generation,
+        arquivos=len(manifest["arquivos"]),
+        bytes=sum(item["bytes"] for item in manifest["arquivos"].values()),
+        segundos=round(time.perf_counter() - started, 3),
+    )
+    return target
+
+
+def _resolve_snapshot(snapshot: str | Path | None) -> Path:
+    root = Path(settings.SNAPSHOT_PATH)
+    if snapshot is None or str(snapshot) == "latest":
+        latest = root / LATEST_NAME
+        if not latest.exists():
+            raise SnapshotError(f"Nenhum snapshot publicado em {root}")
+        return root / latest.read_text(encoding="utf-8").strip()
+
+    path = Path(snapshot)
+    return path if path.is_absolute() or path.exists() else root / path
+
+
+def verify_snapshot(snapshot_dir: Path) -> dict[str, Any]:
+    manifest_path = snapshot_dir / MANIFEST_NAME
+    if not manifest_path.exists():
+        raise SnapshotError(f"Snapshot sem manifest (incompleto?): {snapshot_dir}")
+
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    actual = _checksums(snapshot_dir / DUMP_DIR_NAME)
+    if actual.keys() != manifest["arquivos"].keys():
+        raise SnapshotError("Arquivos do snapshot nao conferem com o manifest")
+    corrupted = [name for name, item in manifest["arquivos"].items() if actual[name]["sha256"] != item["sha256"]]
+    if corrupted:
+        raise SnapshotError(f"Checksum invalido: {', '.join(corrupted)}")
+    return manifest
+
+
+def restore_snapshot(
+    engine: Engine = default_engine,
+    snapshot: str | Path | None = None,
+    jobs: int | None = None,
+    clean: bool = False,
+) -> dict[str, Any]:
+    """Verifies and pg_restores a generation in parallel, then checks the Alembic head."""
+    started = time.perf_counter()
+    jobs = jobs or settings.SNAPSHOT_JOBS
+    snapshot_dir = _resolve_snapshot(snapshot)
+    manifest = verify_snapshot(snapshot_dir)
+
+    head = _alembic_head()
+    if manifest["alembic_revision"] != head:
+        raise SnapshotError(
+            f"Snapshot na revisao {manifest['alembic_revision']}, codigo em {head}; "
+            "publique um snapshot desta versao"
+        )
+
+    with engine.connect() as connection:
+        existing = connection.execute(text(USER_TABLES_SQL)).scalar()
+    if existing and not clean:
+        raise SnapshotError("Banco de destino nao esta vazio; use --clean para substituir")
+
+    command = [
+        "pg_restore",
+        f"--jobs={jobs}",
+        "--no-owner",
+        "--no-privileges",
+        "--exit-on-error",
+        f"--dbname={_libpq_url(engine)}",
+    ]
+    if clean:
+        command += ["--clean", "--if-exists"]
+    _run(command + [str(snapshot_dir / DUMP_DIR_NAME)], _libpq_env(engine))
+
+    # pg_restore does not carry planner statistics or the visibility map the
+    # index-only lookups rely on.
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("VACUUM (ANALYZE)"))
+
+    revision = _database_revision(engine)
+    if revision != head:
+        raise SnapshotError(f"Banco restaurado na revisao {revision}, esperado {head}")
+
+    logger.info(
+        "etl.snapshot_restaurado",
+        geracao=manifest["geracao"],
+        revisao=revision,
+        segundos=round(time.perf_counter() - started, 3),
+    )
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publica/restaura snapshots do banco carregado")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    publish_parser = subparsers.add_parser("publish", help="pg_dump paralelo da ultima importacao")
+    publish_parser.add_argument("--output", default=None, help="diretorio raiz dos snapshots")
+    publish_parser.add_argument("--jobs", type=int, default=None)
+
+    restore_parser = subparsers.add_parser("restore", help="pg_restore paralelo de uma geracao")
+    restore_parser.add_argument("--snapshot", default="latest", help="geracao, caminho ou 'latest'")
+    restore_parser.add_argument("--jobs", type=int, default=None)
+    restore_parser.add_argument("--clean", action="store_true", help="substitui objetos existentes")
+    restore_parser.add_argument("--database-url", default=None, help="banco de destino (padrao: DATABASE_URL)")
+
+    args = parser.parse_args()
+    if args.comando == "publish":
+        print(publish_snapshot(output_dir=args.output, jobs=args.jobs))
+    else:
+        target_engine = create_engine(args.database_url) if args.database_url else default_engine
+        manifest = restore_snapshot(target_engine, snapshot=args.snapshot, jobs=args.jobs, clean=args.clean)
+        print(manifest["geracao"])
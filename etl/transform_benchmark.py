@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+from types import ModuleType
+from typing import Any
+
+import pandas as pd
+
+from etl.processors import empresas_processor, estabelecimentos_processor, socios_processor
+from etl.utils.normalize import category_dtypes
+from etl.utils.postgres_copy import encode_copy_csv
+
+PROCESSORS: dict[str, ModuleType] = {
+    "empresas": empresas_processor,
+    "estabelecimentos": estabelecimentos_processor,
+    "socios": socios_processor,
+}
+
+# texto: every column as one Python string per cell (the reader before
+# CATEGORY_COLUMNS); categorias: what the processors read today.
+MODES = ["texto", "categorias"]
+
+
+def _read_chunks(file_path: Path, processor: ModuleType, mode: str, rows: int, chunk_size: int):
+    dtype: Any = str if mode == "texto" else category_dtypes(processor.CSV_COLUMNS, processor.CATEGORY_COLUMNS)
+    options = {"sep": ";", "dtype": dtype, "encoding": "latin1", "keep_default_na": False}
+    try:
+        return pd.read_csv(file_path, chunksize=chunk_size, nrows=rows, usecols=processor.CSV_COLUMNS, **options)
+    except ValueError:
+        return pd.read_csv(
+            file_path,
+            chunksize=chunk_size,
+            nrows=rows,
+            header=None,
+            names=processor.CSV_COLUMNS,
+            usecols=list(range(len(processor.CSV_COLUMNS))),
+            **options,
+        )
+
+
+def _memory(frame: pd.DataFrame) -> int:
+    return int(frame.memory_usage(index=False, deep=True).sum())
+
+
+def benchmark_transform(file_path: Path, tipo: str, mode: str, rows: int, chunk_size: int) -> dict[str, Any]:
+    """Reads, prepares and COPY-encodes the first ``rows`` rows of a file in one mode."""
+    processor = PROCESSORS[tipo]
+    timings = {"leitura": 0.0, "preparo": 0.0, "copy": 0.0}
+    lidas = preparadas = pico_lido = pico_preparado = 0
+
+    chunks = iter(_read_chunks(file_path, processor, mode, rows, chunk_size))
+    while True:
+        started = time.perf_counter()
+        chunk = next(chunks, None)
+        timings["leitura"] += time.perf_counter() - started
+        if chunk is None:
+            break
+
+        started = time.perf_counter()
+        prepared = processor._prepare_chunk(chunk)
+        timings["preparo"] += time.perf_counter() - started
+        # estabelecimentos returns (estabelecimentos, detalhes).
+        frames = prepared if isinstance(prepared, tuple) else (prepared,)
+
+        started = time.perf_counter()
+        for frame in frames:
+            encode_copy_csv(frame)
+        timings["copy"] += time.perf_counter() - started
+
+        lidas += len(chunk)
+        preparadas += len(frames[0])
+        pico_lido = max(pico_lido, _memory(chunk))
+        pico_preparado = max(pico_preparado, sum(_memory(frame) for frame in frames))
+
+    total = sum(timings.values())
+    return {
+        "tipo": tipo,
+        "modo": mode,
+        "linhas": lidas,
+        "linhas_preparadas": preparadas,
+        **{f"{stage}_s": round(seconds, 3) for stage, seconds in timings.items()},
+        "linhas_por_segundo": round(lidas / total) if total else None,
+        "pico_chunk_lido_mb": round(pico_lido / 1024 / 1024, 1),
+        "pico_chunk_preparado_mb": round(pico_preparado / 1024 / 1024, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compara memoria e vazao do preparo de chunks com colunas de texto e categoricas"
+    )
+    parser.add_argument("file", type=Path, help="CSV da Receita (Empresas, Estabelecimentos ou Socios)")
+    parser.add_argument("--tipo", choices=sorted(PROCESSORS), required=True)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="linhas lidas do inicio do arquivo")
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    results = [benchmark_transform(args.file, args.tipo, mode, args.rows, args.chunk_size) for mode in MODES]
+    print(json.dumps(results, indent=2))
@@ -3,6 +3,8 @@
 import hashlib
 from pathlib import Path
 
+from etl.utils.page_cache import open_streaming
+
 
 def calculate_file_hash(
     file_path: str | Path,
@@ -12,7 +14,7 @@ def calculate_file_hash(
     path = Path(file_path)
     h = hashlib.new(algorithm)
 
-    with path.open("rb") as f:
+    with open_streaming(path) as f:
         while True:
             chunk = f.read(chunk_size)
             if not chunk:
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
 
 _INVALID_DATE_TOKENS = {"", "None", "nan", "<NA>", "NaT"}
@@ -18,3 +19,72 @@ def normalize_date_columns(chunk: pd.DataFrame, date_columns: list[str]) -> pd.D
         chunk[col] = parsed.dt.strftime("%Y-%m-%d").where(valid, None)
 
     return chunk
+
+
+def category_dtypes(columns: list[str], category_columns: list[str]) -> dict[str, object]:
+    """read_csv dtypes: text, except the low-cardinality columns, read as categorical."""
+    return {col: "category" if col in category_columns else str for col in columns}
+
+
+def _recode(series: pd.Series, values: pd.Series, dtype: str) -> pd.Series:
+    # Maps a categorical column through ``values`` (one per category) touching
+    # only the codes: categories mapping to the same value merge and missing
+    # ones become NULL. ``dtype`` keeps the categories typed even when empty.
+    codes, uniques = pd.factorize(values)
+    remap = np.append(codes, -1)
+    categories = pd.Index(uniques.to_numpy(dtype=dtype), dtype=dtype)
+    recoded = pd.Categorical.from_codes(remap[series.cat.codes.to_numpy()], categories=categories)
+    return pd.Series(recoded, index=series.index, name=series.name)
+
+
+def strip_categories(series: pd.Series) -> pd.Series:
+    """Categorical counterpart of ``.str.strip()`` + ``'' -> None``, applied once per category."""
+    values = pd.Series(series.cat.categories).astype("string").str.strip()
+    return _recode(series, values.mask(values == ""), "object")
+
+
+def _parse_codes(series: pd.Series) -> pd.Series:
+    series = series.astype("string").str.strip()
+    numeric = series.where(series.str.fullmatch(r"\d+").fillna(False))
+    return pd.to_numeric(numeric, errors="coerce").astype("Int64")
+
+
+def normalize_code_columns(chunk: pd.DataFrame, code_columns: list[str]) -> pd.DataFrame:
+    # Receita codes are zero-padded digits ("02", "0111301"); they are stored as
+    # SMALLINT/INTEGER and anything that is not a plain number becomes NULL.
+    # Categorical columns stay categorical with integer categories, so COPY
+    # formats each distinct code once instead of once per row.
+    for col in code_columns:
+        if isinstance(chunk[col].dtype, pd.CategoricalDtype):
+            chunk[col] = _recode(chunk[col], _parse_codes(pd.Series(chunk[col].cat.categories)), "int64")
+        else:
+            chunk[col] = _parse_codes(chunk[col])
+
+    return chunk
+
+
+def _array_literal(items: object) -> str | None:
+    if not isinstance(items, list) or not items:
+        return None
+    return "{" + ",".join(str(int(item)) for item in items) + "}"
+
+
+def normalize_code_list_columns(chunk: pd.DataFrame, list_columns: list[str]) -> pd.DataFrame:
+    # "6201501,6202300" -> "{6201501,6202300}", an array literal COPY loads into
+    # INTEGER[]; non-numeric entries are dropped and an empty list becomes NULL.
+    for col in list_columns:
+        codes = chunk[col].astype("string").str.findall(r"\d+")
+        chunk[col] = codes.map(_array_literal)
+
+    return chunk
+
+
+def normalize_decimal_columns(chunk: pd.DataFrame, decimal_columns: list[str]) -> pd.DataFrame:
+    # "1000,00" -> "1000.00"; kept as text so COPY parses it into NUMERIC
+    # without a lossy round-trip through float64.
+    for col in decimal_columns:
+        series = chunk[col].astype("string").str.strip().str.replace(",", ".", regex=False)
+        valid = series.str.fullmatch(r"\d+(\.\d+)?").fillna(False)
+        chunk[col] = series.where(valid, None)
+
+    return chunk
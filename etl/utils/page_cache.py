@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import io
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Literal
+
+from app.config import settings
+
+if TYPE_CHECKING:
+    from _typeshed import ReadableBuffer, WriteableBuffer
+
+# Pages behind the read/write position are dropped in steps of this size.
+DROP_BYTES = 32 * 1024 * 1024
+
+_HAS_FADVISE = hasattr(os, "posix_fadvise")
+
+
+def drop_cache_enabled() -> bool:
+    """ETL_DROP_PAGE_CACHE on a platform with posix_fadvise (Linux)."""
+    return settings.ETL_DROP_PAGE_CACHE and _HAS_FADVISE
+
+
+def drop_pages(fd: int, offset: int = 0, length: int = 0) -> None:
+    """Drops the cached pages of a range (length 0 = up to the end of the file).
+
+    Only clean pages can be dropped; callers that wrote the range flush it first.
+    """
+    if _HAS_FADVISE:
+        os.posix_fadvise(fd, offset, length, os.POSIX_FADV_DONTNEED)
+
+
+def drop_file_pages(path: str | Path) -> None:
+    """Flushes a file and drops all of its pages, when ETL_DROP_PAGE_CACHE is set."""
+    if not drop_cache_enabled():
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fdatasync(fd)
+        drop_pages(fd)
+    finally:
+        os.close(fd)
+
+
+class StreamingFile(io.FileIO):
+    """FileIO for one sequential pass that does not stay in the page cache.
+
+    Reads get the sequential read-ahead hint; every DROP_BYTES the pages already
+    read (or written and flushed) are dropped, so a multi-GB file only ever
+    holds about DROP_BYTES of cache instead of evicting the database's pages.
+    """
+
+    def __init__(self, path: str | Path, mode: Literal["rb", "wb"] = "rb") -> None:
+        super().__init__(path, mode)
+        # Position of the last drop.
+        self._dropped_until = 0
+        if self.readable():
+            os.posix_fadvise(self.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+    def _drop_behind(self, final: bool = False) -> None:
+        position = self.tell()
+        if position < self._dropped_until:
+            # Seeked back (e.g. the header retry of the processors).
+            self._dropped_until = position
+            return
+        if not final and position - self._dropped_until < DROP_BYTES:
+            return
+        if self.writable():
+            os.fdatasync(self.fileno())
+        # From offset 0 every time: only folios wholly inside the range are
+        # dropped, so a large folio across the previous boundary was skipped
+        # then; the pages already dropped cost nothing to walk again. On close,
+        # also drop whatever read-ahead fetched past the position.
+        drop_pages(self.fileno(), 0, 0 if final else position)
+        self._dropped_until = position
+
+    def readinto(self, buffer: WriteableBuffer, /) -> int | None:
+        read = super().readinto(buffer)
+        self._drop_behind()
+        return read
+
+    def write(self, data: ReadableBuffer, /) -> int:
+        written = super().write(data)
+        self._drop_behind()
+        return written
+
+    def close(self) -> None:
+        if not self.closed:
+            self._drop_behind(final=True)
+        super().close()
+
+
+def open_streaming(path: str | Path, mode: Literal["rb", "wb"] = "rb") -> BinaryIO:
+    """``open(path, mode)`` for a sequential read or write ("rb"/"wb") of an ETL file.
+
+    With ETL_DROP_PAGE_CACHE the file goes through StreamingFile; otherwise it
+    is a plain buffered file.
+    """
+    if not drop_cache_enabled():
+        return open(path, mode)
+    raw = StreamingFile(path, mode)
+    return io.BufferedReader(raw) if raw.readable() else io.BufferedWriter(raw)
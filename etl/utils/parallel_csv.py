@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import csv
+import io
+import mmap
+import multiprocessing
+import os
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from etl.utils.page_cache import drop_pages
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional: only needed when ETL_PARSE_WORKERS > 1
+    pa = None
+
+QUOTE = ord('"')
+NEWLINE = ord("\n")
+
+# Bytes parsed by one task. Each in-flight range holds its parsed batches in
+# shared memory until the loader consumes them, so this times 2 x workers
+# bounds the /dev/shm in use.
+RANGE_BYTES = 64 * 1024 * 1024
+
+# Window scanned at a time while counting quotes and looking for a boundary.
+SCAN_BYTES = 8 * 1024 * 1024
+BOUNDARY_SCAN_BYTES = 64 * 1024
+
+
+def _count_quotes(view: np.ndarray, start: int, end: int) -> int:
+    total = 0
+    for offset in range(start, end, SCAN_BYTES):
+        total += int(np.count_nonzero(view[offset : min(offset + SCAN_BYTES, end)] == QUOTE))
+    return total
+
+
+def _next_boundary(view: np.ndarray, position: int, in_quotes: bool) -> int:
+    """Offset just past the first newline at or after ``position`` that is outside quotes."""
+    size = len(view)
+    while position < size:
+        block = view[position : position + BOUNDARY_SCAN_BYTES]
+        # Quote parity before each byte of the block.
+        parity = (np.cumsum(block == QUOTE) - (block == QUOTE) + in_quotes) & 1
+        newlines = np.flatnonzero((block == NEWLINE) & (parity == 0))
+        if len(newlines):
+            return position + int(newlines[0]) + 1
+        in_quotes = bool((int(np.count_nonzero(block == QUOTE)) + in_quotes) & 1)
+        position += len(block)
+    return size
+
+
+def record_ranges(path: str | Path, start: int = 0, range_bytes: int = RANGE_BYTES) -> list[tuple[int, int]]:
+    """Splits ``[start, size)`` into byte ranges of about ``range_bytes`` ending on record boundaries.
+
+    Receita quotes fields with ``"`` and a quoted field may contain ``;`` or a
+    line break, so a boundary is a newline outside quotes. The quote parity is
+    carried over the whole file (an escaped ``""`` toggles it twice); the file is
+    memory-mapped and counted with numpy, never copied.
+    """
+    with open(path, "rb") as handle:
+        size = os.fstat(handle.fileno()).st_size
+        if size <= start:
+            return []
+
+        ranges = []
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            view = np.frombuffer(mapped, dtype=np.uint8)
+            try:
+                in_quotes = False
+                range_start = start
+                while range_start + range_bytes < size:
+                    target = range_start + range_bytes
+                    in_quotes = bool((_count_quotes(view, range_start, target) + in_quotes) & 1)
+                    boundary = _next_boundary(view, target, in_quotes)
+                    ranges.append((range_start, boundary))
+                    # The boundary newline is outside quotes, so the parity there
+                    # is even again.
+                    in_quotes = False
+                    range_start = boundary
+                if range_start < size:
+                    ranges.append((range_start, size))
+            finally:
+                # The mmap cannot close while numpy still exports its buffer.
+                del view
+
+    return ranges
+
+
+def _layout(path: str | Path, columns: list[str], encoding: str) -> tuple[list[str], list, int]:
+    """Column names, usecols and first data byte, mirroring the single-reader fallback."""
+    with open(path, "rb") as handle:
+        first_line = handle.readline()
+
+    header = next(csv.reader([first_line.decode(encoding).rstrip("\r\n")], delimiter=";"), [])
+    if set(columns).issubset(header):
+        return header, columns, len(first_line)
+    return columns, list(range(len(columns))), 0
+
+
+def _buffer(segment: shared_memory.SharedMemory) -> memoryview:
+    memory = segment.buf
+    if memory is None:
+        raise ValueError(f"segmento de memoria compartilhada {segment.name} ja fechado")
+    return memory
+
+
+def _write_ipc(memory: memoryview, table: pa.Table) -> None:
+    with pa.ipc.new_stream(pa.FixedSizeBufferWriter(pa.py_buffer(memory)), table.schema) as writer:
+        writer.write_table(table)
+
+
+def _read_ipc(memory: memoryview, size: int) -> pd.DataFrame:
+    # Copied out first: to_pandas may keep zero-copy views of the Arrow buffers
+    # (pyarrow-backed strings in pandas 3, categorical codes), and a segment
+    # with exported views can be neither closed nor unlinked.
+    return pa.ipc.open_stream(pa.py_buffer(bytes(memory[:size]))).read_all().to_pandas()
+
+
+def _to_shared_memory(batch: pd.DataFrame) -> tuple[str, int]:
+    table = pa.Table.from_pandas(batch, preserve_index=False)
+    sizer = pa.MockOutputStream()
+    with pa.ipc.new_stream(sizer, table.schema) as writer:
+        writer.write_table(table)
+    size = sizer.size()
+
+    segment = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    try:
+        _write_ipc(_buffer(segment), table)
+    except BaseException:
+        segment.close()
+        segment.unlink()
+        raise
+    # The loader attaches, reads and unlinks the segment; without this the
+    # resource tracker would unlink it as soon as this worker exits. On POSIX
+    # the tracker holds the "/"-prefixed name that SharedMemory.name strips
+    # (Python 3.13 adds track=False instead); Windows does not track segments.
+    if os.name == "posix":
+        resource_tracker.unregister(f"/{segment.name}", "shared_memory")
+    segment.close()
+    return segment.name, size
+
+
+def _release(name: str) -> None:
+    try:
+        segment = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    segment.close()
+    segment.unlink()
+
+
+def _parse_range(
+    path: str,
+    start: int,
+    end: int,
+    names: list[str],
+    usecols: list,
+    dtype: dict[str, object] | None,
+    encoding: str,
+    batch_rows: int,
+    drop_cache: bool,
+) -> list[tuple[str, int]]:
+    """Parser process: one byte range -> Arrow IPC batches in shared memory (name, size)."""
+    with open(path, "rb") as handle:
+        handle.seek(start)
+        data = handle.read(end - start)
+        if drop_cache:
+            drop_pages(handle.fileno(), start, end - start)
+    if not data.strip():
+        return []
+
+    batches = pd.read_csv(
+        io.BytesIO(data),
+        sep=";",
+        dtype=dtype or str,
+        encoding=encoding,
+        chunksize=batch_rows,
+        header=None,
+        names=names,
+        usecols=usecols,
+        keep_default_na=False,
+    )
+    segments: list[tuple[str, int]] = []
+    try:
+        for batch in batches:
+            segments.append(_to_shared_memory(batch))
+    except BaseException:
+        for name, _ in segments:
+            _release(name)
+        raise
+    return segments
+
+
+def _read_segment(name: str, size: int) -> pd.DataFrame:
+    segment = shared_memory.SharedMemory(name=name)
+    try:
+        return _read_ipc(_buffer(segment), size)
+    finally:
+        segment.close()
+        segment.unlink()
+
+
+def _collect(future: Future) -> Iterator[pd.DataFrame]:
+    segments = deque(future.result())
+    try:
+        while segments:
+            name, size = segments.popleft()
+            yield _read_segment(name, size)
+    finally:
+        for name, _ in segments:
+            _release(name)
+
+
+def read_csv_parallel(
+    file_path: str | Path,
+    columns: list[str],
+    workers: int,
+    chunk_size: int,
+    dtype: dict[str, object] | None = None,
+    encoding: str = "latin1",
+    range_bytes: int = RANGE_BYTES,
+    drop_cache: bool = False,
+) -> Iterator[pd.DataFrame]:
+    """Reads a Receita CSV with a pool of parser processes, yielding chunks in file order.
+
+    Same frames as ``pd.read_csv(..., dtype=dtype or str, keep_default_na=False,
+    chunksize=chunk_size)``: the file is split into byte ranges on record
+    boundaries (see record_ranges), each range is parsed by a worker and its
+    batches come back as Arrow IPC streams in shared memory, so only segment
+    names cross the process boundary. Chunks never span two ranges, so some are
+    shorter than ``chunk_size``. With ``drop_cache`` each worker drops the
+    pages of its range once read (the boundary scan leaves them cached for it).
+    """
+    if pa is None:
+        raise RuntimeError("ETL_PARSE_WORKERS > 1 requer o pacote pyarrow (pip install pyarrow)")
+
+    names, usecols, data_start = _layout(file_path, columns, encoding)
+    ranges = record_ranges(file_path, data_start, range_bytes)
+
+    # spawn: the loader already runs merge threads (SlicedMerge), which do not
+    # survive a fork.
+    context = multiprocessing.get_context("spawn")
+    pending: deque[Future] = deque()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        try:
+            for start, end in ranges:
+                pending.append(
+                    executor.submit(
+                        _parse_range,
+                        str(file_path),
+                        start,
+                        end,
+                        names,
+                        usecols,
+                        dtype,
+                        encoding,
+                        chunk_size,
+                        drop_cache,
+                    )
+                )
+                # Keep every worker busy while the loader merges, without
+                # parsing the whole file into shared memory ahead of it.
+                if len(pending) >= 2 * workers:
+                    yield from _collect(pending.popleft())
+            while pending:
+                yield from _collect(pending.popleft())
+        finally:
+            for future in pending:
+                future.cancel()
+            for future in pending:
+                if future.cancelled() or future.exception() is not None:
+                    continue
+                for name, _ in future.result():
+                    _release(name)
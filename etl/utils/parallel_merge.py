@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from types import TracebackType
+
+import pandas as pd
+from sqlalchemy import Engine, text
+
+from app.config import settings
+from etl.utils.postgres_copy import quote_ident
+
+
+def merge_slices(file_type: str) -> int:
+    """Concurrent merge transactions for a file type (ETL_MERGE_SLICES, default 1)."""
+    return max(int(settings.ETL_MERGE_SLICES.get(file_type, 1)), 1)
+
+
+def slice_table(staging_table: str, index: int) -> str:
+    """Staging table of one slice; slice 0 uses the base table."""
+    return staging_table if index == 0 else f"{staging_table}_{index}"
+
+
+def ensure_slice_tables(engine: Engine, staging_tables: list[str], slices: int) -> None:
+    # Recreated from the base table for every file, so a migration that drops
+    # or changes the base staging table never leaves a stale slice copy behind.
+    with engine.begin() as connection:
+        for staging_table in staging_tables:
+            for index in range(1, slices):
+                name = quote_ident(slice_table(staging_table, index))
+                connection.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                connection.execute(text(f"CREATE TABLE {name} (LIKE {quote_ident(staging_table)})"))
+
+
+class SlicedMerge:
+    """Merges each chunk as K concurrent transactions over disjoint hash slices.
+
+    Rows are routed by a hash of ``key_column``, so every company lands in
+    exactly one slice and the K transactions never touch the same keys in the
+    target tables or the documento queue: they cannot deadlock on unique
+    indexes. Each slice runs ``merge(index, *frames)`` on its own pooled
+    connection and stages into ``slice_table(base, index)``.
+    """
+
+    def __init__(self, slices: int, key_column: str = "cnpj_basico") -> None:
+        self.slices = slices
+        self.key_column = key_column
+        self._executor = (
+            ThreadPoolExecutor(max_workers=slices, thread_name_prefix="etl-merge") if slices > 1 else None
+        )
+
+    def __enter__(self) -> SlicedMerge:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def run(self, merge: Callable[..., None], *frames: pd.DataFrame) -> None:
+        """Runs one chunk; ``frames`` all carry ``key_column`` and are split alike."""
+        if self._executor is None:
+            merge(0, *frames)
+            return
+
+        slice_ids = [
+            pd.util.hash_pandas_object(frame[self.key_column], index=False).to_numpy() % self.slices
+            for frame in frames
+        ]
+        futures = []
+        for index in range(self.slices):
+            parts = [frame[ids == index] for frame, ids in zip(frames, slice_ids)]
+            # An empty COPY leaves the previous chunk in the staging table.
+            if parts[0].empty:
+                continue
+            futures.append(self._executor.submit(merge, index, *parts))
+
+        # Every slice finishes (commits or fails) before the next chunk starts.
+        errors = [future.exception() for future in futures]
+        for error in errors:
+            if error is not None:
+                raise error
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only needed when ETL_PARQUET_PATH is set
+    pa = None
+    pq = None
+
+# Rows buffered per partition before a row group is written; keeps row groups
+# large enough to scan efficiently while bounding memory per open partition.
+ROW_GROUP_ROWS = 100_000
+
+# Hive convention for rows whose partition value is NULL.
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+def _parse_array_literal(value: object) -> list[int] | None:
+    if not isinstance(value, str):
+        return None
+    return [int(item) for item in value.strip("{}").split(",") if item]
+
+
+def _is_code_column(series: pd.Series) -> bool:
+    # normalize_code_columns yields Int64, or a categorical with integer
+    # categories when the column was read as categorical.
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return pd.api.types.is_integer_dtype(series.cat.categories.dtype)
+    return isinstance(series.dtype, pd.Int64Dtype)
+
+
+class ParquetSink:
+    """Streams prepared ETL chunks into Parquet files partitioned by release (and a column).
+
+    Layout: ``<root>/<table>/release=<release>/[<column>=<value>/]part-<source>.parquet``;
+    a release loaded from several ZIPs gets one file per ZIP (``source``), and
+    re-processing a ZIP replaces its own files. Files are written under a
+    hidden ``.tmp-*`` directory and only moved into the layout when the sink
+    exits without an exception, i.e. once the load they mirror has committed.
+    Code columns (Int64 or integer categoricals after normalize_code_columns)
+    are written as dictionary-encoded int32; code lists (INTEGER[] array literals after
+    normalize_code_list_columns) as list<int32>; everything else is text unless
+    listed as date or decimal.
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        table: str,
+        release: str,
+        source: str,
+        partition_column: str | None = None,
+        date_columns: list[str] | None = None,
+        decimal_columns: list[str] | None = None,
+        list_columns: list[str] | None = None,
+    ) -> None:
+        if pa is None:
+            raise RuntimeError("ETL_PARQUET_PATH requer o pacote pyarrow (pip install pyarrow)")
+
+        self.table = table
+        self.partition_column = partition_column
+        self.date_columns = set(date_columns or [])
+        self.decimal_columns = set(decimal_columns or [])
+        self.list_columns = set(list_columns or [])
+        self.directory = Path(root) / table / f"release={release}"
+        self.staging = Path(root) / table / f".tmp-release={release}-{source}"
+        self.file_name = f"part-{source}.parquet"
+        self.rows = 0
+        self._schema: pa.Schema | None = None
+        self._code_columns: list[str] = []
+        self._buffers: dict[str, list[pa.Table]] = {}
+        self._buffered_rows: dict[str, int] = {}
+        self._writers: dict[str, pq.ParquetWriter] = {}
+
+    def __enter__(self) -> ParquetSink:
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, *exc_info: object) -> None:
+        self.close()
+        if exc_type is None:
+            self.publish()
+        else:
+            self.discard()
+
+    def _build_schema(self, chunk: pd.DataFrame) -> pa.Schema:
+        fields = []
+        for column in chunk.columns:
+            if column == self.partition_column:
+                continue
+            if column in self.date_columns:
+                data_type = pa.date32()
+            elif column in self.decimal_columns:
+                data_type = pa.decimal128(20, 2)
+            elif column in self.list_columns:
+                data_type = pa.list_(pa.int32())
+            elif _is_code_column(chunk[column]):
+                data_type = pa.int32()
+                self._code_columns.append(column)
+            else:
+                data_type = pa.string()
+            fields.append(pa.field(column, data_type))
+        return pa.schema(fields)
+
+    def _to_arrow(self, frame: pd.DataFrame, schema: pa.Schema) -> pa.Table:
+        arrays = []
+        for field in schema:
+            if field.name in self.list_columns:
+                arrays.append(pa.array(frame[field.name].map(_parse_array_literal), type=field.type))
+                continue
+            is_code = field.name in self._code_columns
+            source_type = pa.int32() if is_code else pa.string()
+            values = frame[field.name]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype("Int64" if is_code else object)
+            array = pa.array(values, type=source_type, from_pandas=True)
+            arrays.append(array if source_type == field.type else array.cast(field.type))
+        return pa.Table.from_arrays(arrays, schema=schema)
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        if chunk.empty:
+            return
+        if self._schema is None:
+            self._schema = self._build_schema(chunk)
+        schema = self._schema
+
+        if self.partition_column is None:
+            groups = [("", chunk)]
+        else:
+            keys = chunk[self.partition_column].astype(object).fillna(NULL_PARTITION)
+            groups = list(chunk.groupby(keys, sort=False))
+
+        for value, frame in groups:
+            partition = f"{self.partition_column}={value}" if self.partition_column else ""
+            self._buffers.setdefault(partition, []).append(self._to_arrow(frame, schema))
+            self._buffered_rows[partition] = self._buffered_rows.get(partition, 0) + len(frame)
+            if self._buffered_rows[partition] >= ROW_GROUP_ROWS:
+                self._flush(partition)
+
+        self.rows += len(chunk)
+
+    def _flush(self, partition: str) -> None:
+        tables = self._buffers.pop(partition, [])
+        self._buffered_rows.pop(partition, None)
+        if not tables:
+            return
+
+        writer = self._writers.get(partition)
+        if writer is None:
+            path = self.staging / partition / self.file_name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            writer = pq.ParquetWriter(
+                path,
+                self._schema,
+                compression="zstd",
+                use_dictionary=self._code_columns,
+            )
+            self._writers[partition] = writer
+
+        writer.write_table(pa.concat_tables(tables), row_group_size=ROW_GROUP_ROWS)
+
+    def close(self) -> None:
+        for partition in list(self._buffers):
+            self._flush(partition)
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+
+    def publish(self) -> None:
+        """Moves the written files into the layout, replacing this source's previous files."""
+        written = {path.relative_to(self.staging) for path in self.staging.rglob(self.file_name)}
+        for previous in self.directory.rglob(self.file_name):
+            if previous.relative_to(self.directory) not in written:
+                previous.unlink()
+        for relative in sorted(written):
+            target = self.directory / relative
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(self.staging / relative, target)
+        self.discard()
+
+    def discard(self) -> None:
+        shutil.rmtree(self.staging, ignore_errors=True)
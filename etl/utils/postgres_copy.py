@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+from collections.abc import Callable
 from io import StringIO
 
 import pandas as pd
-from sqlalchemy import Engine, text
+from sqlalchemy import Connection, Engine, text
 
 
 def quote_ident(identifier: str) -> str:
@@ -22,6 +23,31 @@ def _qualified_table_name(schema: str | None, table: str) -> str:
     return quoted_table
 
 
+def _format_categories(dataframe: pd.DataFrame) -> pd.DataFrame:
+    # Categorical columns are formatted once per category; the CSV writer then
+    # copies the shared strings instead of converting every cell.
+    formatted = {
+        col: dataframe[col].cat.rename_categories(dataframe[col].cat.categories.astype(str))
+        for col in dataframe.columns
+        if isinstance(dataframe[col].dtype, pd.CategoricalDtype)
+    }
+    return dataframe.assign(**formatted) if formatted else dataframe
+
+
+def encode_copy_csv(dataframe: pd.DataFrame) -> StringIO:
+    """The CSV body COPY ... FROM STDIN reads (no header, NULL as empty)."""
+    csv_buffer = StringIO()
+    _format_categories(dataframe).to_csv(
+        csv_buffer,
+        index=False,
+        header=False,
+        sep=",",
+        na_rep="",
+    )
+    csv_buffer.seek(0)
+    return csv_buffer
+
+
 def copy_dataframe_to_staging(
     engine: Engine,
     dataframe: pd.DataFrame,
@@ -33,16 +59,7 @@ def copy_dataframe_to_staging(
 
     table_name = _qualified_table_name(schema, staging_table)
     columns = [_quote_ident(col) for col in dataframe.columns]
-    csv_buffer = StringIO()
-
-    dataframe.to_csv(
-        csv_buffer,
-        index=False,
-        header=False,
-        sep=",",
-        na_rep="",
-    )
-    csv_buffer.seek(0)
+    csv_buffer = encode_copy_csv(dataframe)
 
     copy_sql = (
         f"COPY {table_name} ({', '.join(columns)}) "
@@ -74,11 +91,24 @@ def upsert_from_staging(
     conflict_columns: list[str],
     schema: str | None = None,
     conflict_expressions: list[str] | None = None,
+    partition_columns: list[str] | None = None,
+    changed_keys_table: str | None = None,
+    changed_key_column: str = "cnpj_basico",
+    insert_order: list[str] | None = None,
+    before: Callable[[Connection], None] | None = None,
 ) -> None:
+    """Upserts the staging table into the target and empties the staging table, in one transaction.
+
+    ``before`` runs first on the same connection, while the staging table
+    still holds the rows: derived tables it writes commit or roll back with
+    the upsert.
+    """
     if not insert_columns:
         raise ValueError("insert_columns cannot be empty")
     if not conflict_columns:
         raise ValueError("conflict_columns cannot be empty")
+    if partition_columns and not set(partition_columns) < set(conflict_columns):
+        raise ValueError("partition_columns must be a strict subset of conflict_columns")
 
     update_columns = [col for col in insert_columns if col not in conflict_columns]
 
@@ -93,25 +123,80 @@ def upsert_from_staging(
         conflict_target_sql = ", ".join(_quote_ident(col) for col in conflict_columns)
         distinct_on_sql = conflict_target_sql
 
+    # On a partitioned target the unique key has to include the partition key,
+    # so a row whose partition column changed would be inserted next to its old
+    # version. Dedup on the row key alone and delete the stale copy first.
+    move_sql = None
+    if partition_columns:
+        key_columns = [col for col in conflict_columns if col not in partition_columns]
+        distinct_on_sql = ", ".join(_quote_ident(col) for col in key_columns)
+        key_match_sql = " AND ".join(
+            f"t.{_quote_ident(col)} = s.{_quote_ident(col)}" for col in key_columns
+        )
+        moved_sql = " OR ".join(
+            f"t.{_quote_ident(col)} IS DISTINCT FROM s.{_quote_ident(col)}" for col in partition_columns
+        )
+        move_sql = f"""
+            DELETE FROM {qualified_target} t
+            USING {qualified_staging} s
+            WHERE {key_match_sql}
+              AND ({moved_sql})
+        """
+
     if update_columns:
         update_set_sql = ", ".join(
             f"{_quote_ident(col)} = EXCLUDED.{_quote_ident(col)}" for col in update_columns
         )
-        on_conflict_sql = f"DO UPDATE SET {update_set_sql}"
+        # Monthly releases resend every row; skipping identical rows avoids a
+        # dead tuple per unchanged record and keeps RETURNING to real changes.
+        target_row_sql = ", ".join(f"t.{_quote_ident(col)}" for col in update_columns)
+        excluded_row_sql = ", ".join(f"EXCLUDED.{_quote_ident(col)}" for col in update_columns)
+        on_conflict_sql = (
+            f"DO UPDATE SET {update_set_sql} "
+            f"WHERE ROW({target_row_sql}) IS DISTINCT FROM ROW({excluded_row_sql})"
+        )
     else:
         on_conflict_sql = "DO NOTHING"
 
-    upsert_sql = f"""
-        INSERT INTO {qualified_target} ({insert_cols_sql})
+    select_sql = f"""
         SELECT DISTINCT ON ({distinct_on_sql}) {insert_cols_sql}
         FROM {qualified_staging}
         ORDER BY {distinct_on_sql}
+    """
+    # New rows are appended to the heap in the order they are inserted; a
+    # different order than the key's lets BRIN indexes on other columns work.
+    if insert_order:
+        order_sql = ", ".join(_quote_ident(col) for col in insert_order)
+        select_sql = f"SELECT * FROM ({select_sql}) s ORDER BY {order_sql}"
+
+    upsert_sql = f"""
+        INSERT INTO {qualified_target} AS t ({insert_cols_sql})
+        {select_sql}
         ON CONFLICT ({conflict_target_sql})
         {on_conflict_sql}
     """
 
+    # Records the keys of inserted/updated rows so derived tables can be
+    # refreshed for just the companies an import actually changed.
+    if changed_keys_table:
+        qualified_changed = _qualified_table_name(schema, changed_keys_table)
+        key_sql = _quote_ident(changed_key_column)
+        upsert_sql = f"""
+            WITH changed AS (
+                {upsert_sql}
+                RETURNING t.{key_sql}
+            )
+            INSERT INTO {qualified_changed} ({key_sql})
+            SELECT DISTINCT {key_sql} FROM changed
+            ON CONFLICT DO NOTHING
+        """
+
     truncate_sql = f"TRUNCATE TABLE {qualified_staging}"
 
     with engine.begin() as connection:
+        if before is not None:
+            before(connection)
+        if move_sql is not None:
+            connection.execute(text(move_sql))
         connection.execute(text(upsert_sql))
         connection.execute(text(truncate_sql))
@@ -0,0 +1,467 @@
+"""Helpers for data migrations on large tables.
+
+Backfills, dedups and rewrites run in keyset-paginated batches, each one an
+autocommitted statement that also records its progress, so a migration never
+holds one transaction (and its locks) over the whole table and an interrupted
+run resumes where it stopped. Indexes are built CONCURRENTLY by default.
+
+Every helper opens its own ``autocommit_block``; do not call them from inside one.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from alembic import op
+from sqlalchemy import Connection, exc, text
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+BATCH_SIZE = 10_000
+# Pause between batches, so replication and autovacuum keep up and the API's
+# queries are not starved.
+PAUSE_SECONDS = 0.05
+# A batch waits at most this long for a row lock (e.g. an ETL merge) before
+# backing off and retrying, instead of queueing everything behind it.
+LOCK_TIMEOUT = "5s"
+LOCK_RETRIES = 5
+PROGRESS_LOG_SECONDS = 10
+
+LOCK_NOT_AVAILABLE = "55P03"
+
+PROGRESS_TABLE = "migracao_progresso"
+
+PROGRESS_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {PROGRESS_TABLE} (
+        nome TEXT PRIMARY KEY,
+        ultima_chave TEXT NOT NULL,
+        lotes BIGINT NOT NULL,
+        linhas BIGINT NOT NULL,
+        atualizado_em TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+"""
+
+KEY_TYPE_SQL = """
+    SELECT format_type(atttypid, atttypmod)
+    FROM pg_attribute
+    WHERE attrelid = CAST(:tabela AS regclass)
+      AND attname = :coluna
+      AND NOT attisdropped
+"""
+
+COLUMNS_SQL = """
+    SELECT attname, format_type(atttypid, atttypmod) AS tipo, attnotnull
+    FROM pg_attribute
+    WHERE attrelid = CAST(:tabela AS regclass)
+      AND attnum > 0
+      AND NOT attisdropped
+"""
+
+SHADOW_SUFFIX = "_novo"
+
+INVALID_INDEX_SQL = """
+    SELECT NOT indisvalid
+    FROM pg_index
+    WHERE indexrelid = to_regclass(:nome)
+"""
+
+
+def _batch_sql(table: str, key: str, key_type: str, statement: str, resume: bool) -> str:
+    # The batch, its work and its progress row commit together: after a crash
+    # the stored key is exactly the last batch that was applied.
+    after = f"WHERE {key} > CAST(:apos AS {key_type})" if resume else ""
+    return f"""
+        WITH lote AS (
+            SELECT {key} AS chave
+            FROM {table}
+            {after}
+            ORDER BY {key}
+            LIMIT :tamanho
+        ),
+        alterado AS ({statement}),
+        progresso AS (
+            INSERT INTO {PROGRESS_TABLE} AS p (nome, ultima_chave, lotes, linhas)
+            SELECT :nome, max(chave)::text, 1, (SELECT count(*) FROM alterado)
+            FROM lote
+            HAVING count(*) > 0
+            ON CONFLICT (nome) DO UPDATE
+            SET ultima_chave = EXCLUDED.ultima_chave,
+                lotes = p.lotes + 1,
+                linhas = p.linhas + EXCLUDED.linhas,
+                atualizado_em = now()
+        )
+        SELECT max(chave)::text, count(*), (SELECT count(*) FROM alterado)
+        FROM lote
+    """
+
+
+def _execute_retrying(connection: Connection, sql: str, params: dict[str, object]) -> Any:
+    # Run with lock_timeout set: a statement that waited too long for a lock
+    # backs off and is tried again.
+    attempt = 1
+    while True:
+        try:
+            return connection.execute(text(sql), params)
+        except exc.OperationalError as error:
+            if getattr(error.orig, "pgcode", None) != LOCK_NOT_AVAILABLE or attempt >= LOCK_RETRIES:
+                raise
+            logger.warning("migracao.lock_timeout", nome=params["nome"], tentativa=attempt)
+            time.sleep(attempt)
+            attempt += 1
+
+
+def _execute_batch(connection: Connection, sql: str, params: dict[str, object]) -> tuple[str | None, int, int]:
+    last, read, changed = _execute_retrying(connection, sql, params).one()
+    return last, read, changed
+
+
+def run_in_batches(
+    name: str,
+    table: str,
+    key: str,
+    statement: str,
+    batch_size: int = BATCH_SIZE,
+    pause: float = PAUSE_SECONDS,
+) -> int:
+    """Runs ``statement`` over ``table`` in batches of ``key`` order; returns the rows it touched.
+
+    ``statement`` is a data-modifying statement that joins the CTE ``lote``
+    (column ``chave``: the keys of the batch) and ends with ``RETURNING 1``.
+    It has to be idempotent: a resumed run starts after the last committed
+    batch, and a finished run deletes its progress row, so re-running the
+    migration (e.g. after a later step failed) redoes the whole pass. ``key``
+    should be unique and indexed.
+    """
+    context = op.get_context()
+    if context.as_sql:
+        raise RuntimeError(f"{name}: migracao em lotes nao roda em modo offline (--sql)")
+
+    started = time.monotonic()
+    batches = rows = 0
+    with context.autocommit_block():
+        connection = op.get_bind()
+        connection.execute(text(PROGRESS_DDL))
+        key_type = connection.execute(text(KEY_TYPE_SQL), {"tabela": table, "coluna": key}).scalar_one()
+        after = connection.execute(
+            text(f"SELECT ultima_chave FROM {PROGRESS_TABLE} WHERE nome = :nome"), {"nome": name}
+        ).scalar()
+        if after is not None:
+            logger.info("migracao.retomada", nome=name, apos=after)
+
+        connection.execute(text(f"SET lock_timeout = '{LOCK_TIMEOUT}'"))
+        try:
+            logged = time.monotonic()
+            while True:
+                sql = _batch_sql(table, key, key_type, statement, resume=after is not None)
+                last, read, changed = _execute_batch(
+                    connection, sql, {"nome": name, "apos": after, "tamanho": batch_size}
+                )
+                if not read:
+                    break
+                after = last
+                batches += 1
+                rows += changed
+                if time.monotonic() - logged >= PROGRESS_LOG_SECONDS:
+                    logger.info("migracao.progresso", nome=name, lotes=batches, linhas=rows, apos=after)
+                    logged = time.monotonic()
+                if pause:
+                    time.sleep(pause)
+
+            connection.execute(text(f"DELETE FROM {PROGRESS_TABLE} WHERE nome = :nome"), {"nome": name})
+        finally:
+            connection.execute(text("RESET lock_timeout"))
+
+    logger.info(
+        "migracao.concluida",
+        nome=name,
+        lotes=batches,
+        linhas=rows,
+        segundos=round(time.monotonic() - started, 3),
+    )
+    return rows
+
+
+def backfill(
+    name: str,
+    table: str,
+    key: str,
+    assignments: str,
+    where: str | None = None,
+    batch_size: int = BATCH_SIZE,
+    pause: float = PAUSE_SECONDS,
+) -> int:
+    """``UPDATE table t SET assignments`` in batches; ``where`` should skip rows already done.
+
+    To change a column's type, use :func:`shadow_columns` and :func:`swap_columns`.
+    """
+    condition = f" AND ({where})" if where else ""
+    statement = f"""
+        UPDATE {table} t
+        SET {assignments}
+        FROM lote
+        WHERE t.{key} = lote.chave{condition}
+        RETURNING 1
+    """
+    return run_in_batches(name, table, key, statement, batch_size, pause)
+
+
+def delete_duplicates(
+    name: str,
+    table: str,
+    key: str,
+    columns: list[str],
+    batch_size: int = BATCH_SIZE,
+    pause: float = PAUSE_SECONDS,
+) -> int:
+    """Keeps the lowest ``key`` of each group of rows equal on ``columns``.
+
+    ``columns`` are expressions over the placeholder ``{t}``, e.g.
+    ``"COALESCE({t}.nome_socio, '')"``; the first one should be indexed, since
+    every batch probes it once per row.
+    """
+    same = " AND ".join(f"{column.replace('{t}', 'b')} = {column.replace('{t}', 'a')}" for column in columns)
+    statement = f"""
+        DELETE FROM {table} a
+        USING lote
+        WHERE a.{key} = lote.chave
+          AND EXISTS (
+              SELECT 1
+              FROM {table} b
+              WHERE b.{key} < a.{key}
+                AND {same}
+          )
+        RETURNING 1
+    """
+    return run_in_batches(name, table, key, statement, batch_size, pause)
+
+
+def shadow(name: str) -> str:
+    """Name of the copy of a column (or index) that :func:`swap_columns` puts in its place."""
+    return f"{name}{SHADOW_SUFFIX}"
+
+
+def _sync_function(table: str) -> str:
+    return f"{table}_sincroniza{SHADOW_SUFFIX}"
+
+
+def _not_null_check(table: str, column: str) -> str:
+    return f"ck_{table}_{column}_not_null"
+
+
+def _validate_not_null(connection: Connection, table: str, column: str) -> None:
+    # A validated CHECK lets SET NOT NULL skip its scan of the table; VALIDATE
+    # scans without blocking reads or writes.
+    check = _not_null_check(table, column)
+    connection.execute(
+        text(
+            f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {check}, "
+            f"ADD CONSTRAINT {check} CHECK ({column} IS NOT NULL) NOT VALID"
+        )
+    )
+    connection.execute(text(f"ALTER TABLE {table} VALIDATE CONSTRAINT {check}"))
+
+
+def _columns(connection: Connection, table: str) -> dict[str, Any]:
+    return {row.attname: row for row in connection.execute(text(COLUMNS_SQL), {"tabela": table})}
+
+
+def _run_locked(connection: Connection, name: str, statements: list[str]) -> None:
+    # One DO block is one transaction: the ACCESS EXCLUSIVE locks are held
+    # only for the catalog changes, never queued behind a long query.
+    body = "".join(f"\n    {statement};" for statement in statements)
+    connection.execute(text(f"SET lock_timeout = '{LOCK_TIMEOUT}'"))
+    try:
+        _execute_retrying(connection, f"DO $$\nBEGIN{body}\nEND\n$$", {"nome": name})
+    finally:
+        connection.execute(text("RESET lock_timeout"))
+
+
+def shadow_columns(
+    name: str,
+    table: str,
+    key: str,
+    columns: list[tuple[str, str, str]],
+    batch_size: int = BATCH_SIZE,
+    pause: float = PAUSE_SECONDS,
+) -> int:
+    """Fills a copy of each column with its new type; returns the rows it touched.
+
+    ``columns`` are ``(column, type, expression)``, the expression over the
+    placeholder ``{t}``, e.g. ``("pais", "SMALLINT", "NULLIF({t}.pais, '')::smallint")``.
+    Each copy (:func:`shadow` of the column) is added without a default, so
+    the table is not rewritten, kept current by a trigger for rows written
+    meanwhile and backfilled in batches. A NOT NULL column gets a validated
+    CHECK on its copy. Build the indexes the copies need, named and defined
+    with :func:`shadow`, then call :func:`swap_columns`. A column that already
+    has the new type (a re-run after the swap) is skipped.
+    """
+    if op.get_context().as_sql:
+        raise RuntimeError(f"{name}: migracao em lotes nao roda em modo offline (--sql)")
+
+    function = _sync_function(table)
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        additions = ", ".join(f"ADD COLUMN IF NOT EXISTS {shadow(column)} {type_}" for column, type_, _ in columns)
+        connection.execute(text(f"ALTER TABLE {table} {additions}"))
+        current = _columns(connection, table)
+        pending = [spec for spec in columns if current[spec[0]].tipo != current[shadow(spec[0])].tipo]
+        done = [column for column, _, _ in columns if column not in {spec[0] for spec in pending}]
+        if done:
+            drops = ", ".join(f"DROP COLUMN {shadow(column)}" for column in done)
+            connection.execute(text(f"ALTER TABLE {table} {drops}"))
+        if not pending:
+            return 0
+
+        assignments = "".join(
+            f"\n    NEW.{shadow(column)} := {expression.replace('{t}', 'NEW')};" for column, _, expression in pending
+        )
+        connection.execute(
+            text(
+                f"""
+                CREATE OR REPLACE FUNCTION {function}() RETURNS trigger LANGUAGE plpgsql AS $$
+                BEGIN{assignments}
+                    RETURN NEW;
+                END
+                $$
+                """
+            )
+        )
+        connection.execute(
+            text(
+                f"""
+                CREATE OR REPLACE TRIGGER {function}
+                BEFORE INSERT OR UPDATE ON {table}
+                FOR EACH ROW EXECUTE FUNCTION {function}()
+                """
+            )
+        )
+
+    converted = [(shadow(column), expression.replace("{t}", "t")) for column, _, expression in pending]
+    rows = backfill(
+        name,
+        table,
+        key,
+        ", ".join(f"{copy} = {expression}" for copy, expression in converted),
+        where=" OR ".join(f"t.{copy} IS DISTINCT FROM {expression}" for copy, expression in converted),
+        batch_size=batch_size,
+        pause=pause,
+    )
+
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        for column, _, _ in pending:
+            if current[column].attnotnull:
+                _validate_not_null(connection, table, shadow(column))
+    return rows
+
+
+def swap_columns(
+    table: str,
+    columns: list[str],
+    indexes: list[tuple[str, str, bool]] | None = None,
+    primary_key: str | None = None,
+    partitions: list[str] | None = None,
+    drop: list[str] | None = None,
+) -> None:
+    """Puts the copies filled by :func:`shadow_columns` in place of ``columns``.
+
+    ``indexes`` are ``(name, definition, unique)`` as in :func:`create_index`,
+    the definition over the copies (``shadow("codigo")``): each is built
+    first as :func:`shadow` of its name and takes the name in the swap, so
+    readers are never left without it. ``primary_key`` names one of them.
+    The swap itself is one short transaction that drops the old columns (with
+    the indexes and constraints on them) and ``drop``, other columns that go
+    with them, and renames the copies. Does nothing once the swap is done.
+    """
+    function = _sync_function(table)
+    with op.get_context().autocommit_block():
+        current = _columns(op.get_bind(), table)
+    swapped = [column for column in columns if shadow(column) in current]
+    dropped = [column for column in [*swapped, *(drop or [])] if column in current]
+    if not dropped:
+        return
+
+    for name, definition, unique in indexes or []:
+        create_index(shadow(name), table, definition, unique=unique, partitions=partitions)
+
+    statements = [f"DROP TRIGGER IF EXISTS {function} ON {table}"]
+    statements.append(f"ALTER TABLE {table} " + ", ".join(f"DROP COLUMN {column}" for column in dropped))
+    for column in swapped:
+        statements.append(f"ALTER TABLE {table} RENAME COLUMN {shadow(column)} TO {column}")
+        if current[column].attnotnull:
+            check = _not_null_check(table, shadow(column))
+            statements.append(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL, DROP CONSTRAINT {check}")
+    for name, _, _ in indexes or []:
+        for index in [name, *(name.replace(table, partition, 1) for partition in partitions or [])]:
+            statements.append(f"ALTER INDEX {shadow(index)} RENAME TO {index}")
+    if primary_key:
+        statements.append(f"ALTER TABLE {table} ADD CONSTRAINT {primary_key} PRIMARY KEY USING INDEX {primary_key}")
+
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        _run_locked(connection, table, statements)
+        connection.execute(text(f"DROP FUNCTION IF EXISTS {function}()"))
+
+
+def set_not_null(table: str, column: str) -> None:
+    """``ALTER COLUMN column SET NOT NULL`` without holding ACCESS EXCLUSIVE during the scan."""
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        if _columns(connection, table)[column].attnotnull:
+            return
+        _validate_not_null(connection, table, column)
+        check = _not_null_check(table, column)
+        _run_locked(connection, table, [f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL, DROP CONSTRAINT {check}"])
+
+
+def _create_index_concurrently(name: str, table: str, definition: str, unique: bool) -> None:
+    # A failed concurrent build leaves an INVALID index behind; rebuild it
+    # rather than letting IF NOT EXISTS skip it.
+    if op.get_bind().execute(text(INVALID_INDEX_SQL), {"nome": name}).scalar():
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    op.execute(f"CREATE {kind} CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}")
+
+
+def create_index(
+    name: str,
+    table: str,
+    definition: str,
+    unique: bool = False,
+    partitions: list[str] | None = None,
+    concurrently: bool = True,
+) -> None:
+    """Creates an index without blocking writes; ``definition`` is what follows ``ON table``.
+
+    On a partitioned table pass its ``partitions``: the parent index is created
+    ``ON ONLY`` the table, each partition's index (``name`` with ``table``
+    replaced by the partition) concurrently, and then attached. Re-running
+    after a failure picks up where it stopped.
+    """
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    if not concurrently:
+        op.execute(f"CREATE {kind} IF NOT EXISTS {name} ON {table} {definition}")
+        return
+
+    if partitions:
+        op.execute(f"CREATE {kind} IF NOT EXISTS {name} ON ONLY {table} {definition}")
+    with op.get_context().autocommit_block():
+        if not partitions:
+            _create_index_concurrently(name, table, definition, unique)
+            return
+        for partition in partitions:
+            partition_index = name.replace(table, partition, 1)
+            _create_index_concurrently(partition_index, partition, definition, unique)
+            op.execute(f"ALTER INDEX {name} ATTACH PARTITION {partition_index}")
+
+
+def drop_index(name: str, concurrently: bool = True) -> None:
+    """Drops an index if it exists; the parent index of a partitioned table needs ``concurrently=False``."""
+    if not concurrently:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+        return
+    with op.get_context().autocommit_block():
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
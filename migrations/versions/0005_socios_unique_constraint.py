@@ -9,6 +9,8 @@ from __future__ import annotations
 
 from alembic import op
 
+from migrations.batched import delete_duplicates
+
 revision = "0005_socios_unique_constraint"
 down_revision = "0004_performance_indexes"
 branch_labels = None
@@ -17,15 +19,11 @@ depends_on = None
 
 def upgrade() -> None:
     # Remove duplicate rows before adding unique constraint
-    op.execute(
-        """
-        DELETE FROM socios a
-        USING socios b
-        WHERE a.id > b.id
-          AND a.cnpj_basico = b.cnpj_basico
-          AND COALESCE(a.nome_socio, '') = COALESCE(b.nome_socio, '')
-          AND COALESCE(a.cpf_cnpj_socio, '') = COALESCE(b.cpf_cnpj_socio, '')
-        """
+    delete_duplicates(
+        "0005_socios_duplicados",
+        "socios",
+        "id",
+        ["{t}.cnpj_basico", "COALESCE({t}.nome_socio, '')", "COALESCE({t}.cpf_cnpj_socio, '')"],
     )
     op.create_index(
         "uq_socios_basico_nome_cpf",
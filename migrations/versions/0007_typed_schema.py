@@ -0,0 +1,225 @@
+"""compact typed schema: numeric codes, NUMERIC capital_social, CHAR cnpj keys, no estabelecimentos.id
+
+Revision ID: 0007_typed_schema
+Revises: 0006_fix_indices_and_socios_unique
+Create Date: 2026-02-18 00:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+from migrations.batched import drop_index, shadow, shadow_columns, swap_columns
+
+revision = "0007_typed_schema"
+down_revision = "0006_fix_indices_and_socios_unique"
+branch_labels = None
+depends_on = None
+
+# (column, SQL type, zero-padded width in the Receita files) per table
+CODE_COLUMNS = {
+    "empresas": [
+        ("natureza_juridica", "SMALLINT", 4),
+        ("porte_empresa", "SMALLINT", 2),
+    ],
+    "estabelecimentos": [
+        ("situacao", "SMALLINT", 2),
+        ("motivo", "SMALLINT", 2),
+        ("pais", "SMALLINT", 3),
+        ("municipio", "SMALLINT", 4),
+        ("cnae_principal", "INTEGER", 7),
+    ],
+    "socios": [
+        ("qualificacao", "SMALLINT", 2),
+        ("pais", "SMALLINT", 3),
+    ],
+    "cnaes": [("codigo", "INTEGER", 7)],
+    "motivos": [("codigo", "SMALLINT", 2)],
+    "municipios": [("codigo", "SMALLINT", 4)],
+    "naturezas": [("codigo", "SMALLINT", 4)],
+    "paises": [("codigo", "SMALLINT", 3)],
+    "qualificacoes": [("codigo", "SMALLINT", 2)],
+}
+
+CNPJ_KEY_COLUMNS = {
+    "empresas": [("cnpj_basico", 8)],
+    "estabelecimentos": [("cnpj_completo", 14), ("cnpj_basico", 8)],
+    "socios": [("cnpj_basico", 8)],
+    "simples": [("cnpj_basico", 8)],
+}
+
+# capital_social as published ("1500,00") to NUMERIC
+CAPITAL_SOCIAL = (
+    "CASE WHEN replace(btrim({t}.capital_social), ',', '.') ~ '^[0-9]+(\\.[0-9]+)?$' "
+    "THEN replace(btrim({t}.capital_social), ',', '.')::numeric END"
+)
+
+# Batch key of each large table.
+LARGE_TABLES = {
+    "empresas": "cnpj_basico",
+    "estabelecimentos": "id",
+    "socios": "id",
+    "simples": "cnpj_basico",
+}
+
+# Indexes on the converted columns, rebuilt on the typed copies before the
+# swap: (name, definition, unique) as taken by swap_columns.
+SWAP_INDEXES = {
+    "empresas": [("empresas_pkey", f"({shadow('cnpj_basico')})", True)],
+    "simples": [("simples_pkey", f"({shadow('cnpj_basico')})", True)],
+    "socios": [
+        ("idx_socios_cnpj_basico", f"({shadow('cnpj_basico')})", False),
+        (
+            "uix_socios_cnpj_nome_cpf",
+            f"({shadow('cnpj_basico')}, COALESCE(nome_socio, ''), COALESCE(cpf_cnpj_socio, ''))",
+            True,
+        ),
+    ],
+    # The plain cnpj_completo index and the unique constraint are not rebuilt:
+    # they duplicate the new primary key.
+    "estabelecimentos": [
+        ("estabelecimentos_pkey", f"({shadow('cnpj_completo')})", True),
+        ("idx_estabelecimentos_cnpj_basico", f"({shadow('cnpj_basico')})", False),
+        ("idx_estabelecimentos_ativos", f"({shadow('cnpj_basico')}) WHERE {shadow('situacao')} = 2", False),
+    ],
+}
+
+PRIMARY_KEYS = {
+    "empresas": "empresas_pkey",
+    "simples": "simples_pkey",
+    "estabelecimentos": "estabelecimentos_pkey",
+}
+
+REFERENCE_TABLES = ["cnaes", "motivos", "municipios", "naturezas", "paises", "qualificacoes"]
+
+# Staging tables are created lazily by the processors with CREATE TABLE IF NOT
+# EXISTS; dropping them makes the next ETL run recreate them with the new types.
+STAGING_TABLES = [
+    "stg_empresas",
+    "stg_estabelecimentos",
+    "stg_socios",
+    "stg_simples",
+    "stg_cnaes",
+    "stg_motivos",
+    "stg_municipios",
+    "stg_naturezas",
+    "stg_paises",
+    "stg_qualificacoes",
+]
+
+
+def _to_code(column: str, sql_type: str) -> str:
+    return f"CASE WHEN btrim({{t}}.{column}) ~ '^[0-9]+$' THEN btrim({{t}}.{column})::{sql_type} END"
+
+
+def _conversions(table: str) -> list[tuple[str, str, str]]:
+    # (column, new type, expression over {t}) as taken by shadow_columns
+    conversions = [
+        (column, f"CHAR({length})", f"{{t}}.{column}") for column, length in CNPJ_KEY_COLUMNS.get(table, [])
+    ]
+    conversions += [
+        (column, sql_type, _to_code(column, sql_type)) for column, sql_type, _ in CODE_COLUMNS.get(table, [])
+    ]
+    if table == "empresas":
+        conversions.append(("capital_social", "NUMERIC(20, 2)", CAPITAL_SOCIAL))
+    return conversions
+
+
+def _from_code(column: str, width: int) -> str:
+    return f"ALTER COLUMN {column} TYPE VARCHAR USING lpad({column}::text, {width}, '0')"
+
+
+def _drop_foreign_keys() -> None:
+    op.execute("ALTER TABLE estabelecimentos DROP CONSTRAINT IF EXISTS estabelecimentos_cnpj_basico_fkey")
+    op.execute("ALTER TABLE socios DROP CONSTRAINT IF EXISTS socios_cnpj_basico_fkey")
+
+
+def _add_foreign_keys() -> None:
+    # NOT VALID + VALIDATE, committed apart, keeps the validation scan under a
+    # SHARE UPDATE EXCLUSIVE lock.
+    for table in ("estabelecimentos", "socios"):
+        op.execute(
+            f"""
+            ALTER TABLE {table}
+            ADD CONSTRAINT {table}_cnpj_basico_fkey
+            FOREIGN KEY (cnpj_basico) REFERENCES empresas (cnpj_basico) NOT VALID
+            """
+        )
+    with op.get_context().autocommit_block():
+        for table in ("estabelecimentos", "socios"):
+            op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {table}_cnpj_basico_fkey")
+
+
+def upgrade() -> None:
+    for staging_table in STAGING_TABLES:
+        op.execute(f"DROP TABLE IF EXISTS {staging_table}")
+
+    drop_index("idx_estabelecimentos_cnpj_completo")
+    _drop_foreign_keys()
+
+    # The reference tables are tiny: one ALTER TABLE each rewrites them in place.
+    for table in REFERENCE_TABLES:
+        op.execute(f"DELETE FROM {table} WHERE btrim(codigo) !~ '^[0-9]+$'")
+        clauses = [
+            f"ALTER COLUMN {column} TYPE {sql_type} USING {expression.replace('{t}.', '')}"
+            for column, sql_type, expression in _conversions(table)
+        ]
+        op.execute(f"ALTER TABLE {table} {', '.join(clauses)}")
+
+    # The large ones are not rewritten under an exclusive lock: typed copies
+    # of the columns are filled in batches, their indexes built concurrently,
+    # and the copies swapped in.
+    for table, key in LARGE_TABLES.items():
+        shadow_columns(f"0007_{table}", table, key, _conversions(table))
+        swap_columns(
+            table,
+            [column for column, _, _ in _conversions(table)],
+            indexes=SWAP_INDEXES[table],
+            primary_key=PRIMARY_KEYS.get(table),
+            drop=["id"] if table == "estabelecimentos" else None,
+        )
+
+    _add_foreign_keys()
+
+
+def downgrade() -> None:
+    for staging_table in STAGING_TABLES:
+        op.execute(f"DROP TABLE IF EXISTS {staging_table}")
+
+    op.execute("DROP INDEX IF EXISTS idx_estabelecimentos_ativos")
+    _drop_foreign_keys()
+    op.execute("ALTER TABLE estabelecimentos DROP CONSTRAINT IF EXISTS estabelecimentos_pkey")
+
+    for table in ["empresas", "estabelecimentos", "socios", "simples", *REFERENCE_TABLES]:
+        clauses = [
+            f"ALTER COLUMN {column} TYPE VARCHAR({length})"
+            for column, length in CNPJ_KEY_COLUMNS.get(table, [])
+        ]
+        clauses += [_from_code(column, width) for column, _, width in CODE_COLUMNS.get(table, [])]
+        if table == "empresas":
+            clauses.append(
+                "ALTER COLUMN capital_social TYPE VARCHAR USING replace(capital_social::text, '.', ',')"
+            )
+        if table == "estabelecimentos":
+            clauses.append("ADD COLUMN id SERIAL")
+        op.execute(f"ALTER TABLE {table} {', '.join(clauses)}")
+
+    op.execute("ALTER TABLE estabelecimentos ADD CONSTRAINT estabelecimentos_pkey PRIMARY KEY (id)")
+    op.execute(
+        "ALTER TABLE estabelecimentos "
+        "ADD CONSTRAINT estabelecimentos_cnpj_completo_key UNIQUE (cnpj_completo)"
+    )
+    _add_foreign_keys()
+
+    op.create_index(
+        "idx_estabelecimentos_cnpj_completo",
+        "estabelecimentos",
+        ["cnpj_completo"],
+    )
+    op.execute(
+        """
+        CREATE INDEX idx_estabelecimentos_ativos
+        ON estabelecimentos (cnpj_basico)
+        WHERE situacao = '02'
+        """
+    )
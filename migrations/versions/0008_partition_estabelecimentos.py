@@ -0,0 +1,138 @@
+"""list-partition estabelecimentos into active (situacao = 2) and inactive partitions
+
+Revision ID: 0008_partition_estabelecimentos
+Revises: 0007_typed_schema
+Create Date: 2026-02-19 00:00:00
+"""
+
+from __future__ import annotations
+
+import os
+
+from alembic import context, op
+
+revision = "0008_partition_estabelecimentos"
+down_revision = "0007_typed_schema"
+branch_labels = None
+depends_on = None
+
+COLUMNS = """
+    cnpj_completo CHAR(14) NOT NULL,
+    cnpj_basico CHAR(8) NOT NULL,
+    nome_fantasia VARCHAR,
+    situacao SMALLINT,
+    uf VARCHAR(2),
+    municipio SMALLINT,
+    cnae_principal INTEGER,
+    cnae_secundario VARCHAR,
+    pais SMALLINT,
+    motivo SMALLINT
+"""
+
+COLUMN_NAMES = (
+    "cnpj_completo, cnpj_basico, nome_fantasia, situacao, uf, "
+    "municipio, cnae_principal, cnae_secundario, pais, motivo"
+)
+
+
+def _add_foreign_key() -> None:
+    op.execute(
+        """
+        ALTER TABLE estabelecimentos
+        ADD CONSTRAINT estabelecimentos_cnpj_basico_fkey
+        FOREIGN KEY (cnpj_basico) REFERENCES empresas (cnpj_basico)
+        """
+    )
+
+
+def _inativos_tablespace() -> str:
+    # alembic -x inativos_tablespace=<nome> upgrade head, or the environment
+    # variable; read here so the migration does not depend on app settings.
+    tablespace = context.get_x_argument(as_dictionary=True).get(
+        "inativos_tablespace", os.environ.get("ESTABELECIMENTOS_INATIVOS_TABLESPACE", "")
+    )
+    return tablespace.strip()
+
+
+def upgrade() -> None:
+    tablespace = _inativos_tablespace()
+    tablespace_sql = f" TABLESPACE {tablespace}" if tablespace else ""
+
+    op.execute(f"CREATE TABLE estabelecimentos_part ({COLUMNS}) PARTITION BY LIST (situacao)")
+    op.execute(
+        """
+        CREATE TABLE estabelecimentos_ativos
+        PARTITION OF estabelecimentos_part FOR VALUES IN (2)
+        """
+    )
+    # Everything that is not active (nula, suspensa, inapta, baixada, and rows
+    # without a valid situacao, which route here as NULL) is cold data; it
+    # lives in its own relation so it can be moved to cheaper storage with
+    # ALTER TABLE estabelecimentos_inativos SET TABLESPACE ...
+    op.execute(
+        f"""
+        CREATE TABLE estabelecimentos_inativos
+        PARTITION OF estabelecimentos_part DEFAULT{tablespace_sql}
+        """
+    )
+
+    op.execute(
+        f"""
+        INSERT INTO estabelecimentos_part ({COLUMN_NAMES})
+        SELECT {COLUMN_NAMES}
+        FROM estabelecimentos
+        """
+    )
+    op.execute("DROP TABLE estabelecimentos")
+    op.execute("ALTER TABLE estabelecimentos_part RENAME TO estabelecimentos")
+
+    # A unique key on a partitioned table must contain the partition key, and
+    # a primary key would forbid the NULL situacao rows: a unique index with
+    # NULLS NOT DISTINCT is the ON CONFLICT target instead. It only makes
+    # (cnpj_completo, situacao) unique; cnpj_completo alone is kept unique by
+    # the ETL, which deletes the old row when situacao changes
+    # (upsert_from_staging with partition_columns).
+    op.execute(
+        """
+        CREATE UNIQUE INDEX uix_estabelecimentos_cnpj_completo
+        ON estabelecimentos (cnpj_completo, situacao) NULLS NOT DISTINCT
+        """
+    )
+    # idx_estabelecimentos_ativos is not recreated: the active partition's
+    # share of this index covers the same rows.
+    op.create_index(
+        "idx_estabelecimentos_cnpj_basico",
+        "estabelecimentos",
+        ["cnpj_basico"],
+    )
+    _add_foreign_key()
+
+
+def downgrade() -> None:
+    op.execute(f"CREATE TABLE estabelecimentos_plain ({COLUMNS})")
+    op.execute(
+        f"""
+        INSERT INTO estabelecimentos_plain ({COLUMN_NAMES})
+        SELECT {COLUMN_NAMES}
+        FROM estabelecimentos
+        """
+    )
+    op.execute("DROP TABLE estabelecimentos")
+    op.execute("ALTER TABLE estabelecimentos_plain RENAME TO estabelecimentos")
+
+    op.execute(
+        "ALTER TABLE estabelecimentos ADD CONSTRAINT estabelecimentos_pkey PRIMARY KEY (cnpj_completo)"
+    )
+    op.create_index(
+        "idx_estabelecimentos_cnpj_basico",
+        "estabelecimentos",
+        ["cnpj_basico"],
+    )
+    op.execute(
+        """
+        CREATE INDEX idx_estabelecimentos_ativos
+        ON estabelecimentos (cnpj_basico)
+        WHERE situacao = 2
+        """
+    )
+    _add_foreign_key()
@@ -0,0 +1,79 @@
+"""covering (INCLUDE) indexes shaped to the GET /cnpj lookup queries
+
+Revision ID: 0009_covering_lookup_indexes
+Revises: 0008_partition_estabelecimentos
+Create Date: 2026-02-20 00:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+from migrations.batched import create_index, drop_index
+
+revision = "0009_covering_lookup_indexes"
+down_revision = "0008_partition_estabelecimentos"
+branch_labels = None
+depends_on = None
+
+ESTABELECIMENTO_PARTITIONS = ["estabelecimentos_ativos", "estabelecimentos_inativos"]
+
+ESTABELECIMENTOS_LOOKUP = """
+    (cnpj_basico, cnpj_completo)
+    INCLUDE (nome_fantasia, situacao, uf, municipio, cnae_principal, cnae_secundario, pais, motivo)
+"""
+
+# Non-partitioned lookup indexes: (name, table, definition). The reference
+# tables are left out: they are tiny and their primary keys on codigo already
+# serve the joins.
+LOOKUP_INDEXES = [
+    (
+        "idx_empresas_lookup",
+        "empresas",
+        "(cnpj_basico) INCLUDE (razao_social, natureza_juridica, capital_social, porte_empresa)",
+    ),
+    (
+        "idx_simples_lookup",
+        "simples",
+        """
+        (cnpj_basico) INCLUDE (
+            opcao_pelo_simples, data_opcao_pelo_simples, data_exclusao_do_simples,
+            opcao_pelo_mei, data_opcao_pelo_mei, data_exclusao_do_mei
+        )
+        """,
+    ),
+    (
+        "idx_socios_lookup",
+        "socios",
+        "(cnpj_basico, id) INCLUDE (nome_socio, cpf_cnpj_socio, qualificacao, pais, data_entrada)",
+    ),
+]
+
+
+def upgrade() -> None:
+    create_index(
+        "idx_estabelecimentos_lookup",
+        "estabelecimentos",
+        ESTABELECIMENTOS_LOOKUP,
+        partitions=ESTABELECIMENTO_PARTITIONS,
+    )
+    for name, table, definition in LOOKUP_INDEXES:
+        create_index(name, table, definition)
+
+    # Superseded: the lookup indexes above lead with the same column.
+    drop_index("idx_socios_cnpj_basico")
+    drop_index("idx_estabelecimentos_cnpj_basico", concurrently=False)
+
+
+def downgrade() -> None:
+    op.create_index(
+        "idx_estabelecimentos_cnpj_basico",
+        "estabelecimentos",
+        ["cnpj_basico"],
+    )
+    op.execute("DROP INDEX IF EXISTS idx_estabelecimentos_lookup")
+
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_socios_cnpj_basico ON socios (cnpj_basico)")
+        for name, _, _ in LOOKUP_INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,48 @@
+"""precomputed per-company JSONB documents for GET /cnpj
+
+Revision ID: 0010_cnpj_documento
+Revises: 0009_covering_lookup_indexes
+Create Date: 2026-02-21 00:00:00
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "0010_cnpj_documento"
+down_revision = "0009_covering_lookup_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "cnpj_documento",
+        sa.Column("cnpj_basico", sa.CHAR(length=8), nullable=False),
+        sa.Column("documento", postgresql.JSONB(), nullable=False),
+        sa.Column("atualizado_em", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("cnpj_basico"),
+    )
+
+    # Companies whose document must be rebuilt; filled by the ETL upserts.
+    op.create_table(
+        "cnpj_documento_pendente",
+        sa.Column("cnpj_basico", sa.CHAR(length=8), nullable=False),
+        sa.PrimaryKeyConstraint("cnpj_basico"),
+    )
+
+    # Documents for the data already loaded are built by the next ETL run
+    # (or python -m etl.documentos).
+    op.execute(
+        """
+        INSERT INTO cnpj_documento_pendente (cnpj_basico)
+        SELECT cnpj_basico FROM empresas
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("cnpj_documento_pendente")
+    op.drop_table("cnpj_documento")
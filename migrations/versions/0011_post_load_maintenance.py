@@ -0,0 +1,46 @@
+"""record post-load maintenance timings, enable pg_prewarm and tune autovacuum
+
+Revision ID: 0011_post_load_maintenance
+Revises: 0010_cnpj_documento
+Create Date: 2026-02-22 00:00:00
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "0011_post_load_maintenance"
+down_revision = "0010_cnpj_documento"
+branch_labels = None
+depends_on = None
+
+
+# Bulk-upserted tables churn a large fraction of their rows per release; the
+# default scale factors (20%) leave them unvacuumed for most of the month.
+# Storage parameters live on the partitions, not on the partitioned parent.
+AUTOVACUUM_SETTINGS = {
+    "empresas": "autovacuum_vacuum_scale_factor = 0.02, autovacuum_analyze_scale_factor = 0.01",
+    "estabelecimentos_ativos": "autovacuum_vacuum_scale_factor = 0.02, autovacuum_analyze_scale_factor = 0.01",
+    "estabelecimentos_inativos": "autovacuum_vacuum_scale_factor = 0.05, autovacuum_analyze_scale_factor = 0.02",
+    "socios": "autovacuum_vacuum_scale_factor = 0.02, autovacuum_analyze_scale_factor = 0.01",
+    "simples": "autovacuum_vacuum_scale_factor = 0.02, autovacuum_analyze_scale_factor = 0.01",
+    "cnpj_documento": "autovacuum_vacuum_scale_factor = 0.02, autovacuum_analyze_scale_factor = 0.01",
+}
+
+
+def upgrade() -> None:
+    op.add_column("importacoes", sa.Column("manutencao", postgresql.JSONB(), nullable=True))
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_prewarm")
+    for table, settings in AUTOVACUUM_SETTINGS.items():
+        op.execute(f"ALTER TABLE {table} SET ({settings})")
+
+
+def downgrade() -> None:
+    for table in AUTOVACUUM_SETTINGS:
+        op.execute(
+            f"ALTER TABLE {table} RESET (autovacuum_vacuum_scale_factor, autovacuum_analyze_scale_factor)"
+        )
+    op.execute("DROP EXTENSION IF EXISTS pg_prewarm")
+    op.drop_column("importacoes", "manutencao")
@@ -0,0 +1,126 @@
+"""rollup tables for aggregate establishment statistics
+
+Revision ID: 0012_estatisticas
+Revises: 0011_post_load_maintenance
+Create Date: 2026-02-23 00:00:00
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0012_estatisticas"
+down_revision = "0011_post_load_maintenance"
+branch_labels = None
+depends_on = None
+
+# CNAE 2.3: section letter of each two-digit division.
+CNAE_SECOES = {
+    "A": range(1, 4),
+    "B": range(5, 10),
+    "C": range(10, 34),
+    "D": [35],
+    "E": range(36, 40),
+    "F": range(41, 44),
+    "G": range(45, 48),
+    "H": range(49, 54),
+    "I": range(55, 57),
+    "J": range(58, 64),
+    "K": range(64, 67),
+    "L": [68],
+    "M": range(69, 76),
+    "N": range(77, 83),
+    "O": [84],
+    "P": [85],
+    "Q": range(86, 89),
+    "R": range(90, 94),
+    "S": range(94, 97),
+    "T": [97],
+    "U": [99],
+}
+
+
+def upgrade() -> None:
+    cnae_secoes = op.create_table(
+        "cnae_secoes",
+        sa.Column("divisao", sa.SmallInteger(), autoincrement=False, nullable=False),
+        sa.Column("secao", sa.CHAR(length=1), nullable=False),
+        sa.PrimaryKeyConstraint("divisao"),
+    )
+    op.bulk_insert(
+        cnae_secoes,
+        [
+            {"divisao": divisao, "secao": secao}
+            for secao, divisoes in CNAE_SECOES.items()
+            for divisao in divisoes
+        ],
+    )
+
+    op.execute(
+        """
+        CREATE TABLE estatisticas_municipio (
+            uf VARCHAR(2),
+            municipio SMALLINT,
+            cnae_principal INTEGER,
+            cnae_divisao SMALLINT GENERATED ALWAYS AS ((cnae_principal / 100000)::smallint) STORED,
+            situacao SMALLINT,
+            porte_empresa SMALLINT,
+            total BIGINT NOT NULL,
+            CONSTRAINT uq_estatisticas_municipio
+                UNIQUE NULLS NOT DISTINCT (uf, municipio, cnae_principal, situacao, porte_empresa)
+        )
+        """
+    )
+    op.execute(
+        """
+        CREATE TABLE estatisticas_uf (
+            uf VARCHAR(2),
+            cnae_divisao SMALLINT,
+            situacao SMALLINT,
+            porte_empresa SMALLINT,
+            total BIGINT NOT NULL,
+            CONSTRAINT uq_estatisticas_uf
+                UNIQUE NULLS NOT DISTINCT (uf, cnae_divisao, situacao, porte_empresa)
+        )
+        """
+    )
+    op.execute("CREATE INDEX idx_estatisticas_municipio_municipio ON estatisticas_municipio (municipio)")
+    op.execute("CREATE INDEX idx_estatisticas_municipio_cnae ON estatisticas_municipio (cnae_principal)")
+    # Deltas can bring a group to zero; these keep the purge after each batch cheap.
+    op.execute("CREATE INDEX idx_estatisticas_municipio_zerados ON estatisticas_municipio (uf) WHERE total = 0")
+    op.execute("CREATE INDEX idx_estatisticas_uf_zerados ON estatisticas_uf (uf) WHERE total = 0")
+
+    # Seeded from the documents already built; companies still queued in
+    # cnpj_documento_pendente are added as their documents are refreshed.
+    op.execute(
+        """
+        INSERT INTO estatisticas_municipio (uf, municipio, cnae_principal, situacao, porte_empresa, total)
+        SELECT
+            est->>'uf',
+            (est->>'municipio')::smallint,
+            (est->>'cnae_principal')::integer,
+            (est->>'situacao')::smallint,
+            (d.documento->'empresa'->>'porte_empresa')::smallint,
+            COUNT(*)
+        FROM cnpj_documento d
+        CROSS JOIN LATERAL jsonb_array_elements(d.documento->'estabelecimentos') est
+        GROUP BY 1, 2, 3, 4, 5
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO estatisticas_uf (uf, cnae_divisao, situacao, porte_empresa, total)
+        SELECT uf, cnae_divisao, situacao, porte_empresa, SUM(total)
+        FROM estatisticas_municipio
+        GROUP BY uf, cnae_divisao, situacao, porte_empresa
+        """
+    )
+    op.execute("ANALYZE estatisticas_municipio")
+    op.execute("ANALYZE estatisticas_uf")
+
+
+def downgrade() -> None:
+    op.drop_table("estatisticas_uf")
+    op.drop_table("estatisticas_municipio")
+    op.drop_table("cnae_secoes")
@@ -0,0 +1,41 @@
+"""per-import change log of companies
+
+Revision ID: 0013_mudancas
+Revises: 0012_estatisticas
+Create Date: 2026-02-24 00:00:00
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "0013_mudancas"
+down_revision = "0012_estatisticas"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "mudancas",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("importacao_id", sa.Integer(), nullable=False),
+        sa.Column("cnpj_basico", sa.CHAR(length=8), nullable=False),
+        sa.Column("tipo", sa.String(length=16), nullable=False),
+        sa.Column("campos", postgresql.ARRAY(sa.Text()), nullable=False),
+        sa.ForeignKeyConstraint(["importacao_id"], ["importacoes.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    # Finds the first change after ?desde=; pages then walk the primary key.
+    op.create_index("idx_mudancas_importacao", "mudancas", ["importacao_id", "id"])
+
+    # Import that queued the company; NULL for rebuilds queued by hand.
+    op.add_column("cnpj_documento_pendente", sa.Column("importacao_id", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("cnpj_documento_pendente", "importacao_id")
+    op.drop_index("idx_mudancas_importacao", table_name="mudancas")
+    op.drop_table("mudancas")
@@ -0,0 +1,128 @@
+"""secondary CNAEs as INTEGER[], plus CNAE listing indexes
+
+Revision ID: 0014_cnae_secundario_array
+Revises: 0013_mudancas
+Create Date: 2026-02-25 00:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+from migrations.batched import (
+    create_index,
+    drop_index,
+    run_in_batches,
+    shadow,
+    shadow_columns,
+    swap_columns,
+)
+
+revision = "0014_cnae_secundario_array"
+down_revision = "0013_mudancas"
+branch_labels = None
+depends_on = None
+
+ESTABELECIMENTO_PARTITIONS = ["estabelecimentos_ativos", "estabelecimentos_inativos"]
+
+# (name, definition) of the partitioned index behind GET /estabelecimentos/cnae/{cnae}
+CNAE_INDEXES = [
+    ("idx_estabelecimentos_cnae_principal", "(cnae_principal, cnpj_completo)"),
+]
+
+CNAES_SECUNDARIOS_TABLE = "estabelecimentos_cnaes_secundarios"
+
+# One batch of estabelecimentos; ON CONFLICT makes a resumed batch a no-op.
+CNAES_SECUNDARIOS_SQL = f"""
+    INSERT INTO {CNAES_SECUNDARIOS_TABLE} (cnpj_completo, cnae)
+    SELECT DISTINCT e.cnpj_completo, u.cnae
+    FROM estabelecimentos e
+    JOIN lote ON lote.chave = e.cnpj_completo
+    CROSS JOIN LATERAL unnest(e.cnae_secundario) AS u(cnae)
+    ON CONFLICT DO NOTHING
+    RETURNING 1
+"""
+
+# "6201501,6202300" -> {6201501,6202300}, over the placeholder {t} of
+# shadow_columns: anything but digits and separators is dropped and empty
+# entries collapse; nothing left -> NULL.
+TO_ARRAY_SQL = r"""
+    string_to_array(
+        NULLIF(
+            btrim(regexp_replace(regexp_replace({t}.cnae_secundario, '[^0-9,;]', '', 'g'), '[,;]+', ',', 'g'), ','),
+            ''
+        ),
+        ','
+    )::integer[]
+"""
+
+# idx_estabelecimentos_lookup (0009) INCLUDEs the column: rebuilt on the copy
+# before the swap, so lookups never lose it.
+LOOKUP_INDEX = (
+    "idx_estabelecimentos_lookup",
+    f"""
+    (cnpj_basico, cnpj_completo)
+    INCLUDE (nome_fantasia, situacao, uf, municipio, cnae_principal, {shadow("cnae_secundario")}, pais, motivo)
+    """,
+    False,
+)
+
+# Back to the zero-padded text published by the Receita Federal.
+TO_TEXT_FUNCTION_SQL = """
+    CREATE FUNCTION pg_temp.cnae_lista(codigos integer[]) RETURNS text
+    LANGUAGE sql IMMUTABLE AS $$
+        SELECT string_agg(lpad(c::text, 7, '0'), ',' ORDER BY n)
+        FROM unnest(codigos) WITH ORDINALITY AS u(c, n)
+    $$
+"""
+
+
+def upgrade() -> None:
+    shadow_columns(
+        "0014_cnae_secundario",
+        "estabelecimentos",
+        "cnpj_completo",
+        [("cnae_secundario", "INTEGER[]", TO_ARRAY_SQL)],
+    )
+    swap_columns(
+        "estabelecimentos",
+        ["cnae_secundario"],
+        indexes=[LOOKUP_INDEX],
+        partitions=ESTABELECIMENTO_PARTITIONS,
+    )
+    # Recreated by the processor with the new column type.
+    op.execute("DROP TABLE IF EXISTS stg_estabelecimentos")
+
+    for name, definition in CNAE_INDEXES:
+        create_index(name, "estabelecimentos", definition, partitions=ESTABELECIMENTO_PARTITIONS)
+
+    # One row per (establishment, secondary CNAE): the listing walks
+    # (cnae, cnpj_completo) in cursor order, which an index on the array cannot
+    # give. Keyed by establishment for the ETL's per-chunk sync. IF NOT EXISTS:
+    # the batches below commit, so a failed run leaves it behind.
+    op.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {CNAES_SECUNDARIOS_TABLE} (
+            cnpj_completo CHAR(14) NOT NULL,
+            cnae INTEGER NOT NULL,
+            PRIMARY KEY (cnpj_completo, cnae)
+        )
+        """
+    )
+    run_in_batches("0014_cnaes_secundarios", "estabelecimentos", "cnpj_completo", CNAES_SECUNDARIOS_SQL)
+    create_index(
+        f"idx_{CNAES_SECUNDARIOS_TABLE}_cnae", CNAES_SECUNDARIOS_TABLE, "(cnae, cnpj_completo)"
+    )
+    op.execute(f"ANALYZE {CNAES_SECUNDARIOS_TABLE}")
+
+
+def downgrade() -> None:
+    op.execute(f"DROP TABLE IF EXISTS {CNAES_SECUNDARIOS_TABLE}")
+    for name, _ in CNAE_INDEXES:
+        drop_index(name, concurrently=False)
+    op.execute("DROP TABLE IF EXISTS stg_estabelecimentos")
+    op.execute(TO_TEXT_FUNCTION_SQL)
+    op.execute(
+        "ALTER TABLE estabelecimentos ALTER COLUMN cnae_secundario TYPE VARCHAR "
+        "USING pg_temp.cnae_lista(cnae_secundario)"
+    )
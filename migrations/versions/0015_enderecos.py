@@ -0,0 +1,40 @@
+"""establishment addresses in a side table, indexed by numeric CEP
+
+Revision ID: 0015_enderecos
+Revises: 0014_cnae_secundario_array
+Create Date: 2026-02-26 00:00:00
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0015_enderecos"
+down_revision = "0014_cnae_secundario_array"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Keyed by cnpj_completo only: an establishment keeps its address when it
+    # moves between the situacao partitions of estabelecimentos.
+    op.create_table(
+        "enderecos",
+        sa.Column("cnpj_completo", sa.CHAR(length=14), nullable=False),
+        sa.Column("cnpj_basico", sa.CHAR(length=8), nullable=False),
+        sa.Column("cep", sa.Integer(), nullable=True),
+        sa.Column("tipo_logradouro", sa.String(), nullable=True),
+        sa.Column("logradouro", sa.String(), nullable=True),
+        sa.Column("numero", sa.String(), nullable=True),
+        sa.Column("complemento", sa.String(), nullable=True),
+        sa.Column("bairro", sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint("cnpj_completo"),
+    )
+    # CEP lookups (exact or prefix range) page through (cep, cnpj_completo).
+    op.execute("CREATE INDEX idx_enderecos_cep ON enderecos (cep, cnpj_completo)")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS stg_enderecos")
+    op.drop_table("enderecos")
@@ -0,0 +1,55 @@
+"""partner network adjacency table
+
+Revision ID: 0016_rede_arestas
+Revises: 0015_enderecos
+Create Date: 2026-02-27 00:00:00
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0016_rede_arestas"
+down_revision = "0015_enderecos"
+branch_labels = None
+depends_on = None
+
+# Node ids as in etl.rede: companies are cnpj_basico as a number (a 14-digit
+# partner CNPJ maps to its company), individual partners a hash of (masked
+# CPF, name) folded into [2^62, 2^63).
+SEED_SQL = """
+    WITH e AS (
+        SELECT
+            s.cnpj_basico::bigint AS empresa,
+            CASE
+                WHEN s.cpf_cnpj_socio ~ '^[0-9]{14}$' THEN left(s.cpf_cnpj_socio, 8)::bigint
+                ELSE (
+                    hashtextextended(COALESCE(s.cpf_cnpj_socio, '') || '|' || COALESCE(s.nome_socio, ''), 0)
+                    & 4611686018427387903
+                ) | 4611686018427387904
+            END AS socio
+        FROM socios s
+        WHERE s.nome_socio IS NOT NULL OR s.cpf_cnpj_socio IS NOT NULL
+    )
+    INSERT INTO rede_arestas (origem, destino)
+    SELECT empresa, socio FROM e WHERE empresa <> socio
+    UNION
+    SELECT socio, empresa FROM e WHERE empresa <> socio
+"""
+
+
+def upgrade() -> None:
+    # One row per direction; the primary key is the only index the BFS needs.
+    op.create_table(
+        "rede_arestas",
+        sa.Column("origem", sa.BigInteger(), nullable=False),
+        sa.Column("destino", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("origem", "destino"),
+    )
+    op.execute(SEED_SQL)
+    op.execute("ANALYZE rede_arestas")
+
+
+def downgrade() -> None:
+    op.drop_table("rede_arestas")
@@ -0,0 +1,174 @@
+"""dictionary-encode partner identities into pessoas; socios keeps pessoa_id
+
+Revision ID: 0017_pessoas
+Revises: 0016_rede_arestas
+Create Date: 2026-02-28 00:00:00
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+from migrations.batched import backfill, create_index, run_in_batches, set_not_null, swap_columns
+
+revision = "0017_pessoas"
+down_revision = "0016_rede_arestas"
+branch_labels = None
+depends_on = None
+
+# Missing name/document are stored as '' so the identity is a plain unique
+# key (same semantics as the COALESCE expressions of uix_socios_cnpj_nome_cpf).
+PESSOAS_SQL = """
+    INSERT INTO pessoas (cpf_cnpj, nome)
+    SELECT DISTINCT COALESCE(s.cpf_cnpj_socio, ''), COALESCE(s.nome_socio, '')
+    FROM socios s
+    JOIN lote ON lote.chave = s.id
+    ORDER BY 1, 2
+    ON CONFLICT (cpf_cnpj, nome) DO NOTHING
+    RETURNING 1
+"""
+
+PESSOA_ID_SQL = """
+    pessoa_id = (
+        SELECT p.id
+        FROM pessoas p
+        WHERE p.cpf_cnpj = COALESCE(t.cpf_cnpj_socio, '')
+          AND p.nome = COALESCE(t.nome_socio, '')
+    )
+"""
+
+# (name, definition, unique) of the indexes on pessoa_id. idx_socios_lookup
+# replaces the one that INCLUDEs the dropped columns, under the same name.
+PESSOA_INDEXES = [
+    ("uix_socios_cnpj_pessoa", "(cnpj_basico, pessoa_id)", True),
+    ("idx_socios_pessoa", "(pessoa_id)", False),
+]
+LOOKUP_INDEX = (
+    "idx_socios_lookup",
+    "(cnpj_basico, id) INCLUDE (pessoa_id, qualificacao, pais, data_entrada)",
+    False,
+)
+
+# Node ids as in app.core.rede: partners that are companies (14-digit CNPJ)
+# are that company's node, everyone else pessoas.id + 2^62.
+REDE_SEED_SQL = """
+    WITH e AS (
+        SELECT
+            s.cnpj_basico::bigint AS empresa,
+            CASE
+                WHEN p.cpf_cnpj ~ '^[0-9]{14}$' THEN left(p.cpf_cnpj, 8)::bigint
+                ELSE p.id + 4611686018427387904
+            END AS socio
+        FROM socios s
+        JOIN pessoas p ON p.id = s.pessoa_id
+        WHERE p.nome <> '' OR p.cpf_cnpj <> ''
+    )
+    INSERT INTO rede_arestas (origem, destino)
+    SELECT empresa, socio FROM e WHERE empresa <> socio
+    UNION
+    SELECT socio, empresa FROM e WHERE empresa <> socio
+"""
+
+REDE_SEED_SQL_DOWNGRADE = """
+    WITH e AS (
+        SELECT
+            s.cnpj_basico::bigint AS empresa,
+            CASE
+                WHEN s.cpf_cnpj_socio ~ '^[0-9]{14}$' THEN left(s.cpf_cnpj_socio, 8)::bigint
+                ELSE (
+                    hashtextextended(COALESCE(s.cpf_cnpj_socio, '') || '|' || COALESCE(s.nome_socio, ''), 0)
+                    & 4611686018427387903
+                ) | 4611686018427387904
+            END AS socio
+        FROM socios s
+        WHERE s.nome_socio IS NOT NULL OR s.cpf_cnpj_socio IS NOT NULL
+    )
+    INSERT INTO rede_arestas (origem, destino)
+    SELECT empresa, socio FROM e WHERE empresa <> socio
+    UNION
+    SELECT socio, empresa FROM e WHERE empresa <> socio
+"""
+
+
+def upgrade() -> None:
+    # IF NOT EXISTS: the batches below commit, so a failed run leaves these behind.
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS pessoas (
+            id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            cpf_cnpj TEXT NOT NULL,
+            nome TEXT NOT NULL,
+            CONSTRAINT uq_pessoas_cpf_cnpj_nome UNIQUE (cpf_cnpj, nome)
+        )
+        """
+    )
+    op.execute("ALTER TABLE socios ADD COLUMN IF NOT EXISTS pessoa_id INTEGER")
+
+    run_in_batches("0017_pessoas", "socios", "id", PESSOAS_SQL)
+    backfill("0017_socios_pessoa_id", "socios", "id", PESSOA_ID_SQL, where="t.pessoa_id IS NULL")
+    set_not_null("socios", "pessoa_id")
+
+    op.execute(
+        """
+        ALTER TABLE socios
+        DROP CONSTRAINT IF EXISTS socios_pessoa_id_fkey,
+        ADD CONSTRAINT socios_pessoa_id_fkey FOREIGN KEY (pessoa_id) REFERENCES pessoas (id) NOT VALID
+        """
+    )
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TABLE socios VALIDATE CONSTRAINT socios_pessoa_id_fkey")
+
+    for name, definition, unique in PESSOA_INDEXES:
+        create_index(name, "socios", definition, unique=unique)
+
+    # Dropping the columns drops uix_socios_cnpj_nome_cpf, idx_socios_cpf_cnpj_socio
+    # and the old idx_socios_lookup, which all reference them.
+    op.execute("DROP TABLE IF EXISTS stg_socios")
+    swap_columns("socios", [], indexes=[LOOKUP_INDEX], drop=["nome_socio", "cpf_cnpj_socio"])
+
+    # Person node ids change from a hash to pessoas.id.
+    op.execute("TRUNCATE rede_arestas")
+    op.execute(REDE_SEED_SQL)
+
+    op.execute("ANALYZE pessoas")
+    op.execute("ANALYZE socios")
+    op.execute("ANALYZE rede_arestas")
+
+
+def downgrade() -> None:
+    op.add_column("socios", sa.Column("nome_socio", sa.String(), nullable=True))
+    op.add_column("socios", sa.Column("cpf_cnpj_socio", sa.String(), nullable=True))
+    backfill(
+        "0017_socios_nome_cpf",
+        "socios",
+        "id",
+        """
+        nome_socio = (SELECT NULLIF(p.nome, '') FROM pessoas p WHERE p.id = t.pessoa_id),
+        cpf_cnpj_socio = (SELECT NULLIF(p.cpf_cnpj, '') FROM pessoas p WHERE p.id = t.pessoa_id)
+        """,
+    )
+
+    for name, definition, unique in [
+        ("uix_socios_cnpj_nome_cpf", "(cnpj_basico, COALESCE(nome_socio, ''), COALESCE(cpf_cnpj_socio, ''))", True),
+        ("idx_socios_cpf_cnpj_socio", "(cpf_cnpj_socio)", False),
+    ]:
+        create_index(name, "socios", definition, unique=unique)
+
+    op.execute("DROP TABLE IF EXISTS stg_socios")
+    swap_columns(
+        "socios",
+        [],
+        indexes=[
+            (
+                "idx_socios_lookup",
+                "(cnpj_basico, id) INCLUDE (nome_socio, cpf_cnpj_socio, qualificacao, pais, data_entrada)",
+                False,
+            )
+        ],
+        drop=["pessoa_id"],
+    )
+    op.drop_table("pessoas")
+
+    op.execute("TRUNCATE rede_arestas")
+    op.execute(REDE_SEED_SQL_DOWNGRADE)
@@ -0,0 +1,60 @@
+"""persist inicio/data_situacao of estabelecimentos with BRIN and opening-date feed indexes
+
+Revision ID: 0018_datas_estabelecimentos
+Revises: 0017_pessoas
+Create Date: 2026-03-01 00:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+from migrations.batched import create_index, drop_index
+
+revision = "0018_datas_estabelecimentos"
+down_revision = "0017_pessoas"
+branch_labels = None
+depends_on = None
+
+ESTABELECIMENTO_PARTITIONS = ["estabelecimentos_ativos", "estabelecimentos_inativos"]
+
+# The estabelecimentos processor inserts each chunk's new rows in inicio
+# order, so every block range covers a few days of one chunk. minmax-multi
+# keeps a few value ranges per block range instead of one, so old companies
+# re-registered late do not widen every range.
+DATE_INDEXES = [
+    (
+        "idx_estabelecimentos_inicio",
+        "USING brin (inicio date_minmax_multi_ops) WITH (pages_per_range = 32)",
+    ),
+    (
+        "idx_estabelecimentos_data_situacao",
+        "USING brin (data_situacao date_minmax_multi_ops) WITH (pages_per_range = 32)",
+    ),
+    # GET /estabelecimentos/abertas pages through (inicio, cnpj_completo). Only
+    # new rows are sorted, per chunk, so after a full load a day still spans a
+    # block range per chunk; the feed walks this btree in cursor order instead.
+    ("idx_estabelecimentos_inicio_cnpj", "(inicio, cnpj_completo)"),
+]
+
+
+def upgrade() -> None:
+    # Nullable without default: no table rewrite. Filled by the next load.
+    # IF NOT EXISTS: the concurrent index builds commit, so a failed run leaves them behind.
+    op.execute(
+        "ALTER TABLE estabelecimentos ADD COLUMN IF NOT EXISTS inicio DATE, "
+        "ADD COLUMN IF NOT EXISTS data_situacao DATE"
+    )
+    # Recreated by the processor with the new columns.
+    op.execute("DROP TABLE IF EXISTS stg_estabelecimentos")
+
+    for name, definition in DATE_INDEXES:
+        create_index(name, "estabelecimentos", definition, partitions=ESTABELECIMENTO_PARTITIONS)
+
+
+def downgrade() -> None:
+    for name, _ in DATE_INDEXES:
+        drop_index(name, concurrently=False)
+    op.execute("DROP TABLE IF EXISTS stg_estabelecimentos")
+    op.drop_column("estabelecimentos", "data_situacao")
+    op.drop_column("estabelecimentos", "inicio")
@@ -0,0 +1,52 @@
+"""vertical split: enderecos becomes the cold estabelecimentos_detalhes table
+
+Revision ID: 0019_estabelecimentos_detalhes
+Revises: 0018_datas_estabelecimentos
+Create Date: 2026-03-02 00:00:00
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0019_estabelecimentos_detalhes"
+down_revision = "0018_datas_estabelecimentos"
+branch_labels = None
+depends_on = None
+
+# Receita fields that no lookup, listing or search reads; only fetched on
+# request (GET /cnpj/{cnpj}?detalhes=true).
+DETALHE_COLUMNS: list[sa.Column[Any]] = [
+    sa.Column("matriz_filial", sa.SmallInteger(), nullable=True),
+    sa.Column("cidade_exterior", sa.String(), nullable=True),
+    sa.Column("ddd1", sa.String(), nullable=True),
+    sa.Column("telefone1", sa.String(), nullable=True),
+    sa.Column("ddd2", sa.String(), nullable=True),
+    sa.Column("telefone2", sa.String(), nullable=True),
+    sa.Column("email", sa.String(), nullable=True),
+    sa.Column("situacao_especial", sa.String(), nullable=True),
+    sa.Column("data_situacao_especial", sa.Date(), nullable=True),
+]
+
+
+def upgrade() -> None:
+    # The address side table already is the 1:1 cold half (same key, loaded
+    # in the same pass); it takes the remaining fields instead of a second join.
+    op.rename_table("enderecos", "estabelecimentos_detalhes")
+    op.execute("ALTER TABLE estabelecimentos_detalhes RENAME CONSTRAINT enderecos_pkey TO estabelecimentos_detalhes_pkey")
+    op.execute("ALTER INDEX idx_enderecos_cep RENAME TO idx_estabelecimentos_detalhes_cep")
+    for column in DETALHE_COLUMNS:
+        op.add_column("estabelecimentos_detalhes", column)
+    op.execute("DROP TABLE IF EXISTS stg_enderecos")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS stg_estabelecimentos_detalhes")
+    for column in reversed(DETALHE_COLUMNS):
+        op.drop_column("estabelecimentos_detalhes", column.name)
+    op.execute("ALTER INDEX idx_estabelecimentos_detalhes_cep RENAME TO idx_enderecos_cep")
+    op.execute("ALTER TABLE estabelecimentos_detalhes RENAME CONSTRAINT estabelecimentos_detalhes_pkey TO enderecos_pkey")
+    op.rename_table("estabelecimentos_detalhes", "enderecos")
@@ -0,0 +1,115 @@
+"""normalized phone/e-mail contacts of estabelecimentos for reverse lookup
+
+Revision ID: 0020_contatos
+Revises: 0019_estabelecimentos_detalhes
+Create Date: 2026-03-03 00:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+from migrations.batched import create_index, run_in_batches
+
+revision = "0020_contatos"
+down_revision = "0019_estabelecimentos_detalhes"
+branch_labels = None
+depends_on = None
+
+# The one definition of a contact's normalized form, shared by the backfill,
+# the estabelecimentos processor and the API (app.api.v1.contatos):
+#   telefone  digits only, leading zeros and a 55 (Brazil) prefix dropped, then
+#             DDD + number as one BIGINT if 10 or 11 digits long
+#   email     trimmed and lower-cased, if there is text on both sides of an @
+FUNCTIONS_SQL = [
+    """
+    CREATE OR REPLACE FUNCTION normalizar_telefone(valor text) RETURNS bigint
+    LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+    AS $$
+        SELECT CASE WHEN length(numero) BETWEEN 10 AND 11 THEN numero::bigint END
+        FROM (
+            SELECT CASE
+                WHEN length(digitos) IN (12, 13) AND left(digitos, 2) = '55' THEN substr(digitos, 3)
+                ELSE digitos
+            END AS numero
+            FROM (SELECT ltrim(regexp_replace(valor, '[^0-9]', '', 'g'), '0') AS digitos) d
+        ) n
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION normalizar_email(valor text) RETURNS text
+    LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+    AS $$
+        SELECT CASE WHEN email ~ '^[^@]+@.+$' THEN email END
+        FROM (SELECT lower(btrim(valor)) AS email) e
+    $$
+    """,
+]
+
+# One batch of estabelecimentos_detalhes; ON CONFLICT makes a resumed batch a no-op.
+BACKFILL_SQL = """
+    INSERT INTO contatos (cnpj_completo, telefone, email)
+    SELECT DISTINCT cnpj_completo, telefone, email
+    FROM (
+        SELECT d.cnpj_completo, t.telefone, NULL::text AS email
+        FROM estabelecimentos_detalhes d
+        JOIN lote ON lote.chave = d.cnpj_completo
+        CROSS JOIN LATERAL (
+            VALUES
+                (normalizar_telefone(COALESCE(d.ddd1, '') || COALESCE(d.telefone1, ''))),
+                (normalizar_telefone(COALESCE(d.ddd2, '') || COALESCE(d.telefone2, '')))
+        ) t(telefone)
+        WHERE t.telefone IS NOT NULL
+        UNION ALL
+        SELECT d.cnpj_completo, NULL, normalizar_email(d.email)
+        FROM estabelecimentos_detalhes d
+        JOIN lote ON lote.chave = d.cnpj_completo
+        WHERE normalizar_email(d.email) IS NOT NULL
+    ) c
+    ON CONFLICT DO NOTHING
+    RETURNING 1
+"""
+
+# (name, definition): reverse lookups, contact -> establishments as one
+# index-only range scan.
+LOOKUP_INDEXES = [
+    ("idx_contatos_telefone", "(telefone, cnpj_completo) WHERE telefone IS NOT NULL"),
+    ("idx_contatos_email", "(email, cnpj_completo) WHERE email IS NOT NULL"),
+]
+
+
+def upgrade() -> None:
+    # One row per (establishment, contact); exactly one of telefone/email is
+    # set. IF NOT EXISTS: the batches below commit, so a failed run leaves it behind.
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS contatos (
+            id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            cnpj_completo CHAR(14) NOT NULL,
+            telefone BIGINT,
+            email TEXT,
+            CONSTRAINT ck_contatos_telefone_ou_email CHECK ((telefone IS NULL) <> (email IS NULL))
+        )
+        """
+    )
+    for sql in FUNCTIONS_SQL:
+        op.execute(sql)
+
+    # Reload sync (per establishment) and dedup; built first, as the backfill's
+    # ON CONFLICT target.
+    create_index(
+        "uix_contatos_cnpj_contato",
+        "contatos",
+        "(cnpj_completo, telefone, email) NULLS NOT DISTINCT",
+        unique=True,
+    )
+    run_in_batches("0020_contatos", "estabelecimentos_detalhes", "cnpj_completo", BACKFILL_SQL)
+    for name, definition in LOOKUP_INDEXES:
+        create_index(name, "contatos", definition)
+    op.execute("ANALYZE contatos")
+
+
+def downgrade() -> None:
+    op.drop_table("contatos")
+    op.execute("DROP FUNCTION normalizar_email(text)")
+    op.execute("DROP FUNCTION normalizar_telefone(text)")
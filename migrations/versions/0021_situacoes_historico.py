@@ -0,0 +1,63 @@
+"""status history of estabelecimentos with daterange validity
+
+Revision ID: 0021_situacoes_historico
+Revises: 0020_contatos
+Create Date: 2026-03-04 00:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+from migrations.batched import create_index, run_in_batches
+
+revision = "0021_situacoes_historico"
+down_revision = "0020_contatos"
+branch_labels = None
+depends_on = None
+
+
+# Current status as of now; the start is data_situacao when it was loaded.
+# One batch of estabelecimentos; ON CONFLICT makes a re-run a no-op.
+BACKFILL_SQL = """
+    INSERT INTO situacoes_historico (cnpj_completo, vigencia, situacao, motivo)
+    SELECT e.cnpj_completo, daterange(COALESCE(e.data_situacao, CURRENT_DATE), NULL), e.situacao, e.motivo
+    FROM estabelecimentos e
+    JOIN lote ON lote.chave = e.cnpj_completo
+    ON CONFLICT DO NOTHING
+    RETURNING 1
+"""
+
+
+def upgrade() -> None:
+    # One row per (establishment, status interval); the open interval
+    # (upper bound infinite) is the current status. A CNPJ has a handful of
+    # rows, so the primary key alone answers "status on date X" with one probe.
+    # IF NOT EXISTS: the batches below commit, so a failed run leaves it behind.
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS situacoes_historico (
+            cnpj_completo CHAR(14) NOT NULL,
+            vigencia DATERANGE NOT NULL,
+            situacao SMALLINT,
+            motivo SMALLINT,
+            PRIMARY KEY (cnpj_completo, vigencia),
+            CONSTRAINT ck_situacoes_historico_vigencia CHECK (NOT isempty(vigencia) AND NOT lower_inf(vigencia))
+        )
+        """
+    )
+    # At most one open interval per establishment; also the join key of the
+    # ETL's per-chunk comparison. Built first, so a re-run on another day does
+    # not add a second open interval.
+    create_index(
+        "uix_situacoes_historico_aberta",
+        "situacoes_historico",
+        "(cnpj_completo) WHERE upper_inf(vigencia)",
+        unique=True,
+    )
+    run_in_batches("0021_situacoes_historico", "estabelecimentos", "cnpj_completo", BACKFILL_SQL)
+    op.execute("ANALYZE situacoes_historico")
+
+
+def downgrade() -> None:
+    op.drop_table("situacoes_historico")
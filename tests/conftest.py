@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+# app.config reads DATABASE_URL at import time; the suite only ever talks to
+# TEST_DATABASE_URL, a throwaway database it drops and migrates.
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "")
+os.environ["DATABASE_URL"] = TEST_DATABASE_URL or "postgresql+psycopg2://localhost/cnpj_test"
+
+from sqlalchemy import Engine, text  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Filled by the migrations themselves; kept across tests.
+SEEDED_TABLES = ["alembic_version", "cnae_secoes"]
+
+
+def _migrate(engine: Engine) -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    with engine.begin() as connection:
+        connection.execute(text("DROP SCHEMA public CASCADE"))
+        connection.execute(text("CREATE SCHEMA public"))
+        # Revision ids such as 0006_fix_indices_and_socios_unique do not fit
+        # alembic's default VARCHAR(32).
+        connection.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(64) PRIMARY KEY)"))
+
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "migrations"))
+    command.upgrade(config, "head")
+
+
+@pytest.fixture(scope="session")
+def migrated_engine() -> Iterator[Engine]:
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL nao definido")
+
+    from app.database import engine
+
+    _migrate(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def engine(migrated_engine: Engine) -> Engine:
+    """Migrated test database, emptied before each test."""
+    with migrated_engine.begin() as connection:
+        tables = connection.execute(
+            text(
+                """
+                SELECT quote_ident(tablename)
+                FROM pg_tables
+                WHERE schemaname = current_schema()
+                  AND tablename <> ALL(:seeded)
+                """
+            ),
+            {"seeded": SEEDED_TABLES},
+        ).scalars().all()
+        if tables:
+            connection.execute(text(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY CASCADE"))
+    return migrated_engine
+
+
+@pytest.fixture
+def client(engine: Engine) -> Iterator[Any]:
+    """The API against the test database, with the rate limits reset."""
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.middleware.rate_limit import limiter
+
+    limiter.reset()
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def etl_paths(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Points the orchestrator's data directories at ``tmp_path``."""
+    from app.config import settings
+
+    for name in ("RAW_DATA_PATH", "STAGING_PATH", "PROCESSED_PATH", "SNAPSHOT_PATH"):
+        path = tmp_path / name.lower()
+        path.mkdir()
+        monkeypatch.setattr(settings, name, str(path))
+    monkeypatch.setattr(settings, "ETL_POST_LOAD_MAINTENANCE", False)
+    return tmp_path
+
+
+@pytest.fixture
+def tabela_bloqueada(engine: Engine) -> Iterator[None]:
+    """estabelecimentos locked by another session, so queries on it wait past any timeout."""
+    bloqueado = threading.Event()
+    liberar = threading.Event()
+
+    def bloquear() -> None:
+        with engine.begin() as connection:
+            connection.execute(text("LOCK TABLE estabelecimentos IN ACCESS EXCLUSIVE MODE"))
+            bloqueado.set()
+            liberar.wait(10)
+
+    thread = threading.Thread(target=bloquear)
+    thread.start()
+    bloqueado.wait(10)
+    yield
+    liberar.set()
+    thread.join()
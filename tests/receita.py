@@ -0,0 +1,187 @@
+"""Synthetic Receita Federal files for the tests: latin1, ``;``-separated, every field quoted, no header."""
+
+from __future__ import annotations
+
+import zipfile
+from collections.abc import Callable
+from pathlib import Path
+
+from sqlalchemy import Engine
+
+from etl.processors import (
+    cnaes_processor,
+    empresas_processor,
+    estabelecimentos_processor,
+    motivos_processor,
+    municipios_processor,
+    naturezas_processor,
+    paises_processor,
+    qualificacoes_processor,
+    simples_processor,
+    socios_processor,
+)
+
+EMPRESA = {
+    "cnpj_basico": "11222333",
+    "razao_social": "EMPRESA TESTE LTDA",
+    "natureza_juridica": "2062",
+    "qualificacao_responsavel": "49",
+    "capital_social": "1000,00",
+    "porte_empresa": "01",
+    "ente_federativo": "",
+}
+
+ESTABELECIMENTO = {
+    "cnpj_basico": "11222333",
+    "cnpj_ordem": "0001",
+    "cnpj_dv": "81",
+    "matriz_filial": "1",
+    "nome_fantasia": "TESTE",
+    "situacao": "02",
+    "data_situacao": "20200101",
+    "motivo": "00",
+    "cidade_exterior": "",
+    "pais": "",
+    "inicio": "20100315",
+    "cnae_principal": "6201501",
+    "cnae_secundario": "6202300,6209100",
+    "tipo_logradouro": "RUA",
+    "logradouro": "DAS FLORES",
+    "numero": "10",
+    "complemento": "",
+    "bairro": "CENTRO",
+    "cep": "01001000",
+    "uf": "SP",
+    "municipio": "7107",
+    "ddd1": "11",
+    "telefone1": "33334444",
+    "ddd2": "",
+    "telefone2": "",
+    "email": "contato@teste.com.br",
+    "situacao_especial": "",
+    "data_situacao_especial": "",
+}
+
+SOCIO = {
+    "cnpj_basico": "11222333",
+    "tipo": "2",
+    "nome": "FULANO DE TAL",
+    "cpf_cnpj": "***123456**",
+    "qualificacao": "49",
+    "data_entrada": "20100315",
+    "pais": "",
+    "cpf_rep": "***000000**",
+    "nome_rep": "",
+    "qualificacao_rep": "00",
+    "faixa_etaria": "4",
+}
+
+SIMPLES = {
+    "cnpj_basico": "11222333",
+    "opcao_pelo_simples": "S",
+    "data_opcao_pelo_simples": "20100315",
+    "data_exclusao_do_simples": "00000000",
+    "opcao_pelo_mei": "N",
+    "data_opcao_pelo_mei": "00000000",
+    "data_exclusao_do_mei": "00000000",
+}
+
+LAYOUTS = {
+    "empresas": (empresas_processor.CSV_COLUMNS, EMPRESA),
+    "estabelecimentos": (estabelecimentos_processor.CSV_COLUMNS, ESTABELECIMENTO),
+    "socios": (socios_processor.CSV_COLUMNS, SOCIO),
+    "simples": (simples_processor.CSV_COLUMNS, SIMPLES),
+}
+
+PROCESSORS: dict[str, Callable[..., int]] = {
+    "empresas": empresas_processor.process_empresas_csv,
+    "estabelecimentos": estabelecimentos_processor.process_estabelecimentos_csv,
+    "socios": socios_processor.process_socios_csv,
+    "simples": simples_processor.process_simples_csv,
+}
+
+REFERENCE_PROCESSORS: dict[str, Callable[..., int]] = {
+    "cnaes": cnaes_processor.process_cnaes_csv,
+    "motivos": motivos_processor.process_motivos_csv,
+    "municipios": municipios_processor.process_municipios_csv,
+    "naturezas": naturezas_processor.process_naturezas_csv,
+    "paises": paises_processor.process_paises_csv,
+    "qualificacoes": qualificacoes_processor.process_qualificacoes_csv,
+}
+
+# Descriptions for the codes the default rows above use.
+REFERENCES = {
+    "cnaes": {"6201501": "Desenvolvimento de programas de computador sob encomenda"},
+    "motivos": {"00": "SEM MOTIVO"},
+    "municipios": {"7107": "SAO PAULO"},
+    "naturezas": {"2062": "Sociedade Empresaria Limitada"},
+    "paises": {"105": "BRASIL"},
+    "qualificacoes": {"49": "Socio-Administrador"},
+}
+
+# The file name each type is classified by in the orchestrator.
+FILE_NAMES = {
+    "empresas": "K3241.K03200Y0.D40511.EMPRECSV",
+    "estabelecimentos": "K3241.K03200Y0.D40511.ESTABELE",
+    "socios": "K3241.K03200Y0.D40511.SOCIOCSV",
+    "simples": "F.K03200$W.SIMPLES.CSV.D40511",
+}
+
+
+def cnpj_dv(basico: str, ordem: str) -> str:
+    """The two check digits of a CNPJ."""
+    digits = [int(d) for d in basico + ordem]
+    for weights in ([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2], [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]):
+        remainder = sum(d * w for d, w in zip(digits, weights)) % 11
+        digits.append(0 if remainder < 2 else 11 - remainder)
+    return f"{digits[-2]}{digits[-1]}"
+
+
+def row(tipo: str, **values: str) -> dict[str, str]:
+    """A row of ``tipo`` with the defaults above overridden by ``values``."""
+    _, defaults = LAYOUTS[tipo]
+    unknown = set(values) - set(defaults)
+    if unknown:
+        raise KeyError(f"colunas desconhecidas para {tipo}: {sorted(unknown)}")
+    return {**defaults, **values}
+
+
+def render(tipo: str, rows: list[dict[str, str]]) -> bytes:
+    columns, _ = LAYOUTS[tipo]
+    lines = []
+    for values in rows:
+        fields = (str(values.get(column, "")).replace('"', '""') for column in columns)
+        lines.append(";".join(f'"{field}"' for field in fields))
+    return ("\n".join(lines) + "\n").encode("latin1")
+
+
+def write_csv(path: Path, tipo: str, rows: list[dict[str, str]]) -> Path:
+    path.write_bytes(render(tipo, rows))
+    return path
+
+
+def write_zip(path: Path, files: dict[str, list[dict[str, str]]]) -> Path:
+    """A release ZIP with one CSV per type, named as the Receita names them."""
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for tipo, rows in files.items():
+            archive.writestr(FILE_NAMES[tipo], render(tipo, rows))
+    return path
+
+
+def load(engine: Engine, directory: Path, tipo: str, rows: list[dict[str, str]]) -> int:
+    """Writes ``rows`` as a ``tipo`` file and runs its processor against ``engine``."""
+    path = write_csv(directory / f"{tipo}.csv", tipo, rows)
+    return PROCESSORS[tipo](path, engine=engine)
+
+
+def load_reference(engine: Engine, directory: Path, tabela: str, descricoes: dict[str, str]) -> int:
+    """Writes a ``codigo;descricao`` reference file and runs its processor against ``engine``."""
+    path = directory / f"{tabela}.csv"
+    lines = [f'"{codigo}";"{descricao}"' for codigo, descricao in descricoes.items()]
+    path.write_bytes(("\n".join(lines) + "\n").encode("latin1"))
+    return REFERENCE_PROCESSORS[tabela](path, engine=engine)
+
+
+def load_references(engine: Engine, directory: Path) -> None:
+    for tabela, descricoes in REFERENCES.items():
+        load_reference(engine, directory, tabela, descricoes)
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import Engine, exc, text
+
+from migrations import batched
+
+TABELA = "migracao_teste"
+
+
+def test_batch_sql_pages_by_key() -> None:
+    primeira = batched._batch_sql(TABELA, "id", "bigint", "SELECT 1", resume=False)
+    retomada = batched._batch_sql(TABELA, "id", "bigint", "SELECT 1", resume=True)
+
+    assert "WHERE id > CAST(:apos AS bigint)" not in primeira
+    assert "WHERE id > CAST(:apos AS bigint)" in retomada
+    for sql in (primeira, retomada):
+        assert "ORDER BY id\n            LIMIT :tamanho" in sql
+        assert f"INSERT INTO {batched.PROGRESS_TABLE}" in sql
+        assert "alterado AS (SELECT 1)" in sql
+
+
+def test_delete_duplicates_sql(monkeypatch: pytest.MonkeyPatch) -> None:
+    chamadas: list[tuple[Any, ...]] = []
+    monkeypatch.setattr(batched, "run_in_batches", lambda *args: chamadas.append(args) or 0)
+
+    batched.delete_duplicates("dedup", "socios", "id", ["{t}.cnpj_basico", "COALESCE({t}.nome, '')"], 500, 0)
+
+    [(nome, tabela, chave, statement, tamanho, pausa)] = chamadas
+    assert (nome, tabela, chave, tamanho, pausa) == ("dedup", "socios", "id", 500, 0)
+    assert "DELETE FROM socios a\n        USING lote\n        WHERE a.id = lote.chave" in statement
+    assert "WHERE b.id < a.id\n                AND b.cnpj_basico = a.cnpj_basico AND COALESCE(b.nome, '') = COALESCE(a.nome, '')" in statement
+    assert statement.rstrip().endswith("RETURNING 1")
+
+
+def test_backfill_sql(monkeypatch: pytest.MonkeyPatch) -> None:
+    chamadas: list[tuple[Any, ...]] = []
+    monkeypatch.setattr(batched, "run_in_batches", lambda *args: chamadas.append(args) or 0)
+
+    batched.backfill("tipo", "empresas", "cnpj_basico", "capital = 0", where="t.capital IS NULL")
+
+    statement = chamadas[0][3]
+    assert "UPDATE empresas t\n        SET capital = 0\n        FROM lote" in statement
+    assert "WHERE t.cnpj_basico = lote.chave AND (t.capital IS NULL)" in statement
+
+
+@pytest.fixture
+def tabela(engine: Engine) -> Iterator[Engine]:
+    with engine.begin() as connection:
+        connection.execute(text(f"CREATE TABLE {TABELA} (id bigint PRIMARY KEY, grupo int, valor int)"))
+        # Groups of three equal rows: ids 1-3 share group 1, 4-6 group 2, ...
+        connection.execute(text(f"INSERT INTO {TABELA} SELECT n, (n + 2) / 3, 0 FROM generate_series(1, 60) n"))
+    yield engine
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {TABELA}"))
+        connection.execute(text(f"DROP TABLE IF EXISTS {batched.PROGRESS_TABLE}"))
+
+
+def _migrar(engine: Engine, passo: Any) -> Any:
+    with engine.connect() as connection:
+        with Operations.context(MigrationContext.configure(connection)):
+            return passo()
+
+
+def _linhas(engine: Engine) -> list[tuple[int, int, int]]:
+    with engine.connect() as connection:
+        return [tuple(row) for row in connection.execute(text(f"SELECT id, grupo, valor FROM {TABELA} ORDER BY id"))]
+
+
+def _progresso(engine: Engine) -> list[tuple[str, str, int]]:
+    with engine.connect() as connection:
+        rows = connection.execute(text(f"SELECT nome, ultima_chave, lotes FROM {batched.PROGRESS_TABLE}"))
+        return [tuple(row) for row in rows]
+
+
+def test_delete_duplicates_keeps_the_lowest_key(tabela: Engine) -> None:
+    removidas = _migrar(tabela, lambda: batched.delete_duplicates("dedup", TABELA, "id", ["{t}.grupo"], 7, 0))
+
+    assert removidas == 40
+    assert [row[0] for row in _linhas(tabela)] == list(range(1, 61, 3))
+    # A finished run leaves no progress behind, so a re-run redoes the whole pass.
+    assert _progresso(tabela) == []
+
+
+def test_interrupted_run_resumes_after_the_last_committed_batch(tabela: Engine) -> None:
+    # Batches of 10: the third holds id 25, where the division fails.
+    quebrado = f"UPDATE {TABELA} t SET valor = 100 / (t.id - 25) FROM lote WHERE t.id = lote.chave RETURNING 1"
+    with pytest.raises(exc.DataError):
+        _migrar(tabela, lambda: batched.run_in_batches("backfill", TABELA, "id", quebrado, 10, 0))
+
+    assert _progresso(tabela) == [("backfill", "20", 2)]
+    assert [valor for _, _, valor in _linhas(tabela)[20:]] == [0] * 40
+
+    corrigido = f"UPDATE {TABELA} t SET valor = 1 FROM lote WHERE t.id = lote.chave RETURNING 1"
+    alteradas = _migrar(tabela, lambda: batched.run_in_batches("backfill", TABELA, "id", corrigido, 10, 0))
+
+    assert alteradas == 40
+    valores = [valor for _, _, valor in _linhas(tabela)]
+    # The first two batches were already applied and are not redone.
+    assert valores[:20] == [int(100 / (n - 25)) for n in range(1, 21)]
+    assert valores[20:] == [1] * 40
+    assert _progresso(tabela) == []
+
+
+TIPOS = "migracao_tipos"
+
+
+@pytest.fixture
+def tipos(engine: Engine) -> Iterator[Engine]:
+    with engine.begin() as connection:
+        connection.execute(
+            text(f"CREATE TABLE {TIPOS} (chave varchar(8) PRIMARY KEY, codigo varchar NOT NULL, nome text)")
+        )
+        connection.execute(text(f"CREATE INDEX idx_{TIPOS}_codigo ON {TIPOS} (codigo)"))
+        connection.execute(
+            text(f"INSERT INTO {TIPOS} SELECT lpad(n::text, 8, '0'), lpad((n % 7)::text, 2, '0'), 'x' FROM generate_series(1, 30) n")
+        )
+    yield engine
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {TIPOS}"))
+        connection.execute(text(f"DROP FUNCTION IF EXISTS {TIPOS}_sincroniza_novo()"))
+        connection.execute(text(f"DROP TABLE IF EXISTS {batched.PROGRESS_TABLE}"))
+
+
+TIPOS_COLUNAS = [("chave", "CHAR(8)", "{t}.chave"), ("codigo", "SMALLINT", "btrim({t}.codigo)::smallint")]
+
+
+def _trocar_tipos() -> None:
+    batched.swap_columns(
+        TIPOS,
+        ["chave", "codigo"],
+        indexes=[
+            (f"{TIPOS}_pkey", f"({batched.shadow('chave')})", True),
+            (f"idx_{TIPOS}_codigo", f"({batched.shadow('codigo')})", False),
+        ],
+        primary_key=f"{TIPOS}_pkey",
+    )
+
+
+def _catalogo(engine: Engine) -> dict[str, Any]:
+    with engine.connect() as connection:
+        colunas = connection.execute(
+            text(
+                f"""
+                SELECT attname, format_type(atttypid, atttypmod), attnotnull
+                FROM pg_attribute
+                WHERE attrelid = '{TIPOS}'::regclass AND attnum > 0 AND NOT attisdropped
+                ORDER BY attname
+                """
+            )
+        )
+        indices = connection.execute(
+            text(f"SELECT indexname, indexdef FROM pg_indexes WHERE tablename = '{TIPOS}' ORDER BY 1")
+        )
+        restricoes = connection.execute(
+            text(f"SELECT conname, contype FROM pg_constraint WHERE conrelid = '{TIPOS}'::regclass ORDER BY 1")
+        )
+        gatilhos = connection.execute(
+            text(f"SELECT count(*) FROM pg_trigger WHERE tgrelid = '{TIPOS}'::regclass")
+        ).scalar()
+        return {
+            "colunas": [tuple(row) for row in colunas],
+            "indices": dict(tuple(row) for row in indices),
+            "restricoes": [tuple(row) for row in restricoes if row.contype != "n"],
+            "gatilhos": gatilhos,
+        }
+
+
+def test_shadow_columns_change_types_without_losing_writes(tipos: Engine) -> None:
+    copiadas = _migrar(tipos, lambda: batched.shadow_columns("tipos", TIPOS, "chave", TIPOS_COLUNAS, 7, 0))
+
+    assert copiadas == 30
+    # Written while the copies exist: the trigger converts them.
+    with tipos.begin() as connection:
+        connection.execute(text(f"INSERT INTO {TIPOS} VALUES ('00000031', ' 42 ', 'novo')"))
+        connection.execute(text(f"UPDATE {TIPOS} SET codigo = '09' WHERE chave = '00000001'"))
+
+    _migrar(tipos, _trocar_tipos)
+
+    catalogo = _catalogo(tipos)
+    assert catalogo["colunas"] == [
+        ("chave", "character(8)", True),
+        ("codigo", "smallint", True),
+        ("nome", "text", False),
+    ]
+    assert catalogo["indices"] == {
+        f"idx_{TIPOS}_codigo": f"CREATE INDEX idx_{TIPOS}_codigo ON public.{TIPOS} USING btree (codigo)",
+        f"{TIPOS}_pkey": f"CREATE UNIQUE INDEX {TIPOS}_pkey ON public.{TIPOS} USING btree (chave)",
+    }
+    assert catalogo["restricoes"] == [(f"{TIPOS}_pkey", "p")]
+    assert catalogo["gatilhos"] == 0
+    with tipos.connect() as connection:
+        linhas = dict(connection.execute(text(f"SELECT chave, codigo FROM {TIPOS}")).all())
+    assert len(linhas) == 31
+    assert (linhas["00000001"], linhas["00000031"], linhas["00000013"]) == (9, 42, 6)
+
+
+def test_shadow_columns_rerun_after_the_swap_is_a_no_op(tipos: Engine) -> None:
+    _migrar(tipos, lambda: batched.shadow_columns("tipos", TIPOS, "chave", TIPOS_COLUNAS, 7, 0))
+    _migrar(tipos, _trocar_tipos)
+    antes = _catalogo(tipos)
+
+    assert _migrar(tipos, lambda: batched.shadow_columns("tipos", TIPOS, "chave", TIPOS_COLUNAS, 7, 0)) == 0
+    _migrar(tipos, _trocar_tipos)
+
+    assert _catalogo(tipos) == antes
+
+
+def test_set_not_null(tipos: Engine) -> None:
+    _migrar(tipos, lambda: batched.set_not_null(TIPOS, "nome"))
+
+    assert ("nome", "text", True) in _catalogo(tipos)["colunas"]
+    assert _catalogo(tipos)["restricoes"] == [(f"{TIPOS}_pkey", "p")]
+
+
+def test_set_not_null_fails_on_nulls(tipos: Engine) -> None:
+    with tipos.begin() as connection:
+        connection.execute(text(f"UPDATE {TIPOS} SET nome = NULL WHERE chave = '00000005'"))
+
+    with pytest.raises(exc.IntegrityError):
+        _migrar(tipos, lambda: batched.set_not_null(TIPOS, "nome"))
+
+    assert ("nome", "text", False) in _catalogo(tipos)["colunas"]
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from pathlib import Path
+from types import ModuleType
+
+import pandas as pd
+import pytest
+
+from etl.processors import empresas_processor, estabelecimentos_processor, socios_processor
+from etl.utils.normalize import category_dtypes
+from etl.utils.postgres_copy import encode_copy_csv
+from tests import receita
+
+PROCESSORS: dict[str, ModuleType] = {
+    "empresas": empresas_processor,
+    "estabelecimentos": estabelecimentos_processor,
+    "socios": socios_processor,
+}
+
+# Padding, blanks and invalid codes in the categorical columns, mixed with clean values.
+VARIANTES: dict[str, list[dict[str, str]]] = {
+    "empresas": [
+        {"natureza_juridica": "2062", "porte_empresa": "01"},
+        {"natureza_juridica": " 2062 ", "porte_empresa": "1"},
+        {"natureza_juridica": "", "porte_empresa": ""},
+        {"natureza_juridica": "ABCD", "porte_empresa": "05"},
+    ],
+    "estabelecimentos": [
+        {"uf": "SP", "situacao": "02", "motivo": "00", "pais": "", "municipio": "7107", "matriz_filial": "1"},
+        {"uf": " SP", "situacao": "2", "motivo": "01", "pais": "105", "municipio": "07107", "matriz_filial": "2"},
+        {"uf": "", "situacao": "", "motivo": "", "pais": "XX", "municipio": "", "matriz_filial": ""},
+        {"uf": "EX", "situacao": "08", "motivo": "A1", "pais": "249", "municipio": "9999", "cnae_principal": ""},
+    ],
+    "socios": [
+        {"qualificacao": "49", "pais": ""},
+        {"qualificacao": " 49", "pais": "105"},
+        {"qualificacao": "", "pais": "XX"},
+        {"qualificacao": "22", "pais": " 105 "},
+    ],
+}
+
+
+def _rows(tipo: str) -> list[dict[str, str]]:
+    rows = []
+    for n in range(40):
+        basico = f"{n + 1:08d}"
+        values = {"cnpj_basico": basico, **VARIANTES[tipo][n % len(VARIANTES[tipo])]}
+        if tipo == "estabelecimentos":
+            values["cnpj_dv"] = receita.cnpj_dv(basico, "0001")
+        if tipo == "socios":
+            values["cpf_cnpj"] = f"***{n:06d}**"
+        rows.append(receita.row(tipo, **values))
+    return rows
+
+
+def _copy_body(path: Path, processor: ModuleType, dtype: object) -> list[str]:
+    chunks = pd.read_csv(
+        path,
+        sep=";",
+        dtype=dtype,
+        encoding="latin1",
+        header=None,
+        names=processor.CSV_COLUMNS,
+        keep_default_na=False,
+        chunksize=15,
+    )
+    bodies = []
+    for chunk in chunks:
+        prepared = processor._prepare_chunk(chunk)
+        for frame in prepared if isinstance(prepared, tuple) else (prepared,):
+            bodies.append(encode_copy_csv(frame).getvalue())
+    return bodies
+
+
+@pytest.mark.parametrize("tipo", sorted(PROCESSORS))
+def test_categorical_and_text_reads_copy_the_same_rows(tmp_path: Path, tipo: str) -> None:
+    processor = PROCESSORS[tipo]
+    path = receita.write_csv(tmp_path / f"{tipo}.csv", tipo, _rows(tipo))
+
+    texto = _copy_body(path, processor, str)
+    categorias = _copy_body(path, processor, category_dtypes(processor.CSV_COLUMNS, processor.CATEGORY_COLUMNS))
+
+    assert categorias == texto
+    assert all(body for body in texto)
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import Engine, text
+
+from app.config import settings
+from app.core import cache as cache_module
+from app.core.cache import CacheBackend
+from app.core.metrics import get_metrics_store, get_uptime_seconds
+from etl.documentos import refresh_documentos
+from tests import receita
+
+BASICO = "11222333"
+ORDENS = ["0001", "0002", "0003"]
+COMPLETO = BASICO + "0002" + receita.cnpj_dv(BASICO, "0002")
+
+
+class FakeRedis:
+    """The subset of redis.Redis that CacheBackend uses, kept in a dict."""
+
+    def __init__(self) -> None:
+        self.values: dict[str, str] = {}
+        self.ttls: dict[str, int] = {}
+
+    def get(self, key: str) -> str | None:
+        return self.values.get(key)
+
+    def setex(self, key: str, ttl: int, value: str) -> None:
+        self.values[key] = value
+        self.ttls[key] = ttl
+
+    def mget(self, keys: list[str]) -> list[str | None]:
+        return [self.values.get(key) for key in keys]
+
+    def pipeline(self) -> FakeRedis:
+        return self
+
+    def execute(self) -> None:
+        return None
+
+
+@pytest.fixture
+def redis(monkeypatch: pytest.MonkeyPatch) -> FakeRedis:
+    monkeypatch.setattr(settings, "REDIS_URL", "")
+    backend = CacheBackend()
+    backend.client = FakeRedis()
+    backend.enabled = True
+    monkeypatch.setattr(cache_module, "_CACHE_SINGLETON", backend)
+    return backend.client
+
+
+def _carregar(engine: Engine, tmp_path: Path, documentos: bool = True) -> None:
+    receita.load(engine, tmp_path, "empresas", [receita.row("empresas", cnpj_basico=BASICO)])
+    receita.load(
+        engine,
+        tmp_path,
+        "estabelecimentos",
+        [
+            receita.row("estabelecimentos", cnpj_basico=BASICO, cnpj_ordem=ordem, cnpj_dv=receita.cnpj_dv(BASICO, ordem))
+            for ordem in ORDENS
+        ],
+    )
+    if documentos:
+        refresh_documentos(engine)
+
+
+def _sem_cache(client: Any, monkeypatch: pytest.MonkeyPatch, path: str) -> Any:
+    with monkeypatch.context() as patch:
+        patch.setattr(cache_module, "_CACHE_SINGLETON", None)
+        patch.setattr(settings, "REDIS_URL", "")
+        return client.get(path).json()
+
+
+def _contadores() -> tuple[int, int]:
+    snapshot = get_metrics_store().snapshot(get_uptime_seconds())
+    return snapshot["cache_hits_total"], snapshot["cache_misses_total"]
+
+
+def _estabelecimentos(documento: Any) -> list[str]:
+    return [est["cnpj_completo"] for est in documento["estabelecimentos"]]
+
+
+def test_miss_populates_the_entry_and_hit_skips_the_database(
+    engine: Engine, client: Any, redis: FakeRedis, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    _carregar(engine, tmp_path)
+    esperado = _sem_cache(client, monkeypatch, f"/api/v1/cnpj/{BASICO}")
+    hits, misses = _contadores()
+
+    primeira = client.get(f"/api/v1/cnpj/{BASICO}")
+
+    assert primeira.status_code == 200
+    assert primeira.json() == esperado
+    assert _contadores() == (hits, misses + 1)
+    assert json.loads(redis.values[f"cnpj:{BASICO}"]) == esperado
+    assert redis.ttls[f"cnpj:{BASICO}"] == settings.CACHE_TTL_SECONDS
+
+    with engine.begin() as connection:
+        connection.execute(text("TRUNCATE cnpj_documento"))
+    segunda = client.get(f"/api/v1/cnpj/{BASICO}")
+
+    assert segunda.json() == esperado
+    assert _contadores() == (hits + 1, misses + 1)
+
+
+def test_full_cnpj_is_filtered_from_the_root_entry(
+    engine: Engine, client: Any, redis: FakeRedis, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    _carregar(engine, tmp_path)
+    esperado = _sem_cache(client, monkeypatch, f"/api/v1/cnpj/{COMPLETO}")
+    hits, misses = _contadores()
+
+    resposta = client.get(f"/api/v1/cnpj/{COMPLETO}")
+
+    assert resposta.json() == esperado
+    assert _estabelecimentos(resposta.json()) == [COMPLETO]
+    # One entry per company, holding every establishment.
+    assert list(redis.values) == [f"cnpj:{BASICO}"]
+    assert len(_estabelecimentos(json.loads(redis.values[f"cnpj:{BASICO}"]))) == len(ORDENS)
+
+    # Another establishment and the root lookup are served by the same entry.
+    outro = BASICO + "0003" + receita.cnpj_dv(BASICO, "0003")
+    assert _estabelecimentos(client.get(f"/api/v1/cnpj/{outro}").json()) == [outro]
+    assert len(_estabelecimentos(client.get(f"/api/v1/cnpj/{BASICO}").json())) == len(ORDENS)
+    assert _contadores() == (hits + 2, misses + 1)
+
+
+def test_detalhes_read_the_cached_document(
+    engine: Engine, client: Any, redis: FakeRedis, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    _carregar(engine, tmp_path)
+    path = f"/api/v1/cnpj/{COMPLETO}?detalhes=true"
+    esperado = _sem_cache(client, monkeypatch, path)
+
+    client.get(f"/api/v1/cnpj/{BASICO}")
+    hits, misses = _contadores()
+
+    assert client.get(path).json() == esperado
+    assert _contadores() == (hits + 1, misses)
+
+
+def test_without_document_the_built_response_is_cached(
+    engine: Engine, client: Any, redis: FakeRedis, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    _carregar(engine, tmp_path, documentos=False)
+    esperado = _sem_cache(client, monkeypatch, f"/api/v1/cnpj/{COMPLETO}")
+
+    resposta = client.get(f"/api/v1/cnpj/{COMPLETO}")
+
+    assert resposta.json() == esperado
+    assert len(_estabelecimentos(json.loads(redis.values[f"cnpj:{BASICO}"]))) == len(ORDENS)
+
+
+def test_unknown_cnpj_is_not_cached(engine: Engine, client: Any, redis: FakeRedis) -> None:
+    hits, misses = _contadores()
+
+    assert client.get("/api/v1/cnpj/99999999").status_code == 404
+    assert redis.values == {}
+    assert _contadores() == (hits, misses + 1)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import Engine
+
+from etl.documentos import refresh_documentos
+from tests import receita
+
+BASICO = "11222333"
+FILIAL = BASICO + "0002" + receita.cnpj_dv(BASICO, "0002")
+
+
+@pytest.fixture
+def carregado(engine: Engine, tmp_path: Path) -> Engine:
+    receita.load(engine, tmp_path, "empresas", [receita.row("empresas")])
+    receita.load(
+        engine,
+        tmp_path,
+        "estabelecimentos",
+        [
+            receita.row("estabelecimentos"),
+            receita.row(
+                "estabelecimentos",
+                cnpj_ordem="0002",
+                cnpj_dv=receita.cnpj_dv(BASICO, "0002"),
+                matriz_filial="2",
+                cep="20040002",
+                email="",
+                situacao_especial="INTERVENCAO",
+                data_situacao_especial="20240105",
+            ),
+        ],
+    )
+    return engine
+
+
+@pytest.fixture(params=["documento", "tabelas"])
+def origem(request: pytest.FixtureRequest, carregado: Engine) -> str:
+    # With the stored document or, before the first refresh, from the tables.
+    if request.param == "documento":
+        refresh_documentos(carregado)
+    return str(request.param)
+
+
+def test_plain_response_has_no_detalhes(client: Any, origem: str) -> None:
+    body = client.get(f"/api/v1/cnpj/{BASICO}").json()
+
+    assert len(body["estabelecimentos"]) == 2
+    assert all("detalhes" not in est for est in body["estabelecimentos"])
+
+
+def test_detalhes_are_added_to_each_establishment(client: Any, origem: str) -> None:
+    simples = client.get(f"/api/v1/cnpj/{BASICO}").json()
+    body = client.get(f"/api/v1/cnpj/{BASICO}", params={"detalhes": True}).json()
+
+    detalhes = {est["cnpj_completo"]: est.pop("detalhes") for est in body["estabelecimentos"]}
+    assert body == simples
+    assert detalhes[FILIAL] == {
+        "matriz_filial": "2",
+        "cep": "20040002",
+        "tipo_logradouro": "RUA",
+        "logradouro": "DAS FLORES",
+        "numero": "10",
+        "complemento": None,
+        "bairro": "CENTRO",
+        "cidade_exterior": None,
+        "ddd1": "11",
+        "telefone1": "33334444",
+        "ddd2": None,
+        "telefone2": None,
+        "email": None,
+        "situacao_especial": "INTERVENCAO",
+        "data_situacao_especial": "2024-01-05",
+    }
+
+
+def test_detalhes_of_one_establishment(client: Any, origem: str) -> None:
+    body = client.get(f"/api/v1/cnpj/{FILIAL}", params={"detalhes": True}).json()
+
+    assert [(est["cnpj_completo"], est["detalhes"]["cep"]) for est in body["estabelecimentos"]] == [
+        (FILIAL, "20040002")
+    ]
+
+
+def test_unknown_cnpj_with_detalhes(engine: Engine, client: Any) -> None:
+    assert client.get("/api/v1/cnpj/99999999", params={"detalhes": True}).status_code == 404
+
+
+def test_openapi_declares_both_shapes(client: Any) -> None:
+    resposta = client.get("/openapi.json").json()["paths"]["/api/v1/cnpj/{cnpj}"]["get"]["responses"]["200"]
+
+    assert resposta["content"]["application/json"]["schema"]["anyOf"] == [
+        {"$ref": "#/components/schemas/CNPJResponse"},
+        {"$ref": "#/components/schemas/CNPJDetalhadoResponse"},
+    ]
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from app.schemas.codes import code_list_sql, code_sql, format_code, format_code_list
+from app.schemas.empresa import EmpresaSchema
+from app.schemas.estabelecimento import EstabelecimentoDetalheSchema, EstabelecimentoSchema
+from app.schemas.socio import SocioSchema
+from etl.processors.empresas_processor import process_empresas_csv
+from etl.utils.normalize import normalize_code_columns, normalize_decimal_columns
+from tests import receita
+
+
+def test_schemas_zero_pad_integer_codes() -> None:
+    empresa = EmpresaSchema.model_validate(
+        {
+            "cnpj_basico": "11222333",
+            "natureza_juridica": 2062,
+            "porte_empresa": 1,
+            "capital_social": Decimal("1000.50"),
+        }
+    )
+    assert empresa.natureza_juridica == "2062"
+    assert empresa.porte_empresa == "01"
+    assert empresa.capital_social == "1000.50"
+
+    socio = SocioSchema.model_validate({"id": 1, "cnpj_basico": "11222333", "qualificacao": 5, "pais": None})
+    assert socio.qualificacao == "05"
+    assert socio.pais is None
+
+    detalhe = EstabelecimentoDetalheSchema.model_validate({"matriz_filial": 1, "cep": 1001000})
+    assert detalhe.matriz_filial == "1"
+    assert detalhe.cep == "01001000"
+
+
+def test_schemas_keep_published_strings() -> None:
+    estabelecimento = EstabelecimentoSchema(
+        cnpj_completo="11222333000181",
+        cnpj_basico="11222333",
+        situacao="02",
+        cnae_principal="0111301",
+    )
+    assert estabelecimento.situacao == "02"
+    assert estabelecimento.cnae_principal == "0111301"
+
+
+def test_cnae_secundario_list() -> None:
+    base = {"cnpj_completo": "11222333000181", "cnpj_basico": "11222333"}
+    listed = EstabelecimentoSchema.model_validate({**base, "cnae_secundario": [6201501, 111301]})
+    empty = EstabelecimentoSchema.model_validate({**base, "cnae_secundario": []})
+    assert listed.cnae_secundario == "6201501,0111301"
+    assert empty.cnae_secundario is None
+    assert format_code_list(None, "cnae_secundario") is None
+
+
+@pytest.mark.parametrize("categorical", [False, True])
+def test_normalize_code_columns(categorical: bool) -> None:
+    values = pd.Series(["0111301", " 02", "", "abc", "7"])
+    chunk = pd.DataFrame({"cnae_principal": values.astype("category") if categorical else values})
+
+    codes = normalize_code_columns(chunk, ["cnae_principal"])["cnae_principal"]
+
+    assert [None if pd.isna(code) else int(code) for code in codes] == [111301, 2, None, None, 7]
+
+
+def test_normalize_decimal_columns() -> None:
+    chunk = pd.DataFrame({"capital_social": ["1000,50", "0,00", "", "1.000,00", "12"]})
+
+    values = normalize_decimal_columns(chunk, ["capital_social"])["capital_social"]
+
+    assert [None if pd.isna(value) else value for value in values] == ["1000.50", "0.00", None, None, "12"]
+
+
+def test_empresas_load_typed_columns(engine, tmp_path) -> None:
+    rows = [
+        receita.row("empresas", natureza_juridica="0001", porte_empresa="05", capital_social="1234,56"),
+        receita.row("empresas", cnpj_basico="44555666", natureza_juridica="X", capital_social=""),
+    ]
+    assert process_empresas_csv(receita.write_csv(tmp_path / "empresas.csv", "empresas", rows), engine=engine) == 2
+
+    with engine.connect() as connection:
+        loaded = connection.execute(
+            text(
+                """
+                SELECT cnpj_basico, natureza_juridica, porte_empresa, capital_social
+                FROM empresas
+                ORDER BY cnpj_basico
+                """
+            )
+        ).all()
+    assert [tuple(row) for row in loaded] == [
+        ("11222333", 1, 5, Decimal("1234.56")),
+        ("44555666", None, 1, None),
+    ]
+
+
+def test_code_sql_matches_format_code(engine) -> None:
+    with engine.connect() as connection:
+        padded, listed = connection.execute(
+            text(
+                f"SELECT {code_sql('CAST(:codigo AS INTEGER)', 'cnae_principal')}, "
+                f"{code_list_sql('CAST(:codigos AS INTEGER[])', 'cnae_secundario')}"
+            ),
+            {"codigo": 111301, "codigos": [6201501, 111301]},
+        ).one()
+    assert padded == format_code(111301, "cnae_principal")
+    assert listed == format_code_list([6201501, 111301], "cnae_secundario")
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import Engine, text
+
+from tests import receita
+
+A, B = "11222333", "44555666"
+TELEFONE = 1133334444
+
+
+def _cnpj(basico: str, ordem: str) -> str:
+    return basico + ordem + receita.cnpj_dv(basico, ordem)
+
+
+def _estabelecimento(basico: str, ordem: str, **values: str) -> dict[str, str]:
+    return receita.row(
+        "estabelecimentos", cnpj_basico=basico, cnpj_ordem=ordem, cnpj_dv=receita.cnpj_dv(basico, ordem), **values
+    )
+
+
+def _contatos(engine: Engine) -> set[tuple[str, int | None, str | None]]:
+    with engine.connect() as connection:
+        return {tuple(row) for row in connection.execute(text("SELECT cnpj_completo, telefone, email FROM contatos"))}
+
+
+@pytest.fixture
+def carregado(engine: Engine, tmp_path: Path) -> Engine:
+    receita.load(engine, tmp_path, "empresas", [receita.row("empresas", cnpj_basico=b) for b in (A, B)])
+    receita.load(
+        engine,
+        tmp_path,
+        "estabelecimentos",
+        [
+            _estabelecimento(A, "0001", ddd1="011", telefone1="3333-4444", email=" Contato@Teste.com.br "),
+            _estabelecimento(A, "0002", ddd1="11", telefone1="33334444", ddd2="21", telefone2="987654321", email=""),
+            _estabelecimento(B, "0001", ddd1="", telefone1="3333", email="sem-arroba"),
+        ],
+    )
+    return engine
+
+
+def test_load_fills_contatos(carregado: Engine) -> None:
+    assert _contatos(carregado) == {
+        (_cnpj(A, "0001"), TELEFONE, None),
+        (_cnpj(A, "0001"), None, "contato@teste.com.br"),
+        (_cnpj(A, "0002"), TELEFONE, None),
+        (_cnpj(A, "0002"), 21987654321, None),
+    }
+
+
+def test_reload_replaces_changed_contacts(carregado: Engine, tmp_path: Path) -> None:
+    receita.load(
+        carregado,
+        tmp_path,
+        "estabelecimentos",
+        [_estabelecimento(A, "0002", ddd1="11", telefone1="33334444", email="novo@teste.com.br")],
+    )
+
+    contatos = {c for c in _contatos(carregado) if c[0] == _cnpj(A, "0002")}
+    assert contatos == {(_cnpj(A, "0002"), TELEFONE, None), (_cnpj(A, "0002"), None, "novo@teste.com.br")}
+
+
+@pytest.mark.parametrize(
+    "telefone", ["(11) 3333-4444", "011 33334444", "+55 11 3333-4444", "551133334444", "0055 (011) 3333-4444"]
+)
+def test_any_spelling_finds_the_stored_phone(carregado: Engine, client: Any, telefone: str) -> None:
+    response = client.get(f"/api/v1/contatos/telefone/{telefone}")
+
+    assert response.status_code == 200
+    assert [r["cnpj_completo"] for r in response.json()["resultados"]] == [_cnpj(A, "0001"), _cnpj(A, "0002")]
+
+
+def test_email_ignores_case_and_spaces(carregado: Engine, client: Any) -> None:
+    response = client.get("/api/v1/contatos/email/ CONTATO@teste.COM.br")
+
+    assert [r["cnpj_completo"] for r in response.json()["resultados"]] == [_cnpj(A, "0001")]
+
+
+@pytest.mark.parametrize("path", ["telefone/3333-4444", "telefone/12345678901234", "email/sem-arroba", "email/@teste"])
+def test_invalid_contacts_are_rejected(carregado: Engine, client: Any, path: str) -> None:
+    assert client.get(f"/api/v1/contatos/{path}").status_code == 422
+
+
+def test_batch(carregado: Engine, client: Any) -> None:
+    contatos = ["(11) 3333-4444", "+55 21 98765-4321", "contato@TESTE.com.br", "outro@teste.com.br", "123"]
+
+    body = client.post("/api/v1/contatos/batch", params={"max_por_contato": 1}, json={"contatos": contatos}).json()
+
+    assert body["resultados"] == {
+        "(11) 3333-4444": [_cnpj(A, "0001")],
+        "+55 21 98765-4321": [_cnpj(A, "0002")],
+        "contato@TESTE.com.br": [_cnpj(A, "0001")],
+    }
+    assert body["truncados"] == ["(11) 3333-4444"]
+    assert sorted(body["nao_encontrados"]) == ["123", "outro@teste.com.br"]
+    assert (body["total"], body["encontrados"]) == (5, 3)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from sqlalchemy import Engine, create_engine, text
+
+from etl.schema_report import INDEX_ONLY_RELATIONS, check_index_only_scans
+from tests import receita
+
+
+@pytest.fixture
+def loaded(engine: Engine, tmp_path: Path) -> Engine:
+    basicos = [f"{n:08d}" for n in range(11222333, 11222333 + 50)]
+    receita.load(engine, tmp_path, "empresas", [receita.row("empresas", cnpj_basico=b) for b in basicos])
+    receita.load(
+        engine,
+        tmp_path,
+        "estabelecimentos",
+        [
+            receita.row(
+                "estabelecimentos",
+                cnpj_basico=b,
+                cnpj_dv=receita.cnpj_dv(b, "0001"),
+                situacao="02" if i % 2 else "08",
+            )
+            for i, b in enumerate(basicos)
+        ],
+    )
+    receita.load(engine, tmp_path, "socios", [receita.row("socios", cnpj_basico=b) for b in basicos])
+    receita.load(engine, tmp_path, "simples", [receita.row("simples", cnpj_basico=b) for b in basicos])
+
+    # Index-only scans skip the heap only for all-visible pages.
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("VACUUM ANALYZE"))
+    return engine
+
+
+def test_lookup_queries_use_index_only_scans(loaded: Engine) -> None:
+    # The tables are tiny, so a sequential or bitmap scan would win on cost;
+    # take them off the table to see which index the planner picks.
+    planner = create_engine(
+        loaded.url,
+        connect_args={"options": "-c enable_seqscan=off -c enable_bitmapscan=off"},
+    )
+    try:
+        resultado = check_index_only_scans(planner)
+    finally:
+        planner.dispose()
+
+    assert resultado["ok"], resultado["violacoes"]
+    consultas = resultado["consultas"]
+    assert set(consultas) == {"empresa", "estabelecimentos_basico", "estabelecimentos_completo", "socios"}
+    for nome, nodes in consultas.items():
+        lookups = [node for node in nodes if node["relacao"] in INDEX_ONLY_RELATIONS]
+        assert lookups, nome
+        # After the VACUUM every page is all-visible, so not a single heap fetch.
+        assert all(node["tipo"] == "Index Only Scan" and node["heap_fetches"] == 0 for node in lookups), (nome, nodes)
+
+    lidas = {node["relacao"] for nodes in consultas.values() for node in nodes}
+    assert {"empresas", "simples", "socios"} <= lidas
+    assert lidas & {"estabelecimentos_ativos", "estabelecimentos_inativos"}
+
+
+def test_check_flags_heap_scans(loaded: Engine) -> None:
+    # Without the covering index the planner has to visit the heap for the SELECT list.
+    with loaded.begin() as connection:
+        definicao = connection.execute(text("SELECT pg_get_indexdef('idx_socios_lookup'::regclass)")).scalar_one()
+        connection.execute(text("DROP INDEX idx_socios_lookup"))
+    planner = create_engine(
+        loaded.url,
+        connect_args={"options": "-c enable_seqscan=off -c enable_bitmapscan=off"},
+    )
+    try:
+        resultado = check_index_only_scans(planner)
+    finally:
+        planner.dispose()
+        with loaded.begin() as connection:
+            connection.execute(text(definicao))
+
+    assert not resultado["ok"]
+    assert any(violacao.startswith("socios:") for violacao in resultado["violacoes"])
+
+
+def test_reference_tables_have_only_their_primary_key(engine: Engine) -> None:
+    with engine.connect() as connection:
+        indices = connection.execute(
+            text(
+                """
+                SELECT tablename, indexname
+                FROM pg_indexes
+                WHERE schemaname = current_schema()
+                  AND tablename IN ('cnaes', 'motivos', 'municipios', 'naturezas', 'paises', 'qualificacoes')
+                  AND indexname LIKE '%lookup%'
+                """
+            )
+        ).all()
+    assert indices == []
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import Engine, text
+from sqlalchemy.orm import Session
+
+from app.api.v1.cnpj import _cnpj_response_from_db
+from etl.documentos import QUEUE_TABLE, refresh_documentos
+from tests import receita
+
+BASICO = "11222333"
+MATRIZ = BASICO + "0001" + receita.cnpj_dv(BASICO, "0001")
+FILIAL = BASICO + "0002" + receita.cnpj_dv(BASICO, "0002")
+
+
+@pytest.fixture
+def carregado(engine: Engine, tmp_path: Path) -> Engine:
+    receita.load(engine, tmp_path, "empresas", [receita.row("empresas")])
+    receita.load(
+        engine,
+        tmp_path,
+        "estabelecimentos",
+        [
+            receita.row("estabelecimentos", cnpj_dv=MATRIZ[-2:]),
+            receita.row(
+                "estabelecimentos",
+                cnpj_ordem="0002",
+                cnpj_dv=FILIAL[-2:],
+                matriz_filial="2",
+                situacao="08",
+                motivo="01",
+                pais="105",
+                cnae_secundario="",
+            ),
+        ],
+    )
+    receita.load(engine, tmp_path, "socios", [receita.row("socios"), receita.row("socios", nome="BELTRANO", pais="105")])
+    receita.load(engine, tmp_path, "simples", [receita.row("simples")])
+    receita.load_references(engine, tmp_path)
+    refresh_documentos(engine)
+    return engine
+
+
+def _fila(engine: Engine) -> list[str]:
+    with engine.connect() as connection:
+        return list(connection.execute(text(f"SELECT cnpj_basico FROM {QUEUE_TABLE}")).scalars())
+
+
+def _join_path(engine: Engine, cnpj: str) -> dict[str, Any]:
+    with Session(engine) as db:
+        return _cnpj_response_from_db(db, cnpj).model_dump(mode="json")
+
+
+@pytest.mark.parametrize("cnpj", [BASICO, MATRIZ, FILIAL])
+def test_documento_matches_response_model(carregado: Engine, client: Any, cnpj: str) -> None:
+    # The stored document is served as-is, bypassing response_model: it has
+    # to be exactly what the schemas would produce from the join path.
+    response = client.get(f"/api/v1/cnpj/{cnpj}")
+
+    assert response.status_code == 200
+    assert response.json() == _join_path(carregado, cnpj)
+
+
+def test_documento_renders_reference_descriptions(carregado: Engine, client: Any) -> None:
+    documento = client.get(f"/api/v1/cnpj/{BASICO}").json()
+
+    assert documento["empresa"]["natureza_juridica_descricao"] == "Sociedade Empresaria Limitada"
+    assert documento["estabelecimentos"][0]["cnae_principal_descricao"].startswith("Desenvolvimento")
+    assert [s["qualificacao_descricao"] for s in documento["socios"]] == ["Socio-Administrador"] * 2
+
+
+def test_unchanged_reference_file_queues_nothing(carregado: Engine, tmp_path: Path) -> None:
+    receita.load_references(carregado, tmp_path)
+
+    assert _fila(carregado) == []
+
+
+@pytest.mark.parametrize(
+    ("tabela", "codigo", "campo"),
+    [
+        ("cnaes", "6201501", ("estabelecimentos", "cnae_principal_descricao")),
+        ("municipios", "7107", ("estabelecimentos", "municipio_descricao")),
+        ("naturezas", "2062", ("empresa", "natureza_juridica_descricao")),
+        ("paises", "105", ("socios", "pais_descricao")),
+        ("qualificacoes", "49", ("socios", "qualificacao_descricao")),
+    ],
+)
+def test_changed_description_refreshes_documents(
+    carregado: Engine, client: Any, tmp_path: Path, tabela: str, codigo: str, campo: tuple[str, str]
+) -> None:
+    receita.load_reference(carregado, tmp_path, tabela, {codigo: "DESCRICAO NOVA"})
+
+    assert _fila(carregado) == [BASICO]
+    refresh_documentos(carregado)
+
+    secao, chave = campo
+    documento = client.get(f"/api/v1/cnpj/{BASICO}").json()
+    valores = documento[secao] if isinstance(documento[secao], list) else [documento[secao]]
+    assert "DESCRICAO NOVA" in {valor[chave] for valor in valores}
+    assert documento == _join_path(carregado, BASICO)
+
+
+def test_new_code_refreshes_documents_that_referenced_it(carregado: Engine, tmp_path: Path) -> None:
+    # Motivo 01 is used by the filial but was missing from the reference file.
+    receita.load_reference(carregado, tmp_path, "motivos", {"01": "EXTINCAO POR ENCERRAMENTO"})
+
+    assert _fila(carregado) == [BASICO]
+    refresh_documentos(carregado)
+    with carregado.connect() as connection:
+        documento = connection.execute(
+            text("SELECT documento FROM cnpj_documento WHERE cnpj_basico = :b"), {"b": BASICO}
+        ).scalar_one()
+    filial = next(e for e in documento["estabelecimentos"] if e["cnpj_completo"] == FILIAL)
+    assert filial["motivo_descricao"] == "EXTINCAO POR ENCERRAMENTO"
+    assert json.loads(json.dumps(documento)) == _join_path(carregado, BASICO)
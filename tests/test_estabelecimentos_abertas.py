@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import Engine, create_engine, text
+
+from app.api.v1.cnpj import ESTABELECIMENTO_SELECT_SQL
+from app.api.v1.estabelecimentos import ABERTAS_SQL
+from app.config import settings
+from tests import receita
+
+# (cnpj_basico, cnpj_ordem, inicio, uf, cnae_principal)
+ESTABELECIMENTOS = [
+    ("11222333", "0001", "20250110", "SP", "6201501"),
+    ("11222333", "0002", "20250102", "RJ", "6201501"),
+    ("44555666", "0001", "20250102", "SP", "4711302"),
+    ("44555666", "0002", "20250301", "SP", "6201501"),
+    ("77888999", "0001", "20241231", "SP", "6201501"),
+    ("77888999", "0002", "00000000", "SP", "6201501"),
+    ("77888999", "0003", "", "SP", "6201501"),
+]
+
+
+def _cnpj(basico: str, ordem: str) -> str:
+    return basico + ordem + receita.cnpj_dv(basico, ordem)
+
+
+def _esperados(de: str, ate: str, uf: str | None = None, cnae: str | None = None) -> list[tuple[str, str]]:
+    return sorted(
+        (f"{inicio[:4]}-{inicio[4:6]}-{inicio[6:]}", _cnpj(basico, ordem))
+        for basico, ordem, inicio, est_uf, est_cnae in ESTABELECIMENTOS
+        if inicio[:4] != "0000"
+        and de <= inicio <= ate
+        and uf in (None, est_uf)
+        and cnae in (None, est_cnae)
+    )
+
+
+@pytest.fixture
+def carregado(engine: Engine, tmp_path: Path) -> Engine:
+    basicos = sorted({values[0] for values in ESTABELECIMENTOS})
+    receita.load(engine, tmp_path, "empresas", [receita.row("empresas", cnpj_basico=b) for b in basicos])
+    receita.load(
+        engine,
+        tmp_path,
+        "estabelecimentos",
+        [
+            receita.row(
+                "estabelecimentos",
+                cnpj_basico=basico,
+                cnpj_ordem=ordem,
+                cnpj_dv=receita.cnpj_dv(basico, ordem),
+                inicio=inicio,
+                uf=uf,
+                cnae_principal=cnae,
+                cnae_secundario="",
+            )
+            for basico, ordem, inicio, uf, cnae in ESTABELECIMENTOS
+        ],
+    )
+    return engine
+
+
+def _paginas(client: Any, **params: Any) -> list[tuple[str, str]]:
+    vistos: list[tuple[str, str]] = []
+    apos = None
+    while True:
+        response = client.get("/api/v1/estabelecimentos/abertas", params={**params, "limite": 2, "apos": apos})
+        assert response.status_code == 200
+        body = response.json()
+        vistos += [(item["inicio"], item["cnpj_completo"]) for item in body["resultados"]]
+        apos = body["proximo"]
+        if apos is None:
+            return vistos
+
+
+def test_new_rows_are_stored_in_inicio_order(carregado: Engine) -> None:
+    with carregado.connect() as connection:
+        rows = connection.execute(
+            text("SELECT inicio FROM estabelecimentos_ativos WHERE inicio IS NOT NULL ORDER BY ctid")
+        ).scalars().all()
+
+    assert len(rows) == 5
+    assert rows == sorted(rows)
+
+
+def test_pages_walk_the_period(carregado: Engine, client: Any) -> None:
+    assert _paginas(client, de="2024-12-01", ate="2025-12-31") == _esperados("20241201", "20251231")
+
+
+def test_period_bounds_are_inclusive(carregado: Engine, client: Any) -> None:
+    assert _paginas(client, de="2025-01-02", ate="2025-01-10") == _esperados("20250102", "20250110")
+
+
+def test_filters(carregado: Engine, client: Any) -> None:
+    assert _paginas(client, de="2024-01-01", ate="2025-12-31", uf="sp", cnae="6201-5/01") == _esperados(
+        "20240101", "20251231", uf="SP", cnae="6201501"
+    )
+
+
+def test_undated_establishments_are_left_out(carregado: Engine, client: Any) -> None:
+    vistos = {cnpj for _, cnpj in _paginas(client, de="1900-01-01", ate="2100-12-31")}
+
+    assert _cnpj("77888999", "0002") not in vistos
+    assert _cnpj("77888999", "0003") not in vistos
+    assert len(vistos) == 5
+
+
+def test_feed_walks_the_inicio_index(carregado: Engine) -> None:
+    # The tables are tiny, so a sequential or bitmap scan would win on cost;
+    # take them off the table to see which index the planner picks.
+    planner = create_engine(
+        carregado.url,
+        connect_args={"options": "-c enable_seqscan=off -c enable_bitmapscan=off"},
+    )
+    condicoes = [
+        "est.inicio BETWEEN :de AND :ate",
+        "(est.inicio, est.cnpj_completo) > (:apos_inicio, :apos_cnpj)",
+        "est.situacao = :situacao",
+    ]
+    sql = ABERTAS_SQL.format(condicoes=" AND ".join(condicoes), estabelecimento_sql=ESTABELECIMENTO_SELECT_SQL)
+    try:
+        with planner.connect() as connection:
+            connection.execute(text("ANALYZE"))
+            plano = "\n".join(
+                connection.execute(
+                    text(f"EXPLAIN {sql}"),
+                    {
+                        "de": "2024-01-01",
+                        "ate": "2025-12-31",
+                        "apos_inicio": "2025-01-02",
+                        "apos_cnpj": _cnpj("11222333", "0002"),
+                        "situacao": 2,
+                        "limite": 2,
+                    },
+                ).scalars()
+            )
+    finally:
+        planner.dispose()
+
+    assert "idx_estabelecimentos_ativos_inicio_cnpj" in plano
+    assert "Sort" not in plano
+
+
+@pytest.mark.parametrize("tipo", ["principal", "secundario", "qualquer"])
+def test_cnae_filter_is_capped(
+    client: Any, tabela_bloqueada: None, monkeypatch: pytest.MonkeyPatch, tipo: str
+) -> None:
+    monkeypatch.setattr(settings, "CNAE_SECUNDARIO_TIMEOUT_MS", 50)
+
+    response = client.get(
+        "/api/v1/estabelecimentos/abertas",
+        params={"de": "2024-01-01", "ate": "2025-12-31", "cnae": "6201501", "tipo": tipo},
+    )
+
+    assert response.status_code == 422
+    assert "reduza o periodo" in response.json()["error"]["message"]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"de": "2025-02-01", "ate": "2025-01-01"},
+        {"de": "2025-01-01", "ate": "2025-02-01", "apos": "20251340" + "11222333000181"},
+        {"de": "2025-01-01", "ate": "2025-02-01", "apos": "2025"},
+        {"de": "2025-01-01", "ate": "2025-02-01", "cnae": "62"},
+    ],
+)
+def test_rejects_invalid_input(carregado: Engine, client: Any, params: dict[str, str]) -> None:
+    assert client.get("/api/v1/estabelecimentos/abertas", params=params).status_code == 422
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import Engine, text
+
+from tests import receita
+
+# (cnpj_basico, cnpj_ordem, cep, logradouro, situacao)
+ESTABELECIMENTOS = [
+    ("11222333", "0001", "01001000", "DA SE", "02"),
+    ("11222333", "0002", "01001500", "DIREITA", "02"),
+    ("44555666", "0001", "01001000", "DA SE", "02"),
+    ("44555666", "0002", "01001000", "DA SE", "08"),
+    ("77888999", "0001", "01310100", "PAULISTA", "02"),
+    ("77888999", "0002", "20040002", "RIO BRANCO", "02"),
+    ("77888999", "0003", "", "SEM CEP", "02"),
+]
+
+
+def _cnpj(basico: str, ordem: str) -> str:
+    return basico + ordem + receita.cnpj_dv(basico, ordem)
+
+
+def _estabelecimento(basico: str, ordem: str, cep: str, logradouro: str, situacao: str) -> dict[str, str]:
+    return receita.row(
+        "estabelecimentos",
+        cnpj_basico=basico,
+        cnpj_ordem=ordem,
+        cnpj_dv=receita.cnpj_dv(basico, ordem),
+        cep=cep,
+        logradouro=logradouro,
+        situacao=situacao,
+    )
+
+
+def _esperados(de: str, ate: str, situacao: str = "02") -> list[tuple[str, str]]:
+    return sorted(
+        (cep, _cnpj(basico, ordem))
+        for basico, ordem, cep, _, est_situacao in ESTABELECIMENTOS
+        if cep and de <= cep <= ate and est_situacao == situacao
+    )
+
+
+@pytest.fixture
+def carregado(engine: Engine, tmp_path: Path) -> Engine:
+    basicos = sorted({values[0] for values in ESTABELECIMENTOS})
+    receita.load(engine, tmp_path, "empresas", [receita.row("empresas", cnpj_basico=b) for b in basicos])
+    receita.load(engine, tmp_path, "estabelecimentos", [_estabelecimento(*values) for values in ESTABELECIMENTOS])
+    return engine
+
+
+def _paginas(client: Any, cep: str, **params: Any) -> list[dict[str, Any]]:
+    vistos: list[dict[str, Any]] = []
+    apos = None
+    while True:
+        response = client.get(f"/api/v1/estabelecimentos/cep/{cep}", params={**params, "limite": 1, "apos": apos})
+        assert response.status_code == 200
+        body = response.json()
+        vistos += body["resultados"]
+        apos = body["proximo"]
+        if apos is None:
+            return vistos
+
+
+def test_addresses_are_loaded_with_integer_cep(carregado: Engine) -> None:
+    with carregado.connect() as connection:
+        rows = connection.execute(
+            text("SELECT cnpj_completo, cep, tipo_logradouro, logradouro, numero, bairro FROM estabelecimentos_detalhes")
+        ).all()
+    enderecos = {row.cnpj_completo: tuple(row)[1:] for row in rows}
+
+    assert len(enderecos) == len(ESTABELECIMENTOS)
+    assert enderecos[_cnpj("11222333", "0001")] == (1001000, "RUA", "DA SE", "10", "CENTRO")
+    assert enderecos[_cnpj("77888999", "0003")][0] is None
+
+
+def test_reload_updates_the_address(carregado: Engine, tmp_path: Path, client: Any) -> None:
+    receita.load(
+        carregado, tmp_path, "estabelecimentos", [_estabelecimento("11222333", "0001", "20040002", "NOVA", "02")]
+    )
+
+    resultados = client.get("/api/v1/estabelecimentos/cep/20040002").json()["resultados"]
+    assert [(r["cnpj_completo"], r["logradouro"]) for r in resultados] == [
+        (_cnpj("11222333", "0001"), "NOVA"),
+        (_cnpj("77888999", "0002"), "RIO BRANCO"),
+    ]
+
+
+def test_exact_cep_pages_in_cnpj_order(carregado: Engine, client: Any) -> None:
+    resultados = _paginas(client, "01001-000")
+
+    assert [(r["cep"], r["cnpj_completo"]) for r in resultados] == _esperados("01001000", "01001000")
+    assert {r["logradouro"] for r in resultados} == {"DA SE"}
+
+
+@pytest.mark.parametrize(("prefixo", "de", "ate"), [("01001", "01001000", "01001999"), ("0", "00000000", "09999999")])
+def test_prefix_is_a_cep_range(carregado: Engine, client: Any, prefixo: str, de: str, ate: str) -> None:
+    resultados = _paginas(client, prefixo)
+
+    assert [(r["cep"], r["cnpj_completo"]) for r in resultados] == _esperados(de, ate)
+
+
+def test_filters_by_situacao(carregado: Engine, client: Any) -> None:
+    resultados = _paginas(client, "01001000", situacao=8)
+
+    assert [r["cnpj_completo"] for r in resultados] == [_cnpj("44555666", "0002")]
+
+
+@pytest.mark.parametrize(("cep", "params"), [("abc", {}), ("010010001", {}), ("01001", {"apos": "0100100011"})])
+def test_rejects_malformed_cep_and_cursor(carregado: Engine, client: Any, cep: str, params: dict[str, str]) -> None:
+    assert client.get(f"/api/v1/estabelecimentos/cep/{cep}", params=params).status_code == 422
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import Engine, create_engine, text
+
+from app.api.v1.estabelecimentos import _por_cnae_sql
+from app.config import settings
+from tests import receita
+
+CNAE = "6201501"
+
+# (cnpj_basico, cnpj_ordem, uf, cnae_principal, cnae_secundario, situacao)
+ESTABELECIMENTOS = [
+    ("11222333", "0001", "SP", CNAE, "", "02"),
+    ("11222333", "0002", "RJ", "4711302", CNAE, "02"),
+    ("44555666", "0001", "SP", "4711302", f"6202300,{CNAE}", "02"),
+    ("44555666", "0002", "SP", CNAE, "6202300", "08"),
+    ("77888999", "0001", "SP", CNAE, "6209100", "02"),
+    ("77888999", "0002", "MG", "0111301", "6202300", "02"),
+]
+
+
+def _cnpj(basico: str, ordem: str) -> str:
+    return basico + ordem + receita.cnpj_dv(basico, ordem)
+
+
+def _esperados(tipo: str, uf: str | None = None) -> list[str]:
+    return sorted(
+        _cnpj(basico, ordem)
+        for basico, ordem, est_uf, principal, secundario, situacao in ESTABELECIMENTOS
+        if situacao == "02"
+        and (uf is None or est_uf == uf)
+        and (
+            (tipo != "secundario" and principal == CNAE)
+            or (tipo != "principal" and CNAE in secundario.split(","))
+        )
+    )
+
+
+@pytest.fixture
+def carregado(engine: Engine, tmp_path: Path) -> Engine:
+    basicos = sorted({values[0] for values in ESTABELECIMENTOS})
+    receita.load(engine, tmp_path, "empresas", [receita.row("empresas", cnpj_basico=b) for b in basicos])
+    receita.load(
+        engine,
+        tmp_path,
+        "estabelecimentos",
+        [
+            receita.row(
+                "estabelecimentos",
+                cnpj_basico=basico,
+                cnpj_ordem=ordem,
+                cnpj_dv=receita.cnpj_dv(basico, ordem),
+                uf=uf,
+                cnae_principal=principal,
+                cnae_secundario=secundario,
+                situacao=situacao,
+            )
+            for basico, ordem, uf, principal, secundario, situacao in ESTABELECIMENTOS
+        ],
+    )
+    return engine
+
+
+def _paginas(client: Any, **params: Any) -> list[str]:
+    vistos: list[str] = []
+    apos = None
+    while True:
+        response = client.get(f"/api/v1/estabelecimentos/cnae/{CNAE}", params={**params, "limite": 2, "apos": apos})
+        assert response.status_code == 200
+        body = response.json()
+        vistos += [item["cnpj_completo"] for item in body["resultados"]]
+        apos = body["proximo"]
+        if apos is None:
+            return vistos
+
+
+@pytest.mark.parametrize("tipo", ["principal", "secundario", "qualquer"])
+def test_pages_follow_the_cursor(carregado: Engine, client: Any, tipo: str) -> None:
+    assert _paginas(client, tipo=tipo) == _esperados(tipo)
+
+
+def test_filters_by_uf(carregado: Engine, client: Any) -> None:
+    assert _paginas(client, tipo="qualquer", uf="sp") == _esperados("qualquer", uf="SP")
+
+
+def test_reload_syncs_the_secondary_cnaes(carregado: Engine, client: Any, tmp_path: Path) -> None:
+    basico, ordem, uf, principal, _, situacao = ESTABELECIMENTOS[2]
+    receita.load(
+        carregado,
+        tmp_path,
+        "estabelecimentos",
+        [
+            receita.row(
+                "estabelecimentos",
+                cnpj_basico=basico,
+                cnpj_ordem=ordem,
+                cnpj_dv=receita.cnpj_dv(basico, ordem),
+                uf=uf,
+                cnae_principal=principal,
+                cnae_secundario="6209100",
+                situacao=situacao,
+            )
+        ],
+    )
+
+    with carregado.connect() as connection:
+        cnaes = connection.execute(
+            text("SELECT cnae FROM estabelecimentos_cnaes_secundarios WHERE cnpj_completo = :cnpj"),
+            {"cnpj": _cnpj(basico, ordem)},
+        ).scalars().all()
+    assert cnaes == [6209100]
+    assert _cnpj(basico, ordem) not in _paginas(client, tipo="secundario")
+
+
+def test_secondary_walk_follows_the_cursor_order(carregado: Engine) -> None:
+    # The tables are tiny, so a sequential or bitmap scan would win on cost;
+    # take them off the table to see which index the planner picks.
+    planner = create_engine(
+        carregado.url,
+        connect_args={"options": "-c enable_seqscan=off -c enable_bitmapscan=off"},
+    )
+    try:
+        with planner.connect() as connection:
+            connection.execute(text("ANALYZE"))
+            plano = "\n".join(
+                connection.execute(
+                    text(f"EXPLAIN {_por_cnae_sql('secundario', ['est.situacao = :situacao']).text}"),
+                    {"cnae": int(CNAE), "situacao": 2, "apos": "", "limite": 2},
+                ).scalars()
+            )
+    finally:
+        planner.dispose()
+
+    assert "idx_estabelecimentos_cnaes_secundarios_cnae" in plano
+    assert "Sort" not in plano
+
+
+def test_rejects_malformed_cnae_and_cursor(carregado: Engine, client: Any) -> None:
+    assert client.get("/api/v1/estabelecimentos/cnae/62015").status_code == 422
+    assert client.get(f"/api/v1/estabelecimentos/cnae/{CNAE}", params={"apos": "123"}).status_code == 422
+
+
+@pytest.mark.parametrize("tipo", ["secundario", "qualquer"])
+def test_unordered_modes_are_capped(
+    client: Any, tabela_bloqueada: None, monkeypatch: pytest.MonkeyPatch, tipo: str
+) -> None:
+    monkeypatch.setattr(settings, "CNAE_SECUNDARIO_TIMEOUT_MS", 50)
+
+    response = client.get(f"/api/v1/estabelecimentos/cnae/{CNAE}", params={"tipo": tipo})
+
+    assert response.status_code == 422
+    assert "tipo=principal" in response.json()["error"]["message"]
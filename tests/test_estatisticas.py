@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import Engine, text
+
+from etl.documentos import refresh_documentos
+from etl.estatisticas import rebuild_estatisticas
+from tests import receita
+
+EMPRESAS = {"11222333": "01", "44555666": "03", "77888999": "05"}
+
+# (cnpj_basico, cnpj_ordem, uf, municipio, cnae_principal, situacao)
+ESTABELECIMENTOS = [
+    ("11222333", "0001", "SP", "7107", "6201501", "02"),
+    ("11222333", "0002", "SP", "7107", "6201501", "08"),
+    ("11222333", "0003", "RJ", "6001", "4711302", "02"),
+    ("44555666", "0001", "SP", "7107", "4711302", "02"),
+    ("77888999", "0001", "MG", "4123", "0111301", "04"),
+]
+
+MUNICIPIO_SQL = """
+    SELECT uf, municipio, cnae_principal, situacao, porte_empresa, total
+    FROM estatisticas_municipio
+    ORDER BY 1, 2, 3, 4, 5
+"""
+
+UF_SQL = """
+    SELECT uf, cnae_divisao, situacao, porte_empresa, total
+    FROM estatisticas_uf
+    ORDER BY 1, 2, 3, 4
+"""
+
+# Ground truth: the COUNT(*) the rollups replace.
+CONTAGEM_SQL = """
+    SELECT est.uf, est.municipio, est.cnae_principal, est.situacao, e.porte_empresa, COUNT(*) AS total
+    FROM estabelecimentos est
+    LEFT JOIN empresas e ON e.cnpj_basico = est.cnpj_basico
+    GROUP BY 1, 2, 3, 4, 5
+    ORDER BY 1, 2, 3, 4, 5
+"""
+
+
+def _estabelecimento(basico: str, ordem: str, uf: str, municipio: str, cnae: str, situacao: str) -> dict[str, str]:
+    return receita.row(
+        "estabelecimentos",
+        cnpj_basico=basico,
+        cnpj_ordem=ordem,
+        cnpj_dv=receita.cnpj_dv(basico, ordem),
+        uf=uf,
+        municipio=municipio,
+        cnae_principal=cnae,
+        situacao=situacao,
+    )
+
+
+def _rows(engine: Engine, sql: str) -> list[tuple[Any, ...]]:
+    with engine.connect() as connection:
+        return [tuple(row) for row in connection.execute(text(sql))]
+
+
+@pytest.fixture
+def carregado(engine: Engine, tmp_path: Path) -> Engine:
+    receita.load(
+        engine,
+        tmp_path,
+        "empresas",
+        [receita.row("empresas", cnpj_basico=basico, porte_empresa=porte) for basico, porte in EMPRESAS.items()],
+    )
+    receita.load(engine, tmp_path, "estabelecimentos", [_estabelecimento(*values) for values in ESTABELECIMENTOS])
+    refresh_documentos(engine)
+    return engine
+
+
+def test_rollups_match_count_group_by(carregado: Engine) -> None:
+    assert _rows(carregado, MUNICIPIO_SQL) == _rows(carregado, CONTAGEM_SQL)
+
+
+def test_incremental_refresh_matches_rebuild(carregado: Engine, tmp_path: Path) -> None:
+    # An establishment moves city, one closes, one opens, one company changes size.
+    receita.load(
+        carregado,
+        tmp_path,
+        "estabelecimentos",
+        [
+            _estabelecimento("11222333", "0001", "RJ", "6001", "6201501", "02"),
+            _estabelecimento("44555666", "0001", "SP", "7107", "4711302", "08"),
+            _estabelecimento("44555666", "0002", "SP", "7107", "4711302", "02"),
+        ],
+    )
+    receita.load(carregado, tmp_path, "empresas", [receita.row("empresas", cnpj_basico="77888999", porte_empresa="01")])
+    refresh_documentos(carregado)
+
+    incremental = (_rows(carregado, MUNICIPIO_SQL), _rows(carregado, UF_SQL))
+    assert incremental[0] == _rows(carregado, CONTAGEM_SQL)
+
+    rebuild_estatisticas(carregado)
+    assert (_rows(carregado, MUNICIPIO_SQL), _rows(carregado, UF_SQL)) == incremental
+
+
+def test_groups_brought_to_zero_are_purged(carregado: Engine, tmp_path: Path) -> None:
+    receita.load(carregado, tmp_path, "empresas", [receita.row("empresas", cnpj_basico="77888999", porte_empresa="01")])
+    refresh_documentos(carregado)
+
+    with carregado.connect() as connection:
+        zerados = connection.execute(
+            text(
+                "SELECT (SELECT COUNT(*) FROM estatisticas_municipio WHERE total <= 0)"
+                " + (SELECT COUNT(*) FROM estatisticas_uf WHERE total <= 0)"
+            )
+        ).scalar_one()
+        porte_5 = connection.execute(
+            text("SELECT COUNT(*) FROM estatisticas_uf WHERE porte_empresa = 5")
+        ).scalar_one()
+    assert zerados == 0
+    assert porte_5 == 0
+
+
+def test_endpoint_groups_by_uf(carregado: Engine, client: Any) -> None:
+    response = client.get("/api/v1/estatisticas/estabelecimentos", params={"agrupar_por": "uf"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == len(ESTABELECIMENTOS)
+    assert {r["uf"]: r["total"] for r in body["resultados"]} == {"SP": 3, "RJ": 1, "MG": 1}
+
+
+def test_endpoint_filters_and_formats_codes(carregado: Engine, client: Any) -> None:
+    response = client.get(
+        "/api/v1/estatisticas/estabelecimentos",
+        params=[("agrupar_por", "municipio"), ("agrupar_por", "situacao"), ("uf", "sp")],
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["resultados"] == [
+        {"municipio": "7107", "situacao": "02", "total": 2},
+        {"municipio": "7107", "situacao": "08", "total": 1},
+    ]
+    assert body["total"] == 3
+
+
+def test_endpoint_groups_by_cnae_secao(carregado: Engine, client: Any) -> None:
+    response = client.get("/api/v1/estatisticas/estabelecimentos", params={"agrupar_por": "cnae_secao"})
+
+    assert {r["cnae_secao"]: r["total"] for r in response.json()["resultados"]} == {"J": 2, "G": 2, "A": 1}
+
+
+def test_endpoint_rejects_unknown_dimension(carregado: Engine, client: Any) -> None:
+    response = client.get("/api/v1/estatisticas/estabelecimentos", params={"agrupar_por": "bairro"})
+
+    assert response.status_code == 422
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import Connection, Engine, text
+
+from etl.processors import estabelecimentos_processor
+from tests import receita
+
+A = "11222333"
+CNPJ = A + "0001" + receita.cnpj_dv(A, "0001")
+
+
+def _estabelecimento(situacao: str = "02", motivo: str = "00", data_situacao: str = "20200101") -> dict[str, str]:
+    return receita.row(
+        "estabelecimentos",
+        cnpj_basico=A,
+        cnpj_dv=receita.cnpj_dv(A, "0001"),
+        situacao=situacao,
+        motivo=motivo,
+        data_situacao=data_situacao,
+    )
+
+
+def _periodos(engine: Engine) -> list[tuple[int, int, date, date | None]]:
+    with engine.connect() as connection:
+        rows = connection.execute(
+            text(
+                """
+                SELECT situacao, motivo, lower(vigencia), upper(vigencia)
+                FROM situacoes_historico
+                WHERE cnpj_completo = :cnpj
+                ORDER BY lower(vigencia)
+                """
+            ),
+            {"cnpj": CNPJ},
+        )
+        return [tuple(row) for row in rows]
+
+
+@pytest.fixture
+def carregado(engine: Engine, tmp_path: Path) -> Engine:
+    receita.load_reference(engine, tmp_path, "motivos", {"00": "SEM MOTIVO", "01": "EXTINCAO"})
+    receita.load(engine, tmp_path, "empresas", [receita.row("empresas", cnpj_basico=A)])
+    receita.load(engine, tmp_path, "estabelecimentos", [_estabelecimento()])
+    return engine
+
+
+@pytest.fixture
+def baixado(carregado: Engine, tmp_path: Path) -> Engine:
+    receita.load(carregado, tmp_path, "estabelecimentos", [_estabelecimento("08", "01", "20240610")])
+    return carregado
+
+
+def test_first_load_opens_a_period(carregado: Engine) -> None:
+    assert _periodos(carregado) == [(2, 0, date(2020, 1, 1), None)]
+
+
+def test_unchanged_resend_writes_nothing(carregado: Engine, tmp_path: Path) -> None:
+    receita.load(carregado, tmp_path, "estabelecimentos", [_estabelecimento(data_situacao="20230101")])
+
+    assert _periodos(carregado) == [(2, 0, date(2020, 1, 1), None)]
+
+
+def test_status_change_closes_and_opens(baixado: Engine) -> None:
+    assert _periodos(baixado) == [(2, 0, date(2020, 1, 1), date(2024, 6, 10)), (8, 1, date(2024, 6, 10), None)]
+
+
+def test_failed_upsert_rolls_the_history_back(
+    carregado: Engine, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Fails after append_situacoes has written, inside the upsert's transaction.
+    def falhar(connection: Connection, staging_table: str) -> None:
+        raise RuntimeError("upsert interrompido")
+
+    monkeypatch.setattr(estabelecimentos_processor, "_sync_cnaes_secundarios", falhar)
+
+    with pytest.raises(RuntimeError):
+        receita.load(carregado, tmp_path, "estabelecimentos", [_estabelecimento("08", "01", "20240610")])
+
+    assert _periodos(carregado) == [(2, 0, date(2020, 1, 1), None)]
+
+
+def test_api_lists_every_period(baixado: Engine, client: Any) -> None:
+    body = client.get(f"/api/v1/cnpj/{CNPJ}/historico").json()
+
+    assert body["data"] is None
+    assert [(p["situacao"], p["motivo_descricao"], p["desde"], p["ate"]) for p in body["periodos"]] == [
+        ("02", "SEM MOTIVO", "2020-01-01", "2024-06-10"),
+        ("08", "EXTINCAO", "2024-06-10", None),
+    ]
+
+
+@pytest.mark.parametrize(
+    ("data", "situacoes"),
+    [("2019-12-31", []), ("2020-01-01", ["02"]), ("2024-06-09", ["02"]), ("2024-06-10", ["08"]), ("2030-01-01", ["08"])],
+)
+def test_api_picks_the_period_of_a_date(baixado: Engine, client: Any, data: str, situacoes: list[str]) -> None:
+    response = client.get(f"/api/v1/cnpj/{CNPJ}/historico", params={"data": data})
+
+    assert response.status_code == 200
+    assert response.json()["data"] == data
+    assert [p["situacao"] for p in response.json()["periodos"]] == situacoes
+
+
+@pytest.mark.parametrize("params", [{}, {"data": "2024-01-01"}])
+def test_unknown_cnpj_is_not_found(carregado: Engine, client: Any, params: dict[str, str]) -> None:
+    desconhecido = "99888777" + "0001" + receita.cnpj_dv("99888777", "0001")
+
+    assert client.get(f"/api/v1/cnpj/{desconhecido}/historico", params=params).status_code == 404
+
+
+def test_rejects_short_cnpj(carregado: Engine, client: Any) -> None:
+    assert client.get(f"/api/v1/cnpj/{A}/historico").status_code == 422
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+from sqlalchemy import Engine, text
+
+from etl import index_audit
+
+TABELA = "auditoria_indices"
+
+
+@pytest.fixture
+def tabela(engine: Engine) -> Iterator[Engine]:
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                f"""
+                CREATE TABLE {TABELA} (
+                    id integer PRIMARY KEY,
+                    uf char(2) NOT NULL,
+                    municipio integer NOT NULL,
+                    nome text
+                )
+                """
+            )
+        )
+        connection.execute(text(f"CREATE INDEX idx_auditoria_uf_municipio ON {TABELA} (uf, municipio)"))
+    yield engine
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {TABELA}"))
+
+
+def _indices(itens: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    return {item["indice"]: item for item in itens if item["tabela"] == TABELA}
+
+
+def test_prefix_and_identical_indexes_are_redundant(tabela: Engine) -> None:
+    with tabela.begin() as connection:
+        connection.execute(text(f"CREATE INDEX idx_auditoria_uf ON {TABELA} (uf)"))
+        connection.execute(text(f"CREATE INDEX idx_auditoria_copia ON {TABELA} (uf, municipio)"))
+        connection.execute(text(f"CREATE INDEX idx_auditoria_municipio ON {TABELA} (municipio)"))
+
+    redundantes = _indices(index_audit.audit_indexes(tabela)["redundantes"])
+
+    assert redundantes["idx_auditoria_uf"]["coberto_por"] in {"idx_auditoria_uf_municipio", "idx_auditoria_copia"}
+    # Of an identical pair only one is reported, so dropping it is safe.
+    assert redundantes["idx_auditoria_copia"]["coberto_por"] == "idx_auditoria_uf_municipio"
+    assert "idx_auditoria_uf_municipio" not in redundantes
+    # A different leading column is not covered.
+    assert "idx_auditoria_municipio" not in redundantes
+
+
+def test_unique_and_primary_key_indexes_are_kept(tabela: Engine) -> None:
+    with tabela.begin() as connection:
+        connection.execute(text(f"CREATE UNIQUE INDEX idx_auditoria_uf_unico ON {TABELA} (uf, municipio, id)"))
+        connection.execute(text(f"CREATE INDEX idx_auditoria_id_uf ON {TABELA} (id, uf)"))
+
+    report = index_audit.audit_indexes(tabela)
+
+    assert "idx_auditoria_uf_unico" not in _indices(report["redundantes"])
+    assert f"{TABELA}_pkey" not in _indices(report["redundantes"])
+    assert f"{TABELA}_pkey" not in _indices(report["nao_usados"])
+    assert "idx_auditoria_uf_unico" not in _indices(report["nao_usados"])
+
+
+def test_duplicate_expression_indexes_are_redundant(tabela: Engine) -> None:
+    with tabela.begin() as connection:
+        connection.execute(text(f"CREATE INDEX idx_auditoria_nome ON {TABELA} (lower(nome)) WHERE nome IS NOT NULL"))
+        connection.execute(text(f"CREATE INDEX idx_auditoria_nome_2 ON {TABELA} (lower(nome)) WHERE nome IS NOT NULL"))
+        connection.execute(text(f"CREATE INDEX idx_auditoria_nome_upper ON {TABELA} (upper(nome))"))
+
+    redundantes = _indices(index_audit.audit_indexes(tabela)["redundantes"])
+
+    assert {nome: item["coberto_por"] for nome, item in redundantes.items()} == {
+        "idx_auditoria_nome": "idx_auditoria_nome_2"
+    }
+
+
+def test_unused_indexes_carry_their_write_cost(tabela: Engine) -> None:
+    # A backend publishes its counters when it goes idle, but at most once a second unless forced.
+    with tabela.begin() as connection:
+        connection.execute(text("SELECT pg_stat_force_next_flush()"))
+        connection.execute(
+            text(f"INSERT INTO {TABELA} SELECT n, 'SP', n % 10, NULL FROM generate_series(1, 100) n")
+        )
+        connection.execute(text(f"CREATE INDEX idx_auditoria_municipio ON {TABELA} (municipio)"))
+    with tabela.connect() as connection:
+        connection.execute(text("SELECT pg_stat_force_next_flush()"))
+        connection.execute(text("SET enable_seqscan = off"))
+        connection.execute(text(f"SELECT count(*) FROM {TABELA} WHERE uf = 'SP'")).scalar()
+
+    nao_usados = _indices(index_audit.audit_indexes(tabela)["nao_usados"])
+
+    assert set(nao_usados) == {"idx_auditoria_municipio"}
+    assert nao_usados["idx_auditoria_municipio"]["escritas_estimadas"] == 100
+
+
+def test_bloated_index_is_reported(tabela: Engine) -> None:
+    with tabela.begin() as connection:
+        connection.execute(
+            text(f"INSERT INTO {TABELA} SELECT n, 'SP', n, NULL FROM generate_series(1, 50000) n")
+        )
+        # Deleted entries free space inside the pages, but the index keeps its size.
+        connection.execute(text(f"DELETE FROM {TABELA} WHERE id % 20 <> 0"))
+    with tabela.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text(f"VACUUM ANALYZE {TABELA}"))
+
+    report = index_audit.audit_indexes(tabela, min_bloat_ratio=0.5, min_bloat_bytes=0)
+    inchados = _indices(report["inchados"])
+
+    assert {f"{TABELA}_pkey", "idx_auditoria_uf_municipio"} <= set(inchados)
+    pkey = inchados[f"{TABELA}_pkey"]
+    assert pkey["bloat_ratio"] >= 0.5
+    assert 0 < pkey["bloat_bytes"] < pkey["bytes"]
+    assert report["bytes_recuperaveis"] >= sum(item["bloat_bytes"] for item in inchados.values())
+
+    with tabela.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text(f"REINDEX TABLE {TABELA}"))
+        connection.execute(text(f"ANALYZE {TABELA}"))
+
+    assert _indices(index_audit.audit_indexes(tabela, min_bloat_ratio=0.5, min_bloat_bytes=0)["inchados"]) == {}
+
+
+def test_bloat_estimate_skips_other_access_methods() -> None:
+    indice = {"metodo": "gin", "paginas": 100, "tuplas": 10.0, "largura_media": 8, "fillfactor": 90}
+
+    assert index_audit.estimate_btree_bloat(indice) is None
+    assert index_audit.estimate_btree_bloat({**indice, "metodo": "btree", "tuplas": -1.0}) is None
+
+
+def test_bloat_estimate_of_a_packed_btree() -> None:
+    # 4-byte keys: 16-byte tuples + 4-byte line pointers, ~364 per 90%-full page.
+    indice = {"metodo": "btree", "paginas": 276, "tuplas": 100_000.0, "largura_media": 4, "fillfactor": 90}
+
+    estimativa = index_audit.estimate_btree_bloat(indice)
+
+    assert estimativa is not None
+    assert estimativa["bloat_bytes"] < 0.05 * 276 * index_audit.BLOCK_SIZE
+    inchado = index_audit.estimate_btree_bloat({**indice, "paginas": 2760})
+    assert inchado is not None and inchado["bloat_ratio"] > 0.85
+
+
+def test_report_prints(tabela: Engine, capsys: pytest.CaptureFixture[str]) -> None:
+    index_audit._print_report(index_audit.audit_indexes(tabela))
+
+    assert "Total recuperavel" in capsys.readouterr().out
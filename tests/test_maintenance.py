@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from sqlalchemy import Engine, text
+
+from etl import orchestrator
+from etl.documentos import refresh_documentos
+from etl.maintenance import PREWARM_RELATIONS, cluster_tables, run_post_load_maintenance
+from tests import receita
+
+
+@pytest.fixture
+def carregado(engine: Engine, tmp_path: Path) -> Engine:
+    receita.load(engine, tmp_path, "empresas", [receita.row("empresas")])
+    receita.load(engine, tmp_path, "estabelecimentos", [receita.row("estabelecimentos")])
+    receita.load(engine, tmp_path, "socios", [receita.row("socios")])
+    receita.load(engine, tmp_path, "simples", [receita.row("simples")])
+    refresh_documentos(engine)
+    return engine
+
+
+def _reloptions(engine: Engine, relation: str) -> list[str]:
+    with engine.connect() as connection:
+        return connection.execute(
+            text("SELECT reloptions FROM pg_class WHERE relname = :relation"), {"relation": relation}
+        ).scalar_one() or []
+
+
+def test_maintenance_times_every_step(carregado: Engine) -> None:
+    duracoes = run_post_load_maintenance(carregado, ["empresas", "estabelecimentos", "cnpj_documento"])
+
+    assert {"vacuum_empresas", "vacuum_estabelecimentos", "vacuum_cnpj_documento"} <= set(duracoes)
+    assert {
+        "prewarm_cnpj_documento",
+        "prewarm_cnpj_documento_pkey",
+        "prewarm_idx_empresas_lookup",
+        "prewarm_idx_socios_lookup",
+    } <= set(duracoes)
+
+
+def test_maintenance_prewarms_every_partition_of_the_lookup_index(carregado: Engine) -> None:
+    duracoes = run_post_load_maintenance(carregado, [])
+
+    with carregado.connect() as connection:
+        particoes = connection.execute(
+            text(
+                """
+                SELECT relid::regclass::text
+                FROM pg_partition_tree('idx_estabelecimentos_lookup')
+                WHERE isleaf
+                """
+            )
+        ).scalars().all()
+    assert len(particoes) == 2
+    assert {f"prewarm_{indice}" for indice in particoes} <= set(duracoes)
+    assert "prewarm_idx_estabelecimentos_lookup" not in duracoes
+    assert all(segundos >= 0 for segundos in duracoes.values())
+
+
+def test_maintenance_prewarms_the_document_heap_and_its_toast(carregado: Engine) -> None:
+    duracoes = run_post_load_maintenance(carregado, [])
+
+    with carregado.connect() as connection:
+        toast, toast_index = connection.execute(
+            text(
+                """
+                SELECT t.oid::regclass::text, i.indexrelid::regclass::text
+                FROM pg_class c
+                JOIN pg_class t ON t.oid = c.reltoastrelid
+                JOIN pg_index i ON i.indrelid = t.oid
+                WHERE c.oid = 'cnpj_documento'::regclass
+                """
+            )
+        ).one()
+    assert {"prewarm_cnpj_documento", f"prewarm_{toast}", f"prewarm_{toast_index}"} <= set(duracoes)
+    assert "cnpj_documento" in PREWARM_RELATIONS
+
+
+def test_maintenance_only_touches_changed_tables(carregado: Engine) -> None:
+    duracoes = run_post_load_maintenance(carregado, ["empresas"])
+
+    assert "vacuum_empresas" in duracoes
+    assert not any(step.startswith("vacuum_socios") for step in duracoes)
+
+
+def test_autovacuum_is_tuned_once_by_the_migration(carregado: Engine) -> None:
+    assert "autovacuum_vacuum_scale_factor=0.02" in _reloptions(carregado, "estabelecimentos_ativos")
+    assert "autovacuum_vacuum_scale_factor=0.05" in _reloptions(carregado, "estabelecimentos_inativos")
+    assert "autovacuum_analyze_scale_factor=0.01" in _reloptions(carregado, "cnpj_documento")
+
+    duracoes = run_post_load_maintenance(carregado, ["estabelecimentos", "socios"])
+
+    assert not any(step.startswith("autovacuum_") for step in duracoes)
+
+
+def test_maintenance_vacuums_and_analyzes(carregado: Engine) -> None:
+    run_post_load_maintenance(carregado, ["empresas"])
+
+    with carregado.connect() as connection:
+        vacuum, analyze = connection.execute(
+            text("SELECT last_vacuum, last_analyze FROM pg_stat_user_tables WHERE relname = 'empresas'")
+        ).one()
+    assert vacuum is not None
+    assert analyze is not None
+
+
+def test_cluster_tables(carregado: Engine) -> None:
+    duracoes = cluster_tables(carregado)
+
+    assert set(duracoes) == {"empresas", "simples", "socios"}
+    with carregado.connect() as connection:
+        clustered = connection.execute(
+            text(
+                """
+                SELECT c.relname
+                FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                WHERE i.indisclustered
+                """
+            )
+        ).scalars().all()
+    assert {"idx_empresas_lookup", "idx_simples_lookup", "idx_socios_lookup"} <= set(clustered)
+
+
+def test_post_load_maintenance_is_recorded_with_the_import(carregado: Engine) -> None:
+    importacao_id = orchestrator._create_importacao("teste.zip", "hash", "PROCESSING")
+    extracted: dict[str, list[Path]] = {tipo: [] for tipo in orchestrator.REQUIRED_AUXILIARY_TYPES}
+    extracted.update(empresas=[Path("empresas.csv")], estabelecimentos=[], socios=[])
+
+    orchestrator._post_load_maintenance(importacao_id, extracted, documentos=1)
+
+    with carregado.connect() as connection:
+        manutencao = connection.execute(
+            text("SELECT manutencao FROM importacoes WHERE id = :id"), {"id": importacao_id}
+        ).scalar_one()
+    assert "vacuum_empresas" in manutencao
+    assert "vacuum_cnpj_documento" in manutencao
+    assert "vacuum_socios" not in manutencao
+
+
+def test_failed_maintenance_does_not_fail_the_import(
+    carregado: Engine, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def falha(*_: object) -> dict[str, float]:
+        raise RuntimeError("vacuum falhou")
+
+    monkeypatch.setattr(orchestrator, "run_post_load_maintenance", falha)
+    importacao_id = orchestrator._create_importacao("teste.zip", "hash", "PROCESSING")
+    extracted: dict[str, list[Path]] = {tipo: [] for tipo in orchestrator.REQUIRED_AUXILIARY_TYPES}
+    extracted.update(empresas=[Path("empresas.csv")], estabelecimentos=[], socios=[])
+
+    orchestrator._post_load_maintenance(importacao_id, extracted, documentos=0)
+
+    with carregado.connect() as connection:
+        status, manutencao = connection.execute(
+            text("SELECT status, manutencao FROM importacoes WHERE id = :id"), {"id": importacao_id}
+        ).one()
+    assert status == "PROCESSING"
+    assert manutencao is None
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import Engine, text
+
+from etl import orchestrator
+from etl.documentos import enqueue_all, refresh_documentos, stamp_queue
+from tests import receita
+
+OUTRA = "44555666"
+
+
+def _importacao(nome: str) -> int:
+    return orchestrator._create_importacao(nome, nome, "PROCESSING")
+
+
+def _mudancas(engine: Engine) -> list[tuple[int, str, str, list[str]]]:
+    with engine.connect() as connection:
+        rows = connection.execute(
+            text("SELECT importacao_id, cnpj_basico, tipo, campos FROM mudancas ORDER BY importacao_id, cnpj_basico")
+        ).all()
+    return [(row.importacao_id, row.cnpj_basico, row.tipo, list(row.campos)) for row in rows]
+
+
+def _importa(engine: Engine, directory: Path, importacao_id: int, **rows: list[dict[str, str]]) -> None:
+    for tipo, linhas in rows.items():
+        receita.load(engine, directory, tipo, linhas)
+    stamp_queue(engine, importacao_id)
+    refresh_documentos(engine, importacao_id=importacao_id)
+
+
+@pytest.fixture
+def primeira(engine: Engine, tmp_path: Path) -> int:
+    importacao_id = _importacao("primeira.zip")
+    _importa(
+        engine,
+        tmp_path,
+        importacao_id,
+        empresas=[receita.row("empresas")],
+        estabelecimentos=[receita.row("estabelecimentos")],
+    )
+    return importacao_id
+
+
+def test_first_import_logs_inclusions(engine: Engine, primeira: int) -> None:
+    assert _mudancas(engine) == [(primeira, "11222333", "inclusao", [])]
+
+
+def test_changes_are_typed_with_their_fields(engine: Engine, tmp_path: Path, primeira: int) -> None:
+    segunda = _importacao("segunda.zip")
+    _importa(
+        engine,
+        tmp_path,
+        segunda,
+        empresas=[receita.row("empresas", razao_social="NOVA RAZAO"), receita.row("empresas", cnpj_basico=OUTRA)],
+    )
+    terceira = _importacao("terceira.zip")
+    _importa(engine, tmp_path, terceira, estabelecimentos=[receita.row("estabelecimentos", situacao="08")])
+
+    assert _mudancas(engine)[1:] == [
+        (segunda, "11222333", "alteracao", ["empresa.razao_social"]),
+        (segunda, OUTRA, "inclusao", []),
+        (terceira, "11222333", "situacao", ["estabelecimentos.situacao"]),
+    ]
+
+
+def test_identical_release_logs_nothing(engine: Engine, tmp_path: Path, primeira: int) -> None:
+    _importa(
+        engine,
+        tmp_path,
+        _importacao("repetida.zip"),
+        empresas=[receita.row("empresas")],
+        estabelecimentos=[receita.row("estabelecimentos")],
+    )
+
+    assert len(_mudancas(engine)) == 1
+
+
+def test_next_import_logs_what_a_failed_import_queued(engine: Engine, tmp_path: Path, primeira: int) -> None:
+    # The failed import loaded its rows but never rebuilt the documents.
+    falhou = _importacao("falhou.zip")
+    receita.load(engine, tmp_path, "empresas", [receita.row("empresas", razao_social="NOVA RAZAO")])
+    stamp_queue(engine, falhou)
+
+    seguinte = _importacao("seguinte.zip")
+    _importa(engine, tmp_path, seguinte, empresas=[receita.row("empresas", cnpj_basico=OUTRA)])
+
+    # Logged under the import that published them, so ids keep growing with
+    # importacao_id and a client syncing from the largest id it saw misses nothing.
+    assert _mudancas(engine)[1:] == [
+        (seguinte, "11222333", "alteracao", ["empresa.razao_social"]),
+        (seguinte, OUTRA, "inclusao", []),
+    ]
+
+
+def test_manual_refresh_logs_under_the_import_that_queued(engine: Engine, tmp_path: Path, primeira: int) -> None:
+    falhou = _importacao("falhou.zip")
+    receita.load(engine, tmp_path, "empresas", [receita.row("empresas", razao_social="NOVA RAZAO")])
+    stamp_queue(engine, falhou)
+
+    refresh_documentos(engine)
+
+    assert _mudancas(engine)[1:] == [(falhou, "11222333", "alteracao", ["empresa.razao_social"])]
+
+
+def test_hand_queued_rebuild_is_not_logged(engine: Engine, primeira: int) -> None:
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE cnpj_documento SET documento = documento - 'socios'"))
+    enqueue_all(engine)
+
+    refresh_documentos(engine)
+
+    assert len(_mudancas(engine)) == 1
+
+
+def test_failed_import_stamps_its_queue(engine: Engine, etl_paths: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    def falha(*_: object, **__: object) -> int:
+        raise RuntimeError("refresh falhou")
+
+    monkeypatch.setattr(orchestrator, "refresh_documentos", falha)
+    zip_path = receita.write_zip(etl_paths / "release.zip", {"empresas": [receita.row("empresas")]})
+
+    with pytest.raises(RuntimeError):
+        orchestrator.process_zip_file(zip_path, force=True)
+
+    with engine.connect() as connection:
+        importacao_id, status = connection.execute(text("SELECT id, status FROM importacoes")).one()
+        fila = connection.execute(text("SELECT cnpj_basico, importacao_id FROM cnpj_documento_pendente")).all()
+    assert status == "FAILED"
+    assert [tuple(row) for row in fila] == [("11222333", importacao_id)]
+
+
+def test_endpoint_pages_changes_after_desde(engine: Engine, tmp_path: Path, client: Any, primeira: int) -> None:
+    segunda = _importacao("segunda.zip")
+    _importa(
+        engine,
+        tmp_path,
+        segunda,
+        empresas=[receita.row("empresas", razao_social="NOVA RAZAO"), receita.row("empresas", cnpj_basico=OUTRA)],
+    )
+
+    primeira_pagina = client.get("/api/v1/mudancas", params={"desde": primeira, "limite": 1}).json()
+    assert len(primeira_pagina["mudancas"]) == 1
+    assert primeira_pagina["proximo"] is not None
+
+    segunda_pagina = client.get(
+        "/api/v1/mudancas", params={"desde": primeira, "limite": 1, "apos": primeira_pagina["proximo"]}
+    ).json()
+    vistas = {
+        (m["importacao_id"], m["cnpj_basico"], m["tipo"])
+        for pagina in (primeira_pagina, segunda_pagina)
+        for m in pagina["mudancas"]
+    }
+    assert vistas == {(segunda, "11222333", "alteracao"), (segunda, OUTRA, "inclusao")}
+
+    assert client.get("/api/v1/mudancas", params={"desde": segunda}).json()["mudancas"] == []
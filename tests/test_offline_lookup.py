@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import Engine, text
+
+from app.config import settings
+from app.core import offline_lookup
+from app.core.offline_lookup import OfflineLookup
+from etl.documentos import refresh_documentos
+from etl.offline_export import export_offline_artifact
+from tests import receita
+
+BASICOS = ["00000123", "11222333", "44555666"]
+
+
+@pytest.fixture
+def artefato(engine: Engine, tmp_path: Path) -> Path:
+    receita.load(engine, tmp_path, "empresas", [receita.row("empresas", cnpj_basico=b) for b in BASICOS])
+    receita.load(
+        engine,
+        tmp_path,
+        "estabelecimentos",
+        [
+            receita.row("estabelecimentos", cnpj_basico=b, cnpj_ordem=ordem, cnpj_dv=receita.cnpj_dv(b, ordem))
+            for b in BASICOS
+            for ordem in ("0001", "0002")
+        ],
+    )
+    refresh_documentos(engine)
+    path = tmp_path / "offline" / "cnpj_documento.idx"
+    assert export_offline_artifact(path, engine) == len(BASICOS)
+    return path
+
+
+def _documentos(engine: Engine) -> dict[str, Any]:
+    with engine.connect() as connection:
+        rows = connection.execute(text("SELECT cnpj_basico, documento FROM cnpj_documento"))
+        return {cnpj_basico: documento for cnpj_basico, documento in rows}
+
+
+def test_lookup_returns_the_stored_documents(engine: Engine, artefato: Path) -> None:
+    lookup = OfflineLookup(artefato)
+
+    assert lookup.count == len(BASICOS)
+    for cnpj_basico, documento in _documentos(engine).items():
+        encontrado = lookup.get(cnpj_basico)
+        assert encontrado is not None
+        assert json.loads(encontrado) == documento
+
+
+@pytest.mark.parametrize("cnpj_basico", ["00000000", "00000124", "33333333", "99999999"])
+def test_lookup_misses(artefato: Path, cnpj_basico: str) -> None:
+    assert OfflineLookup(artefato).get(cnpj_basico) is None
+
+
+def test_empty_artifact(engine: Engine, tmp_path: Path) -> None:
+    path = tmp_path / "vazio.idx"
+
+    assert export_offline_artifact(path, engine) == 0
+    assert OfflineLookup(path).get("11222333") is None
+
+
+def test_invalid_artifact_is_rejected(tmp_path: Path) -> None:
+    path = tmp_path / "invalido.idx"
+    path.write_bytes(b"\0" * 64)
+
+    with pytest.raises(RuntimeError):
+        OfflineLookup(path)
+
+
+def test_export_replaces_the_artifact_atomically(engine: Engine, artefato: Path) -> None:
+    anterior = OfflineLookup(artefato)
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM cnpj_documento WHERE cnpj_basico = :b"), {"b": BASICOS[0]})
+
+    export_offline_artifact(artefato, engine)
+
+    # A worker that mapped the previous file keeps reading it.
+    assert anterior.get(BASICOS[0]) is not None
+    assert OfflineLookup(artefato).get(BASICOS[0]) is None
+    assert sorted(p.name for p in artefato.parent.iterdir()) == [artefato.name]
+
+
+@pytest.fixture
+def offline(artefato: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(settings, "LOOKUP_BACKEND", "offline")
+    monkeypatch.setattr(settings, "OFFLINE_ARTIFACT_PATH", str(artefato))
+    monkeypatch.setattr(offline_lookup, "_LOOKUP_SINGLETON", None)
+    return artefato
+
+
+@pytest.mark.parametrize("cnpj", ["11222333", "11222333" + "0002" + receita.cnpj_dv("11222333", "0002")])
+def test_offline_backend_matches_postgres(
+    engine: Engine, client: Any, offline: Path, monkeypatch: pytest.MonkeyPatch, cnpj: str
+) -> None:
+    resposta_offline = client.get(f"/api/v1/cnpj/{cnpj}")
+    monkeypatch.setattr(settings, "LOOKUP_BACKEND", "postgres")
+    resposta_postgres = client.get(f"/api/v1/cnpj/{cnpj}")
+
+    assert resposta_offline.status_code == 200
+    assert resposta_offline.json() == resposta_postgres.json()
+    if len(cnpj) == 14:
+        assert [e["cnpj_completo"] for e in resposta_offline.json()["estabelecimentos"]] == [cnpj]
+
+
+def test_offline_backend_unknown_cnpj(client: Any, offline: Path) -> None:
+    assert client.get("/api/v1/cnpj/99999999").status_code == 404
+
+
+def test_offline_backend_has_no_detalhes(client: Any, offline: Path) -> None:
+    assert client.get("/api/v1/cnpj/11222333", params={"detalhes": True}).status_code == 422
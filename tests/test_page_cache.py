@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import io
+import os
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from sqlalchemy import Engine, text
+
+from app.config import settings
+from etl import cache_survival
+from etl.utils import page_cache
+from etl.utils.file_hash import calculate_file_hash
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "posix_fadvise"), reason="posix_fadvise indisponivel")
+
+TAMANHO = 3 * page_cache.DROP_BYTES // 2
+
+
+@pytest.fixture
+def descartando(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "ETL_DROP_PAGE_CACHE", True)
+
+
+@pytest.fixture
+def arquivo(tmp_path: Path) -> Path:
+    path = tmp_path / "dados.bin"
+    path.write_bytes(os.urandom(TAMANHO))
+    # Written pages are dirty until flushed; only clean pages can be dropped.
+    with open(path, "rb") as handle:
+        os.fsync(handle.fileno())
+    return path
+
+
+def _em_cache(path: Path) -> int:
+    return cache_survival._resident_bytes(path)
+
+
+def test_plain_file_without_the_flag(arquivo: Path) -> None:
+    with page_cache.open_streaming(arquivo) as handle:
+        assert not isinstance(getattr(handle, "raw", None), page_cache.StreamingFile)
+        handle.read()
+
+    assert _em_cache(arquivo) == TAMANHO
+
+
+def test_streaming_read_drops_consumed_pages(arquivo: Path, descartando: None) -> None:
+    with page_cache.open_streaming(arquivo) as handle:
+        assert isinstance(handle, io.BufferedReader)
+        assert isinstance(handle.raw, page_cache.StreamingFile)
+        # Past the first DROP_BYTES, the pages behind the position are gone;
+        # read-ahead may still hold the rest of the file.
+        handle.read(page_cache.DROP_BYTES + 1024 * 1024)
+        assert _em_cache(arquivo) <= TAMANHO - page_cache.DROP_BYTES
+        handle.read()
+
+    assert _em_cache(arquivo) == 0
+
+
+def test_seek_back_rereads_the_file(arquivo: Path, descartando: None) -> None:
+    with page_cache.open_streaming(arquivo) as handle:
+        primeira = handle.read()
+        handle.seek(0)
+        assert handle.read() == primeira
+
+
+def test_streaming_write_is_flushed_and_dropped(tmp_path: Path, descartando: None) -> None:
+    dados = os.urandom(TAMANHO)
+    path = tmp_path / "saida.bin"
+
+    with page_cache.open_streaming(path, "wb") as handle:
+        assert isinstance(handle, io.BufferedWriter)
+        for inicio in range(0, TAMANHO, 1024 * 1024):
+            handle.write(dados[inicio : inicio + 1024 * 1024])
+
+    assert _em_cache(path) == 0
+    assert path.read_bytes() == dados
+
+
+def test_hash_is_the_same_with_the_flag(arquivo: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    sem = calculate_file_hash(arquivo)
+    monkeypatch.setattr(settings, "ETL_DROP_PAGE_CACHE", True)
+
+    assert calculate_file_hash(arquivo) == sem
+
+
+def test_drop_file_pages(arquivo: Path, descartando: None) -> None:
+    arquivo.read_bytes()
+
+    page_cache.drop_file_pages(arquivo)
+
+    assert _em_cache(arquivo) == 0
+
+
+@pytest.fixture
+def buffercache(engine: Engine) -> Iterator[Engine]:
+    with engine.begin() as connection:
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_buffercache"))
+    yield engine
+    with engine.begin() as connection:
+        connection.execute(text("DROP EXTENSION IF EXISTS pg_buffercache"))
+
+
+def test_measure_covers_partition_leaves(buffercache: Engine) -> None:
+    with buffercache.connect() as connection:
+        folhas = set(
+            connection.execute(
+                text(cache_survival.PREWARM_LEAVES_SQL), {"name": "idx_estabelecimentos_lookup"}
+            ).scalars()
+        )
+        connection.execute(text("SELECT count(*) FROM empresas")).scalar()
+
+    medicao = cache_survival.measure_cache(buffercache)
+
+    assert len(folhas) == 2
+    assert folhas <= set(medicao)
+    assert {"cnpj_documento", "idx_empresas_lookup"} <= set(medicao)
+    # Partitioned parents have no storage of their own.
+    assert "idx_estabelecimentos_lookup" not in medicao
+    for relacao in medicao.values():
+        assert relacao["shared_buffers_mb"] is not None
+        assert relacao["page_cache_mb"] is not None
+
+
+def test_measure_without_buffercache(engine: Engine) -> None:
+    medicao = cache_survival.measure_cache(engine)
+
+    assert {relacao["shared_buffers_mb"] for relacao in medicao.values()} == {None}
+
+
+def test_compare() -> None:
+    antes = {
+        "a": {"shared_buffers_mb": 10.0, "page_cache_mb": 20.0},
+        "b": {"shared_buffers_mb": 0.0, "page_cache_mb": None},
+    }
+    depois = {"a": {"shared_buffers_mb": 2.5, "page_cache_mb": 30.0}}
+
+    assert cache_survival.compare(antes, depois) == {
+        "a": {"shared_buffers": 0.25, "page_cache": 1.0},
+        "b": {"shared_buffers": None, "page_cache": None},
+    }
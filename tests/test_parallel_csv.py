@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from sqlalchemy import Engine, text
+
+from app.config import settings
+from etl.processors import estabelecimentos_processor
+from etl.utils.normalize import category_dtypes
+from etl.utils.parallel_csv import read_csv_parallel, record_ranges
+from tests import receita
+
+pytest.importorskip("pyarrow")
+
+COLUMNS = estabelecimentos_processor.CSV_COLUMNS
+DTYPE = category_dtypes(COLUMNS, estabelecimentos_processor.CATEGORY_COLUMNS)
+
+
+def _rows(count: int) -> list[dict[str, str]]:
+    # Quoted ";", line breaks and escaped quotes inside fields, as the Receita publishes them.
+    return [
+        receita.row(
+            "estabelecimentos",
+            cnpj_basico=f"{n:08d}",
+            cnpj_dv=receita.cnpj_dv(f"{n:08d}", "0001"),
+            nome_fantasia=f'LOJA "{n}"; FILIAL\nCENTRO' if n % 7 == 0 else f"LOJA {n}",
+            uf=["SP", "RJ", "MG"][n % 3],
+            situacao=["02", "08"][n % 2],
+        )
+        for n in range(1, count + 1)
+    ]
+
+
+@pytest.fixture
+def arquivo(tmp_path: Path) -> Path:
+    return receita.write_csv(tmp_path / "estabelecimentos.csv", "estabelecimentos", _rows(3000))
+
+
+def _serial(path: Path) -> pd.DataFrame:
+    return pd.read_csv(
+        path, sep=";", dtype=DTYPE, encoding="latin1", header=None, names=COLUMNS, keep_default_na=False
+    )
+
+
+def _segmentos() -> set[str]:
+    return set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+
+
+def test_ranges_end_on_record_boundaries(arquivo: Path) -> None:
+    data = arquivo.read_bytes()
+
+    ranges = record_ranges(arquivo, range_bytes=20_000)
+
+    assert len(ranges) > 5
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    for start, end in ranges:
+        # Each range holds whole records: an even number of quotes, ending on a newline.
+        assert data[start:end].count(b'"') % 2 == 0
+        assert data[end - 1 : end] == b"\n"
+
+
+def test_parallel_reader_matches_the_serial_one(arquivo: Path) -> None:
+    antes = _segmentos()
+
+    chunks = list(read_csv_parallel(arquivo, COLUMNS, 2, 500, dtype=DTYPE, range_bytes=100_000))
+
+    assert len(chunks) > 1 and all(len(chunk) <= 500 for chunk in chunks)
+    paralelo = pd.concat(chunks, ignore_index=True)
+    pd.testing.assert_frame_equal(paralelo, _serial(arquivo))
+    # Every shared memory segment was unlinked by the loader.
+    assert _segmentos() <= antes
+
+
+def test_header_line_is_skipped(tmp_path: Path) -> None:
+    path = tmp_path / "com_cabecalho.csv"
+    path.write_bytes(";".join(COLUMNS).encode("latin1") + b"\n" + receita.render("estabelecimentos", _rows(50)))
+
+    paralelo = pd.concat(read_csv_parallel(path, COLUMNS, 2, 20, dtype=DTYPE), ignore_index=True)
+
+    assert list(paralelo["cnpj_basico"]) == [f"{n:08d}" for n in range(1, 51)]
+
+
+def test_parallel_load_matches_the_serial_one(
+    engine: Engine, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    rows = _rows(300)
+    receita.load(engine, tmp_path, "empresas", [receita.row("empresas", cnpj_basico=r["cnpj_basico"]) for r in rows])
+
+    def carregar(workers: int) -> list[tuple[object, ...]]:
+        monkeypatch.setattr(settings, "ETL_PARSE_WORKERS", workers)
+        with engine.begin() as connection:
+            connection.execute(text("TRUNCATE estabelecimentos, estabelecimentos_detalhes CASCADE"))
+        assert receita.load(engine, tmp_path, "estabelecimentos", rows) == len(rows)
+        with engine.connect() as connection:
+            return [
+                tuple(row)
+                for row in connection.execute(
+                    text(
+                        """
+                        SELECT e.*, d.*
+                        FROM estabelecimentos e
+                        JOIN estabelecimentos_detalhes d USING (cnpj_completo)
+                        ORDER BY e.cnpj_completo
+                        """
+                    )
+                )
+            ]
+
+    assert carregar(2) == carregar(1)
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pytest
+from sqlalchemy import Engine, text
+
+from app.config import settings
+from etl.utils.parallel_merge import SlicedMerge
+from tests import receita
+
+TIPOS = ["empresas", "estabelecimentos", "socios", "simples"]
+BASICOS = [f"{n:08d}" for n in range(1, 61)]
+
+# Natural keys only: pessoas ids depend on which slice inserts an identity first.
+SNAPSHOT_SQL = {
+    "empresas": "SELECT * FROM empresas ORDER BY cnpj_basico",
+    "estabelecimentos": "SELECT * FROM estabelecimentos ORDER BY cnpj_completo",
+    "detalhes": "SELECT * FROM estabelecimentos_detalhes ORDER BY cnpj_completo",
+    "contatos": "SELECT cnpj_completo, telefone, email FROM contatos ORDER BY 1, 2, 3",
+    "historico": "SELECT * FROM situacoes_historico ORDER BY cnpj_completo, vigencia",
+    "socios": """
+        SELECT s.cnpj_basico, p.cpf_cnpj, p.nome, s.qualificacao, s.pais, s.data_entrada
+        FROM socios s
+        JOIN pessoas p ON p.id = s.pessoa_id
+        ORDER BY 1, 2, 3
+    """,
+    "pessoas": "SELECT cpf_cnpj, nome FROM pessoas ORDER BY 1, 2",
+    "simples": "SELECT * FROM simples ORDER BY cnpj_basico",
+    "fila": "SELECT cnpj_basico FROM cnpj_documento_pendente ORDER BY 1",
+}
+
+
+def _cargas() -> list[dict[str, list[dict[str, str]]]]:
+    def estabelecimento(basico: str, ordem: str, situacao: str, telefone: str) -> dict[str, str]:
+        return receita.row(
+            "estabelecimentos",
+            cnpj_basico=basico,
+            cnpj_ordem=ordem,
+            cnpj_dv=receita.cnpj_dv(basico, ordem),
+            situacao=situacao,
+            telefone1=telefone,
+        )
+
+    def socio(basico: str, n: int, nome: str) -> dict[str, str]:
+        return receita.row("socios", cnpj_basico=basico, cpf_cnpj=f"***{n:06d}**", nome=nome)
+
+    primeira = {
+        "empresas": [receita.row("empresas", cnpj_basico=b, razao_social=f"EMPRESA {b}") for b in BASICOS],
+        "estabelecimentos": [
+            estabelecimento(b, ordem, "02", f"3333{n:04d}") for n, b in enumerate(BASICOS) for ordem in ("0001", "0002")
+        ],
+        # Shared identities: every company has partners 0-4 in common with others.
+        "socios": [socio(b, (n + k) % 5, f"SOCIO {(n + k) % 5}") for n, b in enumerate(BASICOS) for k in range(2)],
+        "simples": [receita.row("simples", cnpj_basico=b) for b in BASICOS],
+    }
+    # Updates, partition moves and new identities for a third of the companies.
+    alterados = BASICOS[::3]
+    segunda = {
+        "empresas": [receita.row("empresas", cnpj_basico=b, razao_social=f"NOVA {b}") for b in alterados],
+        "estabelecimentos": [
+            estabelecimento(b, "0001", "08", f"4444{n:04d}") for n, b in enumerate(alterados)
+        ],
+        "socios": [socio(b, 100 + n, f"NOVO {n}") for n, b in enumerate(alterados)],
+        "simples": [receita.row("simples", cnpj_basico=b, opcao_pelo_mei="S") for b in alterados],
+    }
+    return [primeira, segunda]
+
+
+def _carregar(engine: Engine, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, slices: int) -> dict[str, Any]:
+    monkeypatch.setattr(settings, "ETL_MERGE_SLICES", {tipo: slices for tipo in TIPOS})
+    for carga in _cargas():
+        for tipo in TIPOS:
+            receita.load(engine, tmp_path, tipo, carga[tipo])
+    with engine.connect() as connection:
+        return {nome: [tuple(row) for row in connection.execute(text(sql))] for nome, sql in SNAPSHOT_SQL.items()}
+
+
+def _esvaziar(engine: Engine) -> None:
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                """
+                TRUNCATE empresas, estabelecimentos, estabelecimentos_detalhes, contatos, situacoes_historico,
+                    socios, pessoas, simples, cnpj_documento_pendente
+                RESTART IDENTITY CASCADE
+                """
+            )
+        )
+
+
+def test_sliced_load_matches_single_slice(engine: Engine, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    serial = _carregar(engine, tmp_path, monkeypatch, 1)
+    _esvaziar(engine)
+    fatiado = _carregar(engine, tmp_path, monkeypatch, 4)
+
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT to_regclass('stg_estabelecimentos_3')")).scalar() is not None
+    assert len(serial["estabelecimentos"]) == 2 * len(BASICOS)
+    assert len(serial["historico"]) == 2 * len(BASICOS) + len(BASICOS[::3])
+    assert fatiado == serial
+
+
+def test_slices_are_disjoint_and_split_every_frame_alike() -> None:
+    empresas = pd.DataFrame({"cnpj_basico": BASICOS, "n": range(len(BASICOS))})
+    filiais = pd.concat([empresas, empresas]).reset_index(drop=True)
+    chamadas: list[tuple[int, pd.DataFrame, pd.DataFrame]] = []
+    lock = threading.Lock()
+
+    def merge(index: int, parte: pd.DataFrame, filiais_parte: pd.DataFrame) -> None:
+        with lock:
+            chamadas.append((index, parte, filiais_parte))
+
+    with SlicedMerge(4) as merger:
+        merger.run(merge, empresas, filiais)
+
+    assert sorted(index for index, _, _ in chamadas) == [0, 1, 2, 3]
+    vistos = [b for _, parte, _ in chamadas for b in parte["cnpj_basico"]]
+    assert sorted(vistos) == BASICOS
+    for _, parte, filiais_parte in chamadas:
+        assert set(filiais_parte["cnpj_basico"]) == set(parte["cnpj_basico"])
+        assert len(filiais_parte) == 2 * len(parte)
+
+
+def test_single_slice_runs_inline() -> None:
+    chamadas: list[tuple[int, str]] = []
+
+    with SlicedMerge(1) as merger:
+        merger.run(lambda index, frame: chamadas.append((index, threading.current_thread().name)), pd.DataFrame())
+
+    assert chamadas == [(0, threading.current_thread().name)]
+
+
+def test_failed_slice_raises_after_the_others_finish() -> None:
+    frame = pd.DataFrame({"cnpj_basico": BASICOS})
+    concluidas: list[int] = []
+
+    def merge(index: int, parte: pd.DataFrame) -> None:
+        if index == 0:
+            raise RuntimeError("fatia 0")
+        concluidas.append(index)
+
+    with SlicedMerge(4) as merger, pytest.raises(RuntimeError, match="fatia 0"):
+        merger.run(merge, frame)
+
+    assert sorted(concluidas) == [1, 2, 3]
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from sqlalchemy import Engine
+
+from app.config import settings
+from etl import orchestrator
+from etl.utils.parquet_sink import ParquetSink
+from tests import receita
+
+pq = pytest.importorskip("pyarrow.parquet")
+pa = pytest.importorskip("pyarrow")
+
+
+def _chunk(ufs: list[str | None]) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "cnpj_basico": [f"{n:08d}" for n in range(len(ufs))],
+            "uf": ufs,
+            "municipio": pd.array([7107] * len(ufs), dtype="Int64"),
+            "cnae_secundario": ["{6202300,6209100}"] + [None] * (len(ufs) - 1),
+            "inicio": ["2010-03-15"] * len(ufs),
+        }
+    )
+
+
+def _sink(root: Path, source: str = "zip1") -> ParquetSink:
+    return ParquetSink(
+        root,
+        "estabelecimentos",
+        "2026-02",
+        source,
+        partition_column="uf",
+        date_columns=["inicio"],
+        list_columns=["cnae_secundario"],
+    )
+
+
+def _files(root: Path) -> list[str]:
+    return sorted(str(path.relative_to(root)) for path in root.rglob("*.parquet"))
+
+
+def test_files_are_published_on_success(tmp_path: Path) -> None:
+    with _sink(tmp_path) as sink:
+        sink.write(_chunk(["SP", "SP", None]))
+        assert _files(tmp_path / "estabelecimentos" / "release=2026-02") == []
+
+    assert _files(tmp_path) == [
+        "estabelecimentos/release=2026-02/uf=SP/part-zip1.parquet",
+        "estabelecimentos/release=2026-02/uf=__HIVE_DEFAULT_PARTITION__/part-zip1.parquet",
+    ]
+    assert not list((tmp_path / "estabelecimentos").glob(".tmp-*"))
+
+    table = pq.read_table(tmp_path / "estabelecimentos/release=2026-02/uf=SP/part-zip1.parquet")
+    assert table.schema.field("municipio").type == pa.int32()
+    assert table.schema.field("inicio").type == pa.date32()
+    assert table.column("cnae_secundario").to_pylist() == [[6202300, 6209100], None]
+
+
+def test_nothing_is_published_when_the_load_fails(tmp_path: Path) -> None:
+    with _sink(tmp_path) as anterior:
+        anterior.write(_chunk(["SP"]))
+
+    with pytest.raises(RuntimeError):
+        with _sink(tmp_path) as sink:
+            sink.write(_chunk(["RJ", "RJ"]))
+            raise RuntimeError("merge falhou")
+
+    # The previous run's files are untouched and the temp files are gone.
+    assert _files(tmp_path) == ["estabelecimentos/release=2026-02/uf=SP/part-zip1.parquet"]
+    assert not list((tmp_path / "estabelecimentos").glob(".tmp-*"))
+
+
+def test_reprocessing_replaces_only_its_own_files(tmp_path: Path) -> None:
+    with _sink(tmp_path) as primeira:
+        primeira.write(_chunk(["SP", "MG"]))
+    with _sink(tmp_path, source="zip2") as outra:
+        outra.write(_chunk(["MG"]))
+
+    with _sink(tmp_path) as reprocessada:
+        reprocessada.write(_chunk(["SP"]))
+
+    assert _files(tmp_path) == [
+        "estabelecimentos/release=2026-02/uf=MG/part-zip2.parquet",
+        "estabelecimentos/release=2026-02/uf=SP/part-zip1.parquet",
+    ]
+
+
+def test_orchestrator_publishes_after_the_load(
+    engine: Engine, etl_paths: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    root = etl_paths / "parquet"
+    monkeypatch.setattr(settings, "ETL_PARQUET_PATH", str(root))
+    zip_path = receita.write_zip(
+        etl_paths / "2026-02.zip",
+        {
+            "empresas": [receita.row("empresas")],
+            "estabelecimentos": [receita.row("estabelecimentos")],
+        },
+    )
+
+    orchestrator.process_zip_file(zip_path, force=True)
+
+    assert _files(root) == [
+        "empresas/release=2026-02/part-2026-02.parquet",
+        "estabelecimentos/release=2026-02/uf=SP/part-2026-02.parquet",
+    ]
+    empresas = pq.read_table(root / "empresas/release=2026-02/part-2026-02.parquet").to_pylist()
+    assert [e["cnpj_basico"] for e in empresas] == ["11222333"]
+
+
+def test_orchestrator_discards_parquet_when_a_load_fails(
+    engine: Engine, etl_paths: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def falha(*_: object, **__: object) -> int:
+        raise RuntimeError("merge falhou")
+
+    root = etl_paths / "parquet"
+    monkeypatch.setattr(settings, "ETL_PARQUET_PATH", str(root))
+    monkeypatch.setattr(orchestrator, "process_estabelecimentos_csv", falha)
+    zip_path = receita.write_zip(
+        etl_paths / "2026-02.zip",
+        {
+            "empresas": [receita.row("empresas")],
+            "estabelecimentos": [receita.row("estabelecimentos")],
+        },
+    )
+
+    with pytest.raises(RuntimeError):
+        orchestrator.process_zip_file(zip_path, force=True)
+
+    assert _files(root) == []
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+from sqlalchemy import text
+
+from etl.processors import estabelecimentos_processor
+from tests import receita
+
+PARTITIONS_SQL = """
+    SELECT cnpj_completo, tableoid::regclass::text, situacao
+    FROM estabelecimentos
+    ORDER BY cnpj_completo, situacao
+"""
+
+
+class _Recorder:
+    def __init__(self) -> None:
+        self.events: list[tuple[str, dict[str, Any]]] = []
+
+    def warning(self, event: str, **fields: Any) -> None:
+        self.events.append((event, fields))
+
+
+@pytest.fixture
+def recorder(monkeypatch: pytest.MonkeyPatch) -> _Recorder:
+    recorder = _Recorder()
+    monkeypatch.setattr(estabelecimentos_processor, "logger", recorder)
+    return recorder
+
+
+def _estabelecimento(ordem: str, situacao: str) -> dict[str, str]:
+    return receita.row(
+        "estabelecimentos",
+        cnpj_ordem=ordem,
+        cnpj_dv=receita.cnpj_dv("11222333", ordem),
+        situacao=situacao,
+    )
+
+
+def _load(engine, tmp_path, rows: list[dict[str, str]]) -> int:
+    receita.load(engine, tmp_path, "empresas", [receita.row("empresas")])
+    return receita.load(engine, tmp_path, "estabelecimentos", rows)
+
+
+def test_rows_route_by_situacao_and_missing_situacao_is_kept(engine, tmp_path, recorder) -> None:
+    rows = [
+        _estabelecimento("0001", "02"),
+        _estabelecimento("0002", "08"),
+        _estabelecimento("0003", ""),
+        _estabelecimento("0004", "XX"),
+    ]
+    assert _load(engine, tmp_path, rows) == 4
+
+    with engine.connect() as connection:
+        loaded = connection.execute(text(PARTITIONS_SQL)).all()
+    assert [(partition, situacao) for _, partition, situacao in loaded] == [
+        ("estabelecimentos_ativos", 2),
+        ("estabelecimentos_inativos", 8),
+        ("estabelecimentos_inativos", None),
+        ("estabelecimentos_inativos", None),
+    ]
+    assert recorder.events == [
+        ("estabelecimentos.sem_situacao", {"arquivo": "estabelecimentos.csv", "linhas": 2})
+    ]
+
+
+@pytest.mark.parametrize("antes, depois", [("02", "08"), ("08", "02"), ("02", ""), ("", "02"), ("", "")])
+def test_cnpj_completo_stays_unique_across_partitions(engine, tmp_path, recorder, antes, depois) -> None:
+    _load(engine, tmp_path, [_estabelecimento("0001", antes)])
+    _load(engine, tmp_path, [_estabelecimento("0001", depois)])
+
+    with engine.connect() as connection:
+        loaded = connection.execute(text(PARTITIONS_SQL)).all()
+    assert [situacao for _, _, situacao in loaded] == [int(depois) if depois else None]
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import Engine, text
+
+from app.config import settings
+from etl.documentos import refresh_documentos
+from tests import receita
+
+A, B = "11222333", "44555666"
+
+
+def _socio(cnpj_basico: str, nome: str, cpf_cnpj: str, qualificacao: str = "49") -> dict[str, str]:
+    return receita.row("socios", cnpj_basico=cnpj_basico, nome=nome, cpf_cnpj=cpf_cnpj, qualificacao=qualificacao)
+
+
+def _pessoas(engine: Engine) -> list[tuple[int, str, str]]:
+    with engine.connect() as connection:
+        return [tuple(row) for row in connection.execute(text("SELECT id, cpf_cnpj, nome FROM pessoas ORDER BY id"))]
+
+
+def _socios(engine: Engine) -> list[tuple[str, int, int]]:
+    with engine.connect() as connection:
+        rows = connection.execute(text("SELECT cnpj_basico, pessoa_id, qualificacao FROM socios ORDER BY 1, 2"))
+        return [tuple(row) for row in rows]
+
+
+@pytest.fixture
+def carregado(engine: Engine, tmp_path: Path) -> Engine:
+    receita.load(engine, tmp_path, "empresas", [receita.row("empresas", cnpj_basico=b) for b in (A, B)])
+    receita.load(
+        engine,
+        tmp_path,
+        "socios",
+        [
+            _socio(A, "FULANO DE TAL", "***123456**"),
+            _socio(B, "FULANO DE TAL", "***123456**"),
+            _socio(B, "", "***654321**"),
+        ],
+    )
+    return engine
+
+
+def test_identities_are_shared_across_companies(carregado: Engine) -> None:
+    pessoas = _pessoas(carregado)
+    ids = {(cpf_cnpj, nome): pessoa_id for pessoa_id, cpf_cnpj, nome in pessoas}
+
+    assert set(ids) == {("***123456**", "FULANO DE TAL"), ("***654321**", "")}
+    fulano, sem_nome = ids[("***123456**", "FULANO DE TAL")], ids[("***654321**", "")]
+    assert _socios(carregado) == [(A, fulano, 49), (B, fulano, 49), (B, sem_nome, 49)]
+
+
+def test_resent_partners_keep_their_ids(carregado: Engine, tmp_path: Path) -> None:
+    antes = _pessoas(carregado)
+
+    receita.load(
+        carregado,
+        tmp_path,
+        "socios",
+        [_socio(A, "FULANO DE TAL", "***123456**", qualificacao="22"), _socio(A, "BELTRANO", "***111222**")],
+    )
+
+    pessoas = _pessoas(carregado)
+    assert pessoas[: len(antes)] == antes
+    # Resent identities draw no id from the sequence.
+    assert pessoas[len(antes):] == [(max(p[0] for p in antes) + 1, "***111222**", "BELTRANO")]
+    fulano = next(pessoa_id for pessoa_id, _, nome in antes if nome == "FULANO DE TAL")
+    assert (A, fulano, 22) in _socios(carregado)
+    assert len(_socios(carregado)) == 4
+
+
+def test_api_restores_missing_values(carregado: Engine, client: Any) -> None:
+    refresh_documentos(carregado)
+
+    socios = client.get(f"/api/v1/cnpj/{B}").json()["socios"]
+
+    assert [(s["nome_socio"], s["cpf_cnpj_socio"], s["qualificacao"]) for s in socios] == [
+        ("FULANO DE TAL", "***123456**", "49"),
+        (None, "***654321**", "49"),
+    ]
+
+
+def test_concurrent_slices_insert_each_identity_once(
+    engine: Engine, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "ETL_MERGE_SLICES", {"socios": 4})
+    basicos = [f"{n:08d}" for n in range(1, 41)]
+    receita.load(engine, tmp_path, "empresas", [receita.row("empresas", cnpj_basico=b) for b in basicos])
+
+    receita.load(
+        engine,
+        tmp_path,
+        "socios",
+        [_socio(b, nome, f"***{n:06d}**") for b in basicos for n, nome in enumerate(["ANA", "BRUNO", "CARLA"])],
+    )
+
+    assert [(cpf_cnpj, nome) for _, cpf_cnpj, nome in _pessoas(engine)] == [
+        ("***000000**", "ANA"),
+        ("***000001**", "BRUNO"),
+        ("***000002**", "CARLA"),
+    ]
+    assert len(_socios(engine)) == 3 * len(basicos)
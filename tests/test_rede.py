@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import Engine, text
+
+from app.config import settings
+from etl.documentos import refresh_documentos
+from etl.rede import rebuild_rede
+from tests import receita
+
+A, B, C = "11222333", "44555666", "77888999"
+# B's CNPJ as A's partner: there is no establishment 0009 of B.
+B_SOCIA = B + "0009" + receita.cnpj_dv(B, "0009")
+
+
+def _arestas(engine: Engine) -> set[tuple[int, int]]:
+    with engine.connect() as connection:
+        return {(row.origem, row.destino) for row in connection.execute(text("SELECT origem, destino FROM rede_arestas"))}
+
+
+def _socio(cnpj_basico: str, nome: str, cpf_cnpj: str = "***123456**", tipo: str = "2") -> dict[str, str]:
+    return {**receita.row("socios", cnpj_basico=cnpj_basico, nome=nome, cpf_cnpj=cpf_cnpj), "tipo": tipo}
+
+
+@pytest.fixture
+def rede(engine: Engine, tmp_path: Path) -> Engine:
+    receita.load(
+        engine,
+        tmp_path,
+        "empresas",
+        [receita.row("empresas", cnpj_basico=b, razao_social=f"EMPRESA {b}") for b in (A, B, C)],
+    )
+    receita.load(
+        engine,
+        tmp_path,
+        "socios",
+        [_socio(A, "FULANO DE TAL"), _socio(A, "EMPRESA B", B_SOCIA, tipo="1"), _socio(C, "FULANO DE TAL")],
+    )
+    refresh_documentos(engine)
+    return engine
+
+
+def test_refresh_matches_rebuild(rede: Engine, tmp_path: Path) -> None:
+    # Refreshing B alone deletes every edge touching B, A -> B included.
+    receita.load(rede, tmp_path, "socios", [_socio(B, "CICLANO", "***654321**")])
+    refresh_documentos(rede)
+
+    incremental = _arestas(rede)
+    assert (int(A), int(B)) in incremental
+    assert (int(B), int(A)) in incremental
+
+    rebuild_rede(rede)
+    assert _arestas(rede) == incremental
+
+
+def test_neighbourhood(rede: Engine, client: Any) -> None:
+    body = client.get(f"/api/v1/rede/{A}", params={"profundidade": 2}).json()
+
+    nos = {(no["tipo"], no["nome"]): no["distancia"] for no in body["nos"]}
+    assert nos == {
+        ("empresa", f"EMPRESA {A}"): 0,
+        ("socio", "FULANO DE TAL"): 1,
+        ("empresa", f"EMPRESA {B}"): 1,
+        ("empresa", f"EMPRESA {C}"): 2,
+    }
+    assert len(body["arestas"]) == 3
+    assert body["truncado"] is False
+
+
+def test_fanout_cap_marks_the_node(rede: Engine, client: Any) -> None:
+    body = client.get(f"/api/v1/rede/{A}", params={"profundidade": 1, "max_vizinhos": 1}).json()
+
+    assert body["truncado"] is True
+    assert [no["vizinhos_truncados"] for no in body["nos"] if no["distancia"] == 0] == [True]
+
+
+def test_path_between_companies(rede: Engine, client: Any) -> None:
+    body = client.get(f"/api/v1/rede/{B}/caminho/{C}").json()
+
+    assert body["encontrado"] is True
+    assert [no["nome"] for no in body["caminho"]] == [f"EMPRESA {B}", f"EMPRESA {A}", "FULANO DE TAL", f"EMPRESA {C}"]
+
+
+def test_unknown_company(rede: Engine, client: Any) -> None:
+    assert client.get("/api/v1/rede/99999999").status_code == 404
+
+
+@pytest.fixture
+def arestas_bloqueadas(rede: Engine) -> Iterator[None]:
+    # A lock held by another session makes the BFS query wait past its limit.
+    bloqueado = threading.Event()
+    liberar = threading.Event()
+
+    def bloquear() -> None:
+        with rede.begin() as connection:
+            connection.execute(text("LOCK TABLE rede_arestas IN ACCESS EXCLUSIVE MODE"))
+            bloqueado.set()
+            liberar.wait(10)
+
+    thread = threading.Thread(target=bloquear)
+    thread.start()
+    bloqueado.wait(10)
+    yield
+    liberar.set()
+    thread.join()
+
+
+def test_statement_timeout_truncates(
+    client: Any, arestas_bloqueadas: None, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "NETWORK_TIME_BUDGET_MS", 50)
+
+    rede = client.get(f"/api/v1/rede/{A}")
+    caminho = client.get(f"/api/v1/rede/{A}/caminho/{C}")
+
+    assert rede.status_code == 200
+    assert rede.json()["truncado"] is True
+    assert [no["id"] for no in rede.json()["nos"]] == [A]
+    assert caminho.status_code == 200
+    assert (caminho.json()["encontrado"], caminho.json()["truncado"]) == (False, True)
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import json
+import shutil
+import subprocess
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import Engine, create_engine, make_url, text
+
+from etl import snapshot
+from etl.documentos import refresh_documentos
+from tests import receita
+
+SENHA = "s3nh@-secreta"
+
+
+def _importacao(engine: Engine, status: str = "SUCCESS") -> int:
+    with engine.begin() as connection:
+        return connection.execute(
+            text(
+                """
+                INSERT INTO importacoes (nome_arquivo, hash_arquivo, status)
+                VALUES ('release.zip', 'hash', :status)
+                RETURNING id
+                """
+            ),
+            {"status": status},
+        ).scalar_one()
+
+
+def test_password_stays_out_of_the_command_line() -> None:
+    engine = create_engine(f"postgresql+psycopg2://cnpj:{SENHA.replace('@', '%40')}@db:5432/cnpj")
+
+    assert snapshot._libpq_url(engine) == "postgresql://cnpj@db:5432/cnpj"
+    assert snapshot._libpq_env(engine)["PGPASSWORD"] == SENHA
+
+
+def test_publish_passes_the_password_in_the_environment(
+    engine: Engine, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    _importacao(engine)
+    chamadas: list[tuple[list[str], dict[str, str]]] = []
+
+    def run(command: list[str], **kwargs: Any) -> subprocess.CompletedProcess[str]:
+        chamadas.append((command, kwargs["env"]))
+        [dump] = [argument.removeprefix("--file=") for argument in command if argument.startswith("--file=")]
+        Path(dump).mkdir()
+        return subprocess.CompletedProcess(command, 0, "", "")
+
+    monkeypatch.setattr(snapshot.subprocess, "run", run)
+    com_senha = create_engine(engine.url.set(password=SENHA))
+
+    snapshot.publish_snapshot(com_senha, output_dir=tmp_path)
+
+    [(command, env)] = chamadas
+    assert make_url(command[-1]).password is None
+    assert not any(SENHA in argument or "s3nh" in argument for argument in command)
+    assert env["PGPASSWORD"] == SENHA
+
+
+def test_publish_refuses_while_an_import_is_running(engine: Engine, tmp_path: Path) -> None:
+    _importacao(engine)
+    _importacao(engine, status="PROCESSING")
+
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.publish_snapshot(engine, output_dir=tmp_path)
+
+
+def test_publish_needs_a_finished_import(engine: Engine, tmp_path: Path) -> None:
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.publish_snapshot(engine, output_dir=tmp_path)
+
+
+def test_corrupted_snapshot_is_rejected(tmp_path: Path) -> None:
+    dump = tmp_path / snapshot.DUMP_DIR_NAME
+    dump.mkdir()
+    (dump / "toc.dat").write_bytes(b"original")
+    manifest = {"arquivos": snapshot._checksums(dump)}
+    (tmp_path / snapshot.MANIFEST_NAME).write_text(json.dumps(manifest))
+    (dump / "toc.dat").write_bytes(b"alterado")
+
+    with pytest.raises(snapshot.SnapshotError, match="Checksum"):
+        snapshot.verify_snapshot(tmp_path)
+
+
+@pytest.fixture
+def destino(migrated_engine: Engine) -> Iterator[Engine]:
+    if shutil.which("pg_dump") is None or shutil.which("pg_restore") is None:
+        pytest.skip("pg_dump/pg_restore fora do PATH")
+
+    nome = f"{migrated_engine.url.database}_restore"
+    with migrated_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text(f"DROP DATABASE IF EXISTS {nome}"))
+        connection.execute(text(f"CREATE DATABASE {nome}"))
+    target = create_engine(migrated_engine.url.set(database=nome))
+    yield target
+    target.dispose()
+    with migrated_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text(f"DROP DATABASE IF EXISTS {nome}"))
+
+
+def test_publish_and_restore(engine: Engine, destino: Engine, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    receita.load(engine, tmp_path, "empresas", [receita.row("empresas")])
+    receita.load(engine, tmp_path, "estabelecimentos", [receita.row("estabelecimentos")])
+    refresh_documentos(engine)
+    importacao_id = _importacao(engine)
+    monkeypatch.setattr(snapshot.settings, "SNAPSHOT_PATH", str(tmp_path / "snapshots"))
+
+    geracao = snapshot.publish_snapshot(engine, jobs=2)
+    assert geracao.name == f"importacao-{importacao_id:06d}"
+    assert (tmp_path / "snapshots" / snapshot.LATEST_NAME).read_text().strip() == geracao.name
+
+    manifest = snapshot.restore_snapshot(destino, snapshot="latest", jobs=2)
+
+    assert manifest["importacao_id"] == importacao_id
+    with destino.connect() as connection:
+        assert connection.execute(text("SELECT cnpj_basico FROM cnpj_documento")).scalars().all() == ["11222333"]
+        assert connection.execute(text("SELECT version_num FROM alembic_version")).scalar() == snapshot._alembic_head()
+
+    with pytest.raises(snapshot.SnapshotError, match="--clean"):
+        snapshot.restore_snapshot(destino, snapshot="latest")